@@ -15,7 +15,7 @@ from alembic import context
 
 # Import your models here to ensure they're registered with SQLAlchemy
 from app.database import Base
-from app.models import user  # noqa - ensure models are imported
+from app import models  # noqa - ensure models are imported
 from app.config import settings
 
 # this is the Alembic Config object, which provides
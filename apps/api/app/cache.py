@@ -0,0 +1,305 @@
+"""
+Result cache configuration and backends.
+
+This module memoizes computed analytics (risk, concentration, ...) keyed by
+portfolio id and a content hash of the portfolio snapshot they are computed
+from. Redis is used when ``REDIS_URL`` is configured and reachable;
+otherwise an in-process LRU cache with the same TTL semantics is used.
+
+Results are keyed only on what they read: the content hash covers every
+position column, prices included, so a result is recomputed exactly when
+an input changes and a price refresh for other symbols leaves it cached.
+The hash comes from the process-local snapshot store, so a result is only
+as fresh as this worker's snapshot of the portfolio (see
+``app.services.snapshot`` for when that is rebuilt). The explicit
+invalidation on position writes reclaims the memory of entries whose
+content hash became unreachable.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import structlog
+
+from app.config import settings
+from app.metrics import registry
+from app.services.snapshot import PortfolioSnapshot, snapshot_store
+
+logger = structlog.get_logger()
+
+KEY_PREFIX = "pxr"
+
+
+class MemoryCache:
+    """
+    In-process cache backend with TTL and LRU eviction.
+
+    Entries are kept in an ``OrderedDict`` in recency order; the least
+    recently used entry is evicted once ``max_entries`` is exceeded. An
+    entry leaves its tag when it is evicted or found expired, so tags do not
+    outgrow the entries.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        """
+        Initialize the memory cache.
+
+        Args:
+            max_entries: Maximum number of cached values before LRU eviction
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[str]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including expired ones."""
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the value for ``key`` or ``None`` if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int, tag: Optional[str] = None) -> None:
+        """Store ``value`` for ``ttl`` seconds, optionally grouped under ``tag``."""
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value, tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        """Remove an entry and its tag membership."""
+        _, _, tag = self._entries.pop(key)
+        if tag is None:
+            return
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Delete every entry stored under ``tag`` and return how many existed."""
+        removed = 0
+        for key in self._tags.pop(tag, ()):
+            if self._entries.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    async def close(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._tags.clear()
+
+
+class RedisCache:
+    """
+    Redis cache backend.
+
+    Every value is written with ``EX`` so TTL expiry is enforced by Redis;
+    LRU eviction relies on the server's ``maxmemory-policy volatile-lru``,
+    which only evicts keys with a TTL. The same server holds the job
+    queue, whose queued and running jobs have none and must never be
+    evicted.
+    Keys stored under a tag are tracked in a Redis set so that they can be
+    deleted together.
+    """
+
+    def __init__(self, client):
+        """
+        Initialize the Redis cache.
+
+        Args:
+            client: ``redis.asyncio.Redis`` compatible client with ``decode_responses=True``
+        """
+        self.client = client
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the value for ``key`` or ``None``."""
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int, tag: Optional[str] = None) -> None:
+        """Store ``value`` for ``ttl`` seconds, optionally grouped under ``tag``."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(key, value, ex=ttl)
+            if tag is not None:
+                pipe.sadd(tag, key)
+                pipe.expire(tag, ttl)
+            await pipe.execute()
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Delete every entry stored under ``tag`` and return how many existed."""
+        keys = await self.client.smembers(tag)
+        if not keys:
+            return 0
+        removed = await self.client.delete(*keys)
+        await self.client.delete(tag)
+        return removed
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self.client.close()
+
+
+class ResultCache:
+    """
+    Memoization layer for portfolio analytics.
+
+    Backend failures are logged and treated as misses so that an unhealthy
+    cache degrades to recomputation rather than failing requests.
+    """
+
+    def __init__(self, backend, ttl: int = 300):
+        """
+        Initialize the result cache.
+
+        Args:
+            backend: ``MemoryCache`` or ``RedisCache`` instance
+            ttl: Time to live for cached results in seconds
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def portfolio_tag(portfolio_id: int) -> str:
+        """Return the tag grouping all entries of a portfolio."""
+        return f"{KEY_PREFIX}:portfolio:{portfolio_id}"
+
+    @staticmethod
+    def make_key(kind: str, snapshot: PortfolioSnapshot) -> str:
+        """Return the cache key for a result of ``kind`` computed from ``snapshot``."""
+        return f"{KEY_PREFIX}:{kind}:{snapshot.portfolio_id}:{snapshot.content_hash}"
+
+    async def get_or_compute(
+        self,
+        kind: str,
+        snapshot: PortfolioSnapshot,
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Return the cached result for ``snapshot``, computing it on a miss.
+
+        Args:
+            kind: Result family, e.g. ``"risk"`` or ``"concentration"``
+            snapshot: Portfolio snapshot the result is derived from
+            compute: Zero-argument callable returning a JSON-serializable dict
+
+        Returns:
+            The cached or freshly computed result
+        """
+        key = None
+        try:
+            key = self.make_key(kind, snapshot)
+            cached = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Result cache read failed", kind=kind, error=str(e))
+            cached = None
+
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        self.misses += 1
+        result = compute()
+        if key is not None:
+            try:
+                await self.backend.set(
+                    key,
+                    json.dumps(result, default=str),
+                    self.ttl,
+                    tag=self.portfolio_tag(snapshot.portfolio_id),
+                )
+            except Exception as e:
+                logger.warning("Result cache write failed", kind=kind, error=str(e))
+        return result
+
+    async def invalidate(self, portfolio_id: int) -> None:
+        """Delete every cached result for a portfolio."""
+        try:
+            await self.backend.invalidate_tag(self.portfolio_tag(portfolio_id))
+        except Exception as e:
+            logger.warning("Result cache invalidation failed", portfolio_id=portfolio_id, error=str(e))
+
+    def schedule_invalidate(self, portfolio_id: int) -> None:
+        """
+        Invalidate a portfolio from synchronous code.
+
+        Used as a snapshot store listener, which runs inside SQLAlchemy's
+        ``after_commit`` hook. Outside an event loop there is nothing to do:
+        the content-hashed keys already make old entries unreachable.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(portfolio_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+result_cache = ResultCache(MemoryCache(settings.CACHE_MAX_ENTRIES), ttl=settings.CACHE_TTL_SECONDS)
+snapshot_store.add_listener(result_cache.schedule_invalidate)
+
+registry.counter(
+    "result_cache_hits_total", "Analytics results served from the result cache",
+    function=lambda: result_cache.hits,
+)
+registry.counter(
+    "result_cache_misses_total", "Analytics results computed on a result cache miss",
+    function=lambda: result_cache.misses,
+)
+registry.gauge(
+    "result_cache_hit_ratio", "Fraction of result cache lookups served from the cache",
+    function=lambda: result_cache.hit_ratio,
+)
+
+
+async def init_cache() -> None:
+    """Switch the result cache to Redis when configured and reachable."""
+    if not settings.REDIS_URL:
+        logger.info("REDIS_URL not set, using in-process result cache")
+        return
+
+    import redis.asyncio as redis
+
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning("Redis unavailable, using in-process result cache", error=str(e))
+        await client.close()
+        return
+
+    result_cache.backend = RedisCache(client)
+    logger.info("Result cache connected to Redis")
+
+
+async def close_cache() -> None:
+    """Close the result cache backend."""
+    try:
+        await result_cache.backend.close()
+        logger.info("Result cache closed successfully")
+    except Exception as e:
+        logger.error("Failed to close result cache", error=str(e), exc_info=True)
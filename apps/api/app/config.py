@@ -2,11 +2,12 @@
 Application configuration management using Pydantic Settings.
 
 This module handles environment variable loading and validation
-using Pydantic's BaseSettings class.
+using the BaseSettings class from pydantic-settings.
 """
 
-from typing import List, Optional, Union
-from pydantic import AnyHttpUrl, BaseSettings, PostgresDsn, validator
+from typing import List, Literal, Optional, Union
+from pydantic import AnyHttpUrl, PostgresDsn, ValidationInfo, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -32,24 +33,43 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
     
-    @validator("SQLALCHEMY_DATABASE_URI", pre=True)
-    def assemble_db_connection(cls, v: Optional[str], values: dict) -> str:
+    @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
+    @classmethod
+    def assemble_db_connection(cls, v: Optional[str], info: ValidationInfo) -> Union[str, PostgresDsn]:
         """Assemble database URL from individual components."""
         if isinstance(v, str):
             return v
+        values = info.data
         return PostgresDsn.build(
             scheme="postgresql+asyncpg",
-            user=values.get("POSTGRES_USER"),
+            username=values.get("POSTGRES_USER"),
             password=values.get("POSTGRES_PASSWORD"),
             host=values.get("POSTGRES_SERVER"),
-            port=str(values.get("POSTGRES_PORT", 5432)),
-            path=f"/{values.get('POSTGRES_DB') or ''}",
+            port=values.get("POSTGRES_PORT", 5432),
+            path=values.get("POSTGRES_DB") or "",
         )
     
+    # Connection pool (applies to the primary and the replica engine)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 300  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    
+    # Startup ("alembic" skips create_all when the database is at the migration head)
+    STARTUP_SCHEMA_MODE: Literal["create_all", "alembic"] = "create_all"
+    STARTUP_WARM_CONNECTIONS: int = 2  # Pooled connections opened before serving
+    
+    # Optional read replica for analytics GETs
+    SQLALCHEMY_REPLICA_URI: Optional[PostgresDsn] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 2.0  # Read from primary this long after a local commit
+    
     # CORS
-    BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
+    # A comma-separated string is not JSON, so the str arm lets it reach the validator.
+    BACKEND_CORS_ORIGINS: Union[List[AnyHttpUrl], str] = []
     
-    @validator("BACKEND_CORS_ORIGINS", pre=True)
+    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @classmethod
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         """Parse CORS origins from comma-separated string or list."""
         if isinstance(v, str) and not v.startswith("["):
@@ -61,6 +81,61 @@ class Settings(BaseSettings):
     # Redis (for caching, sessions, etc.)
     REDIS_URL: Optional[str] = None
     
+    # Result cache (Redis when available, in-process LRU otherwise)
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 10000
+    
+    # Portfolio snapshots (per-process LRU; invalidations relayed between workers over Redis)
+    SNAPSHOT_MAX_ENTRIES: int = 10000
+    SNAPSHOT_TTL_SECONDS: float = 60.0
+    
+    # Market data (quote provider: fake, alphavantage or polygon)
+    MARKET_DATA_PROVIDER: str = "fake"
+    MARKET_DATA_API_KEY: Optional[str] = None
+    MARKET_DATA_RATE_PER_MINUTE: float = 5.0  # Alpha Vantage free tier
+    MARKET_DATA_BURST: int = 5
+    MARKET_DATA_MAX_WAIT_SECONDS: float = 10.0  # Fail lookups that would wait longer for a token
+    MARKET_DATA_BATCH_WINDOW_MS: float = 5.0
+    MARKET_DATA_TIMEOUT_SECONDS: float = 10.0
+    MARKET_DATA_MAX_CONNECTIONS: int = 10
+    
+    # Price cache (in-process LRU in front of Redis; fresh until the next open while the market is closed)
+    PRICE_CACHE_QUOTE_TTL_SECONDS: float = 60.0
+    PRICE_CACHE_BAR_TTL_SECONDS: float = 21600.0
+    PRICE_CACHE_MAX_ENTRIES: int = 50000
+    MARKET_TIMEZONE: str = "America/New_York"
+    MARKET_OPEN: str = "09:30"
+    MARKET_CLOSE: str = "16:00"
+    
+    # Stress testing (compiled .npz from `python -m app.services.stress`; built-in scenarios when unset)
+    STRESS_SCENARIOS_PATH: Optional[str] = None
+    
+    # Security reference data (memory-mapped file from `python -m app.services.reference_data`; polled for new versions)
+    REFERENCE_DATA_PATH: Optional[str] = None
+    REFERENCE_DATA_POLL_SECONDS: float = 30.0
+    
+    # Background jobs (Redis-backed when REDIS_URL is reachable; import jobs then need JOB_SPOOL_DIR on shared storage)
+    JOB_CONCURRENCY: int = 2
+    JOB_PROCESS_WORKERS: int = 2
+    JOB_RESULT_TTL_SECONDS: float = 3600.0
+    JOB_LEASE_SECONDS: float = 30.0  # Jobs of a worker silent this long are requeued
+    JOB_SPOOL_DIR: Optional[str] = None
+    
+    # Live dashboard stream (server-sent events; one price refresh loop per worker)
+    LIVE_UPDATE_INTERVAL_SECONDS: float = 5.0
+    LIVE_KEEPALIVE_SECONDS: float = 15.0
+    LIVE_MAX_CONNECTIONS: int = 1000
+    
+    # Risk history (snapshots recorded on position changes, debounced, and at every market close)
+    RISK_HISTORY_DEBOUNCE_SECONDS: float = 2.0
+    RISK_HISTORY_CLOSE_CHECK_SECONDS: float = 60.0
+    
+    # Pre-forking launcher (`python -m app.server`; workers share a price table refreshed by one updater)
+    SERVER_WORKERS: int = 2
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+    SHARED_PRICES_CAPACITY: int = 20000
+    SHARED_PRICES_REFRESH_SECONDS: float = 15.0
+    
     # Email (for notifications)
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
@@ -72,14 +147,17 @@ class Settings(BaseSettings):
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 1.0  # Fraction of successful requests logged
+    LOG_ASYNC: bool = True  # Render and write log lines on a background thread
+    
+    # Health monitoring (background system sampler)
+    HEALTH_SAMPLE_INTERVAL_SECONDS: float = 5.0
+    HEALTH_SAMPLE_HISTORY: int = 60
     
     # Testing
     TESTING: bool = False
     
-    class Config:
-        """Pydantic configuration."""
-        case_sensitive = True
-        env_file = ".env"
+    model_config = SettingsConfigDict(case_sensitive=True, env_file=".env", extra="ignore")
 
 
 settings = Settings()
\ No newline at end of file
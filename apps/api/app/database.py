@@ -3,25 +3,190 @@ Database configuration and session management.
 
 This module contains SQLAlchemy configuration for async database operations,
 session management, and database table creation utilities.
+
+Pool sizing comes from ``Settings`` and every pool is instrumented in the
+metrics registry (checkout wait, pre-ping cost, overflow connections and
+checkout timeouts, labelled by pool). When ``SQLALCHEMY_REPLICA_URI`` is set,
+``get_read_db`` (and ``get_read_sessionmaker``) sessions send plain SELECTs
+to the read replica.
 """
 
+import asyncio
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
 import structlog
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import MetaData, Select, event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
+from app.metrics import registry
 
 logger = structlog.get_logger()
 
-# SQLAlchemy async engine
-engine = create_async_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI),
-    echo=settings.DEBUG,
-    future=True,
-    pool_pre_ping=True,
-    pool_recycle=300,
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the database pool",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+POOL_PRE_PING = registry.histogram(
+    "db_pool_pre_ping_seconds",
+    "Time spent pinging connections on checkout (pool_pre_ping)",
+    ("pool",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+POOL_CHECKOUT_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT because the pool was exhausted",
+    ("pool",),
 )
+POOL_OVERFLOW_CONNECTS = registry.counter(
+    "db_pool_overflow_connections_total",
+    "Connections opened beyond the pool size (max_overflow)",
+    ("pool",),
+)
+
+_CHECKOUT_STARTED = "pxr_checkout_started"
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited for a connection."""
+
+    role = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(pool=self.role)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, pool=self.role)
+        if not record.fresh:
+            # Fresh connections skip the pre-ping; only time real pings.
+            record.info[_CHECKOUT_STARTED] = time.perf_counter()
+        return record
+
+
+def _instrument_pool(engine: AsyncEngine, role: str) -> None:
+    """Attach pool event hooks recording pre-ping cost and overflow usage."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        overflow = getattr(sync_engine.pool, "overflow", None)
+        if overflow is not None and overflow() > 0:
+            POOL_OVERFLOW_CONNECTS.inc(pool=role)
+
+    if settings.DB_POOL_PRE_PING:
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            # The checkout event fires after the pre-ping, so the time since
+            # ``_do_get`` returned is the ping round trip.
+            started = connection_record.info.pop(_CHECKOUT_STARTED, None)
+            if started is not None:
+                POOL_PRE_PING.observe(time.perf_counter() - started, pool=role)
+
+
+def create_engine_for(url: str, role: str) -> AsyncEngine:
+    """
+    Create an instrumented async engine using the configured pool settings.
+
+    Args:
+        url: Database URL
+        role: Pool label used in metrics, e.g. ``"primary"`` or ``"replica"``
+    """
+    poolclass = type(
+        f"{role.title()}{InstrumentedAsyncAdaptedQueuePool.__name__}",
+        (InstrumentedAsyncAdaptedQueuePool,),
+        {"role": role},
+    )
+    engine = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        future=True,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    _instrument_pool(engine, role)
+    return engine
+
+
+# SQLAlchemy async engines
+engine = create_engine_for(str(settings.SQLALCHEMY_DATABASE_URI), "primary")
+replica_engine: Optional[AsyncEngine] = (
+    create_engine_for(str(settings.SQLALCHEMY_REPLICA_URI), "replica")
+    if settings.SQLALCHEMY_REPLICA_URI
+    else None
+)
+
+
+def _engines() -> Dict[str, AsyncEngine]:
+    """Return the configured engines by pool label."""
+    engines = {"primary": engine}
+    if replica_engine is not None:
+        engines["replica"] = replica_engine
+    return engines
+
+
+registry.gauge(
+    "db_pool_size", "Configured size of the database pool", ("pool",),
+    function=lambda: {(role, ): e.pool.size() for role, e in _engines().items()},
+)
+registry.gauge(
+    "db_pool_checked_out", "Database connections currently checked out", ("pool",),
+    function=lambda: {(role, ): e.pool.checkedout() for role, e in _engines().items()},
+)
+registry.gauge(
+    "db_pool_overflow", "Database connections open beyond the pool size", ("pool",),
+    function=lambda: {(role, ): max(e.pool.overflow(), 0) for role, e in _engines().items()},
+)
+
+# Monotonic time of the last commit in the current context. Requests, jobs
+# and background tasks each run in their own copy of the context, so one
+# request's write does not pin every other request to the primary.
+_last_primary_commit: ContextVar[float] = ContextVar("last_primary_commit", default=float("-inf"))
+
+
+class RoutingSession(Session):
+    """
+    Session sending SELECTs to the read replica and everything else to the primary.
+
+    Reads stay on the primary when no replica is configured, while flushing,
+    for statements executed with ``bind_arguments={"primary": True}``, and
+    for ``DB_REPLICA_MAX_LAG_SECONDS`` after a commit in the same request or
+    task, so it does not read its own write back from a lagging replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, primary: bool = False, **kw):
+        if (
+            primary
+            or replica_engine is None
+            or self._flushing
+            or not isinstance(clause, Select)
+            or time.monotonic() - _last_primary_commit.get() < settings.DB_REPLICA_MAX_LAG_SECONDS
+        ):
+            return engine.sync_engine
+        return replica_engine.sync_engine
+
+
+@event.listens_for(Session, "after_commit")
+def _record_primary_commit(session: Session) -> None:
+    """Remember when the current context last committed, for read-your-writes routing."""
+    _last_primary_commit.set(time.monotonic())
+
 
 # Async session maker
 AsyncSessionLocal = async_sessionmaker(
@@ -32,6 +197,15 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Session maker for read-mostly analytics endpoints
+ReadSessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    sync_session_class=RoutingSession,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 # Naming convention for constraints
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -65,12 +239,52 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """
+    Dependency function to get a read-routed database session.
+
+    SELECTs go to the read replica when one is configured; use this for
+    analytics GET endpoints only.
+
+    Yields:
+        AsyncSession: Database session instance
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error("Database session error", error=str(e), exc_info=True)
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    """
+    Dependency function to get the primary session factory.
+
+    For streaming response bodies: FastAPI exits ``get_db`` before the body
+    runs, so a body that writes opens and closes its own session.
+    """
+    return AsyncSessionLocal
+
+
+def get_read_sessionmaker() -> async_sessionmaker:
+    """
+    Dependency function to get the read-routed session factory.
+
+    The ``get_sessionmaker`` counterpart for streaming bodies that only read.
+    """
+    return ReadSessionLocal
+
+
 async def create_tables() -> None:
     """Create database tables."""
     try:
         async with engine.begin() as conn:
             # Import all models here to ensure they're registered
-            from app.models import user  # noqa
+            from app import models  # noqa
             
             await conn.run_sync(Base.metadata.create_all)
             logger.info("Database tables created successfully")
@@ -79,6 +293,76 @@ async def create_tables() -> None:
         raise
 
 
+def _alembic_heads() -> Tuple[str, ...]:
+    """Return the head revisions of the migration scripts, empty without Alembic."""
+    try:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+    except ImportError:
+        return ()
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return tuple(ScriptDirectory.from_config(config).get_heads())
+
+
+async def schema_is_current() -> bool:
+    """
+    Return whether the database is at the head of the Alembic migrations.
+
+    Only the ``alembic_version`` row is read, which is far cheaper than the
+    per-table reflection ``create_all`` performs. Without migration scripts
+    the answer is always ``False``.
+    """
+    heads = await asyncio.to_thread(_alembic_heads)
+    if not heads:
+        return False
+
+    def current(sync_conn) -> Tuple[str, ...]:
+        from alembic.runtime.migration import MigrationContext
+
+        return tuple(MigrationContext.configure(sync_conn).get_current_heads())
+
+    try:
+        async with engine.connect() as conn:
+            applied = await conn.run_sync(current)
+    except Exception as e:
+        logger.warning("Could not read the applied migration revision", error=str(e))
+        return False
+    return set(applied) == set(heads)
+
+
+async def prepare_schema(mode: str = "create_all") -> str:
+    """
+    Make sure the schema exists before serving.
+
+    Args:
+        mode: ``"create_all"`` always runs ``create_tables``; ``"alembic"``
+            skips it when the database is at the migration head
+
+    Returns:
+        ``"created"`` or ``"current"``
+    """
+    if mode == "alembic":
+        if await schema_is_current():
+            logger.info("Database schema at migration head, skipping create_tables")
+            return "current"
+        logger.warning("Database schema not at migration head, running create_tables")
+    await create_tables()
+    return "created"
+
+
+async def warm_pool(connections: int) -> None:
+    """Open ``connections`` pooled connections concurrently so early requests find them ready."""
+
+    async def ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    connections = min(connections, settings.DB_POOL_SIZE)
+    if connections > 0:
+        await asyncio.gather(*(ping() for _ in range(connections)))
+
+
 async def drop_tables() -> None:
     """Drop all database tables (useful for testing)."""
     try:
@@ -91,9 +375,10 @@ async def drop_tables() -> None:
 
 
 async def close_db() -> None:
-    """Close database engine."""
+    """Close database engines."""
     try:
-        await engine.dispose()
+        for db_engine in _engines().values():
+            await db_engine.dispose()
         logger.info("Database engine disposed successfully")
     except Exception as e:
         logger.error("Failed to dispose database engine", error=str(e), exc_info=True)
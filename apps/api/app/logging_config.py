@@ -0,0 +1,113 @@
+"""
+Structured logging configuration.
+
+structlog runs the cheap processors (level filter, timestamp, exception
+formatting) on the calling thread and hands the event dict to the standard
+library logging machinery. With ``LOG_ASYNC`` enabled, records are put on a
+queue and a ``QueueListener`` thread renders them to JSON and writes them, so
+serialization and stream I/O never run on the event loop.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+import structlog
+
+# Processors applied to records from both structlog and plain stdlib loggers.
+_SHARED_PROCESSORS = [
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+    structlog.processors.TimeStamper(fmt="iso"),
+]
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    ``QueueHandler.prepare`` renders the full message before enqueueing; here
+    structlog records keep their event dict and only plain stdlib records get
+    their ``%`` arguments merged, so JSON rendering happens off the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Make the record safe to hand to another thread without rendering it."""
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def _formatter() -> structlog.stdlib.ProcessorFormatter:
+    """Return the formatter rendering event dicts as JSON lines."""
+    return structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=_SHARED_PROCESSORS + [structlog.processors.format_exc_info],
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.JSONRenderer(),
+        ],
+    )
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(level: str = "INFO", async_sink: bool = True) -> None:
+    """
+    Configure structlog and the root logger.
+
+    Safe to call more than once; the previous listener is flushed and replaced.
+
+    Args:
+        level: Root log level name, e.g. ``"INFO"``
+        async_sink: Render and write records on a background thread
+    """
+    global _listener, _handler
+    stop_logging()
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_formatter())
+    if async_sink:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _handler = DeferredQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        _handler = stream_handler
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            *_SHARED_PROCESSORS,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+
+atexit.register(stop_logging)
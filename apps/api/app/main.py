@@ -5,36 +5,40 @@ This module contains the FastAPI application instance with CORS configuration,
 middleware setup, and route registration.
 """
 
+import asyncio
 import structlog
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.cache import close_cache, init_cache
 from app.config import settings
-from app.database import create_tables
+from app.database import prepare_schema, warm_pool
+from app.logging_config import configure_logging
 from app.middleware.logging import LoggingMiddleware
-from app.routers import health
+from app.middleware.metrics import MetricsMiddleware
+from app.monitoring import system_sampler
+from app.responses import FastJSONResponse
+from app.services.market_data import (
+    close_market_data,
+    close_price_cache,
+    init_market_data,
+    init_price_cache,
+)
+from app.services.correlation_feed import correlation_feed
+from app.services.jobs import close_jobs, init_jobs
+from app.services.live import dashboard_hub
+from app.services.reference_data import reference_data
+from app.services.risk_history import risk_history
+from app.services.snapshot_relay import close_snapshot_relay, init_snapshot_relay
+from app.services.stress import stress_tester
+from app.startup import startup_timer
+from app.routers import health, imports, jobs, live, market, metrics, positions, risk
 
 
 # Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+configure_logging(settings.LOG_LEVEL, async_sink=settings.LOG_ASYNC)
 
 logger = structlog.get_logger()
 
@@ -44,13 +48,49 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown events."""
     # Startup
     logger.info("Starting up application", app_name=settings.APP_NAME)
-    await create_tables()
-    logger.info("Application startup complete")
+    startup_timer.begin()
+    # Independent phases run concurrently; the price cache, job broker and
+    # snapshot relay share the result cache's Redis connection, so they follow it.
+    phases = dict(
+        db_pool=warm_pool(settings.STARTUP_WARM_CONNECTIONS),
+        cache=init_cache(),
+        market_data=init_market_data(),
+    )
+    # Workers of the pre-forking launcher (app.server) inherit the schema,
+    # scenarios and reference data its parent prepared once for all of them.
+    if not getattr(app.state, "preloaded", False):
+        phases.update(
+            schema=prepare_schema(settings.STARTUP_SCHEMA_MODE),
+            stress_scenarios=asyncio.to_thread(stress_tester.load, settings.STRESS_SCENARIOS_PATH),
+            reference_data=reference_data.load_async(settings.REFERENCE_DATA_PATH),
+        )
+    await startup_timer.concurrently(**phases)
+    await startup_timer.concurrently(
+        price_cache=init_price_cache(),
+        jobs=init_jobs(),
+        snapshot_relay=init_snapshot_relay(),
+    )
+    reference_data.start(settings.REFERENCE_DATA_POLL_SECONDS)
+    correlation_feed.start()
+    dashboard_hub.start()
+    risk_history.start()
+    system_sampler.start()
+    startup_timer.report()
     
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    await system_sampler.stop()
+    await dashboard_hub.stop()
+    await risk_history.stop()
+    await correlation_feed.stop()
+    await reference_data.stop()
+    await close_jobs()
+    await close_snapshot_relay()
+    await close_price_cache()
+    await close_market_data()
+    await close_cache()
 
 
 def create_application() -> FastAPI:
@@ -64,20 +104,23 @@ def create_application() -> FastAPI:
         docs_url=f"{settings.API_V1_STR}/docs" if settings.DEBUG else None,
         redoc_url=f"{settings.API_V1_STR}/redoc" if settings.DEBUG else None,
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     # Set up CORS
     if settings.BACKEND_CORS_ORIGINS:
         app.add_middleware(
             CORSMiddleware,
-            allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+            # URLs render with a trailing slash; Origin headers have none.
+            allow_origins=[str(origin).rstrip("/") for origin in settings.BACKEND_CORS_ORIGINS],
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
         )
 
     # Add custom middleware
-    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(LoggingMiddleware, sample_rate=settings.LOG_SAMPLE_RATE)
+    app.add_middleware(MetricsMiddleware)
 
     # Include routers
     app.include_router(
@@ -85,6 +128,41 @@ def create_application() -> FastAPI:
         prefix=settings.API_V1_STR,
         tags=["health"]
     )
+    app.include_router(
+        metrics.router,
+        prefix=settings.API_V1_STR,
+        tags=["health"]
+    )
+    app.include_router(
+        risk.router,
+        prefix=settings.API_V1_STR,
+        tags=["risk"]
+    )
+    app.include_router(
+        positions.router,
+        prefix=settings.API_V1_STR,
+        tags=["positions"]
+    )
+    app.include_router(
+        imports.router,
+        prefix=settings.API_V1_STR,
+        tags=["import"]
+    )
+    app.include_router(
+        jobs.router,
+        prefix=settings.API_V1_STR,
+        tags=["jobs"]
+    )
+    app.include_router(
+        live.router,
+        prefix=settings.API_V1_STR,
+        tags=["live"]
+    )
+    app.include_router(
+        market.router,
+        prefix=settings.API_V1_STR,
+        tags=["market"]
+    )
 
     @app.exception_handler(500)
     async def internal_server_error_handler(request, exc):
@@ -0,0 +1,276 @@
+"""
+In-process metrics registry.
+
+This module provides counters, gauges and histograms that are rendered in the
+Prometheus text exposition format by the ``/metrics`` endpoint. Metrics are
+registered by the modules that own the measured resource (HTTP middleware,
+database engine, result cache); gauges can be backed by a callback so that
+values such as pool sizes are read at scrape time instead of being tracked.
+
+Observations are made from the event loop thread, so no locking is done.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus client default buckets, in seconds.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    """Render ``{name="value",...}``, or an empty string without labels."""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integral values free of a decimal point."""
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class holding name, help text and label names."""
+
+    type_name = "untyped"
+    function: Optional[Callable[[], Any]] = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name, e.g. ``http_request_duration_seconds``
+            documentation: Help text
+            labelnames: Names of the labels every observation must supply
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Return the label values in ``labelnames`` order."""
+        try:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return key
+
+    def _current(self) -> Dict[LabelValues, float]:
+        """Return stored values, or the callback's values when one is set."""
+        if self.function is None:
+            return self._values
+        value = self.function()
+        if not self.labelnames:
+            return {(): float(value)}
+        return {tuple(str(v) for v in key): float(v) for key, v in value.items()}
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Return ``(suffix, rendered labels, value)`` triples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric family in the text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{labels} {_format_value(value)}"
+            for suffix, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Any]] = None):
+        """
+        Initialize the counter.
+
+        Args:
+            function: Optional callback returning the current total, or for
+                labelled counters a mapping of label value tuples to totals
+        """
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the counter by ``amount``."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Return the current value."""
+        return self._current().get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [
+            ("", _format_labels(self.labelnames, key), value)
+            for key, value in sorted(self._current().items())
+        ]
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Any]] = None):
+        """
+        Initialize the gauge.
+
+        Args:
+            function: Optional callback returning the current value, or for
+                labelled gauges a mapping of label value tuples to values
+        """
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge to ``value``."""
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the gauge by ``amount``."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the gauge by ``amount``."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        """Return the current value."""
+        return self._current().get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [
+            ("", _format_labels(self.labelnames, key), value)
+            for key, value in sorted(self._current().items())
+        ]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations over fixed buckets.
+
+    Each label set keeps per-bucket counts (non-cumulative, summed when
+    rendered), a sum and a count, so percentiles can be computed with
+    PromQL's ``histogram_quantile``.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Increasing upper bounds; ``+Inf`` is implied
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for a label set."""
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def total(self, **labels: str) -> float:
+        """Return the sum of observations for a label set."""
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        names = self.labelnames + ("le",)
+        for key, state in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), state):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(("_bucket", _format_labels(names, key + (le,)), cumulative))
+            plain = _format_labels(self.labelnames, key)
+            samples.append(("_sum", plain, state[-1]))
+            samples.append(("_count", plain, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric to the registry.
+
+        Raises:
+            ValueError: If a metric with the same name is already registered
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                function: Optional[Callable[[], Any]] = None) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], Any]] = None) -> Gauge:
+        """Create and register a gauge."""
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
@@ -3,93 +3,122 @@ Logging middleware for FastAPI.
 
 This middleware provides structured logging for all HTTP requests and responses,
 including request/response times, status codes, and error tracking.
+
+It is a plain ASGI middleware rather than a ``BaseHTTPMiddleware`` subclass,
+so it adds no per-request task or response stream wrapping. Request fields
+(URL, headers, redaction) are only built for requests that are actually
+logged, and successful requests can be sampled.
 """
 
+import random
 import time
 import uuid
-from typing import Callable
+from typing import Optional
 import structlog
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = structlog.get_logger()
 
+SENSITIVE_HEADERS = frozenset({"authorization", "x-api-key", "cookie", "x-auth-token"})
+
+
+def _request_info(scope: Scope, request_id: str) -> dict:
+    """Build the request log fields from the ASGI scope."""
+    headers = {}
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1")
+        headers[name] = "[REDACTED]" if name in SENSITIVE_HEADERS else value.decode("latin-1")
+
+    query_string = scope.get("query_string", b"").decode("latin-1")
+    host = headers.get("host") or ""
+    url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{scope['path']}"
+    if query_string:
+        url = f"{url}?{query_string}"
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+    client = scope.get("client")
+    return {
+        "request_id": request_id,
+        "method": scope["method"],
+        "url": url,
+        "path": scope["path"],
+        "query_string": query_string,
+        "headers": headers,
+        "client_host": client[0] if client else None,
+        "user_agent": headers.get("user-agent"),
+    }
+
+
+class LoggingMiddleware:
     """
     Middleware for logging HTTP requests and responses.
-    
+
     Logs all incoming requests with timing information, status codes,
-    and any errors that occur during processing.
+    and any errors that occur during processing. Every response carries an
+    ``X-Request-ID`` header, whether or not the request was sampled.
     """
 
-    def __init__(self, app, log_body: bool = False):
+    def __init__(self, app: ASGIApp, log_body: bool = False, sample_rate: float = 1.0):
         """
         Initialize the logging middleware.
-        
+
         Args:
-            app: FastAPI application instance
-            log_body: Whether to log request/response bodies (disabled by default for security)
+            app: ASGI application instance
+            log_body: Whether to log request body sizes (disabled by default)
+            sample_rate: Fraction of successful (< 400) requests to log;
+                client errors, server errors and exceptions are always logged
         """
-        super().__init__(app)
+        self.app = app
         self.log_body = log_body
+        self.sample_rate = sample_rate
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process the request and log details.
-        
+
         Args:
-            request: The incoming HTTP request
-            call_next: The next middleware or route handler
-            
-        Returns:
-            Response: The HTTP response
+            scope: ASGI connection scope
+            receive: ASGI receive callable
+            send: ASGI send callable
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Generate unique request ID for tracing
         request_id = str(uuid.uuid4())
-        
-        # Start timing
-        start_time = time.time()
-        
-        # Extract request information
-        request_info = {
-            "request_id": request_id,
-            "method": request.method,
-            "url": str(request.url),
-            "path": request.url.path,
-            "query_params": dict(request.query_params),
-            "headers": dict(request.headers),
-            "client_host": request.client.host if request.client else None,
-            "user_agent": request.headers.get("user-agent"),
-        }
-        
-        # Remove sensitive headers
-        sensitive_headers = {"authorization", "x-api-key", "cookie", "x-auth-token"}
-        request_info["headers"] = {
-            k: v if k.lower() not in sensitive_headers else "[REDACTED]"
-            for k, v in request_info["headers"].items()
-        }
-
-        # Log request body if enabled (be careful with sensitive data)
-        if self.log_body and request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                if body:
-                    request_info["body_size"] = len(body)
-                    # Don't log actual body content for security
-                    # request_info["body"] = body.decode("utf-8")[:1000]  # First 1000 chars
-            except Exception as e:
-                request_info["body_read_error"] = str(e)
-
-        # Log incoming request
-        logger.info("Request started", **request_info)
-
-        # Process request
-        response = None
-        error = None
-        
+        request_id_header = request_id.encode("latin-1")
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        start_time = time.perf_counter()
+
+        status_code: Optional[int] = None
+        response_size: Optional[int] = None
+        body_size = 0
+
+        if sampled:
+            logger.info("Request started", **_request_info(scope, request_id))
+
+        async def receive_wrapper() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                for key, value in headers:
+                    if key.lower() == b"content-length":
+                        response_size = int(value)
+                headers.append((b"x-request-id", request_id_header))
+                message["headers"] = headers
+            await send(message)
+
+        error: Optional[Exception] = None
         try:
-            response = await call_next(request)
+            await self.app(scope, receive_wrapper if self.log_body else receive, send_wrapper)
         except Exception as e:
             error = e
             logger.error(
@@ -98,47 +127,54 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 error=str(e),
                 exc_info=True
             )
-            # Re-raise the exception to let FastAPI handle it
+            # Re-raise the exception to let the server handle it
             raise
+        finally:
+            self._log_completion(
+                scope, request_id, sampled, start_time, status_code, response_size,
+                body_size if self.log_body else None, error,
+            )
 
-        # Calculate response time
-        process_time = time.time() - start_time
+    def _log_completion(
+        self,
+        scope: Scope,
+        request_id: str,
+        sampled: bool,
+        start_time: float,
+        status_code: Optional[int],
+        response_size: Optional[int],
+        body_size: Optional[int],
+        error: Optional[Exception],
+    ) -> None:
+        """Emit the completion line if the request was sampled or failed."""
+        # Determine log level based on status code
+        if error is not None or status_code is None or status_code >= 500:
+            log_level = "error"
+        elif status_code >= 400:
+            log_level = "warning"
+        else:
+            log_level = "info"
+
+        if not sampled and log_level == "info":
+            return
 
-        # Extract response information
         response_info = {
             "request_id": request_id,
-            "status_code": response.status_code if response else None,
-            "response_time_ms": round(process_time * 1000, 2),
-            "response_size": None,
+            "status_code": status_code,
+            "response_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+            "response_size": response_size,
         }
-
-        # Get response size if available
-        if response and hasattr(response, "headers"):
-            content_length = response.headers.get("content-length")
-            if content_length:
-                response_info["response_size"] = int(content_length)
-
-        # Determine log level based on status code
-        if response:
-            if response.status_code >= 500:
-                log_level = "error"
-            elif response.status_code >= 400:
-                log_level = "warning"
-            else:
-                log_level = "info"
-        else:
-            log_level = "error"
+        if body_size is not None:
+            response_info["body_size"] = body_size
+        if not sampled:
+            # The start line was skipped; keep enough context to act on.
+            response_info["method"] = scope["method"]
+            response_info["path"] = scope["path"]
 
         # Log response
         log_message = "Request completed"
-        if error:
+        if error is not None:
             log_message = "Request failed"
             response_info["error"] = str(error)
 
         getattr(logger, log_level)(log_message, **response_info)
-
-        # Add request ID to response headers for tracing
-        if response:
-            response.headers["X-Request-ID"] = request_id
-
-        return response
\ No newline at end of file
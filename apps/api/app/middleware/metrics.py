@@ -0,0 +1,100 @@
+"""
+Request metrics middleware.
+
+Records per-route, per-status latency histograms and in-flight request
+gauges in the metrics registry. Requests are labelled with the route path
+template (``/api/v1/portfolio/{portfolio_id}/risk``) rather than the raw
+path, so label cardinality stays bounded; requests that match no route are
+labelled ``unmatched``.
+"""
+
+import time
+from typing import Callable, Dict, Optional
+
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import registry
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds by route template and status code",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ("method",),
+)
+
+
+def _route_paths(routes, prefix: str = "") -> Dict[Callable, str]:
+    """Map route endpoints to their path templates, descending into mounts."""
+    paths: Dict[Callable, str] = {}
+    for route in routes:
+        if isinstance(route, Mount):
+            paths.update(_route_paths(route.routes, prefix + route.path))
+        elif getattr(route, "endpoint", None) is not None:
+            paths.setdefault(route.endpoint, prefix + route.path)
+    return paths
+
+
+class MetricsMiddleware:
+    """Middleware timing every HTTP request into the metrics registry."""
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initialize the metrics middleware.
+
+        Args:
+            app: ASGI application instance
+        """
+        self.app = app
+        self._paths: Optional[Dict[Callable, str]] = None
+
+    def _route_for(self, scope: Scope) -> str:
+        """Return the path template of the route that handled ``scope``."""
+        # The router stores the matched endpoint in the (shared) scope.
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._paths is None:
+            self._paths = _route_paths(scope["app"].routes)
+        return self._paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Time the request and record its outcome.
+
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive callable
+            send: ASGI send callable
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec(method=method)
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                method=method,
+                route=self._route_for(scope),
+                status=str(status_code),
+            )
@@ -4,6 +4,9 @@ SQLAlchemy models package.
 This package contains all database models for the application.
 """
 
+from app.models.portfolio import Portfolio
+from app.models.position import Position
+from app.models.risk_snapshot import RiskSnapshot
 from app.models.user import User
 
-__all__ = ["User"]
\ No newline at end of file
+__all__ = ["Portfolio", "Position", "RiskSnapshot", "User"]
@@ -0,0 +1,50 @@
+"""
+Portfolio model for database operations.
+
+This module contains the SQLAlchemy Portfolio model, which groups a user's
+positions and tracks the uninvested cash balance.
+"""
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class Portfolio(Base):
+    """Portfolio model for storing a user's account."""
+
+    __tablename__ = "portfolios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    name = Column(String(100), nullable=False)
+    cash_balance = Column(Float, default=0.0, nullable=False)
+
+    # Timestamps
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of Portfolio."""
+        return f"<Portfolio(id={self.id}, user_id={self.user_id}, name={self.name})>"
+
+    def dict(self) -> dict:
+        """Convert model to dictionary."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "name": self.name,
+            "cash_balance": self.cash_balance,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,67 @@
+"""
+Position model for database operations.
+
+This module contains the SQLAlchemy Position model. Each row is one open lot
+in a portfolio, with the entry price, protective stop and last known price
+used by the risk engine. A (portfolio_id, symbol, lot) triple identifies a
+lot, which is the key bulk writes upsert on; listings page through a
+portfolio's lots on the (portfolio_id, id) index.
+"""
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+DEFAULT_LOT = "default"
+
+
+class Position(Base):
+    """Position model for storing an open lot."""
+
+    __tablename__ = "positions"
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "symbol", "lot"),
+        # Keyset pagination; also serves lookups by portfolio_id alone.
+        Index("ix_positions_portfolio_id_id", "portfolio_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(
+        Integer,
+        ForeignKey("portfolios.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    symbol = Column(String(20), index=True, nullable=False)
+    lot = Column(String(64), default=DEFAULT_LOT, server_default=DEFAULT_LOT, nullable=False)
+    quantity = Column(Float, nullable=False)
+    entry_price = Column(Float, nullable=False)
+    stop_loss = Column(Float, nullable=True)
+    current_price = Column(Float, nullable=True)
+    sector = Column(String(50), nullable=True)
+
+    # Timestamps
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of Position."""
+        return f"<Position(id={self.id}, portfolio_id={self.portfolio_id}, symbol={self.symbol})>"
+
+    def dict(self) -> dict:
+        """Convert model to dictionary."""
+        return {
+            "id": self.id,
+            "portfolio_id": self.portfolio_id,
+            "symbol": self.symbol,
+            "lot": self.lot,
+            "quantity": self.quantity,
+            "entry_price": self.entry_price,
+            "stop_loss": self.stop_loss,
+            "current_price": self.current_price,
+            "sector": self.sector,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
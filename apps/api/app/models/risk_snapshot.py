@@ -0,0 +1,64 @@
+"""
+Risk snapshot model for database operations.
+
+This module contains the SQLAlchemy RiskSnapshot model: a portfolio's risk
+metrics materialized when its positions or end-of-day prices change, so
+history charts read stored values instead of recomputing past risk.
+
+On PostgreSQL the table is range-partitioned by month on ``timestamp``;
+monthly partitions are created by the recorder before it writes into a new
+month and a default partition catches anything outside them. The primary
+key (portfolio_id, timestamp) includes the partition key, as PostgreSQL
+requires, and is the index history ranges are read through.
+"""
+
+from sqlalchemy import DDL, JSON, Column, DateTime, Float, ForeignKey, Integer, event
+
+from app.database import Base
+
+
+class RiskSnapshot(Base):
+    """Risk snapshot model for storing a portfolio's risk at a point in time."""
+
+    __tablename__ = "risk_snapshots"
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
+
+    portfolio_id = Column(
+        Integer,
+        ForeignKey("portfolios.id", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    timestamp = Column(DateTime(timezone=True), primary_key=True)
+    portfolio_value = Column(Float, nullable=False)
+    total_risk_dollars = Column(Float, nullable=False)
+    total_risk_percent = Column(Float, nullable=False)
+    max_concentration = Column(Float, nullable=False)
+    # ``metadata`` is reserved on declarative classes.
+    meta = Column("metadata", JSON, nullable=True)
+
+    def __repr__(self) -> str:
+        """Return string representation of RiskSnapshot."""
+        return f"<RiskSnapshot(portfolio_id={self.portfolio_id}, timestamp={self.timestamp})>"
+
+    def dict(self) -> dict:
+        """Convert model to dictionary."""
+        return {
+            "portfolio_id": self.portfolio_id,
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+            "portfolio_value": self.portfolio_value,
+            "total_risk_dollars": self.total_risk_dollars,
+            "total_risk_percent": self.total_risk_percent,
+            "max_concentration": self.max_concentration,
+            "metadata": self.meta,
+        }
+
+
+event.listen(
+    RiskSnapshot.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS risk_snapshots_default "
+        "PARTITION OF risk_snapshots DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,194 @@
+"""
+Background system metrics sampler.
+
+This module periodically collects CPU, memory, disk and database ping
+latency into a shared snapshot so that health endpoints can serve system
+information without blocking the event loop. The sampler is started from the
+application lifespan; psutil calls run in a worker thread and CPU usage is
+measured over the interval between samples rather than by sleeping.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+import psutil
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = structlog.get_logger()
+
+
+@dataclass(frozen=True)
+class SystemSample:
+    """One point-in-time reading of system and database health."""
+
+    taken_at: datetime
+    monotonic: float
+    cpu_percent: float
+    memory_total: int
+    memory_available: int
+    memory_percent: float
+    disk_total: int
+    disk_free: int
+    disk_used: int
+    db_status: str
+    db_response_time_ms: Optional[float]
+
+    def age(self) -> float:
+        """Return the number of seconds since the sample was taken."""
+        return time.monotonic() - self.monotonic
+
+    def dict(self) -> dict:
+        """Convert sample to a dictionary."""
+        data = asdict(self)
+        data["taken_at"] = self.taken_at.isoformat()
+        del data["monotonic"]
+        return data
+
+
+def _read_system() -> Tuple[float, object, object]:
+    """Read CPU, memory and disk usage (blocking, run in a thread)."""
+    return psutil.cpu_percent(interval=None), psutil.virtual_memory(), psutil.disk_usage('/')
+
+
+class SystemSampler:
+    """
+    Periodic sampler keeping the latest reading and a rolling history.
+
+    ``latest`` is replaced atomically with an immutable ``SystemSample``, so
+    readers never observe a partially updated snapshot.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        interval: float = 5.0,
+        history_size: int = 60,
+    ):
+        """
+        Initialize the sampler.
+
+        Args:
+            session_factory: Session factory used for database pings
+            interval: Seconds between samples
+            history_size: Number of samples kept in the rolling history
+        """
+        self.session_factory = session_factory
+        self.interval = interval
+        self.latest: Optional[SystemSample] = None
+        self.history: Deque[SystemSample] = deque(maxlen=history_size)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Return whether the background task is active."""
+        return self._task is not None and not self._task.done()
+
+    def is_stale(self, sample: Optional[SystemSample] = None) -> bool:
+        """Return whether ``sample`` (default: latest) is missing or older than two intervals."""
+        sample = sample or self.latest
+        return sample is None or sample.age() > 2 * self.interval
+
+    @staticmethod
+    async def _ping_db(db: AsyncSession) -> float:
+        """Run ``SELECT 1`` and return the round trip in milliseconds."""
+        start = time.perf_counter()
+        await db.execute(text("SELECT 1"))
+        return round((time.perf_counter() - start) * 1000, 3)
+
+    async def sample(self, db: Optional[AsyncSession] = None) -> SystemSample:
+        """
+        Take a sample and publish it.
+
+        Args:
+            db: Session to ping with; a new session is opened when omitted
+        """
+        db_status, db_response_time = "healthy", None
+        try:
+            if db is None:
+                async with self.session_factory() as session:
+                    db_response_time = await self._ping_db(session)
+            else:
+                db_response_time = await self._ping_db(db)
+        except Exception as e:
+            logger.error("Database health check failed", error=str(e))
+            db_status = f"unhealthy: {str(e)}"
+
+        cpu, memory, disk = await asyncio.to_thread(_read_system)
+        sample = SystemSample(
+            taken_at=datetime.utcnow(),
+            monotonic=time.monotonic(),
+            cpu_percent=cpu,
+            memory_total=memory.total,
+            memory_available=memory.available,
+            memory_percent=memory.percent,
+            disk_total=disk.total,
+            disk_free=disk.free,
+            disk_used=disk.used,
+            db_status=db_status,
+            db_response_time_ms=db_response_time,
+        )
+        self.latest = sample
+        self.history.append(sample)
+        return sample
+
+    async def _run(self) -> None:
+        """Sample forever at the configured interval."""
+        # The first cpu_percent(interval=None) call only primes the counters.
+        await asyncio.to_thread(psutil.cpu_percent, None)
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error("System sampling failed", error=str(e), exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background sampling task."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="system-sampler")
+            logger.info("System sampler started", interval=self.interval)
+
+    async def stop(self) -> None:
+        """Stop the background sampling task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("System sampler stopped")
+
+    def reset(self) -> None:
+        """Forget all samples."""
+        self.latest = None
+        self.history.clear()
+
+    def history_points(self) -> List[dict]:
+        """Return the rolling history as compact points, oldest first."""
+        return [
+            {
+                "taken_at": s.taken_at.isoformat(),
+                "cpu_usage_percent": s.cpu_percent,
+                "memory_used_percent": s.memory_percent,
+                "db_response_time_ms": s.db_response_time_ms,
+            }
+            for s in self.history
+        ]
+
+
+system_sampler = SystemSampler(
+    AsyncSessionLocal,
+    interval=settings.HEALTH_SAMPLE_INTERVAL_SECONDS,
+    history_size=settings.HEALTH_SAMPLE_HISTORY,
+)
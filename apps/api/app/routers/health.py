@@ -6,7 +6,6 @@ database connectivity, and system health.
 """
 
 import platform
-import psutil
 import structlog
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -15,12 +14,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database import get_db
+from app.monitoring import system_sampler
+from app.responses import trusted_output
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Static for the life of the process, so computed once at import.
+PLATFORM = platform.platform()
+PYTHON_VERSION = platform.python_version()
+
 
 @router.get("/health")
+@trusted_output
 async def health_check():
     """
     Basic health check endpoint.
@@ -36,36 +42,24 @@ async def health_check():
 
 
 @router.get("/health/detailed")
-async def detailed_health_check(db: AsyncSession = Depends(get_db)):
+@trusted_output
+async def detailed_health_check():
     """
     Detailed health check endpoint.
     
     Returns comprehensive health information including database connectivity,
-    system resources, and application metrics.
+    system resources, and application metrics. Readings come from the
+    background system sampler; a fresh sample is only taken inline when the
+    sampler has not produced one recently (e.g. right after startup), and
+    only then is a database session opened.
     """
     try:
-        # Database connectivity check
-        db_status = "unhealthy"
-        db_response_time = None
-        
-        try:
-            start_time = datetime.utcnow()
-            result = await db.execute(text("SELECT 1"))
-            await result.fetchone()
-            end_time = datetime.utcnow()
-            db_response_time = (end_time - start_time).total_seconds() * 1000  # ms
-            db_status = "healthy"
-        except Exception as e:
-            logger.error("Database health check failed", error=str(e))
-            db_status = f"unhealthy: {str(e)}"
-
-        # System information
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        sample = system_sampler.latest
+        if system_sampler.is_stale(sample):
+            sample = await system_sampler.sample()
 
         health_data = {
-            "status": "healthy" if db_status == "healthy" else "degraded",
+            "status": "healthy" if sample.db_status == "healthy" else "degraded",
             "timestamp": datetime.utcnow().isoformat(),
             "version": settings.VERSION,
             "app_name": settings.APP_NAME,
@@ -74,28 +68,35 @@ async def detailed_health_check(db: AsyncSession = Depends(get_db)):
                 "testing": settings.TESTING,
             },
             "database": {
-                "status": db_status,
-                "response_time_ms": db_response_time,
+                "status": sample.db_status,
+                "response_time_ms": sample.db_response_time_ms,
             },
             "system": {
-                "platform": platform.platform(),
-                "python_version": platform.python_version(),
-                "cpu_usage_percent": cpu_usage,
+                "platform": PLATFORM,
+                "python_version": PYTHON_VERSION,
+                "cpu_usage_percent": sample.cpu_percent,
                 "memory": {
-                    "total_gb": round(memory.total / (1024**3), 2),
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "used_percent": memory.percent,
+                    "total_gb": round(sample.memory_total / (1024**3), 2),
+                    "available_gb": round(sample.memory_available / (1024**3), 2),
+                    "used_percent": sample.memory_percent,
                 },
                 "disk": {
-                    "total_gb": round(disk.total / (1024**3), 2),
-                    "free_gb": round(disk.free / (1024**3), 2),
-                    "used_percent": round(disk.used / disk.total * 100, 2),
+                    "total_gb": round(sample.disk_total / (1024**3), 2),
+                    "free_gb": round(sample.disk_free / (1024**3), 2),
+                    "used_percent": round(sample.disk_used / sample.disk_total * 100, 2),
                 },
             },
+            "sample": {
+                "taken_at": sample.taken_at.isoformat(),
+                "age_seconds": round(sample.age(), 3),
+                "interval_seconds": system_sampler.interval,
+                "sampler_running": system_sampler.running,
+                "history": system_sampler.history_points(),
+            },
         }
 
         # Return error status if database is unhealthy
-        if db_status != "healthy":
+        if sample.db_status != "healthy":
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=health_data
@@ -118,6 +119,7 @@ async def detailed_health_check(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/health/liveness")
+@trusted_output
 async def liveness_probe():
     """
     Kubernetes liveness probe endpoint.
@@ -128,6 +130,7 @@ async def liveness_probe():
 
 
 @router.get("/health/readiness")
+@trusted_output
 async def readiness_probe(db: AsyncSession = Depends(get_db)):
     """
     Kubernetes readiness probe endpoint.
@@ -0,0 +1,166 @@
+"""
+Data import router.
+
+This module contains the streaming CSV upload endpoint and its
+background-job variant for large files.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.datastructures import UploadFile
+
+from app.config import settings
+from app.database import get_db, get_sessionmaker
+from app.models.portfolio import Portfolio
+from app.schemas.jobs import JobStatus
+from app.services.csv_import import CsvImporter
+from app.services.csv_import.parser import DEFAULT_CHUNK_SIZE
+from app.services.jobs import job_queue
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+# The upload is read from the form inside the streaming body, after the
+# endpoint has returned, so it is documented here rather than declared as a
+# ``File`` parameter (FastAPI closes those before the body streams).
+CSV_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/import/csv", openapi_extra=CSV_UPLOAD_BODY)
+async def import_csv(
+    request: Request,
+    portfolio_id: int = Query(..., description="Portfolio receiving the positions"),
+    batch_size: int = Query(500, ge=1, le=10000, description="Rows validated per batch"),
+    dry_run: bool = Query(False, description="Validate only, do not import"),
+    skip_invalid: bool = Query(False, description="Import valid rows even if some rows fail"),
+    db: AsyncSession = Depends(get_db),
+    sessions: async_sessionmaker = Depends(get_sessionmaker),
+):
+    """
+    Streaming CSV import endpoint.
+    
+    Reads the uploaded ``file`` in chunks and streams newline-delimited JSON
+    events: ``error`` for each rejected row, ``progress`` after every batch
+    and a final ``complete`` (or ``failed`` for unparseable files). Rows are
+    only committed when the whole file validates, unless ``skip_invalid`` is
+    set.
+    """
+    exists = await db.scalar(select(Portfolio.id).where(Portfolio.id == portfolio_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    # Starlette spools uploads larger than 1MB to a temporary file, so the
+    # form itself stays small regardless of the upload size.
+    form = await request.form()
+    upload = form.get("file")
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Multipart field 'file' is required"
+        )
+
+    async def events():
+        # ``db`` is closed before the body runs; the import gets its own
+        # session. The importer commits when the file validates; anything
+        # left open (client disconnect, error) is rolled back.
+        async with sessions() as import_db:
+            importer = CsvImporter(
+                import_db,
+                portfolio_id,
+                batch_size=batch_size,
+                dry_run=dry_run,
+                skip_invalid=skip_invalid,
+            )
+            try:
+                async for event in importer.run(upload.read):
+                    yield json.dumps(event) + "\n"
+            finally:
+                await import_db.rollback()
+                await form.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/import/csv/jobs",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=CSV_UPLOAD_BODY,
+)
+async def queue_csv_import(
+    request: Request,
+    portfolio_id: int = Query(..., description="Portfolio receiving the positions"),
+    batch_size: int = Query(500, ge=1, le=10000, description="Rows validated per batch"),
+    dry_run: bool = Query(False, description="Validate only, do not import"),
+    skip_invalid: bool = Query(False, description="Import valid rows even if some rows fail"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Background CSV import endpoint.
+
+    Spools the uploaded ``file`` to ``JOB_SPOOL_DIR`` and queues an import
+    job; poll ``/jobs/{id}`` for progress and the final counts and errors.
+    Uploading the same file again while its import is pending returns the
+    pending job. Responds 503 when background imports are disabled (jobs
+    shared through Redis without ``JOB_SPOOL_DIR``).
+    """
+    if "import" in job_queue.disabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=job_queue.disabled["import"]
+        )
+    exists = await db.scalar(select(Portfolio.id).where(Portfolio.id == portfolio_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    form = await request.form()
+    try:
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Multipart field 'file' is required"
+            )
+        digest = hashlib.sha256()
+        fd, path = tempfile.mkstemp(prefix="import-", suffix=".csv", dir=settings.JOB_SPOOL_DIR)
+        with os.fdopen(fd, "wb") as spool:
+            while chunk := await upload.read(DEFAULT_CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+    finally:
+        await form.close()
+
+    params = {"path": path, "batch_size": batch_size, "dry_run": dry_run, "skip_invalid": skip_invalid}
+    dedup_key = job_queue.dedup_key("import", portfolio_id, {**params, "path": digest.hexdigest()})
+    job = await job_queue.submit("import", portfolio_id, params, dedup_key=dedup_key)
+    if job.params["path"] != path:
+        os.unlink(path)
+    return job.dict()
@@ -0,0 +1,54 @@
+"""
+Background jobs router.
+
+This module contains the job status and cancellation endpoints; jobs are
+submitted by the endpoints of the work they perform.
+"""
+
+import structlog
+from fastapi import APIRouter, HTTPException, status
+
+from app.schemas.jobs import JobStatus
+from app.services.jobs import CANCELLED, job_queue
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Job status endpoint.
+
+    Returns the job's status and progress, and its result or error once it
+    has finished. Finished jobs are kept for ``JOB_RESULT_TTL_SECONDS``.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job.dict()
+
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """
+    Job cancellation endpoint.
+
+    Cancels a queued or running job; running jobs stop at their next
+    progress report.
+    """
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    if job.status != CANCELLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}"
+        )
+    return job.dict()
@@ -0,0 +1,77 @@
+"""
+Live dashboard router.
+
+This module streams a portfolio's valuation and risk metrics as server-sent
+events, pushed by the worker's dashboard hub whenever positions or the
+prices of held symbols change.
+"""
+
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_read_db
+from app.services.live import LIVE_EVENTS, TooManyConnections, dashboard_hub, format_event
+from app.services.snapshot import PortfolioNotFoundError, snapshot_store
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.get("/portfolio/{portfolio_id}/live")
+async def stream_portfolio(portfolio_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Live portfolio stream endpoint.
+
+    Sends a ``snapshot`` event with every metric, then ``delta`` events with
+    only the metrics that changed. A client that falls behind receives the
+    accumulated changes in one delta. Comment lines keep idle connections
+    open through proxies.
+
+    The subscription is taken when the body starts streaming, so a client
+    that disconnects before then leaves nothing behind. A connection that
+    loses the race for the last slot is closed with a ``retry`` hint.
+    """
+    try:
+        await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    try:
+        dashboard_hub.admit()
+    except TooManyConnections as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(int(dashboard_hub.interval) + 1)},
+        )
+
+    async def events():
+        try:
+            subscription = dashboard_hub.subscribe(portfolio_id)
+        except TooManyConnections:
+            yield f"retry: {int(dashboard_hub.interval * 1000) + 1000}\n\n"
+            return
+        event_id = 0
+        try:
+            while True:
+                changes = await subscription.next(settings.LIVE_KEEPALIVE_SECONDS)
+                if changes is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event = "snapshot" if event_id == 0 else "delta"
+                event_id += 1
+                LIVE_EVENTS.inc(event=event)
+                yield format_event(event, {"portfolio_id": portfolio_id, **changes}, event_id)
+        finally:
+            dashboard_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,72 @@
+"""
+Market data router.
+
+This module exposes latest quotes through the shared price cache, which
+refreshes missing or stale quotes with the quote client.
+"""
+
+import structlog
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.schemas.market import BatchQuotes, Quote
+from app.services.market_data import MarketDataError, RateLimitExceeded, price_cache
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+MAX_BATCH_SYMBOLS = 500
+
+
+def _upstream_error(e: MarketDataError) -> HTTPException:
+    """Translate a market data failure into an HTTP error."""
+    if isinstance(e, RateLimitExceeded):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
+    return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+
+
+@router.get("/market/quote/{symbol}", response_model=Quote)
+async def get_quote(symbol: str):
+    """
+    Latest quote endpoint.
+
+    Served from the price cache; concurrent misses for the same symbol share
+    one upstream fetch.
+    """
+    try:
+        quote = await price_cache.get_quote(symbol)
+    except MarketDataError as e:
+        raise _upstream_error(e)
+    if quote is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No quote for {symbol.upper()}"
+        )
+    return quote.dict()
+
+
+@router.get("/market/batch-quotes", response_model=BatchQuotes)
+async def get_batch_quotes(symbols: str = Query(..., description="Comma-separated symbols")):
+    """
+    Batch quote endpoint.
+
+    Cached symbols are served from the price cache; the rest are fetched in
+    as few upstream calls as the provider allows.
+    """
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested or len(requested) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Provide between 1 and {MAX_BATCH_SYMBOLS} symbols"
+        )
+    try:
+        quotes = await price_cache.get_quotes(requested)
+    except MarketDataError as e:
+        raise _upstream_error(e)
+    return {
+        "quotes": [quotes[s].dict() for s in requested if s in quotes],
+        "missing_symbols": [s for s in requested if s not in quotes],
+    }
@@ -0,0 +1,24 @@
+"""
+Metrics router.
+
+This module exposes the in-process metrics registry in the Prometheus text
+exposition format for scraping.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics endpoint.
+
+    Returns request latency histograms, in-flight requests, database pool
+    and result cache metrics in the text exposition format.
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,102 @@
+"""
+Positions router.
+
+This module contains endpoints for listing and writing a portfolio's
+positions.
+"""
+
+from typing import Optional
+
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database import get_db, get_read_db, get_read_sessionmaker
+from app.models.portfolio import Portfolio
+from app.schemas.position import POSITION_LIST, PositionBulkCreate, PositionBulkResult, PositionPage
+from app.services.positions import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    parse_fields,
+    stream_positions,
+    upsert_positions,
+)
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.get("/portfolio/{portfolio_id}/positions", response_model=PositionPage)
+async def list_positions(
+    portfolio_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; id is always included"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    sessions: async_sessionmaker = Depends(get_read_sessionmaker),
+):
+    """
+    Position listing endpoint.
+
+    Returns up to ``limit`` lots in ID order with only the requested
+    fields, and a ``next_cursor`` to pass back for the following page.
+    Pages are read by key rather than offset and the body is streamed as
+    rows arrive from the database.
+    """
+    try:
+        projection = parse_fields(fields.split(",") if fields else None)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    exists = await db.scalar(select(Portfolio.id).where(Portfolio.id == portfolio_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    async def body():
+        # ``db`` is closed before the body runs; the page gets its own session.
+        async with sessions() as page_db:
+            async for chunk in stream_positions(page_db, portfolio_id, projection, after=after, limit=limit):
+                yield chunk
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@router.post("/portfolio/{portfolio_id}/positions/bulk", response_model=PositionBulkResult)
+async def bulk_upsert_positions(
+    portfolio_id: int,
+    payload: PositionBulkCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Bulk position upsert endpoint.
+    
+    Inserts every lot in one set-based write, replacing existing lots with
+    the same (symbol, lot). Lots repeated within the payload are merged,
+    keeping the last one.
+    """
+    exists = await db.scalar(select(Portfolio.id).where(Portfolio.id == portfolio_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    try:
+        result = await upsert_positions(db, portfolio_id, POSITION_LIST.dump_python(payload.positions))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error("Bulk position upsert failed", portfolio_id=portfolio_id, error=str(e), exc_info=True)
+        raise
+
+    return {"portfolio_id": portfolio_id, **result.dict()}
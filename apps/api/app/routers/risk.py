@@ -0,0 +1,271 @@
+"""
+Portfolio risk router.
+
+This module exposes the risk engine's metrics, concentration analysis,
+stress test results and the holdings correlation matrix for a single
+portfolio, and queues VaR and stress calculations as background jobs.
+"""
+
+import numpy as np
+import structlog
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import result_cache
+from app.database import get_read_db
+from app.schemas.concentration import ConcentrationAnalysis
+from app.schemas.correlation import CorrelationMatrix
+from app.schemas.jobs import JobStatus, VaRJobRequest
+from app.models import Portfolio
+from app.responses import trusted_output
+from app.schemas.risk import RiskHistory, RiskMetrics
+from app.schemas.stress import StressTestResult
+from app.services.concentration import (
+    DEFAULT_TOP_N,
+    DEFAULT_WARNING_PERCENT,
+    portfolio_concentration,
+)
+from app.services.correlation import HIGH_CORRELATION_THRESHOLD, correlation_service
+from app.services.jobs import job_queue
+from app.services.market_data import price_cache
+from app.services.reference_data import reference_data
+from app.services.risk import calculate_risk
+from app.services.risk_history import DEFAULT_POINTS, load_history
+from app.services.snapshot import PortfolioNotFoundError, snapshot_store
+from app.services.stress import stress_tester
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.get("/portfolio/{portfolio_id}/risk", response_model=RiskMetrics)
+async def get_portfolio_risk(portfolio_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Portfolio risk metrics endpoint.
+    
+    Returns total dollar risk if all stops hit, risk as a percentage of
+    portfolio value and maximum drawdown potential.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    snapshot = await price_cache.reprice(snapshot)
+
+    def compute() -> dict:
+        metrics = calculate_risk(snapshot.arrays, snapshot.cash_balance)
+        logger.debug(
+            "Portfolio risk calculated",
+            portfolio_id=portfolio_id,
+            position_count=metrics.position_count,
+        )
+        return {
+            "portfolio_id": portfolio_id,
+            "calculated_at": datetime.utcnow().isoformat(),
+            **metrics.dict(),
+        }
+
+    return await result_cache.get_or_compute("risk", snapshot, compute)
+
+
+@router.get("/portfolio/{portfolio_id}/risk/history", response_model=RiskHistory)
+@trusted_output
+async def get_portfolio_risk_history(
+    portfolio_id: int,
+    period: Literal["1M", "3M", "1Y"] = Query("1M", alias="range"),
+    points: int = Query(DEFAULT_POINTS, ge=2, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Portfolio risk history endpoint.
+
+    Returns risk recorded when positions changed and at each market close,
+    downsampled to at most ``points`` values (the latest in each time
+    bucket). Past risk is read back, never recomputed.
+    """
+    exists = await db.scalar(select(Portfolio.id).where(Portfolio.id == portfolio_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    return await load_history(db, portfolio_id, period, points)
+
+
+@router.get("/portfolio/{portfolio_id}/concentration", response_model=ConcentrationAnalysis)
+async def get_portfolio_concentration(
+    portfolio_id: int,
+    top: int = Query(DEFAULT_TOP_N, ge=1, le=100),
+    threshold: float = Query(DEFAULT_WARNING_PERCENT, gt=0.0, le=100.0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Portfolio concentration endpoint.
+
+    Returns position, sector, industry, country, market cap and style box
+    concentration with HHI and the ``top`` largest groups of each, and warns
+    about every group above ``threshold`` percent of the portfolio.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    snapshot = await price_cache.reprice(snapshot)
+
+    def compute() -> dict:
+        report = portfolio_concentration(snapshot, top_n=top, threshold=threshold)
+        return {
+            "portfolio_id": portfolio_id,
+            "calculated_at": datetime.utcnow().isoformat(),
+            **report.dict(),
+        }
+
+    kind = f"concentration:{top}:{threshold:g}:{reference_data.version}"
+    return await result_cache.get_or_compute(kind, snapshot, compute)
+
+
+@router.get("/portfolio/{portfolio_id}/stress", response_model=StressTestResult)
+async def get_portfolio_stress(portfolio_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Stress test endpoint.
+
+    Applies every historical stress scenario (2008 crisis, COVID crash, ...)
+    to the portfolio's positions and returns the P&L of each, worst first.
+    Position betas come from the security reference data when loaded.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    snapshot = await price_cache.reprice(snapshot)
+
+    def compute() -> dict:
+        results = stress_tester.run(snapshot, reference_data.betas(snapshot))
+        return {
+            "portfolio_id": portfolio_id,
+            "portfolio_value": round(
+                float(snapshot.quantity @ snapshot.current_price) + snapshot.cash_balance, 2
+            ),
+            "scenarios": [r.dict() for r in results],
+            "calculated_at": datetime.utcnow().isoformat(),
+        }
+
+    return await result_cache.get_or_compute(f"stress:{reference_data.version}", snapshot, compute)
+
+
+@router.post(
+    "/portfolio/{portfolio_id}/risk/calculate",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def calculate_portfolio_var(
+    portfolio_id: int,
+    request: VaRJobRequest,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Queue a VaR calculation job.
+
+    Returns the job to poll at ``/jobs/{id}``. An identical request for the
+    same positions returns the job already queued or running; a request
+    with other parameters cancels it.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    params = request.model_dump()
+    dedup_key = job_queue.dedup_key("var", portfolio_id, {**params, "snapshot": snapshot.content_hash})
+    job = await job_queue.submit("var", portfolio_id, params, dedup_key=dedup_key)
+    return job.dict()
+
+
+@router.post(
+    "/portfolio/{portfolio_id}/stress/calculate",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def calculate_portfolio_stress(portfolio_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Queue a stress test job.
+
+    Returns the job to poll at ``/jobs/{id}``; identical pending requests
+    share one job.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    dedup_key = job_queue.dedup_key("stress", portfolio_id, {
+        "snapshot": snapshot.content_hash, "reference_data": reference_data.version,
+    })
+    job = await job_queue.submit("stress", portfolio_id, {}, dedup_key=dedup_key)
+    return job.dict()
+
+
+@router.get("/portfolio/{portfolio_id}/correlation", response_model=CorrelationMatrix)
+@trusted_output
+async def get_portfolio_correlation(
+    portfolio_id: int,
+    threshold: float = Query(HIGH_CORRELATION_THRESHOLD, ge=0.0, le=1.0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Holdings correlation endpoint.
+
+    Returns the rolling-window correlation matrix of the portfolio's
+    holdings, sliced from the shared universe matrix, and the pairs whose
+    correlation exceeds ``threshold``.
+    """
+    try:
+        snapshot = await snapshot_store.get(db, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    correlation = correlation_service.for_symbols(snapshot.symbols)
+    if len(correlation.symbols) < 2 or correlation.observations < 2:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                "Correlation needs daily price history for at least two holdings; "
+                f"missing history for: {', '.join(correlation.missing_symbols) or 'none'}"
+            ),
+        )
+
+    return {
+        "portfolio_id": portfolio_id,
+        "symbols": correlation.symbols,
+        # Serialized as an array; NaN (no price variation) becomes null.
+        "matrix": np.round(correlation.matrix, 6),
+        "high_correlation_pairs": [
+            {"symbol_a": a, "symbol_b": b, "correlation": round(c, 6)}
+            for a, b, c in correlation.high_pairs(threshold)
+        ],
+        "missing_symbols": correlation.missing_symbols,
+        "observations": correlation.observations,
+        "window": correlation.window,
+        "calculated_at": datetime.utcnow(),
+    }
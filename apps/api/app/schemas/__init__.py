@@ -5,6 +5,19 @@ This package contains all Pydantic schemas for request/response validation
 and serialization.
 """
 
+from app.schemas.imports import ImportRow
+from app.schemas.position import PositionBulkCreate, PositionBulkResult, PositionCreate
+from app.schemas.risk import RiskMetrics
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
 
-__all__ = ["User", "UserCreate", "UserUpdate", "UserInDB"]
\ No newline at end of file
+__all__ = [
+    "ImportRow",
+    "PositionBulkCreate",
+    "PositionBulkResult",
+    "PositionCreate",
+    "RiskMetrics",
+    "User",
+    "UserCreate",
+    "UserUpdate",
+    "UserInDB",
+]
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Concentration schemas for response serialization.
+
+This module contains Pydantic models for the portfolio concentration endpoint.
+"""
+
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class GroupWeight(BaseModel):
+    """Aggregated exposure of one group."""
+
+    key: str = Field(..., description="Symbol, sector or category")
+    value: float = Field(..., description="Absolute market value of the group")
+    percent: float = Field(..., description="Group value as a percentage of portfolio value")
+    positions: int = Field(..., description="Number of positions in the group")
+
+
+class ConcentrationView(BaseModel):
+    """Concentration along one dimension."""
+
+    dimension: str = Field(..., description="position, sector, industry, country, market_cap or style_box")
+    groups: int = Field(..., description="Number of classified groups held")
+    hhi: float = Field(..., description="Herfindahl-Hirschman index of classified group shares (0-10000)")
+    effective_groups: float = Field(..., description="10000 / HHI, the equivalent number of equal groups")
+    unclassified_percent: float = Field(..., description="Share of the portfolio without a classification")
+    top: List[GroupWeight] = Field(..., description="Largest groups, largest first")
+
+
+class ConcentrationWarning(BaseModel):
+    """A group above the warning threshold."""
+
+    dimension: str = Field(..., description="Dimension of the group")
+    key: str = Field(..., description="Symbol, sector or category")
+    percent: float = Field(..., description="Group value as a percentage of portfolio value")
+    threshold: float = Field(..., description="Warning threshold in percent")
+
+
+class ConcentrationAnalysis(BaseModel):
+    """Portfolio concentration response."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    portfolio_value: float = Field(..., description="Gross exposure plus cash")
+    max_concentration: float = Field(..., description="Largest single-position percentage")
+    views: List[ConcentrationView] = Field(..., description="One view per dimension")
+    warnings: List[ConcentrationWarning] = Field(..., description="Groups above the threshold, largest first")
+    calculated_at: datetime = Field(..., description="When the analysis was calculated")
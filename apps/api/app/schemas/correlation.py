@@ -0,0 +1,34 @@
+"""
+Correlation schemas for response serialization.
+
+This module contains Pydantic models for the holdings correlation endpoint.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class CorrelationPair(BaseModel):
+    """A pair of holdings with high correlation."""
+
+    symbol_a: str = Field(..., description="First symbol")
+    symbol_b: str = Field(..., description="Second symbol")
+    correlation: float = Field(..., description="Pearson correlation of daily returns")
+
+
+class CorrelationMatrix(BaseModel):
+    """Correlation matrix of a portfolio's holdings."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    symbols: List[str] = Field(..., description="Symbols in matrix row/column order")
+    matrix: List[List[Optional[float]]] = Field(
+        ..., description="Correlation matrix; null where a symbol had no price variation"
+    )
+    high_correlation_pairs: List[CorrelationPair] = Field(
+        ..., description="Pairs above the correlation threshold, strongest first"
+    )
+    missing_symbols: List[str] = Field(..., description="Holdings without price history")
+    observations: int = Field(..., description="Daily returns in the window")
+    window: int = Field(..., description="Rolling window length in trading days")
+    calculated_at: datetime = Field(..., description="When the matrix was calculated")
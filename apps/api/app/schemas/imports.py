@@ -0,0 +1,65 @@
+"""
+Import schemas for request validation.
+
+This module contains Pydantic models used to validate rows coming from
+broker CSV uploads before they are written as positions. ``IMPORT_ROWS``
+validates and dumps a whole batch of rows in single pydantic-core calls.
+"""
+
+from typing import Any, List
+
+from pydantic import TypeAdapter, model_validator
+
+from app.models.position import DEFAULT_LOT
+from app.schemas.position import PositionCreate
+
+BLANK_CELLS = ('', '-', '--', 'N/A')
+NUMBER_FIELDS = ('quantity', 'entry_price', 'stop_loss', 'current_price')
+
+
+def _blank_to_none(v: Any) -> Any:
+    """Strip a cell, returning ``None`` for an empty one."""
+    if isinstance(v, str):
+        v = v.strip()
+        if v in BLANK_CELLS:
+            return None
+    return v
+
+
+class ImportRow(PositionCreate):
+    """Schema for a single position row from a CSV upload."""
+
+    @model_validator(mode='before')
+    @classmethod
+    def clean_cells(cls, data: Any) -> Any:
+        """
+        Normalize raw CSV cells in one pass over the row.
+
+        Empty cells become missing values (the default lot for ``lot``);
+        currency symbols and thousands separators are removed from numbers,
+        and parenthesized amounts are read as negative.
+        """
+        if not isinstance(data, dict):
+            return data
+        row = dict(data)
+        for field in ('symbol', 'sector'):
+            if field in row:
+                row[field] = _blank_to_none(row[field])
+        lot = row.get('lot')
+        if lot is None or (isinstance(lot, str) and not lot.strip()):
+            row['lot'] = DEFAULT_LOT
+        elif isinstance(lot, str):
+            row['lot'] = lot.strip()
+        for field in NUMBER_FIELDS:
+            if field not in row:
+                continue
+            v = _blank_to_none(row[field])
+            if isinstance(v, str):
+                v = v.replace('$', '').replace(',', '')
+                if v.startswith('(') and v.endswith(')'):
+                    v = f"-{v[1:-1]}"
+            row[field] = v
+        return row
+
+
+IMPORT_ROWS = TypeAdapter(List[ImportRow])
@@ -0,0 +1,40 @@
+"""
+Background job schemas for request validation and response serialization.
+
+This module contains Pydantic models for submitting analytics jobs and
+polling their status, progress and results.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.services.risk.var import DEFAULT_PATHS
+
+
+class VaRJobRequest(BaseModel):
+    """Parameters of a VaR calculation job."""
+
+    method: Literal["parametric", "historical", "monte_carlo"] = Field(
+        "monte_carlo", description="VaR method"
+    )
+    confidence: float = Field(0.95, gt=0.0, lt=1.0, description="Confidence level, e.g. 0.95")
+    horizon_days: int = Field(1, ge=1, le=252, description="Holding period in trading days")
+    paths: int = Field(DEFAULT_PATHS, ge=1_000, le=10_000_000, description="Monte Carlo paths")
+    seed: Optional[int] = Field(None, description="Seed for reproducible Monte Carlo results")
+
+
+class JobStatus(BaseModel):
+    """State, progress and result of a background job."""
+
+    id: str = Field(..., description="Job ID")
+    kind: str = Field(..., description="Job kind (var, stress, import)")
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    status: str = Field(..., description="queued, running, succeeded, failed or cancelled")
+    progress: float = Field(..., description="Fraction of the work done, 0 to 1")
+    message: Optional[str] = Field(None, description="Latest progress or cancellation message")
+    result: Optional[Dict[str, Any]] = Field(None, description="Result once succeeded")
+    error: Optional[str] = Field(None, description="Error once failed")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="When a worker started the job")
+    finished_at: Optional[datetime] = Field(None, description="When the job finished")
@@ -0,0 +1,27 @@
+"""
+Market data schemas for response serialization.
+
+This module contains Pydantic models for the quote endpoints.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class Quote(BaseModel):
+    """Latest quote for a symbol."""
+
+    symbol: str = Field(..., description="Ticker symbol")
+    price: float = Field(..., description="Last price")
+    previous_close: Optional[float] = Field(None, description="Previous session close")
+    volume: Optional[int] = Field(None, description="Session volume")
+    timestamp: datetime = Field(..., description="Time of the quote")
+    source: str = Field(..., description="Market data provider")
+
+
+class BatchQuotes(BaseModel):
+    """Quotes for several symbols."""
+
+    quotes: List[Quote] = Field(..., description="Quotes in request order")
+    missing_symbols: List[str] = Field(..., description="Symbols without a quote")
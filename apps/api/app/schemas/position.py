@@ -0,0 +1,89 @@
+"""
+Position schemas for request/response validation.
+
+This module contains Pydantic models for position write operations,
+including the bulk upsert payload, and for paginated listings. ``POSITION_LIST`` validates and dumps
+whole lists of lots in single pydantic-core calls.
+"""
+
+from datetime import datetime
+from typing import Annotated, List, Optional
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter, field_validator
+
+from app.models.position import DEFAULT_LOT
+
+MAX_BULK_POSITIONS = 100_000
+
+# Normalized and checked in pydantic-core: letters, numbers, dots and hyphens.
+Symbol = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, to_upper=True, min_length=1, max_length=20,
+                      pattern=r'^\s*[A-Za-z0-9.\-]+\s*$'),
+]
+
+
+class PositionCreate(BaseModel):
+    """Schema for creating or replacing a position lot."""
+
+    symbol: Symbol = Field(..., description="Ticker symbol")
+    lot: str = Field(DEFAULT_LOT, min_length=1, max_length=64, description="Lot identifier within the symbol")
+    quantity: float = Field(..., description="Number of shares (negative for shorts)")
+    entry_price: float = Field(..., gt=0, description="Average entry price per share")
+    stop_loss: Optional[float] = Field(None, gt=0, description="Protective stop price")
+    current_price: Optional[float] = Field(None, gt=0, description="Last traded price")
+    sector: Optional[str] = Field(None, max_length=50, description="Sector classification")
+
+    @field_validator('quantity')
+    @classmethod
+    def validate_quantity(cls, v: float) -> float:
+        """Reject zero-share positions."""
+        if v == 0:
+            raise ValueError('Quantity must not be zero')
+        return v
+
+
+class PositionBulkCreate(BaseModel):
+    """Schema for bulk position upserts."""
+
+    positions: List[PositionCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BULK_POSITIONS,
+        description="Position lots to insert or replace",
+    )
+
+
+POSITION_LIST = TypeAdapter(List[PositionCreate])
+
+
+class PositionBulkResult(BaseModel):
+    """Schema for the outcome of a bulk upsert."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    received: int = Field(..., description="Number of lots in the request")
+    written: int = Field(..., description="Number of distinct lots inserted or updated")
+    duplicates: int = Field(..., description="Lots repeated in the request (last one wins)")
+    method: str = Field(..., description="Write path used: copy or insert")
+
+
+class PositionRow(BaseModel):
+    """Schema for a listed position lot; only the requested fields are present."""
+
+    id: int = Field(..., description="Position ID")
+    symbol: Optional[str] = Field(None, description="Ticker symbol")
+    lot: Optional[str] = Field(None, description="Lot identifier within the symbol")
+    quantity: Optional[float] = Field(None, description="Number of shares (negative for shorts)")
+    entry_price: Optional[float] = Field(None, description="Average entry price per share")
+    stop_loss: Optional[float] = Field(None, description="Protective stop price")
+    current_price: Optional[float] = Field(None, description="Last traded price")
+    sector: Optional[str] = Field(None, description="Sector classification")
+    created_at: Optional[datetime] = Field(None, description="Creation timestamp")
+
+
+class PositionPage(BaseModel):
+    """Schema for one page of a portfolio's positions."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    fields: List[str] = Field(..., description="Fields present on each position")
+    positions: List[PositionRow] = Field(..., description="Position lots in ID order")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
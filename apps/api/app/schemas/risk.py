@@ -0,0 +1,54 @@
+"""
+Risk schemas for response serialization.
+
+This module contains Pydantic models for the portfolio risk endpoints.
+"""
+
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class RiskMetrics(BaseModel):
+    """Portfolio risk metrics response."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    position_count: int = Field(..., description="Number of open positions")
+    market_value: float = Field(..., description="Market value of all positions")
+    cost_basis: float = Field(..., description="Total entry cost of all positions")
+    unrealized_pnl: float = Field(..., description="Market value minus cost basis")
+    cash_balance: float = Field(..., description="Uninvested cash")
+    portfolio_value: float = Field(..., description="Market value plus cash")
+    total_risk_dollars: float = Field(..., description="Dollar loss if every stop is hit")
+    total_risk_percent: float = Field(..., description="Total risk as a percentage of portfolio value")
+    max_drawdown_dollars: float = Field(
+        ..., description="Dollar loss if every stop is hit and unprotected positions go to zero"
+    )
+    max_drawdown_percent: float = Field(
+        ..., description="Maximum drawdown potential as a percentage of portfolio value"
+    )
+    largest_position_risk: float = Field(..., description="Largest single-position dollar risk")
+    unprotected_positions: int = Field(..., description="Number of positions without a stop loss")
+    calculated_at: datetime = Field(..., description="When the metrics were calculated")
+
+
+class RiskHistoryPoint(BaseModel):
+    """Recorded risk of a portfolio at one point in time."""
+
+    timestamp: datetime = Field(..., description="When the snapshot was recorded")
+    portfolio_value: float = Field(..., description="Market value plus cash")
+    total_risk_dollars: float = Field(..., description="Dollar loss if every stop is hit")
+    total_risk_percent: float = Field(..., description="Total risk as a percentage of portfolio value")
+    max_concentration: float = Field(..., description="Largest single-symbol share of the portfolio, in percent")
+
+
+class RiskHistory(BaseModel):
+    """Portfolio risk history response."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    range: str = Field(..., description="Requested range (1M, 3M or 1Y)")
+    start: datetime = Field(..., description="Start of the range")
+    end: datetime = Field(..., description="End of the range")
+    snapshots: int = Field(..., description="Snapshots recorded in the range before downsampling")
+    points: List[RiskHistoryPoint] = Field(..., description="Latest snapshot per time bucket, oldest first")
@@ -0,0 +1,29 @@
+"""
+Stress test schemas for response serialization.
+
+This module contains Pydantic models for the portfolio stress test endpoint.
+"""
+
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class ScenarioResult(BaseModel):
+    """Portfolio P&L under one stress scenario."""
+
+    name: str = Field(..., description="Scenario identifier")
+    title: str = Field(..., description="Scenario title")
+    description: str = Field(..., description="Scenario period and source")
+    pnl: float = Field(..., description="Dollar P&L of the positions under the scenario")
+    pnl_percent: float = Field(..., description="P&L as a percentage of portfolio value")
+    portfolio_value_after: float = Field(..., description="Portfolio value after the shock")
+
+
+class StressTestResult(BaseModel):
+    """Every stress scenario applied to a portfolio."""
+
+    portfolio_id: int = Field(..., description="Portfolio ID")
+    portfolio_value: float = Field(..., description="Market value plus cash before the shock")
+    scenarios: List[ScenarioResult] = Field(..., description="Scenario results, worst first")
+    calculated_at: datetime = Field(..., description="When the scenarios were applied")
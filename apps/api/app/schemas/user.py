@@ -7,7 +7,7 @@ including validation, serialization, and data transformation.
 
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, ValidationInfo, field_validator
 
 
 class UserBase(BaseModel):
@@ -20,14 +20,16 @@ class UserBase(BaseModel):
     bio: Optional[str] = Field(None, description="User's biography")
     avatar_url: Optional[str] = Field(None, description="URL to user's avatar image")
 
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         """Validate username format."""
         if not v.replace('_', '').replace('-', '').isalnum():
             raise ValueError('Username can only contain letters, numbers, underscores, and hyphens')
         return v.lower()
 
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
         """Validate and normalize email."""
         return v.lower()
@@ -44,14 +46,16 @@ class UserCreate(UserBase):
     )
     confirm_password: str = Field(..., description="Password confirmation")
 
-    @validator('confirm_password')
-    def passwords_match(cls, v, values):
+    @field_validator('confirm_password')
+    @classmethod
+    def passwords_match(cls, v, info: ValidationInfo):
         """Validate that passwords match."""
-        if 'password' in values and v != values['password']:
+        if 'password' in info.data and v != info.data['password']:
             raise ValueError('Passwords do not match')
         return v
 
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password_strength(cls, v):
         """Validate password strength."""
         if not any(c.isupper() for c in v):
@@ -73,7 +77,8 @@ class UserUpdate(BaseModel):
     bio: Optional[str] = Field(None, description="User's biography")
     avatar_url: Optional[str] = Field(None, description="Avatar image URL")
 
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         """Validate username format."""
         if v is not None:
@@ -82,7 +87,8 @@ class UserUpdate(BaseModel):
             return v.lower()
         return v
 
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
         """Validate and normalize email."""
         if v is not None:
@@ -101,12 +107,7 @@ class UserInDB(UserBase):
     updated_at: datetime = Field(..., description="When the user was last updated")
     last_login: Optional[datetime] = Field(None, description="Last login timestamp")
 
-    class Config:
-        """Pydantic configuration."""
-        from_attributes = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 
 class User(UserInDB):
@@ -114,12 +115,7 @@ class User(UserInDB):
     
     full_name: str = Field(..., description="User's full name")
 
-    class Config:
-        """Pydantic configuration."""
-        from_attributes = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserLogin(BaseModel):
@@ -128,7 +124,8 @@ class UserLogin(BaseModel):
     email: EmailStr = Field(..., description="User's email address")
     password: str = Field(..., description="User's password")
 
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
         """Normalize email."""
         return v.lower()
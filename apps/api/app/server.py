@@ -0,0 +1,284 @@
+"""
+Pre-forking production launcher.
+
+    python -m app.server --workers 4
+
+``uvicorn --workers`` spawns fresh interpreters, each importing the
+application and loading the reference data and stress scenarios on its own.
+This launcher loads them once in a parent process, freezes the heap
+(``gc.freeze``) so the children's garbage collector does not write to the
+inherited objects, then forks the workers. The workers share those pages
+copy-on-write and accept connections on one socket bound by the parent.
+
+The parent also creates the shared-memory price table and forks one updater
+process that keeps it current; workers read quotes from it without IPC
+(see ``app.services.market_data.shared_prices``).
+
+Workers skip the startup work the parent already did (``app.state.preloaded``).
+Work done once for every worker runs in the first one: it seeds the
+correlation universe and publishes it to a file the other workers load
+(see ``app.services.correlation_feed``), and it alone records market
+closes in the risk history.
+
+The parent only supervises: it restarts children that exit, and on SIGTERM
+or SIGINT stops the workers gracefully, then the updater, and frees the
+table.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import shutil
+import signal
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+
+import structlog
+import uvicorn
+
+from app.config import settings
+from app.database import close_db, prepare_schema
+from app.logging_config import configure_logging, stop_logging
+from app.main import app
+from app.services.correlation_feed import correlation_feed
+from app.services.market_data import (
+    SharedPriceTable,
+    SharedPriceUpdater,
+    close_market_data,
+    init_market_data,
+    price_cache,
+    quote_client,
+)
+from app.services.reference_data import reference_data
+from app.services.risk_history import risk_history
+from app.services.stress import stress_tester
+
+logger = structlog.get_logger()
+
+# Children that exit sooner than this after starting are restarted after a pause.
+MIN_UPTIME_SECONDS = 1.0
+
+
+async def _prepare_schema() -> None:
+    """Prepare the schema once, so workers starting together do not race on DDL."""
+    try:
+        await prepare_schema(settings.STARTUP_SCHEMA_MODE)
+    finally:
+        # Pooled connections must not be inherited by the workers.
+        await close_db()
+
+
+def preload() -> None:
+    """Prepare the schema and load the data every worker reads, before forking."""
+    asyncio.run(_prepare_schema())
+    stress_tester.load(settings.STRESS_SCENARIOS_PATH)
+    reference_data.load(settings.REFERENCE_DATA_PATH)
+    # The workers' lifespan skips what was just done.
+    app.state.preloaded = True
+
+
+def _fork(target: Callable[[], None]) -> int:
+    """Run ``target`` in a forked child and return its pid; the child never returns."""
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # The parent logs synchronously; children get their own listener thread.
+        configure_logging(settings.LOG_LEVEL, async_sink=settings.LOG_ASYNC)
+        target()
+    except BaseException as e:
+        logger.error("Child process failed", error=str(e), exc_info=True)
+        code = 1
+    finally:
+        stop_logging()
+        os._exit(code)
+
+
+def serve_worker(sock, primary: bool) -> None:
+    """
+    Serve the application on an inherited listening socket.
+
+    Args:
+        sock: Listening socket bound by the parent
+        primary: Whether this worker does the work shared by every worker
+    """
+    correlation_feed.follows = not primary
+    risk_history.records_closes = primary
+    config = uvicorn.Config(
+        app,
+        log_config=None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run_updater(table: SharedPriceTable) -> None:
+    """Keep the shared price table current until SIGTERM or SIGINT."""
+    updater = SharedPriceUpdater(
+        table,
+        quote_client,
+        calendar=price_cache.calendar,
+        interval=settings.SHARED_PRICES_REFRESH_SECONDS,
+    )
+
+    async def main() -> None:
+        await init_market_data()
+        task = asyncio.create_task(updater.run(), name="shared-price-updater")
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, task.cancel)
+        logger.info("Shared price updater started", interval=updater.interval)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await close_market_data()
+
+    asyncio.run(main())
+
+
+class Launcher:
+    """Parent process: preloads, forks workers and the price updater, supervises them."""
+
+    def __init__(self, workers: int, host: str = "0.0.0.0", port: int = 8000):
+        """
+        Initialize the launcher.
+
+        Args:
+            workers: Number of worker processes
+            host: Interface to bind
+            port: Port to bind
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be positive, got {workers}")
+        self.workers = workers
+        self.config = uvicorn.Config(app, host=host, port=port, log_config=None)
+        self.table: Optional[SharedPriceTable] = None
+        self.sock = None
+        self.state_dir: Optional[str] = None
+        self._children: Dict[int, Callable[[], None]] = {}
+        self._started: Dict[int, float] = {}
+        self._updater: Optional[int] = None
+        self._stopping = False
+
+    def _start(self, target: Callable[[], None]) -> int:
+        """Fork a child running ``target`` and track it for restarts."""
+        pid = _fork(target)
+        self._children[pid] = target
+        self._started[pid] = time.monotonic()
+        return pid
+
+    def _on_signal(self, signum, frame) -> None:
+        """Ask the supervisor loop to stop."""
+        self._stopping = True
+
+    def run(self) -> None:
+        """Start every child and supervise them until SIGTERM or SIGINT."""
+        preload()
+        self.table = SharedPriceTable.create(settings.SHARED_PRICES_CAPACITY)
+        price_cache.shared = self.table
+        self.state_dir = tempfile.mkdtemp(prefix="pxr-launcher-")
+        correlation_feed.history_path = os.path.join(self.state_dir, "correlation.npz")
+        self.sock = self.config.bind_socket()
+
+        # No threads may be running at fork: swap the log listener for a
+        # synchronous handler, and keep everything loaded so far out of the
+        # collector so the children do not dirty the shared pages.
+        stop_logging()
+        configure_logging(settings.LOG_LEVEL, async_sink=False)
+        gc.freeze()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+        table, sock = self.table, self.sock
+        self._updater = self._start(lambda: run_updater(table))
+        for i in range(self.workers):
+            self._start(lambda primary=i == 0: serve_worker(sock, primary))
+        logger.info("Launcher started", workers=self.workers, pid=os.getpid(),
+                    address=f"{self.config.host}:{self.config.port}")
+
+        try:
+            self._supervise()
+        finally:
+            self._shutdown()
+
+    def _supervise(self) -> None:
+        """Restart children that exit until asked to stop."""
+        while not self._stopping:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                time.sleep(0.2)
+                continue
+            target = self._children.pop(pid, None)
+            started = self._started.pop(pid, 0.0)
+            if target is None or self._stopping:
+                continue
+            logger.warning("Child process exited, restarting", pid=pid,
+                           status=os.waitstatus_to_exitcode(status),
+                           updater=pid == self._updater)
+            if time.monotonic() - started < MIN_UPTIME_SECONDS:
+                time.sleep(MIN_UPTIME_SECONDS)
+            new_pid = self._start(target)
+            if pid == self._updater:
+                self._updater = new_pid
+
+    def _stop(self, pids, timeout: float) -> None:
+        """SIGTERM ``pids``, then SIGKILL those still running after ``timeout``."""
+        pids = set(pids)
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pids.discard(pid)
+        deadline = time.monotonic() + timeout
+        while pids and time.monotonic() < deadline:
+            for pid in list(pids):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        pids.discard(pid)
+                except ChildProcessError:
+                    pids.discard(pid)
+            time.sleep(0.05)
+        for pid in pids:
+            logger.warning("Child process did not stop, killing", pid=pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+    def _shutdown(self) -> None:
+        """Stop the workers, then the updater, and free the shared resources."""
+        logger.info("Launcher stopping", children=len(self._children))
+        workers = [pid for pid in self._children if pid != self._updater]
+        # Workers drain their connections first; uvicorn caps that at the graceful timeout.
+        self._stop(workers, settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5.0)
+        if self._updater in self._children:
+            self._stop([self._updater], 5.0)
+        self._children.clear()
+        if self.sock is not None:
+            self.sock.close()
+        if self.table is not None:
+            price_cache.shared = None
+            self.table.close()
+            self.table.unlink()
+        if self.state_dir is not None:
+            correlation_feed.history_path = None
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+
+
+def main(argv=None) -> None:
+    """Parse arguments and run the launcher."""
+    parser = argparse.ArgumentParser(description="Run pre-forked API workers")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    args = parser.parse_args(argv)
+    Launcher(args.workers, args.host, args.port).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Domain services package.
+
+This package contains the analytics engines that sit between the routers
+and the database layer.
+"""
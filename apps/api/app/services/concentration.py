@@ -0,0 +1,341 @@
+"""
+Portfolio concentration analysis (US-015, US-016, US-027 - US-032).
+
+Every concentration view (position, sector, industry, country, market cap
+and style box) is a group-by of position market values over an integer
+coded categorical column. Rather than one dict-based loop per dimension,
+the codes of all dimensions are densified, offset into one shared index
+space and aggregated with a single ``numpy.bincount``; per-dimension shares,
+the Herfindahl-Hirschman index (HHI), top-N groups and threshold warnings
+are then read off slices of that one result. HHI is computed over each
+dimension's classified exposure, so it ranges from 10000 / groups to 10000
+regardless of cash or unclassified holdings.
+
+Positions and sectors come from the portfolio snapshot. The other
+dimensions are per-symbol classifications held in ``symbol_classifier``,
+assigned explicitly or resolved on first use from a reference-data source
+(see ``app.services.reference_data``); positions of unclassified symbols are
+reported as unclassified and never warned about.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Protocol, Sequence
+
+import numpy as np
+
+from app.services.snapshot import CodeTable, PortfolioSnapshot, sector_codes, symbol_codes
+
+CLASSIFIED_DIMENSIONS = ("industry", "country", "market_cap", "style_box")
+DIMENSIONS = ("position", "sector") + CLASSIFIED_DIMENSIONS
+
+# PRD: flag positions above 20% of the portfolio.
+DEFAULT_WARNING_PERCENT = 20.0
+DEFAULT_TOP_N = 10
+
+# US-030 market cap buckets, in dollars.
+LARGE_CAP = 10e9
+MID_CAP = 2e9
+
+
+def market_cap_bucket(market_cap: Optional[float]) -> Optional[str]:
+    """Return ``"large"``, ``"mid"`` or ``"small"`` for a market cap in dollars."""
+    if market_cap is None or not np.isfinite(market_cap):
+        return None
+    if market_cap > LARGE_CAP:
+        return "large"
+    if market_cap >= MID_CAP:
+        return "mid"
+    return "small"
+
+
+class ClassificationSource(Protocol):
+    """Bulk lookup of symbol categories, e.g. the reference-data store."""
+
+    def classify(self, symbols: Sequence[str]) -> Dict[str, List[Optional[str]]]:
+        """Return, per classified dimension, the category of each symbol."""
+
+
+class SymbolClassifier:
+    """
+    Per-symbol categories for the classified dimensions.
+
+    Categories are interned per dimension and stored in arrays indexed by
+    the process-wide symbol code, so classifying a portfolio is one fancy
+    index per dimension. Category code 0 means unclassified.
+
+    With a ``source`` set, symbols interned since the last lookup are
+    classified in one batch on first use; explicit ``assign`` calls take
+    precedence over the source.
+    """
+
+    def __init__(self):
+        """Initialize with every symbol unclassified."""
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every classification and the source."""
+        self.source: Optional[ClassificationSource] = None
+        self._categories: Dict[str, CodeTable] = {d: CodeTable() for d in CLASSIFIED_DIMENSIONS}
+        self._by_symbol: Dict[str, np.ndarray] = {
+            d: np.zeros(0, dtype=np.int32) for d in CLASSIFIED_DIMENSIONS
+        }
+        self._assigned: Dict[str, np.ndarray] = {
+            d: np.zeros(0, dtype=bool) for d in CLASSIFIED_DIMENSIONS
+        }
+        self._resolved = 1  # code 0 is None
+
+    def set_source(self, source: Optional[ClassificationSource]) -> None:
+        """
+        Classify symbols from ``source``, discarding what an earlier source resolved.
+
+        Explicit assignments are kept.
+        """
+        self.source = source
+        for dimension in CLASSIFIED_DIMENSIONS:
+            column = self._grow(dimension)
+            column[~self._assigned[dimension]] = 0
+        self._resolved = 1  # code 0 is None
+
+    def _grow(self, dimension: str) -> np.ndarray:
+        """Extend the columns of ``dimension`` to cover every interned symbol."""
+        column = self._by_symbol[dimension]
+        missing = len(symbol_codes) - len(column)
+        if missing > 0:
+            column = np.concatenate([column, np.zeros(missing, dtype=np.int32)])
+            self._by_symbol[dimension] = column
+            self._assigned[dimension] = np.concatenate(
+                [self._assigned[dimension], np.zeros(missing, dtype=bool)]
+            )
+        return column
+
+    def _resolve(self) -> None:
+        """Classify symbols interned since the last call from the source."""
+        start, stop = self._resolved, len(symbol_codes)
+        if self.source is None or start >= stop:
+            return
+        codes = np.arange(start, stop)
+        found = self.source.classify(symbol_codes.decode_many(codes))
+        for dimension, categories in found.items():
+            column = self._grow(dimension)
+            resolved = self._categories[dimension].encode_many(categories)
+            keep = self._assigned[dimension][start:stop]
+            column[start:stop] = np.where(keep, column[start:stop], resolved)
+        self._resolved = stop
+
+    def assign(self, dimension: str, categories: Mapping[str, Optional[str]]) -> None:
+        """
+        Set the category of symbols in one dimension.
+
+        Args:
+            dimension: One of ``CLASSIFIED_DIMENSIONS``
+            categories: Symbol to category; ``None`` clears a classification
+        """
+        table = self._categories[dimension]
+        codes = [(symbol_codes.encode(s), table.encode(c)) for s, c in categories.items()]
+        column = self._grow(dimension)
+        assigned = self._assigned[dimension]
+        for symbol_code, category_code in codes:
+            column[symbol_code] = category_code
+            assigned[symbol_code] = True
+
+    def codes(self, dimension: str, symbol_code: np.ndarray) -> np.ndarray:
+        """Return the category code of each symbol code (0 when unclassified)."""
+        self._resolve()
+        column = self._by_symbol[dimension]
+        known = symbol_code < len(column)
+        codes = np.zeros(len(symbol_code), dtype=np.int32)
+        codes[known] = column[symbol_code[known]]
+        return codes
+
+    def label(self, dimension: str, code: int) -> Optional[str]:
+        """Return the category name of a code."""
+        return self._categories[dimension].decode(code)
+
+
+symbol_classifier = SymbolClassifier()
+
+
+@dataclass(frozen=True)
+class GroupWeight:
+    """Aggregated exposure of one group."""
+
+    key: str
+    value: float
+    percent: float
+    positions: int
+
+
+@dataclass(frozen=True)
+class ConcentrationView:
+    """Concentration of a portfolio along one dimension."""
+
+    dimension: str
+    groups: int
+    hhi: float
+    effective_groups: float
+    unclassified_percent: float
+    top: List[GroupWeight]
+
+
+@dataclass(frozen=True)
+class ConcentrationWarning:
+    """A group above the warning threshold."""
+
+    dimension: str
+    key: str
+    percent: float
+    threshold: float
+
+
+@dataclass(frozen=True)
+class ConcentrationReport:
+    """Concentration views and warnings of a portfolio."""
+
+    portfolio_value: float
+    max_concentration: float
+    views: List[ConcentrationView]
+    warnings: List[ConcentrationWarning]
+
+    def dict(self) -> dict:
+        """Convert report to a dictionary."""
+        return asdict(self)
+
+
+def group_totals(columns: Sequence[np.ndarray], weights: np.ndarray):
+    """
+    Aggregate ``weights`` over several categorical columns in one pass.
+
+    Each column is densified to ``0..k-1`` and offset into a shared index
+    space, so a single weighted ``bincount`` (and one unweighted one for the
+    member counts) covers every column.
+
+    Args:
+        columns: Integer codes, one array per dimension, each as long as ``weights``
+        weights: Value of each row
+
+    Returns:
+        ``(keys, totals, counts)``: per column, the distinct codes in
+        ascending order and the summed weight and row count of each
+    """
+    keys, inverses = [], []
+    offset = 0
+    for codes in columns:
+        unique, inverse = np.unique(codes, return_inverse=True)
+        keys.append(unique)
+        inverses.append(inverse + offset)
+        offset += len(unique)
+    index = np.concatenate(inverses) if inverses else np.empty(0, dtype=np.intp)
+    flat_totals = np.bincount(index, weights=np.tile(weights, len(columns)), minlength=offset)
+    flat_counts = np.bincount(index, minlength=offset)
+
+    bounds = np.cumsum([0] + [len(k) for k in keys])
+    totals = [flat_totals[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    counts = [flat_counts[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    return keys, totals, counts
+
+
+def analyze_concentration(
+    weights: np.ndarray,
+    columns: Mapping[str, np.ndarray],
+    labels: Mapping[str, Callable[[int], Optional[str]]],
+    portfolio_value: float,
+    top_n: int = DEFAULT_TOP_N,
+    threshold: float = DEFAULT_WARNING_PERCENT,
+) -> ConcentrationReport:
+    """
+    Compute every concentration view from one group-by pass.
+
+    Args:
+        weights: Absolute market value of each position
+        columns: Dimension name to integer codes per position; code 0 is
+            unclassified
+        labels: Dimension name to a function decoding a code
+        portfolio_value: Denominator for percentages
+        top_n: Number of largest groups reported per dimension
+        threshold: Warn about groups above this percentage of the portfolio
+
+    Returns:
+        ConcentrationReport: Views in ``columns`` order and warnings, largest first
+    """
+    names = list(columns)
+    keys, totals, counts = group_totals([columns[n] for n in names], weights)
+    scale = 100.0 / portfolio_value if portfolio_value > 0 else 0.0
+
+    views, warnings = [], []
+    max_concentration = 0.0
+    for name, key, total, count in zip(names, keys, totals, counts):
+        percent = total * scale
+        classified = key != 0
+        # HHI is over the shares of the classified groups within the dimension.
+        classified_total = total[classified].sum()
+        hhi = float(np.square(total[classified] / classified_total * 100.0).sum()) if classified_total > 0 else 0.0
+        decode = labels[name]
+
+        order = np.argsort(-percent, kind="stable")
+        order = order[classified[order]]
+        top = [
+            GroupWeight(
+                key=str(decode(int(key[i]))),
+                value=round(float(total[i]), 2),
+                percent=round(float(percent[i]), 4),
+                positions=int(count[i]),
+            )
+            for i in order[:top_n]
+        ]
+        warnings.extend(
+            ConcentrationWarning(name, str(decode(int(key[i]))), round(float(percent[i]), 4), threshold)
+            for i in order
+            if percent[i] > threshold
+        )
+        if name == "position" and classified.any():
+            max_concentration = float(percent[classified].max())
+
+        views.append(ConcentrationView(
+            dimension=name,
+            groups=int(classified.sum()),
+            hhi=round(hhi, 2),
+            effective_groups=round(10_000.0 / hhi, 2) if hhi > 0 else 0.0,
+            unclassified_percent=round(float(percent[~classified].sum()), 4),
+            top=top,
+        ))
+
+    warnings.sort(key=lambda w: -w.percent)
+    return ConcentrationReport(
+        portfolio_value=round(portfolio_value, 2),
+        max_concentration=round(max_concentration, 4),
+        views=views,
+        warnings=warnings,
+    )
+
+
+def portfolio_concentration(
+    snapshot: PortfolioSnapshot,
+    top_n: int = DEFAULT_TOP_N,
+    threshold: float = DEFAULT_WARNING_PERCENT,
+    dimensions: Sequence[str] = DIMENSIONS,
+) -> ConcentrationReport:
+    """
+    Analyze a portfolio snapshot along ``dimensions``.
+
+    Weights are absolute market values, so shorts count as exposure; the
+    denominator is gross exposure plus any positive cash balance.
+    """
+    weights = np.abs(snapshot.quantity * snapshot.current_price)
+    portfolio_value = float(weights.sum()) + max(snapshot.cash_balance, 0.0)
+
+    columns: Dict[str, np.ndarray] = {}
+    labels: Dict[str, Callable[[int], Optional[str]]] = {}
+    for dimension in dimensions:
+        if dimension == "position":
+            columns[dimension] = snapshot.symbol_code
+            labels[dimension] = symbol_codes.decode
+        elif dimension == "sector":
+            columns[dimension] = snapshot.sector_code
+            labels[dimension] = sector_codes.decode
+        elif dimension in CLASSIFIED_DIMENSIONS:
+            columns[dimension] = symbol_classifier.codes(dimension, snapshot.symbol_code)
+            labels[dimension] = lambda code, d=dimension: symbol_classifier.label(d, code)
+        else:
+            raise ValueError(f"Unknown dimension {dimension!r}; expected one of {', '.join(DIMENSIONS)}")
+
+    return analyze_concentration(weights, columns, labels, portfolio_value, top_n, threshold)
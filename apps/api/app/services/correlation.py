@@ -0,0 +1,310 @@
+"""
+Incremental rolling-window correlation.
+
+Holdings overlap heavily between users, so correlations are maintained for
+shared symbol universes rather than per portfolio. Each universe keeps the
+last ``window`` daily returns in a ring buffer together with running sums
+and cross-products; a new bar updates them in O(N^2) by adding the new row's
+outer product and subtracting the one leaving the window, without rescanning
+history. A portfolio's matrix is a sub-matrix slice of the smallest universe
+that covers its symbols.
+
+The running sums are recomputed exactly from the buffer every ``window``
+bars, so floating-point drift stays bounded at the same amortized cost.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+# Trading days in the rolling window (US-025).
+DEFAULT_WINDOW = 252
+HIGH_CORRELATION_THRESHOLD = 0.7
+
+
+class RollingCorrelation:
+    """Pearson correlation of a fixed symbol universe over a rolling window."""
+
+    __slots__ = (
+        "symbols", "window", "_index", "_buffer", "_count", "_next",
+        "_sum", "_cross", "_last_prices", "_since_resync", "_matrix", "version",
+    )
+
+    def __init__(self, symbols: Sequence[str], window: int = DEFAULT_WINDOW):
+        """
+        Initialize an empty universe.
+
+        Args:
+            symbols: Symbols of the universe, in matrix order
+            window: Number of daily returns in the rolling window
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("symbols must be unique")
+        n = len(symbols)
+        self.symbols: Tuple[str, ...] = tuple(symbols)
+        self.window = window
+        self._index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self._buffer = np.zeros((window, n))
+        self._count = 0
+        self._next = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._last_prices: Optional[np.ndarray] = None
+        self._since_resync = 0
+        self._matrix: Optional[np.ndarray] = None
+        self.version = 0
+
+    @property
+    def observations(self) -> int:
+        """Return the number of returns currently in the window."""
+        return self._count
+
+    @property
+    def last_prices(self) -> Optional[np.ndarray]:
+        """Return the closes of the last ``push_prices`` call, in matrix order."""
+        return self._last_prices
+
+    def __contains__(self, symbol: str) -> bool:
+        """Return whether ``symbol`` belongs to the universe."""
+        return symbol in self._index
+
+    def indexes(self, symbols: Sequence[str]) -> np.ndarray:
+        """Return matrix indexes of ``symbols`` (all must be in the universe)."""
+        return np.fromiter((self._index[s] for s in symbols), dtype=np.intp, count=len(symbols))
+
+    def push_returns(self, returns: Sequence[float]) -> None:
+        """
+        Add one day of returns, evicting the oldest day once the window is full.
+
+        Args:
+            returns: One return per universe symbol, in matrix order
+        """
+        row = np.asarray(returns, dtype=np.float64)
+        if row.shape != self._sum.shape:
+            raise ValueError(f"expected {len(self._sum)} returns, got {row.shape}")
+        if not np.isfinite(row).all():
+            raise ValueError("returns must be finite; fill missing bars before pushing")
+
+        if self._count == self.window:
+            old = self._buffer[self._next]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._buffer[self._next] = row
+        self._next = (self._next + 1) % self.window
+        self._sum += row
+        self._cross += np.outer(row, row)
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+        self._matrix = None
+        self.version += 1
+
+    def push_prices(self, prices: Sequence[float]) -> None:
+        """
+        Add one day of closing prices; the first call only primes the returns.
+
+        Args:
+            prices: One close per universe symbol, in matrix order
+        """
+        closes = np.asarray(prices, dtype=np.float64)
+        previous, self._last_prices = self._last_prices, closes.copy()
+        if previous is not None:
+            self.push_returns(closes / previous - 1.0)
+
+    def load(self, returns: np.ndarray) -> None:
+        """Replace the window with the last ``window`` rows of a returns history."""
+        returns = np.asarray(returns, dtype=np.float64)[-self.window:]
+        if returns.ndim != 2 or returns.shape[1] != len(self.symbols):
+            raise ValueError(f"returns must be (days, {len(self.symbols)}), got {returns.shape}")
+        self._count = len(returns)
+        self._buffer[:self._count] = returns
+        self._next = self._count % self.window
+        self._resync()
+        self._matrix = None
+        self.version += 1
+
+    def _resync(self) -> None:
+        """Recompute the running sums exactly from the buffer."""
+        rows = self._buffer[:self._count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+        self._since_resync = 0
+
+    def matrix(self) -> np.ndarray:
+        """
+        Return the N x N correlation matrix of the current window.
+
+        Symbols with zero variance in the window have NaN correlations. The
+        result is cached until the next bar and must not be modified.
+        """
+        if self._matrix is None:
+            n = self._count
+            if n < 2:
+                corr = np.full_like(self._cross, np.nan)
+            else:
+                cov = (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+                std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    corr = cov / np.outer(std, std)
+                corr[np.outer(std, std) <= 1e-15] = np.nan
+                np.clip(corr, -1.0, 1.0, out=corr)
+                np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+            corr.setflags(write=False)
+            self._matrix = corr
+        return self._matrix
+
+    def submatrix(self, symbols: Sequence[str]) -> np.ndarray:
+        """Return the correlation matrix restricted to ``symbols``, in that order."""
+        idx = self.indexes(symbols)
+        return self.matrix()[np.ix_(idx, idx)]
+
+    def returns(self, symbols: Sequence[str]) -> np.ndarray:
+        """Return the window's daily returns of ``symbols``, oldest day first."""
+        idx = self.indexes(symbols)
+        if self._count < self.window:
+            return self._buffer[:self._count, idx]
+        return np.concatenate([self._buffer[self._next:, idx], self._buffer[:self._next, idx]])
+
+
+@dataclass(frozen=True)
+class CorrelationSlice:
+    """Correlation matrix for a set of holdings."""
+
+    symbols: List[str]
+    matrix: np.ndarray
+    missing_symbols: List[str]
+    observations: int
+    window: int
+
+    def high_pairs(self, threshold: float = HIGH_CORRELATION_THRESHOLD) -> List[Tuple[str, str, float]]:
+        """Return symbol pairs with correlation above ``threshold``, strongest first."""
+        rows, cols = np.triu_indices(len(self.symbols), k=1)
+        values = self.matrix[rows, cols]
+        hits = np.flatnonzero(values > threshold)
+        hits = hits[np.argsort(-values[hits])]
+        return [(self.symbols[rows[i]], self.symbols[cols[i]], float(values[i])) for i in hits]
+
+
+class CorrelationService:
+    """Registry of shared universes answering per-portfolio correlation queries."""
+
+    def __init__(self):
+        """Initialize an empty service."""
+        self._universes: Dict[str, RollingCorrelation] = {}
+
+    def register(
+        self,
+        name: str,
+        symbols: Sequence[str],
+        history: Optional[np.ndarray] = None,
+        window: int = DEFAULT_WINDOW,
+    ) -> RollingCorrelation:
+        """
+        Create (or replace) a universe, optionally seeded with returns history.
+
+        Args:
+            name: Universe name, e.g. ``"sp500"``
+            symbols: Symbols of the universe
+            history: Optional ``(days, symbols)`` daily returns
+            window: Rolling window length in days
+        """
+        universe = RollingCorrelation(symbols, window)
+        if history is not None:
+            universe.load(history)
+        self._universes[name] = universe
+        logger.info("Correlation universe registered", universe=name, symbols=len(symbols),
+                    observations=universe.observations)
+        return universe
+
+    def universe(self, name: str) -> RollingCorrelation:
+        """Return a registered universe by name."""
+        return self._universes[name]
+
+    def get(self, name: str) -> Optional[RollingCorrelation]:
+        """Return a registered universe by name, or ``None``."""
+        return self._universes.get(name)
+
+    def remove(self, name: str) -> None:
+        """Drop a universe if registered."""
+        self._universes.pop(name, None)
+
+    def on_bar(self, name: str, closes: Mapping[str, float], carry_forward: bool = False) -> None:
+        """
+        Apply one day's closing prices to a universe.
+
+        Args:
+            name: Universe name
+            closes: Close by symbol
+            carry_forward: Repeat the previous close of symbols missing from
+                ``closes`` (a zero return) instead of failing
+
+        Raises:
+            KeyError: If the bar lacks a close for a universe symbol and
+                there is no previous close to carry forward
+        """
+        universe = self._universes[name]
+        previous = universe.last_prices
+        if carry_forward and previous is not None:
+            prices = [closes.get(s, previous[i]) for i, s in enumerate(universe.symbols)]
+        else:
+            prices = [closes[s] for s in universe.symbols]
+        universe.push_prices(prices)
+
+    def _covering(self, wanted: Sequence[str]) -> Optional[RollingCorrelation]:
+        """Return the smallest universe covering the most of ``wanted``."""
+        best: Optional[RollingCorrelation] = None
+        best_key = (0, 0)
+        for universe in self._universes.values():
+            covered = sum(1 for s in wanted if s in universe)
+            key = (covered, -len(universe.symbols))
+            if covered and (best is None or key > best_key):
+                best, best_key = universe, key
+        return best
+
+    def for_symbols(self, symbols: Sequence[str]) -> CorrelationSlice:
+        """
+        Return the correlation matrix of ``symbols``.
+
+        The smallest universe covering the most symbols is sliced; symbols
+        that no universe covers are reported in ``missing_symbols``.
+        """
+        wanted = list(dict.fromkeys(symbols))
+        best = self._covering(wanted)
+        if best is None:
+            return CorrelationSlice([], np.empty((0, 0)), wanted, 0, DEFAULT_WINDOW)
+        found = [s for s in wanted if s in best]
+        missing = [s for s in wanted if s not in best]
+        return CorrelationSlice(found, best.submatrix(found), missing, best.observations, best.window)
+
+    def returns_for(self, symbols: Sequence[str]) -> Tuple[List[str], np.ndarray, List[str]]:
+        """
+        Return the rolling-window daily returns of ``symbols``.
+
+        Returns:
+            ``(found, returns, missing)``: the covered symbols, their
+            ``(days, len(found))`` returns from the same universe as
+            ``for_symbols`` and the symbols without history
+        """
+        wanted = list(dict.fromkeys(symbols))
+        best = self._covering(wanted)
+        if best is None:
+            return [], np.empty((0, 0)), wanted
+        found = [s for s in wanted if s in best]
+        missing = [s for s in wanted if s not in best]
+        return found, best.returns(found), missing
+
+    def clear(self) -> None:
+        """Drop every universe."""
+        self._universes.clear()
+
+
+correlation_service = CorrelationService()
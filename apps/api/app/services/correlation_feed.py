@@ -0,0 +1,293 @@
+"""
+Correlation universe feed.
+
+Keeps the ``holdings`` universe of the correlation service (every symbol held
+in any portfolio) supplied with daily returns: at startup it is seeded from
+each symbol's daily bar history, then advanced by one bar at every market
+close from the price cache's latest daily bars. Holdings that appear later
+trigger a reseed at the next close.
+
+History costs one rate-limited provider call per symbol, so seeding waits
+for rate limit tokens rather than failing, and a failed startup seed is
+retried with backoff. A close that arrives while the startup seed is still
+running is skipped: the seed already ends at the latest bar.
+
+Under the pre-forking launcher one worker seeds and advances the universe
+and publishes its closes to ``history_path`` after every change; the other
+workers (``follows``) load that file whenever it changes instead of
+fetching the same history again.
+
+History is aligned on the union of trading dates, carrying a close forward
+over a symbol's missing days. Symbols whose history does not reach back to
+the start of the window are left out (and reported missing by correlation
+and VaR) rather than padded with flat returns.
+"""
+
+import asyncio
+import os
+from datetime import date
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import structlog
+from sqlalchemy import select
+
+from app.database import ReadSessionLocal
+from app.models.position import Position
+from app.services.correlation import DEFAULT_WINDOW, CorrelationService, correlation_service
+from app.services.market_data import DailyBar, MarketDataError, price_cache, quote_client
+
+logger = structlog.get_logger()
+
+HOLDINGS = "holdings"
+# Longest pause between startup seeding attempts.
+MAX_RETRY_SECONDS = 900.0
+
+
+def align_closes(
+    history: Mapping[str, Sequence[DailyBar]],
+    days: int,
+) -> Tuple[List[str], List[date], np.ndarray]:
+    """
+    Align daily closes on the last ``days`` trading dates.
+
+    Returns:
+        ``(symbols, dates, closes)``: the symbols with a close on the first
+        date, the dates and a ``(dates, symbols)`` close matrix with gaps
+        carried forward
+    """
+    dates = sorted({bar.date for bars in history.values() for bar in bars})[-days:]
+    if not dates:
+        return [], [], np.empty((0, 0))
+    row = {d: i for i, d in enumerate(dates)}
+    symbols, columns = [], []
+    for symbol in sorted(history):
+        column = np.full(len(dates), np.nan)
+        for bar in history[symbol]:
+            if bar.date in row:
+                column[row[bar.date]] = bar.close
+        if np.isnan(column[0]):
+            continue
+        # Carry the last close forward over missing days.
+        filled = np.where(np.isnan(column), 0, np.arange(len(column)))
+        np.maximum.accumulate(filled, out=filled)
+        symbols.append(symbol)
+        columns.append(column[filled])
+    closes = np.column_stack(columns) if columns else np.empty((len(dates), 0))
+    return symbols, dates, closes
+
+
+class CorrelationFeed:
+    """Seeds the holdings universe from daily history and advances it at each close."""
+
+    def __init__(
+        self,
+        service: CorrelationService = correlation_service,
+        window: int = DEFAULT_WINDOW,
+        retry: float = 30.0,
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            service: Correlation service holding the universe
+            window: Rolling window length in days
+            retry: Seconds before the first retry of a failed startup seed,
+                doubled after every failure
+        """
+        self.service = service
+        self.window = window
+        self.retry = retry
+        self.sessions = ReadSessionLocal
+        self.client = quote_client
+        self.prices = price_cache
+        self.last_date: Optional[date] = None
+        # Set by the launcher: where the seeding worker publishes its closes,
+        # and whether this worker loads them instead of seeding.
+        self.history_path: Optional[str] = None
+        self.follows = False
+        self._unavailable: Set[str] = set()
+        self._history: Optional[Tuple[List[str], List[date], np.ndarray]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def held_symbols(self) -> List[str]:
+        """Return every symbol held in any portfolio."""
+        async with self.sessions() as db:
+            return sorted((await db.scalars(select(Position.symbol).distinct())).all())
+
+    async def seed(self, symbols: Optional[Sequence[str]] = None) -> int:
+        """
+        Register the holdings universe from daily history.
+
+        Args:
+            symbols: Symbols of the universe (default: every held symbol)
+
+        Returns:
+            Number of symbols in the universe
+
+        Raises:
+            MarketDataError: If history could not be fetched
+        """
+        symbols = await self.held_symbols() if symbols is None else list(symbols)
+        history = await self.client.get_daily_history(symbols, self.window + 1, background=True)
+        found, dates, closes = align_closes(history, self.window + 1)
+        self._unavailable = set(symbols).difference(found)
+        if self._unavailable:
+            logger.warning("No daily history for held symbols", symbols=sorted(self._unavailable))
+        count = self._register(found, dates, closes)
+        self._publish()
+        return count
+
+    def _register(self, symbols: List[str], dates: List[date], closes: np.ndarray) -> int:
+        """Replace the universe with aligned closes and return its size."""
+        if not symbols:
+            self.service.remove(HOLDINGS)
+            self.last_date = self._history = None
+            return 0
+        universe = self.service.register(HOLDINGS, symbols, closes[1:] / closes[:-1] - 1.0, self.window)
+        # Prime the last closes so the next bar becomes a return.
+        universe.push_prices(closes[-1])
+        self.last_date = dates[-1]
+        self._history = (list(symbols), list(dates), closes)
+        return len(symbols)
+
+    def _publish(self) -> None:
+        """Write the closes for the workers that follow this one, atomically."""
+        if self.history_path is None or self.following:
+            return
+        symbols, dates, closes = self._history or ([], [], np.empty((0, 0)))
+        partial = f"{self.history_path}.{os.getpid()}.npz"
+        np.savez(
+            partial,
+            symbols=np.array(symbols, dtype=str),
+            dates=np.array([d.toordinal() for d in dates], dtype=np.int64),
+            closes=closes,
+            unavailable=np.array(sorted(self._unavailable), dtype=str),
+        )
+        os.replace(partial, self.history_path)
+
+    def load(self) -> int:
+        """
+        Register the universe published at ``history_path``.
+
+        Returns:
+            Number of symbols in the universe
+
+        Raises:
+            FileNotFoundError: If nothing was published yet
+        """
+        with open(self.history_path, "rb") as f, np.load(f, allow_pickle=False) as data:
+            self._unavailable = set(data["unavailable"].tolist())
+            return self._register(
+                data["symbols"].tolist(),
+                [date.fromordinal(d) for d in data["dates"].tolist()],
+                data["closes"],
+            )
+
+    async def on_close(self) -> bool:
+        """
+        Advance the universe by the latest daily bars, reseeding if holdings grew.
+
+        Workers following a published universe leave this to the worker
+        that publishes it.
+
+        Returns:
+            Whether the universe changed
+
+        Raises:
+            MarketDataError: If bars or history could not be fetched
+        """
+        if self.following:
+            return False
+        if self.seeding:
+            logger.info("Close skipped while the correlation universe is seeding")
+            return False
+        held = set(await self.held_symbols())
+        universe = self.service.get(HOLDINGS)
+        if universe is None or held.difference(universe.symbols, self._unavailable):
+            return await self.seed(sorted(held)) > 0
+
+        bars: Dict[str, DailyBar] = await self.prices.get_bars(universe.symbols, background=True)
+        newest = max((bar.date for bar in bars.values()), default=None)
+        if newest is None or (self.last_date is not None and newest <= self.last_date):
+            return False
+        closes = {s: bar.close for s, bar in bars.items() if bar.date == newest}
+        self.service.on_bar(HOLDINGS, closes, carry_forward=True)
+        self.last_date = newest
+        if self._history is not None:
+            symbols, dates, history = self._history
+            row = history[-1].copy()
+            for i, symbol in enumerate(symbols):
+                row[i] = closes.get(symbol, row[i])
+            self._history = (symbols, dates[1:] + [newest], np.vstack([history[1:], row]))
+        self._publish()
+        return True
+
+    @property
+    def seeding(self) -> bool:
+        """Return whether the startup seed is still running."""
+        return self._task is not None and not self._task.done()
+
+    async def _seed_at_startup(self) -> None:
+        """Seed in the background until it succeeds; history fetches are rate limited."""
+        delay = self.retry
+        while True:
+            try:
+                count = await self.seed()
+            except MarketDataError as e:
+                logger.warning("Correlation universe not seeded", error=str(e), retry_in=delay)
+            except Exception as e:
+                logger.error("Correlation universe seeding failed", error=str(e), retry_in=delay, exc_info=True)
+            else:
+                logger.info("Correlation universe seeded", symbols=count, last_date=str(self.last_date))
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    async def _follow(self) -> None:
+        """Load the published universe whenever it changes, checking every ``retry`` seconds."""
+        loaded = None
+        while True:
+            try:
+                version = os.stat(self.history_path).st_mtime_ns
+                if version != loaded:
+                    count = self.load()
+                    loaded = version
+                    logger.info("Correlation universe loaded", symbols=count, last_date=str(self.last_date))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning("Published correlation universe unreadable", error=str(e))
+            await asyncio.sleep(self.retry)
+
+    @property
+    def following(self) -> bool:
+        """Return whether this worker follows another worker's universe."""
+        return self.follows and self.history_path is not None
+
+    def start(self) -> None:
+        """Start seeding the universe, or following the published one, in the background."""
+        if self._task is None or self._task.done():
+            if self.following:
+                self._task = asyncio.create_task(self._follow(), name="correlation-follow")
+            else:
+                self._task = asyncio.create_task(self._seed_at_startup(), name="correlation-seed")
+
+    async def stop(self) -> None:
+        """Cancel seeding still in progress."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def clear(self) -> None:
+        """Forget the feed's progress."""
+        self.last_date = self._history = None
+        self._unavailable.clear()
+
+
+correlation_feed = CorrelationFeed()
@@ -0,0 +1,11 @@
+"""
+Streaming CSV import pipeline.
+
+Reads broker CSV uploads chunk by chunk, validates rows in batches and writes
+them as positions, emitting progress and per-row errors as it goes.
+"""
+
+from app.services.csv_import.importer import CsvImporter, ImportStats, map_header
+from app.services.csv_import.parser import CsvFormatError, iter_csv_records
+
+__all__ = ["CsvFormatError", "CsvImporter", "ImportStats", "iter_csv_records", "map_header"]
@@ -0,0 +1,300 @@
+"""
+Batch-validating CSV importer.
+
+Rows from ``iter_csv_records`` are mapped onto ``ImportRow`` fields, validated
+``batch_size`` rows at a time and written with one bulk upsert per batch.
+The whole import runs in a single transaction that is committed only when no
+row was rejected (or ``skip_invalid`` is set), so a failed upload never leaves
+a partial portfolio behind. Batches go through the bulk upsert path, so
+re-importing a file replaces lots instead of duplicating them.
+
+Rows are keyed on (symbol, lot), across batches. Files without a lot column
+hold one row per purchase, so repeated symbols get their own lots, numbered
+in file order (``default``, ``default-2``, ...) from one counter per symbol;
+in files with a lot column a repeated (symbol, lot) is rejected rather than
+silently overwriting the earlier row. The lots seen so far are claimed in a
+temporary table keyed on (symbol, lot) inside the import transaction, so
+memory stays bounded by the batch size however long the file is.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Set, Tuple
+
+import structlog
+from pydantic import ValidationError
+from sqlalchemy import column, delete, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.position import DEFAULT_LOT
+from app.schemas.imports import IMPORT_ROWS
+from app.services.csv_import.parser import DEFAULT_CHUNK_SIZE, CsvFormatError, iter_csv_records
+from app.services.positions import upsert_positions
+
+logger = structlog.get_logger()
+
+DEFAULT_BATCH_SIZE = 500
+
+# Header spellings used by common broker exports, normalized to lower case.
+HEADER_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "symbol": ("symbol", "ticker", "security symbol", "instrument"),
+    "lot": ("lot", "lot id", "lot_id"),
+    "quantity": ("quantity", "qty", "shares", "quantity held"),
+    "entry_price": (
+        "entry_price", "entry price", "average cost", "avg cost", "cost/share",
+        "cost basis per share", "purchase price", "price paid",
+    ),
+    "stop_loss": ("stop_loss", "stop loss", "stop", "stop price"),
+    "current_price": ("current_price", "current price", "last price", "market price", "price", "last"),
+    "sector": ("sector",),
+}
+REQUIRED_FIELDS = ("symbol", "quantity", "entry_price")
+
+# (symbol, lot) -> first line, for files with a lot column.
+SEEN_LOTS_TABLE = "import_seen_lots"
+SEEN_LOTS = table(SEEN_LOTS_TABLE, column("symbol"), column("lot"), column("line"))
+CREATE_SEEN_LOTS = text(
+    f"CREATE TEMP TABLE IF NOT EXISTS {SEEN_LOTS_TABLE} "
+    "(symbol VARCHAR(20) NOT NULL, lot VARCHAR(64) NOT NULL, line INTEGER NOT NULL, PRIMARY KEY (symbol, lot))"
+)
+
+
+def map_header(header: List[str]) -> Dict[str, int]:
+    """
+    Map ``ImportRow`` fields to column indexes.
+
+    Raises:
+        CsvFormatError: If a required column is missing
+    """
+    normalized = [h.strip().lower() for h in header]
+    mapping = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                mapping[field] = normalized.index(alias)
+                break
+    missing = [f for f in REQUIRED_FIELDS if f not in mapping]
+    if missing:
+        raise CsvFormatError(
+            f"Missing required column(s): {', '.join(missing)}. "
+            f"Expected headers such as {', '.join(HEADER_ALIASES[missing[0]][:3])}"
+        )
+    return mapping
+
+
+@dataclass
+class ImportStats:
+    """Running totals for an import."""
+
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    bytes_read: int = 0
+
+    def dict(self) -> dict:
+        """Convert stats to a dictionary."""
+        return asdict(self)
+
+
+class CsvImporter:
+    """Streaming importer for one portfolio's CSV upload."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        portfolio_id: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dry_run: bool = False,
+        skip_invalid: bool = False,
+    ):
+        """
+        Initialize the importer.
+
+        Args:
+            db: Database session the import transaction runs in
+            portfolio_id: Portfolio receiving the positions
+            batch_size: Rows validated and inserted per batch
+            dry_run: Validate only, never write
+            skip_invalid: Commit valid rows even if some rows were rejected
+        """
+        self.db = db
+        self.portfolio_id = portfolio_id
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.skip_invalid = skip_invalid
+        self.stats = ImportStats()
+        # Rows seen per symbol, numbering lots in files without a lot column.
+        self._symbol_rows: Dict[str, int] = {}
+        self._claims_ready = False
+
+    def _validate(self, batch: List[Tuple[int, List[str]]], mapping: Dict[str, int]):
+        """
+        Validate a batch, returning (line, row) pairs of valid rows and error events.
+
+        The batch is validated and dumped as one list; when some rows fail,
+        the others are validated again without them.
+        """
+        lines = [line for line, _ in batch]
+        data = [
+            {f: fields[i] if i < len(fields) else None for f, i in mapping.items()}
+            for _, fields in batch
+        ]
+        try:
+            return list(zip(lines, IMPORT_ROWS.dump_python(IMPORT_ROWS.validate_python(data)))), []
+        except ValidationError as e:
+            failures: Dict[int, list] = {}
+            for err in e.errors():
+                failures.setdefault(err["loc"][0], []).append({
+                    "field": ".".join(str(p) for p in err["loc"][1:]),
+                    "message": err["msg"],
+                })
+
+        errors = [
+            {"event": "error", "line": batch[i][0], "symbol": data[i].get("symbol"), "errors": failures[i]}
+            for i in sorted(failures)
+        ]
+        kept = [i for i in range(len(data)) if i not in failures]
+        rows = IMPORT_ROWS.dump_python(IMPORT_ROWS.validate_python([data[i] for i in kept]))
+        return [(lines[i], row) for i, row in zip(kept, rows)], errors
+
+    async def _claim_lots(self, rows: List[Tuple[int, dict]]) -> Dict[Tuple[str, str], int]:
+        """
+        Claim each row's (symbol, lot) for the first line carrying it.
+
+        Returns:
+            First line of every (symbol, lot) in ``rows`` claimed on another line
+        """
+        if not self._claims_ready:
+            await self.db.execute(CREATE_SEEN_LOTS)
+            await self.db.execute(delete(SEEN_LOTS))
+            self._claims_ready = True
+        insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(SEEN_LOTS).values([
+            {"symbol": row["symbol"], "lot": row["lot"], "line": line} for line, row in rows
+        ])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["symbol", "lot"])
+        claimed = {
+            tuple(r) for r in (await self.db.execute(stmt.returning(SEEN_LOTS.c.symbol, SEEN_LOTS.c.lot))).all()
+        }
+        # Keys claimed on another line: earlier batches, or earlier in this one.
+        seen: Set[Tuple[str, str]] = set()
+        taken = set()
+        for _, row in rows:
+            key = (row["symbol"], row["lot"])
+            if key not in claimed or key in seen:
+                taken.add(key)
+            seen.add(key)
+        if not taken:
+            return {}
+        found = await self.db.execute(
+            select(SEEN_LOTS.c.symbol, SEEN_LOTS.c.lot, SEEN_LOTS.c.line).where(
+                SEEN_LOTS.c.symbol.in_({symbol for symbol, _ in taken}),
+                SEEN_LOTS.c.lot.in_({lot for _, lot in taken}),
+            )
+        )
+        return {(symbol, lot): line for symbol, lot, line in found if (symbol, lot) in taken}
+
+    async def _assign_lots(self, rows: List[Tuple[int, dict]], has_lot: bool) -> Tuple[List[dict], List[dict]]:
+        """
+        Key rows on (symbol, lot), returning writable rows and error events.
+
+        Without a lot column, repeated symbols get numbered lots; with one,
+        a (symbol, lot) seen on an earlier line is rejected.
+        """
+        if not has_lot:
+            for _, row in rows:
+                n = self._symbol_rows.get(row["symbol"], 0) + 1
+                self._symbol_rows[row["symbol"]] = n
+                row["lot"] = DEFAULT_LOT if n == 1 else f"{DEFAULT_LOT}-{n}"
+            return [row for _, row in rows], []
+
+        first_lines = await self._claim_lots(rows) if rows else {}
+        valid, errors = [], []
+        for line, row in rows:
+            first = first_lines.get((row["symbol"], row["lot"]), line)
+            if first != line:
+                errors.append({
+                    "event": "error",
+                    "line": line,
+                    "symbol": row["symbol"],
+                    "errors": [{"field": "lot", "message": f"Duplicate lot {row['lot']!r}, first on line {first}"}],
+                })
+            else:
+                valid.append(row)
+        return valid, errors
+
+    async def _flush_batch(self, batch, mapping) -> List[dict]:
+        """Validate and write one batch, returning the events it produced."""
+        rows, errors = self._validate(batch, mapping)
+        valid, duplicates = await self._assign_lots(rows, "lot" in mapping)
+        errors = sorted(errors + duplicates, key=lambda e: e["line"])
+        self.stats.rows += len(batch)
+        self.stats.rejected += len(errors)
+
+        writable = not self.dry_run and (self.skip_invalid or self.stats.rejected == 0)
+        if valid and writable:
+            result = await upsert_positions(self.db, self.portfolio_id, valid)
+            self.stats.imported += result.written
+
+        return errors + [{"event": "progress", **self.stats.dict()}]
+
+    async def run(
+        self,
+        read: Callable[[int], Awaitable[bytes]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Import an upload, yielding progress, error and completion events.
+
+        Args:
+            read: Async callable returning up to ``n`` bytes, e.g. ``UploadFile.read``
+            chunk_size: Number of bytes requested per read
+        """
+        async def counted_read(n: int) -> bytes:
+            chunk = await read(n)
+            self.stats.bytes_read += len(chunk)
+            return chunk
+
+        mapping = None
+        batch: List[Tuple[int, List[str]]] = []
+        try:
+            async for line, fields in iter_csv_records(counted_read, chunk_size):
+                if mapping is None:
+                    mapping = map_header(fields)
+                    continue
+                batch.append((line, fields))
+                if len(batch) >= self.batch_size:
+                    for event in await self._flush_batch(batch, mapping):
+                        yield event
+                    batch = []
+            if mapping is None:
+                raise CsvFormatError("File is empty")
+            if batch:
+                for event in await self._flush_batch(batch, mapping):
+                    yield event
+        except CsvFormatError as e:
+            await self.db.rollback()
+            logger.warning("CSV import failed", portfolio_id=self.portfolio_id, error=str(e))
+            yield {"event": "failed", "message": str(e), **self.stats.dict()}
+            return
+
+        committed = (
+            not self.dry_run
+            and self.stats.imported > 0
+            and (self.skip_invalid or self.stats.rejected == 0)
+        )
+        if committed:
+            if self._claims_ready:
+                await self.db.execute(delete(SEEN_LOTS))
+            await self.db.commit()
+        else:
+            await self.db.rollback()
+            self.stats.imported = 0
+
+        logger.info(
+            "CSV import finished",
+            portfolio_id=self.portfolio_id,
+            committed=committed,
+            **self.stats.dict(),
+        )
+        yield {"event": "complete", "committed": committed, **self.stats.dict()}
@@ -0,0 +1,94 @@
+"""
+Incremental CSV record parser.
+
+Decodes an upload chunk by chunk and yields one parsed record at a time, so
+memory is bounded by the chunk size plus the longest record rather than the
+file size. Quoted fields may contain newlines; a record is complete once its
+accumulated text contains an even number of quote characters, which holds for
+RFC 4180 CSV because embedded quotes are doubled.
+"""
+
+import codecs
+import csv
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_RECORD_BYTES = 1024 * 1024
+
+# Physical lines with their terminators; unlike str.splitlines this only
+# breaks on CR/LF so that form feeds or U+2028 inside fields are preserved.
+_LINES = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+")
+
+
+class CsvFormatError(ValueError):
+    """Raised when the upload cannot be decoded or parsed as CSV."""
+
+
+async def iter_csv_records(
+    read: Callable[[int], Awaitable[bytes]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[Tuple[int, List[str]]]:
+    """
+    Yield ``(line_number, fields)`` for every non-empty CSV record.
+
+    Args:
+        read: Async callable returning up to ``n`` bytes, e.g. ``UploadFile.read``
+        chunk_size: Number of bytes requested per read
+
+    Raises:
+        CsvFormatError: On invalid UTF-8, an unterminated quote or a record
+            larger than ``MAX_RECORD_BYTES``
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    record = ""
+    record_line = line_number = 0
+
+    while True:
+        chunk = await read(chunk_size)
+        try:
+            text = decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError as e:
+            raise CsvFormatError(f"File is not valid UTF-8 near line {line_number + 1}") from e
+
+        lines = _LINES.findall(tail + text)
+        # Keep a line without its "\n" (unterminated, or a lone "\r" that may
+        # be the first half of "\r\n") until the next chunk arrives.
+        if chunk and lines and not lines[-1].endswith("\n"):
+            tail = lines.pop()
+        else:
+            tail = ""
+        if len(tail) > MAX_RECORD_BYTES:
+            raise CsvFormatError(f"Line {line_number + 1}: record exceeds {MAX_RECORD_BYTES} bytes")
+
+        # Group the chunk's lines into complete records, then run a single
+        # csv.reader over all of them.
+        starts, records = [], []
+        for line in lines:
+            line_number += 1
+            if not record:
+                record_line = line_number
+            record += line
+            if len(record) > MAX_RECORD_BYTES:
+                raise CsvFormatError(f"Line {record_line}: record exceeds {MAX_RECORD_BYTES} bytes")
+            if record.count('"') % 2:
+                continue
+            if record.strip():
+                starts.append(record_line)
+                records.append(record)
+            record = ""
+
+        parsed = csv.reader(records)
+        for start in starts:
+            try:
+                fields = next(parsed)
+            except csv.Error as e:
+                raise CsvFormatError(f"Line {start}: {e}") from e
+            yield start, fields
+
+        if not chunk:
+            break
+
+    if record:
+        raise CsvFormatError(f"Line {record_line}: unterminated quoted field")
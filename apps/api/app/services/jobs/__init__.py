@@ -0,0 +1,51 @@
+"""
+Background jobs.
+
+An async job queue for analytics too heavy for a request handler, with an
+in-process broker for single instances and tests and a Redis broker shared
+by every API process in production. Importing the package registers the
+built-in job handlers.
+"""
+
+from app.services.jobs.broker import (
+    ACTIVE_STATUSES,
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    Job,
+    MemoryJobBroker,
+    RedisJobBroker,
+)
+from app.services.jobs.queue import (
+    JobCancelled,
+    JobContext,
+    JobKindDisabled,
+    JobQueue,
+    UnknownJobKind,
+    close_jobs,
+    init_jobs,
+    job_queue,
+)
+from app.services.jobs import tasks  # noqa: F401  (registers handlers)
+
+__all__ = [
+    "ACTIVE_STATUSES",
+    "CANCELLED",
+    "FAILED",
+    "Job",
+    "JobCancelled",
+    "JobContext",
+    "JobKindDisabled",
+    "JobQueue",
+    "MemoryJobBroker",
+    "QUEUED",
+    "RUNNING",
+    "RedisJobBroker",
+    "SUCCEEDED",
+    "UnknownJobKind",
+    "close_jobs",
+    "init_jobs",
+    "job_queue",
+]
@@ -0,0 +1,363 @@
+"""
+Job records and brokers.
+
+A broker stores job records and the queue of job ids waiting for a worker.
+Every state change goes through ``transition``, a compare-and-set on the
+job's status, so a job cancelled while queued is never started and a job
+cancelled while running cannot later be marked succeeded.
+
+``submit`` deduplicates and supersedes in the same atomic step: a job whose
+dedup key matches a queued or running job returns that job instead, and a
+job submitted into a *slot* (one per kind and portfolio) displaces the
+slot's previous job, which the queue then cancels.
+
+``MemoryJobBroker`` serves a single process and tests; ``RedisJobBroker``
+shares jobs between every API process, using ``WATCH``/``MULTI`` for the
+atomic steps and a Redis list as the queue.
+
+A Redis worker moves the job id it takes into a processing list (``BLMOVE``)
+and holds a lease on it, renewed while the job runs and released with
+``ack``. ``reap`` puts the jobs whose lease ran out, because their worker
+died, back on the queue; a job that has lost ``max_attempts`` workers fails
+instead, so a job that crashes its worker cannot take every worker down.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from app.cache import KEY_PREFIX
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = frozenset({QUEUED, RUNNING})
+QUEUE_KEY = f"{KEY_PREFIX}:jobs:queue"
+PROCESSING_KEY = f"{KEY_PREFIX}:jobs:processing"
+LEASES_KEY = f"{KEY_PREFIX}:jobs:leases"
+
+
+@dataclass(frozen=True)
+class Job:
+    """State of one background job."""
+
+    id: str
+    kind: str
+    portfolio_id: int
+    params: Dict[str, Any]
+    key: str
+    slot: Optional[str] = None
+    status: str = QUEUED
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+
+    @property
+    def active(self) -> bool:
+        """Return whether the job is queued or running."""
+        return self.status in ACTIVE_STATUSES
+
+    def dict(self) -> dict:
+        """Convert job to a dictionary."""
+        return asdict(self)
+
+    def to_json(self) -> str:
+        """Serialize the job for storage."""
+        return json.dumps(self.dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Job":
+        """Deserialize a stored job."""
+        return cls(**json.loads(raw))
+
+
+class MemoryJobBroker:
+    """
+    In-process broker.
+
+    Finished jobs are kept for ``result_ttl`` seconds so their results can
+    be polled, then dropped on the next submission.
+    """
+
+    def __init__(self, result_ttl: float = 3600.0):
+        """
+        Initialize an empty broker.
+
+        Args:
+            result_ttl: Seconds finished jobs are retained
+        """
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._keys: Dict[str, str] = {}
+        self._slots: Dict[str, str] = {}
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+
+    def _prune(self) -> None:
+        """Drop finished jobs older than ``result_ttl``."""
+        cutoff = time.time() - self.result_ttl
+        expired = [j.id for j in self._jobs.values()
+                   if j.finished_at is not None and j.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired:
+            self._keys = {k: v for k, v in self._keys.items() if v in self._jobs}
+            self._slots = {k: v for k, v in self._slots.items() if v in self._jobs}
+
+    async def submit(self, job: Job) -> Tuple[Job, Optional[str]]:
+        """
+        Store and enqueue ``job`` unless an active job has the same key.
+
+        Returns:
+            ``(job, superseded)``: the stored or deduplicated job and the id
+            of the job previously holding ``job.slot``, if any
+        """
+        self._prune()
+        existing = self._jobs.get(self._keys.get(job.key, ""))
+        if existing is not None and existing.active:
+            return existing, None
+        self._jobs[job.id] = job
+        self._keys[job.key] = job.id
+        superseded = None
+        if job.slot is not None:
+            superseded = self._slots.get(job.slot)
+            self._slots[job.slot] = job.id
+        self._queue.put_nowait(job.id)
+        return job, superseded
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id."""
+        return self._jobs.get(job_id)
+
+    async def transition(self, job_id: str, allowed: Collection[str], **changes: Any) -> Optional[Job]:
+        """
+        Apply ``changes`` if the job's status is in ``allowed``.
+
+        Returns:
+            The updated job, or ``None`` if it is unknown or in another status
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in allowed:
+            return None
+        job = replace(job, **changes)
+        self._jobs[job_id] = job
+        return job
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        """Return the next queued job id, or ``None`` after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def renew(self, job_id: str) -> None:
+        """Extend a dequeued job's lease; a single process needs none."""
+
+    async def ack(self, job_id: str) -> None:
+        """Release a dequeued job; a single process needs no bookkeeping."""
+
+    async def reap(self) -> List[Job]:
+        """Requeue jobs of dead workers; a single process has none."""
+        return []
+
+    async def close(self) -> None:
+        """Drop every job."""
+        self._jobs.clear()
+        self._keys.clear()
+        self._slots.clear()
+        self._queue = asyncio.Queue()
+
+
+class RedisJobBroker:
+    """
+    Redis broker shared by every API process.
+
+    Job records, dedup keys and slots are plain string keys; records of
+    finished jobs and the dedup and slot keys expire after ``result_ttl``.
+    Lease deadlines (epoch seconds) are fields of one hash, keyed by job id.
+    The connection belongs to the result cache and is not closed here.
+
+    Records of queued and running jobs, the queue, the processing list and
+    the leases have no TTL, so the server's ``volatile-lru`` policy never
+    evicts them (``allkeys-lru`` would drop jobs under memory pressure).
+    """
+
+    def __init__(self, client, result_ttl: float = 3600.0, lease_ttl: float = 30.0, max_attempts: int = 3,
+                 clock=time.time):
+        """
+        Initialize the Redis broker.
+
+        Args:
+            client: ``redis.asyncio.Redis`` compatible client with ``decode_responses=True``
+            result_ttl: Seconds finished jobs are retained
+            lease_ttl: Seconds a dequeued job is held without a renewal
+            max_attempts: Workers a job may lose before it fails
+            clock: Wall clock returning epoch seconds, shared by every process
+        """
+        self.client = client
+        self.result_ttl = result_ttl
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.clock = clock
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"{KEY_PREFIX}:job:{job_id}"
+
+    async def submit(self, job: Job) -> Tuple[Job, Optional[str]]:
+        """
+        Store and enqueue ``job`` unless an active job has the same key.
+
+        Returns:
+            ``(job, superseded)``: the stored or deduplicated job and the id
+            of the job previously holding ``job.slot``, if any
+        """
+        from redis.exceptions import WatchError
+
+        dedup_key = f"{KEY_PREFIX}:job:dedup:{job.key}"
+        ttl = int(self.result_ttl)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(dedup_key)
+                    existing_id = await pipe.get(dedup_key)
+                    if existing_id is not None:
+                        raw = await pipe.get(self._job_key(existing_id))
+                        if raw is not None:
+                            existing = Job.from_json(raw)
+                            if existing.active:
+                                await pipe.reset()
+                                return existing, None
+                    pipe.multi()
+                    pipe.set(self._job_key(job.id), job.to_json())
+                    pipe.set(dedup_key, job.id, ex=ttl)
+                    if job.slot is not None:
+                        slot_key = f"{KEY_PREFIX}:job:slot:{job.slot}"
+                        pipe.getset(slot_key, job.id)
+                        pipe.expire(slot_key, ttl)
+                    pipe.rpush(QUEUE_KEY, job.id)
+                    results = await pipe.execute()
+                    return job, results[2] if job.slot is not None else None
+                except WatchError:
+                    continue
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id."""
+        raw = await self.client.get(self._job_key(job_id))
+        return Job.from_json(raw) if raw is not None else None
+
+    async def transition(self, job_id: str, allowed: Collection[str], **changes: Any) -> Optional[Job]:
+        """
+        Apply ``changes`` if the job's status is in ``allowed``.
+
+        Returns:
+            The updated job, or ``None`` if it is unknown or in another status
+        """
+        from redis.exceptions import WatchError
+
+        key = self._job_key(job_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    job = Job.from_json(raw) if raw is not None else None
+                    if job is None or job.status not in allowed:
+                        await pipe.reset()
+                        return None
+                    job = replace(job, **changes)
+                    pipe.multi()
+                    pipe.set(key, job.to_json(), ex=None if job.active else int(self.result_ttl))
+                    await pipe.execute()
+                    return job
+                except WatchError:
+                    continue
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        """
+        Return the next queued job id, or ``None`` after ``timeout`` seconds.
+
+        The id stays in the processing list under a lease until ``ack``.
+        """
+        # A zero timeout would block forever.
+        job_id = await self.client.blmove(QUEUE_KEY, PROCESSING_KEY, max(timeout, 0.01), "LEFT", "RIGHT")
+        if job_id is not None:
+            await self.renew(job_id)
+        return job_id
+
+    async def renew(self, job_id: str) -> None:
+        """Extend a dequeued job's lease by ``lease_ttl``."""
+        await self.client.hset(LEASES_KEY, job_id, self.clock() + self.lease_ttl)
+
+    async def ack(self, job_id: str) -> None:
+        """Release a dequeued job once it has finished or been skipped."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrem(PROCESSING_KEY, 1, job_id)
+            pipe.hdel(LEASES_KEY, job_id)
+            await pipe.execute()
+
+    async def reap(self) -> List[Job]:
+        """
+        Requeue the jobs whose lease has run out.
+
+        A job found without a lease (its worker is between ``BLMOVE`` and
+        the first renewal) is given one, so it is reaped a lease later at
+        the earliest. A running job goes back to ``queued``, or fails once
+        it has lost ``max_attempts`` workers.
+
+        Returns:
+            The records of the jobs that were requeued or failed
+        """
+        from redis.exceptions import WatchError
+
+        changed = []
+        now = self.clock()
+        for job_id in await self.client.lrange(PROCESSING_KEY, 0, -1):
+            key = self._job_key(job_id)
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(LEASES_KEY, key)
+                    deadline = await pipe.hget(LEASES_KEY, job_id)
+                    if deadline is None or float(deadline) > now:
+                        await pipe.reset()
+                        if deadline is None:
+                            await self.client.hsetnx(LEASES_KEY, job_id, now + self.lease_ttl)
+                        continue
+                    raw = await pipe.get(key)
+                    job = Job.from_json(raw) if raw is not None else None
+                    if job is not None and job.status == RUNNING:
+                        attempts = job.attempts + 1
+                        if attempts < self.max_attempts:
+                            job = replace(job, status=QUEUED, attempts=attempts, progress=0.0, started_at=None,
+                                          message="Requeued after its worker was lost")
+                        else:
+                            job = replace(job, status=FAILED, attempts=attempts, finished_at=now,
+                                          error=f"Lost {attempts} workers")
+                        pipe.multi()
+                        pipe.set(key, job.to_json(), ex=None if job.active else int(self.result_ttl))
+                        changed.append(job)
+                    else:
+                        pipe.multi()
+                    # Queued jobs were dequeued but never started; finished ones only need releasing.
+                    pipe.lrem(PROCESSING_KEY, 1, job_id)
+                    pipe.hdel(LEASES_KEY, job_id)
+                    if job is not None and job.status == QUEUED:
+                        pipe.rpush(QUEUE_KEY, job_id)
+                    await pipe.execute()
+                except WatchError:
+                    # Renewed or reaped meanwhile; look again on the next pass.
+                    if changed and changed[-1].id == job_id:
+                        changed.pop()
+        return changed
+
+    async def close(self) -> None:
+        """Nothing to release; the client is owned by the result cache."""
@@ -0,0 +1,470 @@
+"""
+Background job queue.
+
+Heavy analytics (Monte Carlo VaR, stress tests, large imports) are
+submitted as jobs and answered with a job id; clients poll the job for
+progress and its result instead of holding a request open while the
+computation blocks the event loop.
+
+Each API process runs ``concurrency`` worker coroutines pulling job ids
+from the broker. Handlers are coroutines that hand CPU-bound kernels to a
+process pool with ``JobContext.run`` (threads when no pool is configured)
+and report progress with ``JobContext.progress``, which is also where a
+cancelled job stops: the progress write is a compare-and-set on the job's
+status and raises ``JobCancelled`` once the job is no longer running.
+
+A job kind may register a cleanup for resources its parameters refer to
+(the spool file of an import). It runs when a job is cancelled before it
+started, or skipped by a worker because it no longer is queued, so it must
+tolerate running twice; a job that runs cleans up in its handler.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import structlog
+
+from app.cache import RedisCache, result_cache
+from app.config import settings
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.metrics import registry
+from app.services.jobs.broker import (
+    ACTIVE_STATUSES,
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    Job,
+    MemoryJobBroker,
+    RedisJobBroker,
+)
+
+logger = structlog.get_logger()
+
+JOBS_SUBMITTED = registry.counter(
+    "jobs_submitted_total",
+    "Background jobs submitted by kind and outcome (queued, deduplicated)",
+    ("kind", "outcome"),
+)
+JOBS_FINISHED = registry.counter(
+    "jobs_finished_total",
+    "Background jobs finished by kind and final status",
+    ("kind", "status"),
+)
+JOB_DURATION = registry.histogram(
+    "job_duration_seconds",
+    "Run time of background jobs from start to finish",
+    ("kind",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once its job has been cancelled."""
+
+
+class UnknownJobKind(ValueError):
+    """Raised when submitting a job kind without a registered handler."""
+
+
+class JobKindDisabled(Exception):
+    """Raised when submitting a job kind this deployment cannot run."""
+
+
+Handler = Callable[["JobContext"], Awaitable[Dict[str, Any]]]
+Cleanup = Callable[[Job], None]
+
+
+class JobContext:
+    """What a handler sees of its job and the queue."""
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        """Initialize the context of a running job."""
+        self.queue = queue
+        self.job = job
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Return the job's parameters."""
+        return self.job.params
+
+    @property
+    def portfolio_id(self) -> int:
+        """Return the job's portfolio id."""
+        return self.job.portfolio_id
+
+    def session(self):
+        """Return a new primary database session (an async context manager)."""
+        return self.queue.sessions()
+
+    def read_session(self):
+        """Return a new read-routed database session (an async context manager)."""
+        return self.queue.read_sessions()
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Record progress between 0 and 1.
+
+        Raises:
+            JobCancelled: If the job was cancelled or superseded
+        """
+        job = await self.queue.broker.transition(
+            self.job.id, {RUNNING}, progress=round(min(max(fraction, 0.0), 1.0), 4), message=message,
+        )
+        if job is None:
+            raise JobCancelled(self.job.id)
+        self.job = job
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a picklable module-level function on the process pool."""
+        if kwargs:
+            fn = functools.partial(fn, **kwargs)
+        pool = self.queue.pool
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    async def run_in_thread(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a function that needs this process's state on a thread."""
+        return await asyncio.to_thread(fn, *args)
+
+    async def map(self, fn: Callable[..., Any], calls: Sequence[Tuple]) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        Run ``fn(*args)`` for every tuple of ``calls`` concurrently via ``run``.
+
+        Yields ``(index, result)`` in completion order; calls not yet started
+        are cancelled if the consumer stops early (e.g. on ``JobCancelled``).
+        """
+        async def indexed(i: int, args: Tuple) -> Tuple[int, Any]:
+            return i, await self.run(fn, *args)
+
+        tasks = [asyncio.ensure_future(indexed(i, args)) for i, args in enumerate(calls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class JobQueue:
+    """Job submission, cancellation and the worker loop of one process."""
+
+    def __init__(self, broker, concurrency: int = 2, process_workers: int = 0, poll_interval: float = 1.0,
+                 lease_interval: float = 10.0):
+        """
+        Initialize the queue.
+
+        Args:
+            broker: ``MemoryJobBroker`` or ``RedisJobBroker`` instance
+            concurrency: Jobs run at once by this process
+            process_workers: Size of the process pool for CPU-bound kernels;
+                0 runs them on threads
+            poll_interval: Longest a worker blocks waiting for a job, which
+                bounds how long ``stop`` waits for idle workers
+            lease_interval: Seconds between lease renewals of running jobs,
+                and between passes requeueing jobs of dead workers
+        """
+        self.broker = broker
+        self.concurrency = concurrency
+        self.process_workers = process_workers
+        self.poll_interval = poll_interval
+        self.lease_interval = lease_interval
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.sessions = AsyncSessionLocal
+        self.read_sessions = ReadSessionLocal
+        self._handlers: Dict[str, Tuple[Handler, bool, Optional[Cleanup]]] = {}
+        # Kinds refused at submission, with the reason
+        self.disabled: Dict[str, str] = {}
+        self._workers: List[asyncio.Task] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    @property
+    def kinds(self) -> Set[str]:
+        """Return the registered job kinds."""
+        return set(self._handlers)
+
+    @property
+    def running(self) -> bool:
+        """Return whether worker tasks are active."""
+        return any(not t.done() for t in self._workers)
+
+    def handler(self, kind: str, supersede: bool = True, cleanup: Optional[Cleanup] = None):
+        """
+        Register the handler of a job kind.
+
+        Args:
+            kind: Job kind, e.g. ``"var"``
+            supersede: Cancel the portfolio's pending job of this kind when a
+                job with different parameters is submitted
+            cleanup: Releases what a job that never runs leaves behind
+        """
+        def register(fn: Handler) -> Handler:
+            self._handlers[kind] = (fn, supersede, cleanup)
+            return fn
+        return register
+
+    def _cleanup(self, job: Job) -> None:
+        """Run the cleanup of a job that will not run."""
+        _, _, cleanup = self._handlers.get(job.kind, (None, None, None))
+        if cleanup is None:
+            return
+        try:
+            cleanup(job)
+        except Exception as e:
+            logger.warning("Job cleanup failed", job_id=job.id, kind=job.kind, error=str(e))
+
+    @staticmethod
+    def dedup_key(kind: str, portfolio_id: int, params: Dict[str, Any]) -> str:
+        """Return the key identical submissions share."""
+        payload = json.dumps([kind, portfolio_id, params], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    async def submit(
+        self,
+        kind: str,
+        portfolio_id: int,
+        params: Dict[str, Any],
+        dedup_key: Optional[str] = None,
+    ) -> Job:
+        """
+        Queue a job, or return the identical job already queued or running.
+
+        Args:
+            kind: Registered job kind
+            portfolio_id: Portfolio the job works on
+            params: JSON-serializable handler parameters
+            dedup_key: Key identifying identical jobs (default: derived from
+                kind, portfolio and params)
+
+        Raises:
+            UnknownJobKind: If no handler is registered for ``kind``
+            JobKindDisabled: If ``kind`` is disabled
+        """
+        if kind not in self._handlers:
+            raise UnknownJobKind(f"Unknown job kind {kind!r}")
+        if kind in self.disabled:
+            raise JobKindDisabled(self.disabled[kind])
+        _, supersede, _ = self._handlers[kind]
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            portfolio_id=portfolio_id,
+            params=params,
+            key=dedup_key or self.dedup_key(kind, portfolio_id, params),
+            slot=f"{kind}:{portfolio_id}" if supersede else None,
+        )
+        stored, superseded = await self.broker.submit(job)
+        if stored.id != job.id:
+            JOBS_SUBMITTED.inc(kind=kind, outcome="deduplicated")
+            return stored
+
+        JOBS_SUBMITTED.inc(kind=kind, outcome="queued")
+        logger.info("Job queued", job_id=job.id, kind=kind, portfolio_id=portfolio_id)
+        if superseded and superseded != job.id:
+            await self.cancel(superseded, reason=f"Superseded by job {job.id}")
+        return stored
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id."""
+        return await self.broker.get(job_id)
+
+    async def cancel(self, job_id: str, reason: str = "Cancelled") -> Optional[Job]:
+        """
+        Cancel a queued or running job.
+
+        A queued job is never started. A running job stops at its next
+        progress report; if it runs in this process it is interrupted at
+        once. Finished jobs are returned unchanged.
+        """
+        job = await self.broker.transition(
+            job_id, ACTIVE_STATUSES, status=CANCELLED, message=reason, finished_at=time.time(),
+        )
+        if job is None:
+            return await self.broker.get(job_id)
+        JOBS_FINISHED.inc(kind=job.kind, status=CANCELLED)
+        logger.info("Job cancelled", job_id=job_id, kind=job.kind, reason=reason)
+        if job.started_at is None:
+            self._cleanup(job)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def _execute(self, job: Job) -> None:
+        """Run a started job's handler and record its outcome."""
+        handler, _, _ = self._handlers[job.kind]
+        started = time.monotonic()
+        try:
+            result = await handler(JobContext(self, job))
+        except (JobCancelled, asyncio.CancelledError):
+            # Cancelled jobs were already marked; anything still running was
+            # interrupted by shutdown.
+            if await self.broker.transition(job.id, {RUNNING}, status=FAILED, error="Interrupted",
+                                            finished_at=time.time()):
+                JOBS_FINISHED.inc(kind=job.kind, status=FAILED)
+            return
+        except Exception as e:
+            logger.warning("Job failed", job_id=job.id, kind=job.kind, error=str(e))
+            if await self.broker.transition(job.id, {RUNNING}, status=FAILED, error=str(e),
+                                            finished_at=time.time()):
+                JOBS_FINISHED.inc(kind=job.kind, status=FAILED)
+            return
+        finally:
+            JOB_DURATION.observe(time.monotonic() - started, kind=job.kind)
+
+        if await self.broker.transition(job.id, {RUNNING}, status=SUCCEEDED, progress=1.0,
+                                        result=result, finished_at=time.time()):
+            JOBS_FINISHED.inc(kind=job.kind, status=SUCCEEDED)
+            logger.info("Job succeeded", job_id=job.id, kind=job.kind,
+                        duration=round(time.monotonic() - started, 3))
+
+    async def _worker(self) -> None:
+        """Pull and run jobs until stopped."""
+        while not self._stopping:
+            try:
+                job_id = await self.broker.dequeue(timeout=self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job dequeue failed", error=str(e))
+                await asyncio.sleep(1.0)
+                continue
+            if job_id is None:
+                continue
+            try:
+                await self._start_job(job_id)
+            finally:
+                try:
+                    await self.broker.ack(job_id)
+                except Exception as e:
+                    # The reaper releases it once the lease runs out.
+                    logger.warning("Job ack failed", job_id=job_id, error=str(e))
+
+    async def _start_job(self, job_id: str) -> None:
+        """Run a dequeued job unless it no longer is queued."""
+        job = await self.broker.transition(job_id, {QUEUED}, status=RUNNING, started_at=time.time())
+        if job is None:
+            skipped = await self.broker.get(job_id)
+            if skipped is not None and not skipped.active:
+                self._cleanup(skipped)
+            return
+        if job.kind not in self._handlers:
+            await self.broker.transition(job_id, {RUNNING}, status=FAILED, finished_at=time.time(),
+                                         error=f"No handler for job kind {job.kind!r}")
+            return
+        task = asyncio.create_task(self._execute(job), name=f"job-{job_id}")
+        self._running[job_id] = task
+        try:
+            # ``wait`` rather than ``await`` so cancelling the job does not
+            # cancel the worker; renew the lease while it runs.
+            while not (await asyncio.wait({task}, timeout=self.lease_interval))[0]:
+                try:
+                    await self.broker.renew(job_id)
+                except Exception as e:
+                    logger.warning("Job lease renewal failed", job_id=job_id, error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _reap(self) -> None:
+        """Requeue the jobs of dead workers until stopped."""
+        while True:
+            await asyncio.sleep(self.lease_interval)
+            try:
+                jobs = await self.broker.reap()
+            except Exception as e:
+                logger.warning("Job reaping failed", error=str(e))
+                continue
+            for job in jobs:
+                if job.status == FAILED:
+                    JOBS_FINISHED.inc(kind=job.kind, status=FAILED)
+                logger.warning("Job worker lost", job_id=job.id, kind=job.kind,
+                               status=job.status, attempts=job.attempts)
+
+    def start(self) -> None:
+        """Start the worker tasks and the process pool."""
+        if self.running:
+            return
+        self._stopping = False
+        if self.process_workers > 0 and self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        self._reaper = asyncio.create_task(self._reap(), name="job-reaper")
+
+    async def stop(self) -> None:
+        """Stop the workers, interrupting running jobs, and shut the pool down."""
+        self._stopping = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        for task in list(self._running.values()):
+            task.cancel()
+        # Idle workers exit after their current poll; cancelling a blocking
+        # pop could hand its connection back with a reply still pending.
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=self.poll_interval + 1.0)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+job_queue = JobQueue(
+    MemoryJobBroker(result_ttl=settings.JOB_RESULT_TTL_SECONDS),
+    concurrency=settings.JOB_CONCURRENCY,
+    process_workers=settings.JOB_PROCESS_WORKERS,
+    lease_interval=settings.JOB_LEASE_SECONDS / 3,
+)
+
+
+async def init_jobs() -> None:
+    """
+    Share jobs through Redis when the result cache uses it, then start workers.
+
+    Import jobs are disabled when jobs are shared through Redis without a
+    ``JOB_SPOOL_DIR``: uploads spooled to a process's temporary directory
+    cannot be read by workers of other hosts. Every other kind still runs.
+    """
+    backend = result_cache.backend
+    job_queue.disabled.clear()
+    if isinstance(backend, RedisCache):
+        if not settings.JOB_SPOOL_DIR:
+            job_queue.disabled["import"] = ("Background imports need JOB_SPOOL_DIR, a directory "
+                                            "shared by every API process")
+            logger.warning("Import jobs disabled: JOB_SPOOL_DIR is not set")
+        job_queue.broker = RedisJobBroker(
+            backend.client,
+            result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+            lease_ttl=settings.JOB_LEASE_SECONDS,
+        )
+    job_queue.start()
+    logger.info("Job workers started", concurrency=job_queue.concurrency,
+                process_workers=job_queue.process_workers,
+                shared=isinstance(job_queue.broker, RedisJobBroker))
+
+
+async def close_jobs() -> None:
+    """Stop the job workers."""
+    await job_queue.stop()
+    await job_queue.broker.close()
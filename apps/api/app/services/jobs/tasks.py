@@ -0,0 +1,151 @@
+"""
+Job handlers for heavy analytics.
+
+* ``var``: Value at Risk over the holdings' rolling-window returns; Monte
+  Carlo paths are simulated in chunks on the process pool with progress
+  reported per chunk.
+* ``stress``: every stress scenario applied to the portfolio.
+* ``import``: a spooled CSV upload imported in one transaction, with
+  progress by bytes read.
+"""
+
+import asyncio
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.services.correlation import correlation_service
+from app.services.csv_import import CsvImporter
+from app.services.jobs.broker import Job
+from app.services.jobs.queue import JobContext, job_queue
+from app.services.market_data import price_cache
+from app.services.reference_data import reference_data
+from app.services.risk import InsufficientHistoryError, calculate_var, plan_monte_carlo, simulate_chunk
+from app.services.risk.var import CHUNK_BYTES
+from app.services.snapshot import PortfolioSnapshot, snapshot_store, symbol_codes
+from app.services.stress import stress_tester
+
+# Monte Carlo jobs are split into at least this many chunks so progress
+# advances in steps of at most 5%.
+PROGRESS_STEPS = 20
+# Rejected import rows kept in the job result.
+MAX_REPORTED_ERRORS = 100
+
+
+def _portfolio_value(snapshot: PortfolioSnapshot) -> float:
+    """Return market value plus cash."""
+    return float(snapshot.quantity @ snapshot.current_price) + snapshot.cash_balance
+
+
+def _symbol_exposures(snapshot: PortfolioSnapshot) -> Tuple[List[str], np.ndarray]:
+    """Return the distinct symbols of a portfolio and the summed market value of each."""
+    codes, inverse = np.unique(snapshot.symbol_code, return_inverse=True)
+    exposures = np.bincount(inverse, weights=snapshot.quantity * snapshot.current_price,
+                            minlength=len(codes))
+    return symbol_codes.decode_many(codes), exposures
+
+
+@job_queue.handler("var")
+async def run_var(ctx: JobContext) -> Dict[str, Any]:
+    """Compute VaR and CVaR of a portfolio with the requested method."""
+    params = ctx.params
+    async with ctx.read_session() as db:
+        snapshot = await snapshot_store.get(db, ctx.portfolio_id)
+    snapshot = await price_cache.reprice(snapshot)
+
+    symbols, exposures = _symbol_exposures(snapshot)
+    found, returns, missing = correlation_service.returns_for(symbols)
+    if missing:
+        raise InsufficientHistoryError(f"No daily price history for: {', '.join(missing)}")
+    options = {
+        "confidence": params["confidence"],
+        "horizon_days": params["horizon_days"],
+        "portfolio_value": _portfolio_value(snapshot),
+    }
+    await ctx.progress(0.05, "Returns history loaded")
+
+    if params["method"] == "monte_carlo":
+        paths = params["paths"]
+        chunk_size = min(max(1, CHUNK_BYTES // (3 * 8 * len(found))), math.ceil(paths / PROGRESS_STEPS))
+        plan = plan_monte_carlo(returns, exposures, paths=paths, seed=params.get("seed"),
+                                chunk_size=chunk_size, **options)
+        offsets = np.cumsum([0] + [size for _, size, *_ in plan.chunks])
+        pnl = np.empty(plan.paths)
+        done = 0
+        async for i, chunk in ctx.map(simulate_chunk, plan.chunks):
+            pnl[offsets[i]:offsets[i + 1]] = chunk
+            done += 1
+            await ctx.progress(0.05 + 0.95 * done / len(plan.chunks),
+                               f"{done}/{len(plan.chunks)} path chunks simulated")
+        result = plan.result(pnl)
+    else:
+        result = await ctx.run(calculate_var, returns, exposures, params["method"], **options)
+
+    return {
+        "portfolio_id": ctx.portfolio_id,
+        **result.dict(),
+        "calculated_at": datetime.utcnow().isoformat(),
+    }
+
+
+@job_queue.handler("stress")
+async def run_stress(ctx: JobContext) -> Dict[str, Any]:
+    """Apply every stress scenario to a portfolio."""
+    async with ctx.read_session() as db:
+        snapshot = await snapshot_store.get(db, ctx.portfolio_id)
+    snapshot = await price_cache.reprice(snapshot)
+    # Scenarios and reference data live in this process, so a thread rather than the pool.
+    results = await ctx.run_in_thread(stress_tester.run, snapshot, reference_data.betas(snapshot))
+    return {
+        "portfolio_id": ctx.portfolio_id,
+        "portfolio_value": round(_portfolio_value(snapshot), 2),
+        "scenarios": [r.dict() for r in results],
+        "calculated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def remove_spool(job: Job) -> None:
+    """Delete the spooled upload of an import job."""
+    try:
+        os.unlink(job.params["path"])
+    except FileNotFoundError:
+        pass
+
+
+@job_queue.handler("import", supersede=False, cleanup=remove_spool)
+async def run_import(ctx: JobContext) -> Dict[str, Any]:
+    """Import a spooled CSV upload, deleting the spool file afterwards."""
+    params = ctx.params
+    path = params["path"]
+    try:
+        size = os.path.getsize(path) or 1
+        with open(path, "rb") as f:
+            async def read(n: int) -> bytes:
+                return await asyncio.to_thread(f.read, n)
+
+            async with ctx.session() as db:
+                importer = CsvImporter(
+                    db,
+                    ctx.portfolio_id,
+                    batch_size=params["batch_size"],
+                    dry_run=params["dry_run"],
+                    skip_invalid=params["skip_invalid"],
+                )
+                errors: List[dict] = []
+                final: Dict[str, Any] = {}
+                async for event in importer.run(read):
+                    if event["event"] == "error":
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append(event)
+                    elif event["event"] == "progress":
+                        await ctx.progress(importer.stats.bytes_read / size,
+                                           f"{importer.stats.rows} rows processed")
+                    else:
+                        final = event
+    finally:
+        remove_spool(ctx.job)
+
+    return {"portfolio_id": ctx.portfolio_id, **final, "errors": errors}
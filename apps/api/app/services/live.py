@@ -0,0 +1,327 @@
+"""
+Live dashboard updates (US-019).
+
+Rather than every open dashboard polling the risk endpoints, dashboards
+subscribe to a portfolio and receive its valuation and risk metrics as
+server-sent events: the full set once, then only the fields that changed.
+
+One update loop per worker serves every subscription. Each tick it fetches
+quotes for the union of subscribed holdings in one price cache call, and
+recomputes a portfolio only if one of its symbols' prices moved or its
+positions were written (snapshot invalidation, relayed from the other
+workers by ``app.services.snapshot_relay``). A watched snapshot that is no
+longer the store's, because it expired or was evicted, is reloaded too, so
+a missed invalidation is picked up within the snapshot TTL. A recomputed portfolio is
+diffed against what was last published and the changed fields are fanned
+out to its subscribers.
+
+Each subscription holds at most one pending update: a new delta is merged
+into an unsent one instead of queueing behind it, so a slow client receives
+fewer, larger deltas with the latest values, and its memory stays bounded
+no matter how far behind it falls.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.metrics import registry
+from app.services.market_data import MarketDataError, price_cache
+from app.services.risk import PositionArrays, calculate_risk
+from app.services.snapshot import (
+    PortfolioNotFoundError,
+    PortfolioSnapshot,
+    snapshot_store,
+    symbol_codes,
+)
+
+logger = structlog.get_logger()
+
+LIVE_EVENTS = registry.counter(
+    "live_events_sent_total",
+    "Server-sent events written to dashboard connections by event type",
+    ("event",),
+)
+LIVE_COALESCED = registry.counter(
+    "live_updates_coalesced_total",
+    "Dashboard updates merged into an unsent update of a slow connection",
+)
+LIVE_REJECTED = registry.counter(
+    "live_connections_rejected_total",
+    "Dashboard connections refused because the worker was at its connection limit",
+)
+
+
+class TooManyConnections(Exception):
+    """Raised when a worker is at its live connection limit."""
+
+
+class Subscription:
+    """One dashboard connection's view of a portfolio."""
+
+    __slots__ = ("portfolio_id", "_pending", "_ready")
+
+    def __init__(self, portfolio_id: int):
+        """Initialize a subscription with nothing to send."""
+        self.portfolio_id = portfolio_id
+        self._pending: Optional[Dict[str, Any]] = None
+        self._ready = asyncio.Event()
+
+    def push(self, changes: Dict[str, Any]) -> None:
+        """Queue ``changes``, merging them into an update not yet sent."""
+        if self._pending is None:
+            self._pending = dict(changes)
+        else:
+            self._pending.update(changes)
+            LIVE_COALESCED.inc()
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the next update, or ``None`` if there was none within ``timeout``."""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        pending, self._pending = self._pending, None
+        return pending
+
+
+class DashboardHub:
+    """Per-worker fan-out of portfolio valuation and risk changes."""
+
+    def __init__(self, interval: float = 5.0, max_connections: int = 1000):
+        """
+        Initialize the hub.
+
+        Args:
+            interval: Seconds between price refreshes
+            max_connections: Live connections allowed on this worker
+        """
+        self.interval = interval
+        self.max_connections = max_connections
+        self.sessions = ReadSessionLocal
+        self.quotes = price_cache
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._snapshots: Dict[int, PortfolioSnapshot] = {}
+        self._published: Dict[int, Dict[str, Any]] = {}
+        self._dirty: Set[int] = set()
+        self._prices = np.full(0, np.nan)
+        self._previous_close = np.full(0, np.nan)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        snapshot_store.add_listener(self._on_invalidate)
+
+    @property
+    def connections(self) -> int:
+        """Return the number of live subscriptions."""
+        return sum(len(s) for s in self._subscriptions.values())
+
+    @property
+    def running(self) -> bool:
+        """Return whether the update loop is active."""
+        return self._task is not None and not self._task.done()
+
+    def admit(self) -> None:
+        """
+        Check that the worker can take another connection.
+
+        Raises:
+            TooManyConnections: If the worker is at ``max_connections``
+        """
+        if self.connections >= self.max_connections:
+            LIVE_REJECTED.inc()
+            raise TooManyConnections(f"{self.max_connections} live connections already open")
+
+    def subscribe(self, portfolio_id: int) -> Subscription:
+        """
+        Subscribe to a portfolio's updates.
+
+        The current state is pushed at once if known; otherwise the next
+        tick computes it.
+
+        Raises:
+            TooManyConnections: If the worker is at ``max_connections``
+        """
+        self.admit()
+        subscription = Subscription(portfolio_id)
+        self._subscriptions.setdefault(portfolio_id, set()).add(subscription)
+        published = self._published.get(portfolio_id)
+        if published is not None:
+            subscription.push(published)
+        else:
+            self._dirty.add(portfolio_id)
+            self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Drop a subscription, forgetting portfolios nobody watches."""
+        subscribers = self._subscriptions.get(subscription.portfolio_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            portfolio_id = subscription.portfolio_id
+            del self._subscriptions[portfolio_id]
+            self._snapshots.pop(portfolio_id, None)
+            self._published.pop(portfolio_id, None)
+            self._dirty.discard(portfolio_id)
+
+    def _on_invalidate(self, portfolio_id: int) -> None:
+        """Recompute a watched portfolio whose positions were written."""
+        if portfolio_id in self._subscriptions:
+            self._dirty.add(portfolio_id)
+            self._wake.set()
+
+    async def _load_snapshots(self, portfolio_ids: Set[int]) -> None:
+        """Reload the snapshots of ``portfolio_ids``."""
+        async with self.sessions() as db:
+            for portfolio_id in portfolio_ids:
+                try:
+                    self._snapshots[portfolio_id] = await snapshot_store.get(db, portfolio_id)
+                except PortfolioNotFoundError:
+                    self._snapshots.pop(portfolio_id, None)
+                    for subscription in self._subscriptions.get(portfolio_id, ()):
+                        subscription.push({"deleted": True})
+
+    async def _refresh_prices(self) -> np.ndarray:
+        """
+        Fetch quotes for every watched symbol in one call.
+
+        Returns:
+            Boolean mask by symbol code of prices that changed
+        """
+        size = len(symbol_codes)
+        if len(self._prices) < size:
+            grow = size - len(self._prices)
+            self._prices = np.concatenate([self._prices, np.full(grow, np.nan)])
+            self._previous_close = np.concatenate([self._previous_close, np.full(grow, np.nan)])
+        changed = np.zeros(size, dtype=bool)
+
+        codes = np.unique(np.concatenate(
+            [s.symbol_code for s in self._snapshots.values()] or [np.empty(0, dtype=np.int32)]
+        ))
+        if not len(codes):
+            return changed
+        try:
+            quotes = await self.quotes.get_quotes(symbol_codes.decode_many(codes))
+        except MarketDataError as e:
+            logger.warning("Live price refresh failed", symbols=len(codes), error=str(e))
+            return changed
+
+        for code, symbol in zip(codes.tolist(), symbol_codes.decode_many(codes)):
+            quote = quotes.get(symbol)
+            if quote is None:
+                continue
+            if quote.price != self._prices[code]:
+                self._prices[code] = quote.price
+                changed[code] = True
+            if quote.previous_close is not None:
+                self._previous_close[code] = quote.previous_close
+        return changed
+
+    def compute(self, snapshot: PortfolioSnapshot) -> Dict[str, Any]:
+        """Return the dashboard values of a snapshot at the latest live prices."""
+        live = self._prices[snapshot.symbol_code] if len(self._prices) else np.full(len(snapshot), np.nan)
+        price = np.where(np.isnan(live), snapshot.current_price, live)
+        metrics = calculate_risk(
+            PositionArrays(
+                quantity=snapshot.quantity,
+                entry_price=snapshot.entry_price,
+                stop_loss=snapshot.stop_loss,
+                current_price=price,
+            ),
+            snapshot.cash_balance,
+        )
+        previous = self._previous_close[snapshot.symbol_code] if len(self._previous_close) else price
+        day_change = np.where(np.isnan(previous), 0.0, snapshot.quantity * (price - previous))
+        return {**metrics.dict(), "day_pnl": round(float(day_change.sum()), 2)}
+
+    def _publish(self, portfolio_id: int, values: Dict[str, Any]) -> None:
+        """Push the fields of ``values`` that changed since the last publish."""
+        published = self._published.get(portfolio_id)
+        changes = values if published is None else {
+            k: v for k, v in values.items() if published.get(k) != v
+        }
+        if not changes:
+            return
+        self._published[portfolio_id] = values
+        for subscription in self._subscriptions.get(portfolio_id, ()):
+            subscription.push(changes)
+
+    async def tick(self) -> None:
+        """Refresh prices and publish what changed for every watched portfolio."""
+        dirty, self._dirty = self._dirty, set()
+        dirty |= {pid for pid, snapshot in self._snapshots.items() if snapshot_store.peek(pid) is not snapshot}
+        dirty &= set(self._subscriptions)
+        if dirty:
+            await self._load_snapshots(dirty)
+
+        changed = await self._refresh_prices()
+        for portfolio_id, snapshot in list(self._snapshots.items()):
+            if portfolio_id in dirty or changed[snapshot.symbol_code].any():
+                self._publish(portfolio_id, self.compute(snapshot))
+
+    async def _run(self) -> None:
+        """Tick every ``interval`` seconds, or at once when woken."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._subscriptions:
+                continue
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error("Live update tick failed", error=str(e), exc_info=True)
+
+    def start(self) -> None:
+        """Start the update loop."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="dashboard-hub")
+
+    async def stop(self) -> None:
+        """Stop the update loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def clear(self) -> None:
+        """Drop every subscription and all state."""
+        self._subscriptions.clear()
+        self._snapshots.clear()
+        self._published.clear()
+        self._dirty.clear()
+        self._prices = np.full(0, np.nan)
+        self._previous_close = np.full(0, np.nan)
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: int) -> str:
+    """Return one server-sent event frame carrying ``data`` as JSON."""
+    payload = json.dumps({**data, "as_of": datetime.utcnow().isoformat()}, separators=(",", ":"))
+    return f"event: {event}\nid: {event_id}\ndata: {payload}\n\n"
+
+
+dashboard_hub = DashboardHub(
+    interval=settings.LIVE_UPDATE_INTERVAL_SECONDS,
+    max_connections=settings.LIVE_MAX_CONNECTIONS,
+)
+
+registry.gauge(
+    "live_connections", "Dashboard connections open on this worker",
+    function=lambda: dashboard_hub.connections,
+)
@@ -0,0 +1,59 @@
+"""
+Market data access.
+
+Quote providers (Alpha Vantage, Polygon.io and an offline fake) behind a
+coalescing, batching, rate-limited async client, fronted by a two-tier,
+market-hours-aware price cache and, under the pre-forking launcher, a
+shared-memory quote table.
+"""
+
+from app.services.market_data.client import (
+    QuoteClient,
+    QuoteNotFoundError,
+    RateLimitExceeded,
+    TokenBucket,
+    close_market_data,
+    init_market_data,
+    quote_client,
+)
+from app.services.market_data.price_cache import (
+    MarketCalendar,
+    PriceCache,
+    close_price_cache,
+    init_price_cache,
+    price_cache,
+)
+from app.services.market_data.providers import (
+    AlphaVantageProvider,
+    DailyBar,
+    FakeQuoteProvider,
+    MarketDataError,
+    PolygonProvider,
+    Quote,
+    QuoteProvider,
+)
+from app.services.market_data.shared_prices import SharedPriceTable, SharedPriceUpdater
+
+__all__ = [
+    "AlphaVantageProvider",
+    "DailyBar",
+    "FakeQuoteProvider",
+    "MarketCalendar",
+    "MarketDataError",
+    "PolygonProvider",
+    "PriceCache",
+    "Quote",
+    "QuoteClient",
+    "QuoteNotFoundError",
+    "QuoteProvider",
+    "RateLimitExceeded",
+    "SharedPriceTable",
+    "SharedPriceUpdater",
+    "TokenBucket",
+    "close_market_data",
+    "close_price_cache",
+    "init_market_data",
+    "init_price_cache",
+    "price_cache",
+    "quote_client",
+]
@@ -0,0 +1,399 @@
+"""
+Async quote client.
+
+Free-tier provider rate limits are the throughput ceiling for market data,
+so the client spends upstream calls carefully:
+
+* Coalescing: concurrent lookups of the same symbol share one in-flight
+  fetch instead of each calling the provider.
+* Batching: single-symbol lookups arriving within ``batch_window`` seconds
+  are merged into one ``fetch_quotes`` call of up to the provider's
+  ``max_batch_size`` symbols.
+* Rate limiting: every upstream call takes a token from a token bucket
+  sized to the provider plan; callers wait for a token up to ``max_wait``
+  seconds and then fail fast with ``RateLimitExceeded``.
+
+The provider's ``httpx.AsyncClient`` is created once in the application
+lifespan (``init_market_data``) so connections are pooled across requests.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence, Set
+
+import httpx
+import structlog
+
+from app.config import settings
+from app.metrics import registry
+from app.services.market_data.providers import (
+    AlphaVantageProvider,
+    DailyBar,
+    FakeQuoteProvider,
+    MarketDataError,
+    PolygonProvider,
+    Quote,
+    QuoteProvider,
+)
+
+logger = structlog.get_logger()
+
+UPSTREAM_CALLS = registry.counter(
+    "market_data_upstream_calls_total",
+    "Quote provider calls by provider and outcome",
+    ("provider", "outcome"),
+)
+COALESCED_LOOKUPS = registry.counter(
+    "market_data_coalesced_lookups_total",
+    "Quote lookups that joined an in-flight fetch instead of calling the provider",
+)
+
+
+class QuoteNotFoundError(MarketDataError):
+    """Raised when the provider has no quote for a symbol."""
+
+
+class RateLimitExceeded(MarketDataError):
+    """Raised when no rate limit token becomes available within the wait budget."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Market data rate limit reached; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Holds up to ``capacity`` tokens refilled at ``rate`` tokens per second.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        """
+        Take one token, waiting for a refill if necessary.
+
+        Args:
+            max_wait: Give up instead of waiting longer than this many seconds
+
+        Raises:
+            RateLimitExceeded: If the token would arrive after ``max_wait``
+        """
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                if max_wait is not None and wait > max_wait:
+                    raise RateLimitExceeded(wait)
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    """Mark a shared future's exception as retrieved when all waiters went away."""
+    if not future.cancelled():
+        future.exception()
+
+
+class QuoteClient:
+    """Coalescing, batching, rate-limited front end to a quote provider."""
+
+    def __init__(
+        self,
+        provider: QuoteProvider,
+        limiter: Optional[TokenBucket] = None,
+        batch_window: float = 0.005,
+        max_wait: Optional[float] = None,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            provider: Upstream quote provider
+            limiter: Rate limiter for upstream calls; unlimited when omitted
+            batch_window: Seconds to collect lookups into one batch
+            max_wait: Seconds a lookup may wait for a rate limit token
+        """
+        self.provider = provider
+        self.limiter = limiter
+        self.batch_window = batch_window
+        self.max_wait = max_wait
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get_quote(self, symbol: str) -> Quote:
+        """
+        Return the latest quote for ``symbol``.
+
+        Raises:
+            QuoteNotFoundError: If the provider does not know the symbol
+            RateLimitExceeded: If the rate limit wait budget was exhausted
+            MarketDataError: If the provider failed
+        """
+        symbol = symbol.strip().upper()
+        future = self._inflight.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(_consume_exception)
+            self._inflight[symbol] = future
+            self._enqueue(symbol)
+        else:
+            COALESCED_LOOKUPS.inc()
+        # Shield so that one cancelled caller does not cancel the shared fetch.
+        return await asyncio.shield(future)
+
+    async def get_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        """
+        Return quotes for ``symbols``; symbols without a quote are left out.
+
+        Raises:
+            RateLimitExceeded: If the rate limit wait budget was exhausted
+            MarketDataError: If the provider failed
+        """
+        unique = list(dict.fromkeys(s.strip().upper() for s in symbols))
+        results = await asyncio.gather(*(self.get_quote(s) for s in unique), return_exceptions=True)
+        quotes = {}
+        for symbol, result in zip(unique, results):
+            if isinstance(result, QuoteNotFoundError):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            quotes[symbol] = result
+        return quotes
+
+    async def get_daily_bars(self, symbols: Sequence[str], background: bool = False) -> Dict[str, DailyBar]:
+        """
+        Return the latest complete daily bar of ``symbols``; unknown symbols are left out.
+
+        Bars change once a day and are cached upstream of this client, so
+        they are fetched in provider-sized batches without coalescing.
+
+        Args:
+            symbols: Symbols to fetch
+            background: Wait for rate limit tokens however long it takes
+                instead of failing after ``max_wait`` (see ``get_daily_history``)
+
+        Raises:
+            RateLimitExceeded: If the rate limit wait budget was exhausted
+            MarketDataError: If the provider failed
+        """
+        unique = list(dict.fromkeys(s.strip().upper() for s in symbols))
+        provider = self.provider
+        max_wait = None if background else self.max_wait
+        size = provider.max_batch_size
+        bars: Dict[str, DailyBar] = {}
+        for start in range(0, len(unique), size):
+            try:
+                if self.limiter is not None:
+                    await self.limiter.acquire(max_wait)
+                bars.update(await provider.fetch_daily_bars(unique[start:start + size]))
+            except Exception as e:
+                outcome = "rate_limited" if isinstance(e, RateLimitExceeded) else "error"
+                UPSTREAM_CALLS.inc(provider=provider.name, outcome=outcome)
+                logger.warning("Daily bar fetch failed", provider=provider.name, error=str(e))
+                if isinstance(e, MarketDataError):
+                    raise
+                raise MarketDataError(str(e)) from e
+            UPSTREAM_CALLS.inc(provider=provider.name, outcome="ok")
+        return bars
+
+    async def get_daily_history(
+        self,
+        symbols: Sequence[str],
+        days: int,
+        background: bool = False,
+    ) -> Dict[str, List[DailyBar]]:
+        """
+        Return up to the last ``days`` daily bars of each symbol, oldest first.
+
+        One rate-limited upstream call per symbol; symbols without history
+        are left out.
+
+        Args:
+            symbols: Symbols to fetch
+            days: Bars wanted per symbol
+            background: Wait for rate limit tokens however long it takes
+                instead of failing after ``max_wait``; for loads no request
+                is waiting on
+
+        Raises:
+            RateLimitExceeded: If the rate limit wait budget was exhausted
+            MarketDataError: If the provider failed
+        """
+        provider = self.provider
+        max_wait = None if background else self.max_wait
+        history: Dict[str, List[DailyBar]] = {}
+        for symbol in dict.fromkeys(s.strip().upper() for s in symbols):
+            try:
+                if self.limiter is not None:
+                    await self.limiter.acquire(max_wait)
+                bars = await provider.fetch_daily_history(symbol, days)
+            except Exception as e:
+                outcome = "rate_limited" if isinstance(e, RateLimitExceeded) else "error"
+                UPSTREAM_CALLS.inc(provider=provider.name, outcome=outcome)
+                logger.warning("Daily history fetch failed", provider=provider.name, symbol=symbol, error=str(e))
+                if isinstance(e, MarketDataError):
+                    raise
+                raise MarketDataError(str(e)) from e
+            UPSTREAM_CALLS.inc(provider=provider.name, outcome="ok")
+            if bars:
+                history[symbol] = bars
+        return history
+
+    def _enqueue(self, symbol: str) -> None:
+        """Add a symbol to the next batch, flushing when the batch is full."""
+        self._pending.append(symbol)
+        if len(self._pending) >= self.provider.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self) -> None:
+        """Start upstream fetches for every pending symbol."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        size = self.provider.max_batch_size
+        for start in range(0, len(pending), size):
+            task = asyncio.get_running_loop().create_task(self._fetch(pending[start:start + size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, symbols: List[str]) -> None:
+        """Fetch one batch and settle the futures waiting on it."""
+        provider = self.provider
+        try:
+            if self.limiter is not None:
+                await self.limiter.acquire(self.max_wait)
+            quotes = await provider.fetch_quotes(symbols)
+        except Exception as e:
+            outcome = "rate_limited" if isinstance(e, RateLimitExceeded) else "error"
+            UPSTREAM_CALLS.inc(provider=provider.name, outcome=outcome)
+            logger.warning("Quote fetch failed", provider=provider.name, symbols=len(symbols), error=str(e))
+            if not isinstance(e, MarketDataError):
+                e = MarketDataError(str(e))
+            for symbol in symbols:
+                self._settle(symbol, error=e)
+            return
+
+        UPSTREAM_CALLS.inc(provider=provider.name, outcome="ok")
+        for symbol in symbols:
+            quote = quotes.get(symbol)
+            if quote is None:
+                self._settle(symbol, error=QuoteNotFoundError(f"No quote for {symbol}"))
+            else:
+                self._settle(symbol, quote=quote)
+
+    def _settle(
+        self,
+        symbol: str,
+        quote: Optional[Quote] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Resolve the in-flight future of ``symbol``."""
+        future = self._inflight.pop(symbol, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(quote)
+
+    async def close(self) -> None:
+        """Cancel pending batches and fail their waiters."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = []
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for symbol in list(self._inflight):
+            self._settle(symbol, error=MarketDataError("Quote client closed"))
+
+
+quote_client = QuoteClient(FakeQuoteProvider())
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_provider(http: httpx.AsyncClient) -> QuoteProvider:
+    """Return the provider configured by ``MARKET_DATA_PROVIDER``."""
+    name = settings.MARKET_DATA_PROVIDER
+    if name == "fake":
+        return FakeQuoteProvider()
+    if not settings.MARKET_DATA_API_KEY:
+        raise ValueError(f"MARKET_DATA_API_KEY is required for provider {name}")
+    if name == "alphavantage":
+        return AlphaVantageProvider(http, settings.MARKET_DATA_API_KEY)
+    if name == "polygon":
+        return PolygonProvider(http, settings.MARKET_DATA_API_KEY)
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER {name!r}")
+
+
+async def init_market_data() -> None:
+    """
+    Create the pooled HTTP client and configure the quote client.
+
+    Only ``MARKET_DATA_PROVIDER=fake`` selects the fake provider; a
+    misconfigured real provider fails startup rather than serving fake
+    prices.
+
+    Raises:
+        ValueError: If the provider is unknown or its API key is missing
+    """
+    global _http_client
+    http = httpx.AsyncClient(
+        timeout=settings.MARKET_DATA_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.MARKET_DATA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MARKET_DATA_MAX_CONNECTIONS,
+        ),
+    )
+    try:
+        quote_client.provider = _build_provider(http)
+    except ValueError:
+        await http.aclose()
+        raise
+    _http_client = http
+    quote_client.limiter = TokenBucket(
+        rate=settings.MARKET_DATA_RATE_PER_MINUTE / 60.0,
+        capacity=settings.MARKET_DATA_BURST,
+    )
+    quote_client.batch_window = settings.MARKET_DATA_BATCH_WINDOW_MS / 1000.0
+    quote_client.max_wait = settings.MARKET_DATA_MAX_WAIT_SECONDS
+    logger.info("Market data client ready", provider=quote_client.provider.name)
+
+
+async def close_market_data() -> None:
+    """Close the quote client and its HTTP connection pool."""
+    global _http_client
+    await quote_client.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    logger.info("Market data client closed")
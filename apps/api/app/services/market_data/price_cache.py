@@ -0,0 +1,506 @@
+"""
+Two-tier price cache for last quotes and daily bars.
+
+Every risk, VaR and concentration computation needs prices, so they are
+served from a cache instead of the provider (``PriceCache.reprice`` values a
+portfolio snapshot at the cached quotes):
+
+* L1 is an in-process LRU of decoded values; L2 is Redis, shared by every
+  worker, used when ``REDIS_URL`` is configured and reachable.
+* Intraday quotes and end-of-day bars have separate TTLs. Outside market
+  hours anything fetched after the last session close cannot change, so it
+  stays fresh until the next open however old it is, and Redis keeps it
+  until then.
+* Under the pre-forking launcher, quotes are first read from a shared-memory
+  table that one updater process keeps current for every worker; symbols
+  missing from it are registered for the updater and served as below.
+* Stampede protection: concurrent misses of one symbol in a process share a
+  single refresh, and across processes a short ``SET NX`` lock per symbol
+  lets one worker refresh while the others serve the stale value or wait
+  for the winner's write.
+
+Entries are stored with their fetch time and freshness is decided on read,
+so stale values stay available as a fallback for lock losers.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import structlog
+
+from app.cache import KEY_PREFIX, RedisCache, result_cache
+from app.config import settings
+from app.metrics import registry
+from app.services.market_data.client import QuoteClient, quote_client
+from app.services.market_data.providers import DailyBar, MarketDataError, Quote
+from app.services.snapshot import PortfolioSnapshot
+
+logger = structlog.get_logger()
+
+QUOTE = "quote"
+BAR = "bar"
+
+PRICE_CACHE_LOOKUPS = registry.counter(
+    "price_cache_lookups_total",
+    "Price lookups by kind and the tier that answered (shm, l1, l2, stale, upstream)",
+    ("kind", "tier"),
+)
+
+Entry = Tuple[float, Any]  # (fetched_at epoch seconds, Quote or DailyBar)
+
+
+class MarketCalendar:
+    """
+    Regular trading sessions of an exchange.
+
+    Sessions run Monday to Friday between ``open_time`` and ``close_time`` in
+    the exchange time zone. Exchange holidays are treated as sessions, which
+    only costs a few extra refreshes on those days.
+    """
+
+    def __init__(
+        self,
+        tz: str = "America/New_York",
+        open_time: dtime = dtime(9, 30),
+        close_time: dtime = dtime(16, 0),
+    ):
+        """
+        Initialize the calendar.
+
+        Args:
+            tz: IANA time zone of the exchange
+            open_time: Local session open
+            close_time: Local session close
+        """
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+
+    def is_open(self, now: datetime) -> bool:
+        """Return whether a session is in progress at ``now``."""
+        local = now.astimezone(self.tz)
+        return local.weekday() < 5 and self.open_time <= local.time() < self.close_time
+
+    def last_close(self, now: datetime) -> datetime:
+        """Return the close of the most recent session that ended at or before ``now``."""
+        local = now.astimezone(self.tz)
+        day = local.date()
+        if local.time() < self.close_time:
+            day -= timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        return datetime.combine(day, self.close_time, self.tz)
+
+    def next_open(self, now: datetime) -> datetime:
+        """Return the open of the first session starting after ``now``."""
+        local = now.astimezone(self.tz)
+        day = local.date()
+        if local.time() >= self.open_time:
+            day += timedelta(days=1)
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        return datetime.combine(day, self.open_time, self.tz)
+
+
+def _encode(fetched_at: float, value: Any) -> str:
+    """Serialize an entry for Redis."""
+    return json.dumps({"fetched_at": fetched_at, "value": value.dict()}, default=str)
+
+
+def _decode(kind: str, raw: str) -> Entry:
+    """Deserialize an entry written by ``_encode``."""
+    data = json.loads(raw)
+    value = data["value"]
+    if kind == QUOTE:
+        value["timestamp"] = datetime.fromisoformat(value["timestamp"])
+        return data["fetched_at"], Quote(**value)
+    value["date"] = date.fromisoformat(value["date"])
+    return data["fetched_at"], DailyBar(**value)
+
+
+class PriceCache:
+    """Read-through L1/L2 cache in front of the quote client."""
+
+    def __init__(
+        self,
+        client: QuoteClient,
+        calendar: Optional[MarketCalendar] = None,
+        quote_ttl: float = 60.0,
+        bar_ttl: float = 6 * 3600.0,
+        max_entries: int = 50_000,
+        redis=None,
+        lock_ttl: float = 10.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            client: Quote client used to refresh missing or stale prices
+            calendar: Exchange sessions (default: NYSE regular hours)
+            quote_ttl: Seconds a quote stays fresh while the market is open
+            bar_ttl: Seconds a daily bar stays fresh while the market is open
+            max_entries: L1 capacity before LRU eviction
+            redis: ``redis.asyncio.Redis`` client for the shared tier, or ``None``
+            lock_ttl: Seconds a cross-process refresh lock is held at most
+            clock: Wall clock returning epoch seconds
+
+        ``shared`` is set to a ``SharedPriceTable`` by the launcher.
+        """
+        self.client = client
+        self.calendar = calendar or MarketCalendar()
+        self.ttls = {QUOTE: quote_ttl, BAR: bar_ttl}
+        self.max_entries = max_entries
+        self.redis = redis
+        self.lock_ttl = lock_ttl
+        self.clock = clock
+        self.shared = None
+        self._local: "OrderedDict[Tuple[str, str], Entry]" = OrderedDict()
+        self._refreshing: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        """Return the number of L1 entries."""
+        return len(self._local)
+
+    @staticmethod
+    def _key(kind: str, symbol: str) -> str:
+        return f"{KEY_PREFIX}:price:{kind}:{symbol}"
+
+    @staticmethod
+    def _lock_key(kind: str, symbol: str) -> str:
+        return f"{KEY_PREFIX}:price:{kind}:{symbol}:lock"
+
+    def is_fresh(self, kind: str, entry: Entry, now: float) -> bool:
+        """
+        Return whether a cached entry may be served without refreshing.
+
+        Within the TTL an entry is always fresh. Past it, an entry is still
+        fresh while the market is closed if it was fetched after the last
+        close (and, for bars, already is that session's bar).
+        """
+        fetched_at, value = entry
+        if now - fetched_at < self.ttls[kind]:
+            return True
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        if self.calendar.is_open(moment):
+            return False
+        last_close = self.calendar.last_close(moment)
+        if fetched_at < last_close.timestamp():
+            return False
+        return kind == QUOTE or value.date >= last_close.date()
+
+    def _redis_ttl(self, kind: str, now: float) -> int:
+        """Return how long Redis keeps an entry written at ``now``."""
+        ttl = 2 * self.ttls[kind]
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        if not self.calendar.is_open(moment):
+            ttl = max(ttl, self.calendar.next_open(moment).timestamp() - now)
+        return max(1, int(ttl))
+
+    def _remember(self, kind: str, symbol: str, entry: Entry) -> None:
+        """Store an entry in L1, evicting the least recently used ones."""
+        key = (kind, symbol)
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Return the cached or refreshed quote of ``symbol``, ``None`` if unknown."""
+        return (await self.get_quotes([symbol])).get(symbol.strip().upper())
+
+    async def get_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        """
+        Return quotes of ``symbols``; unknown symbols are left out.
+
+        Raises:
+            MarketDataError: If a refresh failed (see ``QuoteClient``)
+        """
+        return await self._get_many(QUOTE, symbols)
+
+    async def reprice(self, snapshot: PortfolioSnapshot) -> PortfolioSnapshot:
+        """
+        Return ``snapshot`` valued at the latest quotes.
+
+        Positions without a quote keep their stored ``current_price``, and so
+        does every position when the refresh fails: analytics fall back to
+        the last written prices rather than failing.
+        """
+        if not len(snapshot):
+            return snapshot
+        symbols = snapshot.symbols
+        try:
+            quotes = await self.get_quotes(symbols)
+        except MarketDataError as e:
+            logger.warning("Quotes unavailable; using stored prices",
+                           portfolio_id=snapshot.portfolio_id, error=str(e))
+            return snapshot
+        prices = np.array(
+            [quotes[s].price if s in quotes else np.nan for s in symbols], dtype=np.float64
+        )
+        return snapshot.at_prices(prices)
+
+    async def get_bar(self, symbol: str) -> Optional[DailyBar]:
+        """Return the cached or refreshed latest daily bar of ``symbol``, ``None`` if unknown."""
+        return (await self.get_bars([symbol])).get(symbol.strip().upper())
+
+    async def get_bars(self, symbols: Sequence[str], background: bool = False) -> Dict[str, DailyBar]:
+        """
+        Return the latest daily bars of ``symbols``; unknown symbols are left out.
+
+        Args:
+            symbols: Symbols to look up
+            background: Let a refresh wait for rate limit tokens however long
+                it takes, for sweeps no request is waiting on
+
+        Raises:
+            MarketDataError: If a refresh failed (see ``QuoteClient``)
+        """
+        return await self._get_many(BAR, symbols, background)
+
+    async def _get_many(self, kind: str, symbols: Sequence[str], background: bool = False) -> Dict[str, Any]:
+        """Serve ``symbols`` from the shared-memory table (quotes), L1, then L2, then one shared refresh."""
+        now = self.clock()
+        found: Dict[str, Any] = {}
+        stale: Dict[str, Entry] = {}
+        misses: List[str] = []
+        wanted = list(dict.fromkeys(s.strip().upper() for s in symbols))
+        if kind == QUOTE and self.shared is not None:
+            wanted = self._read_table(wanted, now, found, stale)
+        for symbol in wanted:
+            entry = self._local.get((kind, symbol))
+            if entry is not None and self.is_fresh(kind, entry, now):
+                self._local.move_to_end((kind, symbol))
+                found[symbol] = entry[1]
+                PRICE_CACHE_LOOKUPS.inc(kind=kind, tier="l1")
+            else:
+                misses.append(symbol)
+                if entry is not None and entry[0] > stale.get(symbol, (0.0,))[0]:
+                    stale[symbol] = entry
+
+        if misses and self.redis is not None:
+            shared = await self._read_shared(kind, misses)
+            remaining = []
+            for symbol in misses:
+                entry = shared.get(symbol)
+                if entry is not None and self.is_fresh(kind, entry, now):
+                    self._remember(kind, symbol, entry)
+                    found[symbol] = entry[1]
+                    PRICE_CACHE_LOOKUPS.inc(kind=kind, tier="l2")
+                else:
+                    remaining.append(symbol)
+                    if entry is not None and entry[0] > stale.get(symbol, (0.0,))[0]:
+                        stale[symbol] = entry
+            misses = remaining
+
+        if misses:
+            found.update(await self._refresh(kind, misses, stale, background))
+        return found
+
+    def _read_table(self, symbols: List[str], now: float, found: Dict[str, Any], stale: Dict[str, Entry]) -> List[str]:
+        """Serve quotes from the shared-memory table; return the symbols it could not."""
+        entries = self.shared.get(symbols)
+        remaining = []
+        for symbol in symbols:
+            entry = entries.get(symbol)
+            if entry is not None and self.is_fresh(QUOTE, entry, now):
+                found[symbol] = entry[1]
+                PRICE_CACHE_LOOKUPS.inc(kind=QUOTE, tier="shm")
+            else:
+                remaining.append(symbol)
+                if entry is not None:
+                    stale[symbol] = entry
+        unpriced = [s for s in remaining if s not in entries]
+        if unpriced:
+            self.shared.register(unpriced)
+        return remaining
+
+    async def _read_shared(self, kind: str, symbols: List[str]) -> Dict[str, Entry]:
+        """Read entries from Redis; failures degrade to misses."""
+        try:
+            raws = await self.redis.mget([self._key(kind, s) for s in symbols])
+        except Exception as e:
+            logger.warning("Price cache read failed", kind=kind, error=str(e))
+            return {}
+        return {s: _decode(kind, raw) for s, raw in zip(symbols, raws) if raw is not None}
+
+    async def _refresh(
+        self, kind: str, symbols: List[str], stale: Dict[str, Entry], background: bool = False
+    ) -> Dict[str, Any]:
+        """Refresh ``symbols``, joining refreshes already running in this process."""
+        loop = asyncio.get_running_loop()
+        joined: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+        for symbol in symbols:
+            future = self._refreshing.get((kind, symbol))
+            if future is not None:
+                joined[symbol] = future
+            else:
+                owned[symbol] = self._refreshing[(kind, symbol)] = loop.create_future()
+
+        if owned:
+            try:
+                results = await self._refresh_owned(kind, list(owned), stale, background)
+            except BaseException as e:
+                for symbol, future in owned.items():
+                    self._refreshing.pop((kind, symbol), None)
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        future.exception()
+                raise
+            for symbol, future in owned.items():
+                self._refreshing.pop((kind, symbol), None)
+                future.set_result(results.get(symbol))
+
+        found = {}
+        for symbol in symbols:
+            future = joined.get(symbol) or owned[symbol]
+            # Shield so that one cancelled caller does not cancel the shared refresh.
+            value = await asyncio.shield(future)
+            if value is not None:
+                found[symbol] = value
+        return found
+
+    async def _refresh_owned(
+        self, kind: str, symbols: List[str], stale: Dict[str, Entry], background: bool = False
+    ) -> Dict[str, Any]:
+        """Fetch the symbols this process won the refresh lock for; serve or await the rest."""
+        won, lost = await self._lock(kind, symbols)
+        results: Dict[str, Any] = {}
+        if won:
+            try:
+                results.update(await self._fetch(kind, won, background))
+            finally:
+                await self._unlock(kind, won)
+
+        waiting = []
+        for symbol in lost:
+            if symbol in stale:
+                results[symbol] = stale[symbol][1]
+                PRICE_CACHE_LOOKUPS.inc(kind=kind, tier="stale")
+            else:
+                waiting.append(symbol)
+        if waiting:
+            results.update(await self._await_winner(kind, waiting, background))
+        return results
+
+    async def _fetch(self, kind: str, symbols: List[str], background: bool = False) -> Dict[str, Any]:
+        """Fetch ``symbols`` upstream and store them in both tiers."""
+        if kind == QUOTE:
+            fetched = await self.client.get_quotes(symbols)
+        else:
+            fetched = await self.client.get_daily_bars(symbols, background=background)
+        PRICE_CACHE_LOOKUPS.inc(len(symbols), kind=kind, tier="upstream")
+        now = self.clock()
+        for symbol, value in fetched.items():
+            self._remember(kind, symbol, (now, value))
+        await self._write_shared(kind, fetched, now)
+        return fetched
+
+    async def _lock(self, kind: str, symbols: List[str]) -> Tuple[List[str], List[str]]:
+        """Take the cross-process refresh lock of each symbol; return (won, lost)."""
+        if self.redis is None:
+            return symbols, []
+        token = uuid.uuid4().hex
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for symbol in symbols:
+                    pipe.set(self._lock_key(kind, symbol), token, nx=True, px=int(self.lock_ttl * 1000))
+                acquired = await pipe.execute()
+        except Exception as e:
+            logger.warning("Price cache lock failed", kind=kind, error=str(e))
+            return symbols, []
+        won = [s for s, ok in zip(symbols, acquired) if ok]
+        lost = [s for s, ok in zip(symbols, acquired) if not ok]
+        return won, lost
+
+    async def _unlock(self, kind: str, symbols: List[str]) -> None:
+        """
+        Release refresh locks.
+
+        A lock that expired during a slow fetch may already belong to another
+        worker; deleting it then costs at most one duplicate refresh.
+        """
+        if self.redis is None or not symbols:
+            return
+        try:
+            await self.redis.delete(*(self._lock_key(kind, s) for s in symbols))
+        except Exception as e:
+            logger.warning("Price cache unlock failed", kind=kind, error=str(e))
+
+    async def _write_shared(self, kind: str, values: Dict[str, Any], now: float) -> None:
+        """Write refreshed entries to Redis; failures are logged and ignored."""
+        if self.redis is None or not values:
+            return
+        ttl = self._redis_ttl(kind, now)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for symbol, value in values.items():
+                    pipe.set(self._key(kind, symbol), _encode(now, value), ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Price cache write failed", kind=kind, error=str(e))
+
+    async def _await_winner(self, kind: str, symbols: List[str], background: bool = False) -> Dict[str, Any]:
+        """Poll Redis for another worker's refresh, fetching directly once the lock expires."""
+        deadline = time.monotonic() + self.lock_ttl
+        results: Dict[str, Any] = {}
+        pending = list(symbols)
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            now = self.clock()
+            shared = await self._read_shared(kind, pending)
+            for symbol, entry in shared.items():
+                if self.is_fresh(kind, entry, now):
+                    self._remember(kind, symbol, entry)
+                    results[symbol] = entry[1]
+                    PRICE_CACHE_LOOKUPS.inc(kind=kind, tier="l2")
+            pending = [s for s in pending if s not in results]
+        if pending:
+            # The winner died or the symbol is unknown upstream.
+            results.update(await self._fetch(kind, pending, background))
+        return results
+
+    def clear(self) -> None:
+        """Drop every L1 entry."""
+        self._local.clear()
+
+
+def _market_calendar() -> MarketCalendar:
+    """Return the calendar configured by the ``MARKET_*`` settings."""
+    return MarketCalendar(
+        settings.MARKET_TIMEZONE,
+        dtime.fromisoformat(settings.MARKET_OPEN),
+        dtime.fromisoformat(settings.MARKET_CLOSE),
+    )
+
+
+price_cache = PriceCache(
+    quote_client,
+    calendar=_market_calendar(),
+    quote_ttl=settings.PRICE_CACHE_QUOTE_TTL_SECONDS,
+    bar_ttl=settings.PRICE_CACHE_BAR_TTL_SECONDS,
+    max_entries=settings.PRICE_CACHE_MAX_ENTRIES,
+)
+
+
+async def init_price_cache() -> None:
+    """Share the result cache's Redis connection with the price cache, if it has one."""
+    backend = result_cache.backend
+    price_cache.redis = backend.client if isinstance(backend, RedisCache) else None
+    logger.info("Price cache ready", shared=price_cache.redis is not None)
+
+
+async def close_price_cache() -> None:
+    """Detach the price cache from Redis and drop its L1 entries."""
+    price_cache.redis = None
+    price_cache.clear()
@@ -0,0 +1,366 @@
+"""
+Market data providers.
+
+A provider turns a list of symbols into quotes (and latest daily bars) with
+as few upstream calls as its API allows, and fetches a symbol's daily bar
+history for seeding the correlation windows; ``max_batch_size`` tells the quote
+client how many symbols one call may carry. Providers share the application's pooled
+``httpx.AsyncClient`` rather than opening their own connections.
+"""
+
+import hashlib
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import httpx
+import numpy as np
+
+
+class MarketDataError(Exception):
+    """Raised when an upstream provider fails or returns an unusable response."""
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Last known price of a symbol."""
+
+    symbol: str
+    price: float
+    timestamp: datetime
+    source: str
+    previous_close: Optional[float] = None
+    volume: Optional[int] = None
+
+    def dict(self) -> dict:
+        """Convert quote to a dictionary."""
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class DailyBar:
+    """End-of-day OHLCV bar of a symbol."""
+
+    symbol: str
+    date: date
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: Optional[int]
+    source: str
+
+    def dict(self) -> dict:
+        """Convert bar to a dictionary."""
+        return asdict(self)
+
+
+class QuoteProvider:
+    """Base class for quote providers."""
+
+    name = "base"
+    max_batch_size = 1
+
+    async def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        """
+        Fetch quotes for up to ``max_batch_size`` symbols.
+
+        Symbols the provider does not know are left out of the result.
+
+        Raises:
+            MarketDataError: If the upstream call fails
+        """
+        raise NotImplementedError
+
+    async def fetch_daily_bars(self, symbols: Sequence[str]) -> Dict[str, DailyBar]:
+        """
+        Fetch the latest complete daily bar for up to ``max_batch_size`` symbols.
+
+        Symbols the provider does not know are left out of the result.
+
+        Raises:
+            MarketDataError: If the upstream call fails
+        """
+        raise NotImplementedError
+
+    async def fetch_daily_history(self, symbol: str, days: int) -> List[DailyBar]:
+        """
+        Fetch up to the last ``days`` complete daily bars of ``symbol``, oldest first.
+
+        An unknown symbol returns an empty list.
+
+        Raises:
+            MarketDataError: If the upstream call fails
+        """
+        raise NotImplementedError
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """
+    Offline provider for development and tests.
+
+    Prices come from ``prices`` when given, otherwise they are derived
+    deterministically from the symbol so repeated runs agree. Every call is
+    recorded in ``calls``.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        prices: Optional[Mapping[str, float]] = None,
+        max_batch_size: int = 100,
+        unknown: Sequence[str] = (),
+    ):
+        """
+        Initialize the fake provider.
+
+        Args:
+            prices: Fixed prices by symbol
+            max_batch_size: Symbols accepted per call
+            unknown: Symbols reported as not found
+        """
+        self.prices = dict(prices or {})
+        self.max_batch_size = max_batch_size
+        self.unknown = set(unknown)
+        self.calls: List[List[str]] = []
+
+    def price_for(self, symbol: str) -> float:
+        """Return the configured or derived price of ``symbol``."""
+        if symbol in self.prices:
+            return self.prices[symbol]
+        digest = hashlib.blake2b(symbol.encode(), digest_size=4).digest()
+        return round(5 + int.from_bytes(digest, "big") % 50_000 / 100, 2)
+
+    async def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        self.calls.append(list(symbols))
+        now = datetime.now(timezone.utc)
+        return {
+            s: Quote(symbol=s, price=self.price_for(s), timestamp=now, source=self.name)
+            for s in symbols
+            if s not in self.unknown
+        }
+
+    @staticmethod
+    def _sessions(days: int) -> List[date]:
+        """Return the last ``days`` weekdays up to today, oldest first."""
+        sessions: List[date] = []
+        day = datetime.now(timezone.utc).date()
+        while len(sessions) < days:
+            if day.weekday() < 5:
+                sessions.append(day)
+            day -= timedelta(days=1)
+        return sessions[::-1]
+
+    async def fetch_daily_bars(self, symbols: Sequence[str]) -> Dict[str, DailyBar]:
+        self.calls.append(list(symbols))
+        today = self._sessions(1)[0]
+        bars = {}
+        for s in symbols:
+            if s in self.unknown:
+                continue
+            close = self.price_for(s)
+            bars[s] = DailyBar(
+                symbol=s, date=today, open=close, high=close, low=close, close=close,
+                volume=None, source=self.name,
+            )
+        return bars
+
+    async def fetch_daily_history(self, symbol: str, days: int) -> List[DailyBar]:
+        """Return a deterministic random walk of weekday closes ending at ``price_for``."""
+        self.calls.append([symbol])
+        if symbol in self.unknown or days < 1:
+            return []
+        seed = int.from_bytes(hashlib.blake2b(symbol.encode(), digest_size=4).digest(), "big")
+        returns = np.random.default_rng(seed).normal(0.0, 0.015, days)
+        closes = self.price_for(symbol) * np.exp(np.cumsum(returns) - returns.sum())
+        return [
+            DailyBar(symbol=symbol, date=d, open=c, high=c, low=c, close=c, volume=None, source=self.name)
+            for d, c in zip(self._sessions(days), closes.round(4).tolist())
+        ]
+
+
+class AlphaVantageProvider(QuoteProvider):
+    """Alpha Vantage ``GLOBAL_QUOTE`` provider (one symbol per request)."""
+
+    name = "alphavantage"
+    max_batch_size = 1
+    BASE_URL = "https://www.alphavantage.co/query"
+
+    def __init__(self, http: httpx.AsyncClient, api_key: str):
+        """
+        Initialize the provider.
+
+        Args:
+            http: Shared pooled HTTP client
+            api_key: Alpha Vantage API key
+        """
+        self.http = http
+        self.api_key = api_key
+
+    async def _query(self, function: str, symbol: str, **params) -> dict:
+        """Call one Alpha Vantage function and return its JSON payload."""
+        try:
+            response = await self.http.get(
+                self.BASE_URL,
+                params={"function": function, "symbol": symbol, "apikey": self.api_key, **params},
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise MarketDataError(f"Alpha Vantage request failed: {e}") from e
+
+        # Throttling and key errors come back as 200 with a message.
+        for key in ("Note", "Information", "Error Message"):
+            if key in payload:
+                raise MarketDataError(f"Alpha Vantage: {payload[key]}")
+        return payload
+
+    async def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        quotes = {}
+        for symbol in symbols:
+            payload = await self._query("GLOBAL_QUOTE", symbol)
+            data = payload.get("Global Quote") or {}
+            if not data.get("05. price"):
+                continue
+            day = data.get("07. latest trading day")
+            quotes[symbol] = Quote(
+                symbol=symbol,
+                price=float(data["05. price"]),
+                timestamp=(
+                    datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+                    if day else datetime.now(timezone.utc)
+                ),
+                source=self.name,
+                previous_close=float(data["08. previous close"]) if data.get("08. previous close") else None,
+                volume=int(data["06. volume"]) if data.get("06. volume") else None,
+            )
+        return quotes
+
+    async def fetch_daily_bars(self, symbols: Sequence[str]) -> Dict[str, DailyBar]:
+        bars = {}
+        for symbol in symbols:
+            payload = await self._query("TIME_SERIES_DAILY", symbol)
+            series = payload.get("Time Series (Daily)") or {}
+            if not series:
+                continue
+            day = max(series)
+            bars[symbol] = self._bar(symbol, day, series[day])
+        return bars
+
+    async def fetch_daily_history(self, symbol: str, days: int) -> List[DailyBar]:
+        # The compact series holds the last 100 days.
+        payload = await self._query("TIME_SERIES_DAILY", symbol,
+                                    outputsize="compact" if days <= 100 else "full")
+        series = payload.get("Time Series (Daily)") or {}
+        return [self._bar(symbol, day, series[day]) for day in sorted(series)[-days:]]
+
+    def _bar(self, symbol: str, day: str, data: dict) -> DailyBar:
+        """Build a bar from one ``TIME_SERIES_DAILY`` entry."""
+        return DailyBar(
+            symbol=symbol,
+            date=date.fromisoformat(day),
+            open=float(data["1. open"]),
+            high=float(data["2. high"]),
+            low=float(data["3. low"]),
+            close=float(data["4. close"]),
+            volume=int(data["5. volume"]) if data.get("5. volume") else None,
+            source=self.name,
+        )
+
+
+class PolygonProvider(QuoteProvider):
+    """Polygon.io snapshot provider (many symbols per request)."""
+
+    name = "polygon"
+    max_batch_size = 100
+    BASE_URL = "https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers"
+    PREV_URL = "https://api.polygon.io/v2/aggs/ticker/{symbol}/prev"
+    RANGE_URL = "https://api.polygon.io/v2/aggs/ticker/{symbol}/range/1/day/{start}/{end}"
+
+    def __init__(self, http: httpx.AsyncClient, api_key: str):
+        """
+        Initialize the provider.
+
+        Args:
+            http: Shared pooled HTTP client
+            api_key: Polygon.io API key
+        """
+        self.http = http
+        self.api_key = api_key
+
+    async def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        try:
+            response = await self.http.get(
+                self.BASE_URL,
+                params={"tickers": ",".join(symbols), "apiKey": self.api_key},
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise MarketDataError(f"Polygon request failed: {e}") from e
+
+        quotes = {}
+        for ticker in payload.get("tickers") or ():
+            last_trade = ticker.get("lastTrade") or {}
+            day = ticker.get("day") or {}
+            prev_day = ticker.get("prevDay") or {}
+            price = last_trade.get("p") or day.get("c") or prev_day.get("c")
+            if not price:
+                continue
+            updated = ticker.get("updated") or last_trade.get("t")
+            quotes[ticker["ticker"]] = Quote(
+                symbol=ticker["ticker"],
+                price=float(price),
+                timestamp=(
+                    datetime.fromtimestamp(updated / 1e9, timezone.utc)
+                    if updated else datetime.now(timezone.utc)
+                ),
+                source=self.name,
+                previous_close=prev_day.get("c"),
+                volume=int(day["v"]) if day.get("v") else None,
+            )
+        return quotes
+
+    async def fetch_daily_bars(self, symbols: Sequence[str]) -> Dict[str, DailyBar]:
+        bars = {}
+        for symbol in symbols:
+            try:
+                response = await self.http.get(
+                    self.PREV_URL.format(symbol=symbol), params={"apiKey": self.api_key}
+                )
+                response.raise_for_status()
+                payload = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise MarketDataError(f"Polygon request failed: {e}") from e
+            for result in payload.get("results") or ():
+                bars[symbol] = self._bar(symbol, result)
+        return bars
+
+    async def fetch_daily_history(self, symbol: str, days: int) -> List[DailyBar]:
+        end = datetime.now(timezone.utc).date()
+        # Calendar days covering ``days`` sessions, with room for holidays.
+        start = end - timedelta(days=days * 7 // 5 + 10)
+        try:
+            response = await self.http.get(
+                self.RANGE_URL.format(symbol=symbol, start=start.isoformat(), end=end.isoformat()),
+                params={"adjusted": "true", "sort": "asc", "limit": 50000, "apiKey": self.api_key},
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise MarketDataError(f"Polygon request failed: {e}") from e
+        return [self._bar(symbol, result) for result in payload.get("results") or ()][-days:]
+
+    def _bar(self, symbol: str, result: dict) -> DailyBar:
+        """Build a bar from one aggregates result."""
+        return DailyBar(
+            symbol=symbol,
+            date=datetime.fromtimestamp(result["t"] / 1e3, timezone.utc).date(),
+            open=float(result["o"]),
+            high=float(result["h"]),
+            low=float(result["l"]),
+            close=float(result["c"]),
+            volume=int(result["v"]) if result.get("v") else None,
+            source=self.name,
+        )
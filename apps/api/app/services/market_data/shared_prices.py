@@ -0,0 +1,286 @@
+"""
+Shared-memory last-price table for pre-forked workers.
+
+Under the production launcher (``python -m app.server``) one updater process
+refreshes quotes and every worker reads them from a fixed-size table in
+``multiprocessing.shared_memory``, instead of each worker polling the
+provider and Redis on its own. Reads are plain memory loads, with no IPC.
+
+Layout: a 64-byte header holding the number of registered symbols, then one
+80-byte record per symbol slot. Slots are append-only: a worker that misses
+a symbol registers it under a lock created before forking, and the updater
+refreshes every registered symbol from then on.
+
+Each record starts with a sequence number (a seqlock). The single writer
+makes it odd before changing the record and even again after; a reader
+copies the records it needs and retries those whose sequence number was odd
+or moved during the copy. This relies on stores becoming visible in program
+order, as they do on x86-64.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import time
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from app.services.market_data.client import QuoteClient
+from app.services.market_data.price_cache import MarketCalendar
+from app.services.market_data.providers import MarketDataError, Quote
+
+logger = structlog.get_logger()
+
+HEADER_BYTES = 64
+SYMBOL_BYTES = 16
+RECORD = np.dtype([
+    ("seq", "<u8"),
+    ("fetched_at", "<f8"),
+    ("price", "<f8"),
+    ("previous_close", "<f8"),  # NaN: unknown
+    ("timestamp", "<f8"),
+    ("volume", "<i8"),  # -1: unknown
+    ("symbol", f"S{SYMBOL_BYTES}"),
+    ("source", "S16"),
+])
+READ_RETRIES = 100
+
+
+class SharedPriceTable:
+    """Quotes by symbol in shared memory: one writer, many lock-free readers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, lock, owner: bool = False):
+        """
+        Wrap a shared memory block; use ``create`` to allocate one.
+
+        Args:
+            shm: Block holding the header and ``capacity`` records
+            capacity: Number of symbol slots
+            lock: Inter-process lock serializing symbol registration
+            owner: Whether ``unlink`` may free the block
+        """
+        self.shm = shm
+        self.capacity = capacity
+        self.lock = lock
+        self.owner = owner
+        self._count = np.ndarray((1,), dtype="<i8", buffer=shm.buf)
+        self._records = np.ndarray((capacity,), dtype=RECORD, buffer=shm.buf, offset=HEADER_BYTES)
+        self._index: Dict[str, int] = {}
+        self._full_logged = False
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedPriceTable":
+        """Allocate an empty table; create it before forking so children inherit it."""
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        # New blocks are zero-filled: no symbols, every slot never fetched.
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * RECORD.itemsize)
+        return cls(shm, capacity, multiprocessing.get_context("fork").Lock(), owner=True)
+
+    def __len__(self) -> int:
+        """Return the number of registered symbols."""
+        return int(self._count[0])
+
+    def _sync_index(self) -> None:
+        """Index symbols registered by other processes since the last call."""
+        count = len(self)
+        for slot in range(len(self._index), count):
+            self._index[self._records["symbol"][slot].decode()] = slot
+
+    def slot(self, symbol: str) -> Optional[int]:
+        """Return the slot of a registered symbol, ``None`` if it is not registered."""
+        slot = self._index.get(symbol)
+        if slot is None and len(self) > len(self._index):
+            self._sync_index()
+            slot = self._index.get(symbol)
+        return slot
+
+    def register(self, symbols: Iterable[str]) -> None:
+        """
+        Add symbols for the updater to refresh.
+
+        Symbols that do not fit a slot, or once the table is full, are
+        skipped and keep being served by the other price cache tiers.
+        """
+        missing = [s for s in symbols if self.slot(s) is None and len(s.encode()) <= SYMBOL_BYTES]
+        if not missing:
+            return
+        with self.lock:
+            self._sync_index()
+            for symbol in missing:
+                if symbol in self._index:
+                    continue
+                count = len(self)
+                if count >= self.capacity:
+                    if not self._full_logged:
+                        logger.warning("Shared price table full", capacity=self.capacity)
+                        self._full_logged = True
+                    return
+                self._records["symbol"][count] = symbol.encode()
+                # Publish the slot only once its symbol is written.
+                self._count[0] = count + 1
+                self._index[symbol] = count
+
+    def symbols(self) -> List[str]:
+        """Return every registered symbol, in slot order."""
+        self._sync_index()
+        return list(self._index)
+
+    def _read(self, slots: np.ndarray) -> np.ndarray:
+        """Return a consistent copy of the records at ``slots``."""
+        result = self._records[slots]
+        pending = np.arange(len(slots))
+        for _ in range(READ_RETRIES):
+            after = self._records["seq"][slots[pending]]
+            torn = (result["seq"][pending] != after) | (after % 2 == 1)
+            pending = pending[torn]
+            if not len(pending):
+                return result
+            result[pending] = self._records[slots[pending]]
+        # Still being written after every retry: report as never fetched.
+        result["fetched_at"][pending] = np.nan
+        return result
+
+    def get(self, symbols: Sequence[str]) -> Dict[str, Tuple[float, Quote]]:
+        """
+        Return ``(fetched_at, quote)`` of the symbols the updater has priced.
+
+        Unregistered and not yet priced symbols are left out.
+        """
+        found = [(s, self.slot(s)) for s in symbols]
+        found = [(s, slot) for s, slot in found if slot is not None]
+        if not found:
+            return {}
+        records = self._read(np.fromiter((slot for _, slot in found), dtype=np.int64, count=len(found)))
+        entries = {}
+        for (symbol, _), record in zip(found, records):
+            fetched_at = float(record["fetched_at"])
+            if not fetched_at > 0:
+                continue
+            previous_close = float(record["previous_close"])
+            volume = int(record["volume"])
+            entries[symbol] = (fetched_at, Quote(
+                symbol=symbol,
+                price=float(record["price"]),
+                timestamp=datetime.fromtimestamp(float(record["timestamp"]), timezone.utc),
+                source=record["source"].decode(),
+                previous_close=None if np.isnan(previous_close) else previous_close,
+                volume=None if volume < 0 else volume,
+            ))
+        return entries
+
+    def put(self, quotes: Dict[str, Quote], fetched_at: float) -> int:
+        """
+        Write quotes of registered symbols; only the updater may call this.
+
+        Returns:
+            Number of records written
+        """
+        records = self._records
+        written = 0
+        for symbol, quote in quotes.items():
+            slot = self.slot(symbol)
+            if slot is None:
+                continue
+            records["seq"][slot] += 1
+            records["fetched_at"][slot] = fetched_at
+            records["price"][slot] = quote.price
+            records["previous_close"][slot] = np.nan if quote.previous_close is None else quote.previous_close
+            records["timestamp"][slot] = quote.timestamp.timestamp()
+            records["volume"][slot] = -1 if quote.volume is None else quote.volume
+            records["source"][slot] = quote.source.encode()[:16]
+            records["seq"][slot] += 1
+            written += 1
+        return written
+
+    def fetched_at(self) -> Dict[str, float]:
+        """Return when each registered symbol was last written (NaN if never)."""
+        self._sync_index()
+        times = self._read(np.arange(len(self._index)))["fetched_at"]
+        return {symbol: float(t) if t > 0 else float("nan") for symbol, t in zip(self._index, times)}
+
+    def close(self) -> None:
+        """Unmap the block from this process."""
+        self._count = self._records = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Free the block; the creating process calls this once at shutdown."""
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedPriceUpdater:
+    """
+    The table's single writer.
+
+    Every tick it refreshes the registered symbols that are unpriced or older
+    than ``interval``, in one client call; outside market hours a quote
+    fetched after the last close stays current until the next open. Short
+    ticks let symbols registered by workers be priced within a second.
+    """
+
+    def __init__(
+        self,
+        table: SharedPriceTable,
+        client: QuoteClient,
+        calendar: Optional[MarketCalendar] = None,
+        interval: float = 15.0,
+        clock=time.time,
+    ):
+        """
+        Initialize the updater.
+
+        Args:
+            table: Table to keep current
+            client: Quote client used for refreshes
+            calendar: Exchange sessions (default: NYSE regular hours)
+            interval: Seconds a quote is kept while the market is open
+            clock: Wall clock returning epoch seconds
+        """
+        self.table = table
+        self.client = client
+        self.calendar = calendar or MarketCalendar()
+        self.interval = interval
+        self.clock = clock
+
+    def due(self, now: float) -> List[str]:
+        """Return the registered symbols to refresh at ``now``."""
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        if self.calendar.is_open(moment):
+            cutoff = now - self.interval
+        else:
+            cutoff = min(now - self.interval, self.calendar.last_close(moment).timestamp())
+        return [s for s, fetched_at in self.table.fetched_at().items()
+                if math.isnan(fetched_at) or fetched_at <= cutoff]
+
+    async def refresh(self) -> int:
+        """
+        Refresh the symbols that are due.
+
+        Returns:
+            Number of quotes written
+        """
+        symbols = self.due(self.clock())
+        if not symbols:
+            return 0
+        try:
+            quotes = await self.client.get_quotes(symbols)
+        except MarketDataError as e:
+            logger.warning("Shared price refresh failed", symbols=len(symbols), error=str(e))
+            return 0
+        return self.table.put(quotes, self.clock())
+
+    async def run(self) -> None:
+        """Refresh until cancelled."""
+        tick = min(1.0, self.interval)
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Shared price refresh failed", error=str(e), exc_info=True)
+            await asyncio.sleep(tick)
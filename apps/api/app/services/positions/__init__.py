@@ -0,0 +1,32 @@
+"""
+Position write and read paths.
+
+Bulk writes and paginated reads that bypass per-object ORM overhead for
+large portfolios.
+"""
+
+from app.services.positions.bulk import BulkWriteResult, dedupe_lots, upsert_positions
+from app.services.positions.listing import (
+    DEFAULT_PAGE_SIZE,
+    LISTABLE_FIELDS,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    stream_positions,
+)
+
+__all__ = [
+    "BulkWriteResult",
+    "DEFAULT_PAGE_SIZE",
+    "InvalidCursor",
+    "LISTABLE_FIELDS",
+    "MAX_PAGE_SIZE",
+    "decode_cursor",
+    "dedupe_lots",
+    "encode_cursor",
+    "parse_fields",
+    "stream_positions",
+    "upsert_positions",
+]
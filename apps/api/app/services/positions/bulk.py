@@ -0,0 +1,170 @@
+"""
+Bulk position upserts.
+
+Writes many lots with set-based statements instead of one ORM object per row.
+Lots are deduplicated on (symbol, lot) first, keeping the last occurrence,
+since a single ``INSERT ... ON CONFLICT`` may not touch the same row twice.
+
+Two write paths exist:
+
+* ``insert``: one ``INSERT ... ON CONFLICT DO UPDATE`` executed with the lot
+  list as parameters, which SQLAlchemy's insertmanyvalues batches into
+  multi-row ``VALUES`` clauses. Works on PostgreSQL and SQLite.
+* ``copy``: PostgreSQL with asyncpg only. Lots are streamed with ``COPY``
+  into a temporary staging table and merged with one
+  ``INSERT ... SELECT ... ON CONFLICT DO UPDATE``.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.position import DEFAULT_LOT, Position
+from app.services.snapshot import mark_portfolio_dirty
+
+logger = structlog.get_logger()
+
+# Below this many lots the staging table round trips cost more than COPY saves.
+COPY_THRESHOLD = 1000
+STAGE_TABLE = "positions_stage"
+
+WRITE_COLUMNS = (
+    "portfolio_id",
+    "symbol",
+    "lot",
+    "quantity",
+    "entry_price",
+    "stop_loss",
+    "current_price",
+    "sector",
+)
+CONFLICT_COLUMNS = ("portfolio_id", "symbol", "lot")
+UPDATE_COLUMNS = ("quantity", "entry_price", "stop_loss", "current_price", "sector")
+
+
+@dataclass
+class BulkWriteResult:
+    """Outcome of a bulk upsert."""
+
+    received: int
+    written: int
+    duplicates: int
+    method: str
+
+    def dict(self) -> dict:
+        """Convert result to a dictionary."""
+        return asdict(self)
+
+
+def dedupe_lots(rows: Iterable[dict]) -> List[dict]:
+    """Return rows unique on (symbol, lot), keeping the last occurrence."""
+    lots: Dict[Tuple[str, str], dict] = {}
+    for row in rows:
+        lots[(row["symbol"], row.get("lot") or DEFAULT_LOT)] = row
+    return list(lots.values())
+
+
+def _insert_for(dialect_name: str):
+    """Return the dialect-specific ``insert`` construct supporting ON CONFLICT."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect_name}")
+    return insert
+
+
+def _on_conflict_update(stmt):
+    """Attach the (portfolio_id, symbol, lot) upsert clause to an insert."""
+    return stmt.on_conflict_do_update(
+        index_elements=list(CONFLICT_COLUMNS),
+        set_={name: stmt.excluded[name] for name in UPDATE_COLUMNS},
+    )
+
+
+async def _driver_connection(db: AsyncSession):
+    """Return the raw DBAPI driver connection behind the session."""
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    return conn, raw.driver_connection
+
+
+async def _copy_upsert(db: AsyncSession, rows: List[dict]) -> None:
+    """Upsert rows through COPY into a staging table (PostgreSQL + asyncpg)."""
+    conn, driver = await _driver_connection(db)
+    await conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} "
+        f"(LIKE {Position.__tablename__} INCLUDING DEFAULTS) ON COMMIT DROP"
+    )
+    await conn.exec_driver_sql(f"TRUNCATE {STAGE_TABLE}")
+    await driver.copy_records_to_table(
+        STAGE_TABLE,
+        records=[tuple(row[name] for name in WRITE_COLUMNS) for row in rows],
+        columns=list(WRITE_COLUMNS),
+    )
+
+    insert = _insert_for("postgresql")
+    stage = table(STAGE_TABLE, *(column(name) for name in WRITE_COLUMNS))
+    stmt = insert(Position).from_select(list(WRITE_COLUMNS), select(*stage.c))
+    await conn.execute(_on_conflict_update(stmt))
+
+
+async def upsert_positions(
+    db: AsyncSession,
+    portfolio_id: int,
+    rows: Iterable[dict],
+    use_copy: Optional[bool] = None,
+) -> BulkWriteResult:
+    """
+    Insert or replace position lots for a portfolio.
+
+    The caller owns the transaction; the portfolio's snapshot is invalidated
+    when it commits.
+
+    Args:
+        db: Database session
+        portfolio_id: Portfolio receiving the lots
+        rows: Dicts with ``symbol``, ``quantity``, ``entry_price`` and
+            optionally ``lot``, ``stop_loss``, ``current_price``, ``sector``
+        use_copy: Force (``True``) or disable (``False``) the COPY path;
+            by default it is used for large writes when available
+
+    Returns:
+        BulkWriteResult: Counts and the write path used
+    """
+    rows = list(rows)
+    lots = [
+        {name: row.get(name) for name in WRITE_COLUMNS}
+        | {"portfolio_id": portfolio_id, "lot": row.get("lot") or DEFAULT_LOT}
+        for row in dedupe_lots(rows)
+    ]
+    result = BulkWriteResult(
+        received=len(rows),
+        written=len(lots),
+        duplicates=len(rows) - len(lots),
+        method="insert",
+    )
+    if not lots:
+        return result
+
+    dialect_name = db.get_bind().dialect.name
+    copy_available = dialect_name == "postgresql" and db.get_bind().dialect.driver == "asyncpg"
+    if use_copy and not copy_available:
+        raise NotImplementedError("COPY requires PostgreSQL with the asyncpg driver")
+    if use_copy is None:
+        use_copy = copy_available and len(lots) >= COPY_THRESHOLD
+
+    if use_copy:
+        await _copy_upsert(db, lots)
+        result.method = "copy"
+    else:
+        stmt = _on_conflict_update(_insert_for(dialect_name)(Position))
+        await db.execute(stmt, lots)
+
+    mark_portfolio_dirty(db, portfolio_id)
+    logger.debug("Bulk upserted positions", portfolio_id=portfolio_id, **result.dict())
+    return result
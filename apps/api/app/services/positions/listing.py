@@ -0,0 +1,128 @@
+"""
+Paginated position listing.
+
+Pages through a portfolio's lots in ``id`` order with a keyset cursor: each
+page is ``WHERE portfolio_id = :id AND id > :after ORDER BY id LIMIT n``,
+served by the (portfolio_id, id) index, so a page costs the same however deep
+it is (no ``OFFSET`` scan). Only the requested columns are selected, and
+rows are streamed from a server-side cursor and rendered into the JSON body
+in chunks, so neither ORM objects nor the whole page are held in memory.
+
+The body is one JSON object::
+
+    {"portfolio_id": 1, "fields": [...], "positions": [{...}, ...], "next_cursor": "..."}
+
+``next_cursor`` is ``null`` on the last page.
+"""
+
+import base64
+import binascii
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.position import Position
+from app.responses import dumps
+
+LISTABLE_FIELDS = (
+    "id",
+    "symbol",
+    "lot",
+    "quantity",
+    "entry_price",
+    "stop_loss",
+    "current_price",
+    "sector",
+    "created_at",
+)
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+# Rows fetched from the cursor, and rendered, per round trip.
+CHUNK_ROWS = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(last_id: int) -> str:
+    """Return the opaque cursor for the page after ``last_id``."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Return the last ``id`` seen, encoded in ``cursor``."""
+    try:
+        last_id = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from None
+    if last_id < 0:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return last_id
+
+
+def parse_fields(fields: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Return the projection to select, in listing order.
+
+    ``id`` is always included since the cursor is built from it. ``None``
+    or an empty selection means every field.
+
+    Raises:
+        ValueError: If a field cannot be listed
+    """
+    requested = {f.strip() for f in fields or () if f.strip()}
+    unknown = requested.difference(LISTABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not requested:
+        return LISTABLE_FIELDS
+    return tuple(f for f in LISTABLE_FIELDS if f == "id" or f in requested)
+
+
+async def stream_positions(
+    db: AsyncSession,
+    portfolio_id: int,
+    fields: Tuple[str, ...] = LISTABLE_FIELDS,
+    after: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield one page of a portfolio's positions as JSON body chunks.
+
+    Args:
+        db: Database session, owned by the caller
+        portfolio_id: Portfolio to list
+        fields: Columns to select, as returned by ``parse_fields``
+        after: Last ``id`` of the previous page
+        limit: Maximum number of positions in the page
+    """
+    stmt = (
+        select(*(getattr(Position, name) for name in fields))
+        .where(Position.portfolio_id == portfolio_id)
+        .order_by(Position.id)
+        # One extra row tells whether another page follows.
+        .limit(limit + 1)
+    )
+    if after is not None:
+        stmt = stmt.where(Position.id > after)
+    id_index = fields.index("id")
+
+    yield dumps({"portfolio_id": portfolio_id, "fields": fields})[:-1] + b',"positions":['
+    sent, last_id, has_more = 0, None, False
+    result = await db.stream(stmt.execution_options(yield_per=CHUNK_ROWS))
+    async for rows in result.partitions():
+        page = rows[:limit - sent]
+        if page:
+            chunk = dumps([dict(zip(fields, row)) for row in page])[1:-1]
+            yield (b"," if sent else b"") + chunk
+            sent += len(page)
+            last_id = page[-1][id_index]
+        if len(page) < len(rows):
+            has_more = True
+            break
+    await result.close()
+    next_cursor = encode_cursor(last_id) if has_more else None
+    yield b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
@@ -0,0 +1,432 @@
+"""
+Security reference data (sector, industry, country, market cap, style, beta).
+
+Reference data is compiled offline into a single read-only columnar file and
+memory-mapped at startup, so every worker process on a host shares the same
+page-cache pages instead of holding its own copy or querying the database
+per symbol. The file layout is::
+
+    magic (8 bytes) | version (uint32) | header length (uint32) | JSON header
+    | 64-byte aligned columns
+
+The JSON header lists each column's dtype and offset, the row count, a build
+id and the category labels of the coded columns. Rows are sorted by symbol,
+stored as fixed-width ASCII, so a lookup is a ``numpy.searchsorted`` binary
+search over the mapped symbol column; categorical columns are int32 codes
+into the header labels (0 = unknown) and ``market_cap`` and ``beta`` are
+float64 (NaN = unknown).
+
+Files are published by writing a temporary file next to the target and
+``os.replace``-ing it, which is atomic; ``ReferenceDataStore`` polls the path
+and swaps in a freshly mapped file when its identity changes, so readers
+always see one complete version. Compile with:
+
+    python -m app.services.reference_data securities.csv reference.bin
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import structlog
+
+from app.metrics import registry
+from app.services.concentration import market_cap_bucket, symbol_classifier
+from app.services.snapshot import PortfolioSnapshot
+
+logger = structlog.get_logger()
+
+MAGIC = b"PXRREF\x00\x00"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 64
+
+CATEGORY_COLUMNS = ("sector", "industry", "country", "style_box")
+VALUE_COLUMNS = ("market_cap", "beta")
+
+REFERENCE_DATA_RELOADS = registry.counter(
+    "reference_data_reloads_total",
+    "Reference data file loads by outcome (loaded, failed)",
+    ("outcome",),
+)
+
+
+def _normalize(symbol: str) -> str:
+    """Return the stored form of a symbol."""
+    return symbol.strip().upper()
+
+
+def _optional_float(value: Any) -> float:
+    """Parse a float, mapping blanks and ``None`` to NaN."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return float("nan")
+    return float(value)
+
+
+@dataclass(frozen=True)
+class SecurityReference:
+    """Reference data of one symbol."""
+
+    symbol: str
+    sector: Optional[str]
+    industry: Optional[str]
+    country: Optional[str]
+    style_box: Optional[str]
+    market_cap: Optional[float]
+    beta: Optional[float]
+
+    def dict(self) -> dict:
+        """Convert record to a dictionary."""
+        return asdict(self)
+
+
+def compile_reference_data(records: Iterable[Mapping[str, Any]], path: Union[str, Path]) -> str:
+    """
+    Write reference records into a memory-mappable file, atomically.
+
+    Args:
+        records: Mappings with a ``symbol`` and any of the category and value
+            columns; later duplicates of a symbol win
+        path: Destination; replaced in one ``os.replace``
+
+    Returns:
+        The build id of the written file
+    """
+    by_symbol: Dict[str, Mapping[str, Any]] = {}
+    for record in records:
+        symbol = _normalize(record["symbol"])
+        if not symbol or not symbol.isascii():
+            raise ValueError(f"Invalid symbol {record['symbol']!r}")
+        by_symbol[symbol] = record
+    symbols = sorted(by_symbol)
+    rows = [by_symbol[s] for s in symbols]
+
+    width = max((len(s) for s in symbols), default=1)
+    columns: Dict[str, np.ndarray] = {"symbol": np.array(symbols, dtype=f"S{width}")}
+    categories: Dict[str, List[Optional[str]]] = {}
+    for name in CATEGORY_COLUMNS:
+        labels: List[Optional[str]] = [None]
+        codes: Dict[str, int] = {}
+        column = np.zeros(len(rows), dtype="<i4")
+        for i, row in enumerate(rows):
+            label = (row.get(name) or "").strip()
+            if label:
+                if label not in codes:
+                    codes[label] = len(labels)
+                    labels.append(label)
+                column[i] = codes[label]
+        columns[name] = column
+        categories[name] = labels
+    for name in VALUE_COLUMNS:
+        columns[name] = np.array([_optional_float(row.get(name)) for row in rows], dtype="<f8")
+
+    digest = hashlib.sha256()
+    for name, column in columns.items():
+        digest.update(name.encode())
+        digest.update(column.tobytes())
+    build_id = digest.hexdigest()[:16]
+
+    layout, offset = {}, 0
+    for name, column in columns.items():
+        layout[name] = {"dtype": column.dtype.str, "offset": offset}
+        offset += -(-column.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({
+        "count": len(rows),
+        "build_id": build_id,
+        "built_at": datetime.utcnow().isoformat(),
+        "columns": layout,
+        "categories": categories,
+    }).encode("utf-8")
+    data_start = -(-(PREAMBLE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, column in columns.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(column.tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return build_id
+
+
+def read_csv(path: Union[str, Path]) -> List[Dict[str, str]]:
+    """Read reference records from a CSV file with a header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class ReferenceData:
+    """
+    One memory-mapped reference data file.
+
+    Columns are read-only NumPy views of the mapping; nothing is copied at
+    load time, and pages are faulted in from the shared page cache on use.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Map a compiled file.
+
+        Raises:
+            ValueError: If the file is truncated, not a reference data file,
+                or of an unsupported format version
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if stat.st_size < PREAMBLE.size:
+                raise ValueError(f"{self.path} is not a reference data file")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = PREAMBLE.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a reference data file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported reference data version {version}")
+        header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_length])
+        data_start = -(-(PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+
+        self.count: int = header["count"]
+        self.build_id: str = header["build_id"]
+        self.built_at: str = header["built_at"]
+        self._labels: Dict[str, List[Optional[str]]] = header["categories"]
+        self._columns: Dict[str, np.ndarray] = {}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            end = data_start + spec["offset"] + dtype.itemsize * self.count
+            if end > len(self._mmap):
+                raise ValueError(f"{self.path} is truncated")
+            self._columns[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=self.count, offset=data_start + spec["offset"]
+            )
+        self._symbols = self._columns["symbol"]
+
+    def __len__(self) -> int:
+        """Return the number of symbols."""
+        return self.count
+
+    def rows(self, symbols: Sequence[str]) -> np.ndarray:
+        """
+        Binary-search the row of each symbol.
+
+        Returns:
+            Row index per symbol, ``-1`` when the symbol is unknown
+        """
+        if not symbols or not self.count:
+            return np.full(len(symbols), -1, dtype=np.intp)
+        width = self._symbols.dtype.itemsize
+        normalized = [_normalize(s) for s in symbols]
+        fits = np.array([len(s) <= width and s.isascii() for s in normalized])
+        keys = np.array([s if ok else "" for s, ok in zip(normalized, fits)], dtype=f"S{width}")
+        rows = np.minimum(np.searchsorted(self._symbols, keys), self.count - 1)
+        found = fits & (self._symbols[rows] == keys)
+        return np.where(found, rows, -1)
+
+    def categories(self, name: str, rows: np.ndarray) -> List[Optional[str]]:
+        """Return the label of a categorical column at ``rows`` (``None`` for -1)."""
+        labels = self._labels[name]
+        codes = np.where(rows >= 0, self._columns[name][rows], 0)
+        return [labels[c] for c in codes.tolist()]
+
+    def values(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """Return a float column at ``rows`` (NaN for -1)."""
+        return np.where(rows >= 0, self._columns[name][rows], np.nan)
+
+    def get(self, symbol: str) -> Optional[SecurityReference]:
+        """Return the reference data of one symbol."""
+        rows = self.rows([symbol])
+        if rows[0] < 0:
+            return None
+        values = {name: float(self.values(name, rows)[0]) for name in VALUE_COLUMNS}
+        return SecurityReference(
+            symbol=_normalize(symbol),
+            **{name: self.categories(name, rows)[0] for name in CATEGORY_COLUMNS},
+            **{name: None if np.isnan(v) else v for name, v in values.items()},
+        )
+
+    def classify(self, symbols: Sequence[str]) -> Dict[str, List[Optional[str]]]:
+        """Return the concentration categories of ``symbols`` (see ``SymbolClassifier``)."""
+        rows = self.rows(symbols)
+        return {
+            "industry": self.categories("industry", rows),
+            "country": self.categories("country", rows),
+            "style_box": self.categories("style_box", rows),
+            "market_cap": [market_cap_bucket(v) for v in self.values("market_cap", rows).tolist()],
+        }
+
+
+def _identity(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Return the inode, size and mtime of ``path``, or None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class ReferenceDataStore:
+    """
+    Holder of the current reference data file, with hot reload.
+
+    ``data`` is replaced by a single attribute assignment, so readers see
+    either the old or the new mapping; the old mapping is released once the
+    last array view of it is garbage collected.
+    """
+
+    def __init__(self):
+        """Initialize without reference data."""
+        self.path: Optional[Path] = None
+        self.data: Optional[ReferenceData] = None
+        self.interval = 30.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> str:
+        """Return the build id of the loaded file (``"none"`` without one)."""
+        data = self.data
+        return data.build_id if data is not None else "none"
+
+    def load(self, path: Optional[Union[str, Path]]) -> bool:
+        """
+        Map the file at ``path`` and make it current.
+
+        A missing or invalid file is logged and leaves the current data in
+        place; the watcher picks the file up once it is published.
+
+        Returns:
+            Whether a new file was loaded
+        """
+        self.path = Path(path) if path else None
+        return self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        """Load ``path`` if it differs from the mapped file."""
+        data = self._open_if_changed()
+        if data is None:
+            return False
+        self._install(data)
+        return True
+
+    async def load_async(self, path: Optional[Union[str, Path]]) -> bool:
+        """Like ``load``, mapping the file off the event loop."""
+        self.path = Path(path) if path else None
+        return await self.reload_async()
+
+    async def reload_async(self) -> bool:
+        """Like ``reload_if_changed``, mapping the file off the event loop."""
+        # Map off the loop, swap on it, so requests never see a half-installed file.
+        data = await asyncio.to_thread(self._open_if_changed)
+        if data is None:
+            return False
+        self._install(data)
+        return True
+
+    def clear(self) -> None:
+        """Drop the loaded data and stop following a path."""
+        self.path = None
+        self.data = None
+        symbol_classifier.set_source(None)
+
+    def _open_if_changed(self) -> Optional[ReferenceData]:
+        """Map ``path`` if it differs from the mapped file; safe off the event loop."""
+        if self.path is None:
+            return None
+        identity = _identity(self.path)
+        if identity is None or (self.data is not None and identity == self.data.identity):
+            return None
+        try:
+            return ReferenceData(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            REFERENCE_DATA_RELOADS.inc(outcome="failed")
+            logger.warning("Reference data load failed", path=str(self.path), error=str(e))
+            return None
+
+    def _install(self, data: ReferenceData) -> None:
+        """Make ``data`` current and reclassify symbols from it."""
+        self.data = data
+        symbol_classifier.set_source(data)
+        REFERENCE_DATA_RELOADS.inc(outcome="loaded")
+        logger.info("Reference data loaded", path=str(self.path), symbols=len(data),
+                    build_id=data.build_id, built_at=data.built_at)
+
+    def get(self, symbol: str) -> Optional[SecurityReference]:
+        """Return the reference data of one symbol."""
+        data = self.data
+        return data.get(symbol) if data is not None else None
+
+    def betas(self, snapshot: PortfolioSnapshot, default: float = 1.0) -> Optional[np.ndarray]:
+        """Return the beta of every position (``default`` when unknown), or None without data."""
+        data = self.data
+        if data is None:
+            return None
+        betas = data.values("beta", data.rows(snapshot.symbols))
+        return np.where(np.isnan(betas), default, betas)
+
+    @property
+    def running(self) -> bool:
+        """Return whether the watcher task is active."""
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        """Poll the file for a new version until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reload_async()
+            except Exception as e:
+                logger.error("Reference data reload failed", error=str(e))
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Start watching ``path`` for new versions."""
+        if interval is not None:
+            self.interval = interval
+        if self.path is not None and not self.running:
+            self._task = asyncio.create_task(self._run(), name="reference-data-watcher")
+
+    async def stop(self) -> None:
+        """Stop the watcher task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+reference_data = ReferenceDataStore()
+
+registry.gauge(
+    "reference_data_symbols", "Symbols in the loaded reference data file",
+    function=lambda: len(reference_data.data) if reference_data.data is not None else 0,
+)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.services.reference_data SECURITIES.csv OUTPUT.bin")
+    records = read_csv(sys.argv[1])
+    build_id = compile_reference_data(records, sys.argv[2])
+    print(f"Compiled {len(records)} securities into {sys.argv[2]} (build {build_id})")
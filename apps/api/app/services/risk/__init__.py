@@ -0,0 +1,50 @@
+"""
+Portfolio risk engine.
+
+Computes stop-loss based portfolio risk metrics over columnar NumPy arrays,
+one vectorized pass per portfolio, Value at Risk / expected shortfall
+over a returns matrix, and single-pass drawdown and risk-adjusted
+performance kernels over portfolio value series.
+"""
+
+from app.services.risk.calculator import PositionArrays, RiskMetrics, calculate_risk
+from app.services.risk.performance import (
+    WINDOWS,
+    PerformanceAccumulator,
+    PerformanceStats,
+    Welford,
+    max_drawdown,
+    performance_summary,
+    rolling_mean_std,
+    trailing_max_drawdowns,
+)
+from app.services.risk.var import (
+    VAR_METHODS,
+    InsufficientHistoryError,
+    MonteCarloPlan,
+    VaRResult,
+    calculate_var,
+    plan_monte_carlo,
+    simulate_chunk,
+)
+
+__all__ = [
+    "InsufficientHistoryError",
+    "MonteCarloPlan",
+    "PerformanceAccumulator",
+    "PerformanceStats",
+    "PositionArrays",
+    "RiskMetrics",
+    "VAR_METHODS",
+    "VaRResult",
+    "WINDOWS",
+    "Welford",
+    "calculate_risk",
+    "calculate_var",
+    "max_drawdown",
+    "performance_summary",
+    "plan_monte_carlo",
+    "rolling_mean_std",
+    "simulate_chunk",
+    "trailing_max_drawdowns",
+]
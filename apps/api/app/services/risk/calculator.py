@@ -0,0 +1,169 @@
+"""
+Vectorized portfolio risk calculator.
+
+This module implements the PRD's risk metrics (total dollar risk if all stops
+hit, risk as a percentage of the portfolio, and maximum drawdown potential)
+over columnar position arrays. Every metric is derived from the same handful
+of array expressions, so cost grows with NumPy throughput rather than with
+per-position Python overhead.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PositionArrays:
+    """
+    Columnar view of a portfolio's positions.
+
+    All arrays are float64 and share the same length. A missing stop loss is
+    encoded as NaN and means the position is unprotected.
+    """
+
+    quantity: np.ndarray
+    entry_price: np.ndarray
+    stop_loss: np.ndarray
+    current_price: np.ndarray
+
+    def __post_init__(self) -> None:
+        """Validate that all columns have the same length."""
+        n = len(self.quantity)
+        for name in ("entry_price", "stop_loss", "current_price"):
+            if len(getattr(self, name)) != n:
+                raise ValueError(f"{name} has length {len(getattr(self, name))}, expected {n}")
+
+    def __len__(self) -> int:
+        """Return the number of positions."""
+        return len(self.quantity)
+
+    @classmethod
+    def from_columns(
+        cls,
+        quantity: Sequence[float],
+        entry_price: Sequence[float],
+        stop_loss: Sequence[Optional[float]],
+        current_price: Sequence[Optional[float]],
+    ) -> "PositionArrays":
+        """
+        Build arrays from Python sequences.
+
+        ``None`` stops become NaN, and a missing current price falls back to
+        the entry price so that freshly imported lots still carry risk.
+        """
+        qty = np.asarray(quantity, dtype=np.float64)
+        entry = np.asarray(entry_price, dtype=np.float64)
+        stop = np.array(stop_loss, dtype=np.float64)
+        price = np.array(current_price, dtype=np.float64)
+        price = np.where(np.isnan(price), entry, price)
+        return cls(quantity=qty, entry_price=entry, stop_loss=stop, current_price=price)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Tuple[float, float, Optional[float], Optional[float]]],
+    ) -> "PositionArrays":
+        """Build arrays from ``(quantity, entry_price, stop_loss, current_price)`` rows."""
+        columns = list(zip(*rows))
+        if not columns:
+            return cls.empty()
+        return cls.from_columns(*columns)
+
+    @classmethod
+    def empty(cls) -> "PositionArrays":
+        """Return arrays for a portfolio without positions."""
+        e = np.empty(0, dtype=np.float64)
+        return cls(quantity=e, entry_price=e, stop_loss=e, current_price=e)
+
+
+@dataclass(frozen=True)
+class RiskMetrics:
+    """Portfolio-level risk metrics."""
+
+    position_count: int
+    market_value: float
+    cost_basis: float
+    unrealized_pnl: float
+    cash_balance: float
+    portfolio_value: float
+    total_risk_dollars: float
+    total_risk_percent: float
+    max_drawdown_dollars: float
+    max_drawdown_percent: float
+    largest_position_risk: float
+    unprotected_positions: int
+
+    def dict(self) -> dict:
+        """Convert metrics to a dictionary."""
+        return {
+            "position_count": self.position_count,
+            "market_value": self.market_value,
+            "cost_basis": self.cost_basis,
+            "unrealized_pnl": self.unrealized_pnl,
+            "cash_balance": self.cash_balance,
+            "portfolio_value": self.portfolio_value,
+            "total_risk_dollars": self.total_risk_dollars,
+            "total_risk_percent": self.total_risk_percent,
+            "max_drawdown_dollars": self.max_drawdown_dollars,
+            "max_drawdown_percent": self.max_drawdown_percent,
+            "largest_position_risk": self.largest_position_risk,
+            "unprotected_positions": self.unprotected_positions,
+        }
+
+
+def _percent(numerator: float, denominator: float) -> float:
+    """Return ``numerator`` as a percentage of ``denominator`` (0 when undefined)."""
+    if denominator <= 0:
+        return 0.0
+    return round(numerator / denominator * 100.0, 4)
+
+
+def calculate_risk(positions: PositionArrays, cash_balance: float = 0.0) -> RiskMetrics:
+    """
+    Calculate portfolio risk metrics in a single vectorized pass.
+
+    Risk per position is the loss from the current price to the stop,
+    ``quantity * (current_price - stop_loss)``, floored at zero so that a stop
+    trailing above the market (or below it for shorts) does not offset risk
+    elsewhere. Positions without a stop contribute nothing to the stop-based
+    total, but are assumed to go to zero for the maximum drawdown potential.
+
+    Args:
+        positions: Columnar position arrays
+        cash_balance: Uninvested cash held in the portfolio
+
+    Returns:
+        RiskMetrics: Aggregated risk metrics
+    """
+    qty = positions.quantity
+    price = positions.current_price
+    stop = positions.stop_loss
+
+    market_values = qty * price
+    unprotected = np.isnan(stop)
+    stop_risk = np.where(unprotected, 0.0, qty * (price - np.nan_to_num(stop)))
+    np.maximum(stop_risk, 0.0, out=stop_risk)
+    drawdown = np.where(unprotected, np.abs(market_values), stop_risk)
+
+    market_value = float(market_values.sum())
+    cost_basis = float(np.dot(qty, positions.entry_price))
+    total_risk = float(stop_risk.sum())
+    max_drawdown = float(drawdown.sum())
+    portfolio_value = market_value + cash_balance
+
+    return RiskMetrics(
+        position_count=len(positions),
+        market_value=round(market_value, 2),
+        cost_basis=round(cost_basis, 2),
+        unrealized_pnl=round(market_value - cost_basis, 2),
+        cash_balance=round(cash_balance, 2),
+        portfolio_value=round(portfolio_value, 2),
+        total_risk_dollars=round(total_risk, 2),
+        total_risk_percent=_percent(total_risk, portfolio_value),
+        max_drawdown_dollars=round(max_drawdown, 2),
+        max_drawdown_percent=_percent(max_drawdown, portfolio_value),
+        largest_position_risk=round(float(drawdown.max()), 2) if len(positions) else 0.0,
+        unprotected_positions=int(unprotected.sum()),
+    )
@@ -0,0 +1,325 @@
+"""
+Drawdown and risk-adjusted performance over portfolio value series.
+
+US-023 and US-024 report return, volatility, Sharpe ratio and maximum
+drawdown for several trailing windows. Every kernel here makes one pass
+over the series, whatever the number of windows:
+
+* Maximum drawdown of a prefix comes from a running maximum. For trailing
+  windows a single backward pass with a running minimum gives the maximum
+  drawdown of *every* suffix, so all windows are read off one array.
+* Streamed mean and variance since inception are accumulated with
+  Welford's algorithm, which stays accurate over arbitrarily long streams.
+* Windowed sums of returns and squared returns are differences of two
+  cumulative sums, so any window's mean and variance cost O(1), and a
+  rolling series costs O(n) regardless of the window length.
+
+``performance_summary`` accepts a NumPy array or any iterable of daily
+values, such as a generator reading rows from the database; iterables are
+fed through ``PerformanceAccumulator``, which keeps only the longest
+window's worth of values.
+
+Returns, volatility and drawdowns are fractions (0.05 is 5%); volatility
+and Sharpe ratios are annualized.
+"""
+
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+# Trailing windows in trading days.
+WINDOWS: Dict[str, int] = {
+    "1M": 21,
+    "3M": 63,
+    "6M": 126,
+    "1Y": 252,
+    "3Y": 756,
+}
+
+
+@dataclass(frozen=True)
+class PerformanceStats:
+    """Performance of a value series over one trailing window."""
+
+    window: str
+    days: int
+    total_return: float
+    mean_daily_return: float
+    volatility: float
+    sharpe: Optional[float]
+    max_drawdown: float
+
+    def dict(self) -> dict:
+        """Convert stats to a dictionary."""
+        return asdict(self)
+
+
+class Welford:
+    """Streaming mean and variance (Welford's online algorithm)."""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self) -> None:
+        """Initialize an empty accumulator."""
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x: float) -> None:
+        """Add one observation."""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Return the sample variance (NaN below two observations)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+
+def drawdowns(values: np.ndarray) -> np.ndarray:
+    """Return the drawdown from the running peak at each point."""
+    values = np.asarray(values, dtype=np.float64)
+    return 1.0 - values / np.maximum.accumulate(values)
+
+
+def max_drawdown(values: np.ndarray) -> float:
+    """Return the maximum peak-to-trough decline of a value series."""
+    values = np.asarray(values, dtype=np.float64)
+    return float(drawdowns(values).max()) if len(values) else 0.0
+
+
+def trailing_max_drawdowns(values: np.ndarray) -> np.ndarray:
+    """
+    Return the maximum drawdown of every suffix of a value series.
+
+    Element ``s`` is ``max_drawdown(values[s:])``. Walking backwards, a
+    suffix's drawdown is the larger of the next suffix's and the fall from
+    its first value to the lowest value after it: any other peak in the
+    suffix is already a peak of the shorter one.
+
+    Args:
+        values: Positive values, oldest first
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return np.empty(0)
+    lowest_after = np.minimum.accumulate(values[::-1])[::-1]
+    fall = np.zeros(len(values))
+    fall[:-1] = 1.0 - lowest_after[1:] / values[:-1]
+    np.maximum(fall, 0.0, out=fall)
+    return np.maximum.accumulate(fall[::-1])[::-1]
+
+
+def rolling_mean_std(returns: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the rolling mean and sample standard deviation of ``returns``.
+
+    Computed from cumulative sums of the returns and their squares, shifted
+    by the overall mean to limit cancellation, in O(n) for any window.
+
+    Returns:
+        ``(mean, std)`` arrays of length ``len(returns) - window + 1``; element
+        ``i`` covers ``returns[i:i + window]``
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if window < 2:
+        raise ValueError(f"window must be at least 2, got {window}")
+    if len(returns) < window:
+        return np.empty(0), np.empty(0)
+    shift = returns.mean()
+    centered = returns - shift
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    total = sums[window:] - sums[:-window]
+    total_sq = squares[window:] - squares[:-window]
+    mean = total / window
+    variance = np.maximum(total_sq - total * mean, 0.0) / (window - 1)
+    return mean + shift, np.sqrt(variance)
+
+
+def _stats(
+    window: str,
+    days: int,
+    total_return: float,
+    mean: float,
+    variance: float,
+    drawdown: float,
+    risk_free_rate: float,
+) -> PerformanceStats:
+    """Annualize one window's moments into ``PerformanceStats``."""
+    std = math.sqrt(max(variance, 0.0))
+    excess = mean - risk_free_rate / TRADING_DAYS_PER_YEAR
+    return PerformanceStats(
+        window=window,
+        days=days,
+        total_return=total_return,
+        mean_daily_return=mean,
+        volatility=std * math.sqrt(TRADING_DAYS_PER_YEAR),
+        sharpe=excess / std * math.sqrt(TRADING_DAYS_PER_YEAR) if std > 0 else None,
+        max_drawdown=drawdown,
+    )
+
+
+def summarize_array(
+    values: np.ndarray,
+    windows: Mapping[str, int] = WINDOWS,
+    risk_free_rate: float = 0.0,
+) -> Dict[str, PerformanceStats]:
+    """
+    Return trailing-window performance of a value array.
+
+    Windows longer than the history are left out; ``"inception"`` covers
+    the whole series.
+
+    Args:
+        values: Daily portfolio values, oldest first
+        windows: Window name to length in trading days
+        risk_free_rate: Annual risk-free rate for the Sharpe ratio
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3:
+        return {}
+    returns = values[1:] / values[:-1] - 1.0
+    n = len(returns)
+    lengths = {name: days for name, days in windows.items() if 2 <= days <= n}
+
+    # Windows only need the longest window's tail of the series.
+    longest = max(lengths.values(), default=0)
+    tail, tail_returns = values[len(values) - 1 - longest:], returns[n - longest:]
+    shift = tail_returns.mean() if longest else 0.0
+    centered = tail_returns - shift
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    suffix_drawdowns = trailing_max_drawdowns(tail)
+
+    result = {}
+    for name, days in lengths.items():
+        total = sums[-1] - sums[-1 - days]
+        mean = total / days
+        variance = (squares[-1] - squares[-1 - days] - total * mean) / (days - 1)
+        result[name] = _stats(
+            name, days, float(tail[-1] / tail[-1 - days] - 1.0), float(mean + shift),
+            float(variance), float(suffix_drawdowns[-1 - days]), risk_free_rate,
+        )
+    result["inception"] = _stats(
+        "inception", n, float(values[-1] / values[0] - 1.0), float(returns.mean()),
+        float(returns.var(ddof=1)), max_drawdown(values), risk_free_rate,
+    )
+    return result
+
+
+class PerformanceAccumulator:
+    """
+    Streaming trailing-window performance.
+
+    ``push`` is O(1): it updates Welford moments and the running peak for
+    the whole stream, and appends the value and the cumulative return sums
+    to ring buffers one longest window long. ``summary`` reads every
+    window from those buffers.
+    """
+
+    def __init__(self, windows: Mapping[str, int] = WINDOWS):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            windows: Window name to length in trading days
+        """
+        self.windows = dict(windows)
+        size = max(self.windows.values(), default=0) + 1
+        self._values: deque = deque(maxlen=size)
+        self._sums: deque = deque([0.0], maxlen=size)
+        self._squares: deque = deque([0.0], maxlen=size)
+        self._shift: Optional[float] = None
+        self._moments = Welford()
+        self._first: Optional[float] = None
+        self._peak = -math.inf
+        self._max_drawdown = 0.0
+
+    def push(self, value: float) -> None:
+        """Add the next daily value."""
+        value = float(value)
+        if self._values:
+            r = value / self._values[-1] - 1.0
+            self._moments.push(r)
+            if self._shift is None:
+                # Center the cumulative sums on the first return to limit cancellation.
+                self._shift = r
+            centered = r - self._shift
+            self._sums.append(self._sums[-1] + centered)
+            self._squares.append(self._squares[-1] + centered * centered)
+        else:
+            self._first = value
+        self._values.append(value)
+        self._peak = max(self._peak, value)
+        self._max_drawdown = max(self._max_drawdown, 1.0 - value / self._peak)
+
+    def extend(self, values: Iterable[float]) -> "PerformanceAccumulator":
+        """Add several daily values."""
+        for value in values:
+            self.push(value)
+        return self
+
+    def summary(self, risk_free_rate: float = 0.0) -> Dict[str, PerformanceStats]:
+        """
+        Return trailing-window performance of the values pushed so far.
+
+        Windows longer than the history are left out; ``"inception"``
+        covers every value pushed.
+        """
+        n = self._moments.count
+        if n < 2:
+            return {}
+        values = np.fromiter(self._values, dtype=np.float64, count=len(self._values))
+        sums = np.fromiter(self._sums, dtype=np.float64, count=len(self._sums))
+        squares = np.fromiter(self._squares, dtype=np.float64, count=len(self._squares))
+        suffix_drawdowns = trailing_max_drawdowns(values)
+
+        result = {}
+        for name, days in self.windows.items():
+            if days < 2 or days > n:
+                continue
+            total = sums[-1] - sums[-1 - days]
+            mean = total / days
+            variance = (squares[-1] - squares[-1 - days] - total * mean) / (days - 1)
+            result[name] = _stats(
+                name, days, float(values[-1] / values[-1 - days] - 1.0), float(mean + self._shift),
+                float(variance), float(suffix_drawdowns[-1 - days]), risk_free_rate,
+            )
+        result["inception"] = _stats(
+            "inception", n, values[-1] / self._first - 1.0, self._moments.mean,
+            self._moments.variance, self._max_drawdown, risk_free_rate,
+        )
+        return result
+
+
+def performance_summary(
+    values: Union[np.ndarray, Iterable[float]],
+    windows: Mapping[str, int] = WINDOWS,
+    risk_free_rate: float = 0.0,
+) -> Dict[str, PerformanceStats]:
+    """
+    Return trailing-window performance of daily portfolio values.
+
+    Arrays are summarized with vectorized kernels; other iterables are
+    consumed once through ``PerformanceAccumulator`` without being
+    materialized.
+
+    Args:
+        values: Daily portfolio values, oldest first
+        windows: Window name to length in trading days
+        risk_free_rate: Annual risk-free rate for the Sharpe ratio
+
+    Returns:
+        Window name to stats, for every window the history covers, plus
+        ``"inception"``
+    """
+    if isinstance(values, np.ndarray):
+        return summarize_array(values, windows, risk_free_rate)
+    return PerformanceAccumulator(windows).extend(values).summary(risk_free_rate)
@@ -0,0 +1,385 @@
+"""
+Value at Risk and Conditional VaR (expected shortfall).
+
+All three methods work on a matrix of daily simple returns (one row per day,
+one column per position) and a vector of dollar exposures per position:
+
+* ``parametric``: variance-covariance VaR assuming normal portfolio returns,
+  scaled to the horizon with the square root of time.
+* ``historical``: empirical quantile of the historical daily portfolio P&L,
+  scaled with the square root of time.
+* ``monte_carlo``: correlated normal daily returns drawn from the historical
+  mean and covariance and compounded over the horizon, so multi-day paths
+  are simulated rather than scaled. Paths are generated in chunks sized to a
+  fixed memory budget, each with its own child of one ``SeedSequence``, so
+  peak memory stays bounded at any path count and a given seed gives
+  identical results whether chunks run serially or on a process pool.
+
+VaR and CVaR are reported as positive dollar losses.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+VAR_METHODS = ("parametric", "historical", "monte_carlo")
+
+# One year of trading days, per US-021.
+MIN_OBSERVATIONS = 252
+DEFAULT_PATHS = 100_000
+# Working-set budget per simulated chunk (three float64 paths x positions matrices).
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+class InsufficientHistoryError(ValueError):
+    """Raised when the returns history is too short to estimate VaR."""
+
+
+@dataclass(frozen=True)
+class VaRResult:
+    """VaR and CVaR of a portfolio for one method, confidence and horizon."""
+
+    method: str
+    confidence: float
+    horizon_days: int
+    portfolio_value: float
+    var: float
+    cvar: float
+    var_percent: float
+    cvar_percent: float
+    observations: int
+    paths: Optional[int] = None
+
+    def dict(self) -> dict:
+        """Convert result to a dictionary."""
+        return asdict(self)
+
+
+def _percent(numerator: float, denominator: float) -> float:
+    """Return ``numerator`` as a percentage of ``denominator`` (0 when undefined)."""
+    if denominator <= 0:
+        return 0.0
+    return round(numerator / denominator * 100.0, 4)
+
+
+def _validate(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    confidence: float,
+    horizon_days: int,
+    min_observations: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Coerce inputs to float64 arrays and check their shapes and ranges."""
+    returns = np.asarray(returns, dtype=np.float64)
+    exposures = np.asarray(exposures, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, np.newaxis]
+    if returns.ndim != 2 or exposures.ndim != 1 or returns.shape[1] != len(exposures):
+        raise ValueError(
+            f"returns must be (days, {len(exposures)}) for {len(exposures)} exposures, "
+            f"got {returns.shape}"
+        )
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+    if horizon_days < 1:
+        raise ValueError(f"horizon_days must be at least 1, got {horizon_days}")
+    if len(returns) < min_observations:
+        raise InsufficientHistoryError(
+            f"VaR needs at least {min_observations} days of returns "
+            f"(about one year of trading days); only {len(returns)} available"
+        )
+    if not np.isfinite(returns).all():
+        raise ValueError("returns contain NaN or infinite values")
+    return returns, exposures
+
+
+def _result(
+    method: str,
+    confidence: float,
+    horizon_days: int,
+    exposures: np.ndarray,
+    portfolio_value: Optional[float],
+    var: float,
+    cvar: float,
+    observations: int,
+    paths: Optional[int] = None,
+) -> VaRResult:
+    """Round and package a VaR computation."""
+    if portfolio_value is None:
+        portfolio_value = float(np.abs(exposures).sum())
+    return VaRResult(
+        method=method,
+        confidence=confidence,
+        horizon_days=horizon_days,
+        portfolio_value=round(portfolio_value, 2),
+        var=round(var, 2),
+        cvar=round(cvar, 2),
+        var_percent=_percent(var, portfolio_value),
+        cvar_percent=_percent(cvar, portfolio_value),
+        observations=observations,
+        paths=paths,
+    )
+
+
+def _tail(pnl: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """Return (VaR, CVaR) of a P&L sample as positive losses."""
+    cutoff = np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return -float(cutoff), -float(tail.mean())
+
+
+def parametric_var(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    portfolio_value: Optional[float] = None,
+    min_observations: int = MIN_OBSERVATIONS,
+) -> VaRResult:
+    """
+    Variance-covariance VaR.
+
+    Args:
+        returns: Daily simple returns, shape ``(days, positions)``
+        exposures: Dollar exposure per position (negative for shorts)
+        confidence: Confidence level, e.g. 0.95
+        horizon_days: Holding period in trading days
+        portfolio_value: Denominator for percentages (default: gross exposure)
+        min_observations: Minimum number of days of history
+
+    Raises:
+        InsufficientHistoryError: If there are fewer than ``min_observations`` days
+    """
+    returns, exposures = _validate(returns, exposures, confidence, horizon_days, min_observations)
+    mean = float(returns.mean(axis=0) @ exposures) * horizon_days
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    sigma = float(np.sqrt(max(exposures @ cov @ exposures, 0.0) * horizon_days))
+
+    z = NormalDist().inv_cdf(confidence)
+    var = z * sigma - mean
+    cvar = sigma * NormalDist().pdf(z) / (1.0 - confidence) - mean
+    return _result("parametric", confidence, horizon_days, exposures, portfolio_value,
+                   var, cvar, len(returns))
+
+
+def historical_var(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    portfolio_value: Optional[float] = None,
+    min_observations: int = MIN_OBSERVATIONS,
+) -> VaRResult:
+    """
+    Historical-simulation VaR.
+
+    Replays every historical day against today's exposures and takes the
+    empirical loss quantile; CVaR is the mean loss beyond it.
+
+    Args:
+        returns: Daily simple returns, shape ``(days, positions)``
+        exposures: Dollar exposure per position (negative for shorts)
+        confidence: Confidence level, e.g. 0.95
+        horizon_days: Holding period in trading days
+        portfolio_value: Denominator for percentages (default: gross exposure)
+        min_observations: Minimum number of days of history
+
+    Raises:
+        InsufficientHistoryError: If there are fewer than ``min_observations`` days
+    """
+    returns, exposures = _validate(returns, exposures, confidence, horizon_days, min_observations)
+    var, cvar = _tail(returns @ exposures, confidence)
+    scale = float(np.sqrt(horizon_days))
+    return _result("historical", confidence, horizon_days, exposures, portfolio_value,
+                   var * scale, cvar * scale, len(returns))
+
+
+def _factor(returns: np.ndarray) -> np.ndarray:
+    """
+    Return ``L`` with ``L @ L.T`` equal to the covariance of ``returns``.
+
+    With fewer days than positions the centered returns themselves are an
+    exact factor of rank ``days``, which makes each simulated day a
+    ``paths x days x positions`` product instead of ``paths x positions^2``.
+    """
+    days, positions = returns.shape
+    if days <= positions:
+        return (returns - returns.mean(axis=0)).T / np.sqrt(days - 1)
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Collinear returns: use the PSD square root.
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def simulate_chunk(
+    seed: np.random.SeedSequence,
+    size: int,
+    mean: np.ndarray,
+    factor: np.ndarray,
+    exposures: np.ndarray,
+    horizon_days: int,
+) -> np.ndarray:
+    """Simulate ``size`` horizon P&L paths (module level so it can be pickled)."""
+    rng = np.random.default_rng(seed)
+    growth = np.ones((size, len(exposures)))
+    for _ in range(horizon_days):
+        daily = rng.standard_normal((size, factor.shape[1])) @ factor.T
+        daily += mean
+        daily += 1.0
+        growth *= daily
+    growth -= 1.0
+    return growth @ exposures
+
+
+@dataclass(frozen=True)
+class MonteCarloPlan:
+    """
+    A Monte Carlo VaR run split into independent chunks.
+
+    Each entry of ``chunks`` is the argument tuple of one ``simulate_chunk``
+    call; the chunks may run in any order or place (a process pool, a job
+    worker reporting progress) and their P&L is handed back to ``result``.
+    """
+
+    chunks: List[tuple]
+    paths: int
+    confidence: float
+    horizon_days: int
+    exposures: np.ndarray
+    portfolio_value: Optional[float]
+    observations: int
+
+    def result(self, pnl: np.ndarray) -> VaRResult:
+        """Return VaR and CVaR of the concatenated chunk P&L."""
+        var, cvar = _tail(pnl, self.confidence)
+        return _result("monte_carlo", self.confidence, self.horizon_days, self.exposures,
+                       self.portfolio_value, var, cvar, self.observations, self.paths)
+
+
+def plan_monte_carlo(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    portfolio_value: Optional[float] = None,
+    min_observations: int = MIN_OBSERVATIONS,
+    paths: int = DEFAULT_PATHS,
+    seed: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> MonteCarloPlan:
+    """
+    Validate inputs and split a Monte Carlo VaR run into chunks.
+
+    Arguments are those of ``monte_carlo_var``.
+
+    Raises:
+        InsufficientHistoryError: If there are fewer than ``min_observations`` days
+    """
+    returns, exposures = _validate(returns, exposures, confidence, horizon_days, min_observations)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_BYTES // (3 * 8 * len(exposures)))
+    if paths < 1 or chunk_size < 1:
+        raise ValueError("paths and chunk_size must be positive")
+
+    mean = returns.mean(axis=0)
+    factor = _factor(returns)
+
+    sizes = [chunk_size] * (paths // chunk_size)
+    if paths % chunk_size:
+        sizes.append(paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return MonteCarloPlan(
+        chunks=[(s, n, mean, factor, exposures, horizon_days) for s, n in zip(seeds, sizes)],
+        paths=paths,
+        confidence=confidence,
+        horizon_days=horizon_days,
+        exposures=exposures,
+        portfolio_value=portfolio_value,
+        observations=len(returns),
+    )
+
+
+def monte_carlo_var(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    portfolio_value: Optional[float] = None,
+    min_observations: int = MIN_OBSERVATIONS,
+    paths: int = DEFAULT_PATHS,
+    seed: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> VaRResult:
+    """
+    Monte Carlo VaR.
+
+    Args:
+        returns: Daily simple returns, shape ``(days, positions)``
+        exposures: Dollar exposure per position (negative for shorts)
+        confidence: Confidence level, e.g. 0.95
+        horizon_days: Holding period in trading days
+        portfolio_value: Denominator for percentages (default: gross exposure)
+        min_observations: Minimum number of days of history
+        paths: Number of simulated horizon paths
+        seed: Seed for reproducible results
+        chunk_size: Paths simulated per chunk (default: as many as fit in
+            ``CHUNK_BYTES``); results for a seed depend on it
+        workers: Simulate chunks on a process pool of this size; ``None`` or
+            1 runs in the calling process. Worth it only for large books.
+
+    Raises:
+        InsufficientHistoryError: If there are fewer than ``min_observations`` days
+    """
+    plan = plan_monte_carlo(returns, exposures, confidence, horizon_days, portfolio_value,
+                            min_observations, paths, seed, chunk_size)
+
+    pnl = np.empty(paths)
+    if workers is not None and workers > 1 and len(plan.chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = pool.map(simulate_chunk, *zip(*plan.chunks))
+            offset = 0
+            for chunk in chunks:
+                pnl[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+    else:
+        offset = 0
+        for chunk_args in plan.chunks:
+            chunk = simulate_chunk(*chunk_args)
+            pnl[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+    return plan.result(pnl)
+
+
+def calculate_var(
+    returns: np.ndarray,
+    exposures: np.ndarray,
+    method: str = "historical",
+    **options,
+) -> VaRResult:
+    """
+    Calculate VaR and CVaR with the given method.
+
+    Args:
+        returns: Daily simple returns, shape ``(days, positions)``
+        exposures: Dollar exposure per position (negative for shorts)
+        method: One of ``VAR_METHODS``
+        **options: Keyword arguments of the method's function
+
+    Returns:
+        VaRResult: VaR and CVaR in dollars and percent
+    """
+    if method == "parametric":
+        return parametric_var(returns, exposures, **options)
+    if method == "historical":
+        return historical_var(returns, exposures, **options)
+    if method == "monte_carlo":
+        return monte_carlo_var(returns, exposures, **options)
+    raise ValueError(f"Unknown VaR method {method!r}; expected one of {', '.join(VAR_METHODS)}")
@@ -0,0 +1,462 @@
+"""
+Risk history materialization (US-017).
+
+A portfolio's risk is recorded as a ``RiskSnapshot`` row when its positions
+change and at every market close, valued at the closing prices. History
+charts read those rows back, downsampled on the server, and never recompute
+past risk.
+
+Position writes arrive through snapshot invalidation. The recorder collects
+them for ``debounce`` seconds so an import committing in many batches
+produces one row, and skips portfolios whose snapshot is identical to the
+one it last recorded.
+
+Each close is recorded by one worker. Under the pre-forking launcher only
+one worker of a host records closes; with Redis, workers claim the close
+with ``SET NX`` and the others wait for the winner's "recorded" marker (a
+claim expires, so a crashed winner is replaced). Close rows are keyed on
+the close time, so a close recorded twice anyway keeps one row per
+portfolio. A close is only recorded before the next session opens, while
+the latest daily bars are still the close's, and is marked recorded once its
+rows are committed. The sweep over every portfolio builds snapshots without
+storing them in the shared snapshot store. Once a close is recorded, every worker
+advances its correlation universe by one daily bar.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import structlog
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import KEY_PREFIX, RedisCache, result_cache
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import registry
+from app.models import Portfolio, RiskSnapshot
+from app.services.concentration import group_totals
+from app.services.correlation_feed import correlation_feed
+from app.services.market_data import MarketCalendar, MarketDataError, price_cache
+from app.services.risk import PositionArrays, calculate_risk
+from app.services.snapshot import PortfolioNotFoundError, PortfolioSnapshot, snapshot_store
+
+logger = structlog.get_logger()
+
+RANGES = {
+    "1M": timedelta(days=30),
+    "3M": timedelta(days=91),
+    "1Y": timedelta(days=365),
+}
+DEFAULT_POINTS = 120
+# Portfolios valued per database round trip when recording a close.
+CLOSE_BATCH_SIZE = 500
+
+POSITIONS = "positions"
+CLOSE = "close"
+
+# Close claim states; a claim outlives a slow recording, a marker every retry.
+CLOSE_RECORDING = "recording"
+CLOSE_RECORDED = "recorded"
+CLOSE_CLAIM_SECONDS = 900
+CLOSE_MARKER_SECONDS = 7 * 86400
+
+HISTORY_WRITES = registry.counter(
+    "risk_history_rows_written_total",
+    "Risk snapshot rows written by trigger",
+    ("trigger",),
+)
+
+HISTORY_COLUMNS = (
+    RiskSnapshot.timestamp,
+    RiskSnapshot.portfolio_value,
+    RiskSnapshot.total_risk_dollars,
+    RiskSnapshot.total_risk_percent,
+    RiskSnapshot.max_concentration,
+)
+
+
+def measure(snapshot: PortfolioSnapshot, prices: Optional[np.ndarray] = None) -> dict:
+    """
+    Return the stored risk columns of a snapshot.
+
+    Args:
+        snapshot: Portfolio snapshot
+        prices: Prices to value positions at instead of their stored ones;
+            NaN keeps the stored price
+    """
+    price = snapshot.current_price
+    if prices is not None:
+        price = np.where(np.isnan(prices), price, prices)
+    metrics = calculate_risk(
+        PositionArrays(snapshot.quantity, snapshot.entry_price, snapshot.stop_loss, price),
+        snapshot.cash_balance,
+    )
+
+    # Largest single-symbol share, on the same basis as the concentration endpoint.
+    weights = np.abs(snapshot.quantity * price)
+    gross = float(weights.sum()) + max(snapshot.cash_balance, 0.0)
+    _, totals, _ = group_totals([snapshot.symbol_code], weights)
+    max_concentration = float(totals[0].max()) * 100.0 / gross if len(snapshot) and gross > 0 else 0.0
+
+    return {
+        "portfolio_value": metrics.portfolio_value,
+        "total_risk_dollars": metrics.total_risk_dollars,
+        "total_risk_percent": metrics.total_risk_percent,
+        "max_concentration": round(max_concentration, 4),
+        "meta": {
+            "position_count": metrics.position_count,
+            "market_value": metrics.market_value,
+            "max_drawdown_dollars": metrics.max_drawdown_dollars,
+            "unprotected_positions": metrics.unprotected_positions,
+        },
+    }
+
+
+def partition_for(timestamp: datetime) -> Tuple[str, datetime, datetime]:
+    """Return the name and bounds of the monthly partition holding ``timestamp``."""
+    timestamp = timestamp.astimezone(timezone.utc)
+    start = datetime(timestamp.year, timestamp.month, 1, tzinfo=timezone.utc)
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return f"{RiskSnapshot.__tablename__}_{start:%Y%m}", start, end
+
+
+def downsample(timestamps: np.ndarray, start: float, end: float, points: int) -> np.ndarray:
+    """
+    Pick at most ``points`` rows evenly spread over ``[start, end]``.
+
+    The range is cut into ``points`` equal buckets and the latest row of
+    each non-empty bucket is kept, so the last point is always the most
+    recent snapshot.
+
+    Args:
+        timestamps: Epoch seconds of the rows, ascending
+        start: Range start in epoch seconds
+        end: Range end in epoch seconds
+        points: Number of buckets
+
+    Returns:
+        Indices of the kept rows, ascending
+    """
+    if len(timestamps) <= points:
+        return np.arange(len(timestamps))
+    width = (end - start) / points
+    bucket = np.clip(((timestamps - start) // width).astype(np.int64), 0, points - 1)
+    return np.flatnonzero(np.append(bucket[1:] != bucket[:-1], True))
+
+
+def _epoch(timestamp: datetime) -> float:
+    """Return epoch seconds, reading naive timestamps (SQLite) as UTC."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+async def load_history(
+    db: AsyncSession,
+    portfolio_id: int,
+    period: str,
+    points: int = DEFAULT_POINTS,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Return a portfolio's recorded risk over ``period``, downsampled to ``points``.
+
+    Reads only the history columns through the (portfolio_id, timestamp)
+    key; on PostgreSQL the time bounds prune the scan to the partitions in
+    range.
+    """
+    end = now or datetime.now(timezone.utc)
+    start = end - RANGES[period]
+    result = await db.execute(
+        select(*HISTORY_COLUMNS)
+        .where(RiskSnapshot.portfolio_id == portfolio_id)
+        .where(RiskSnapshot.timestamp >= start)
+        .where(RiskSnapshot.timestamp <= end)
+        .order_by(RiskSnapshot.timestamp)
+    )
+    rows = result.all()
+    timestamps = np.array([_epoch(row[0]) for row in rows], dtype=np.float64)
+    keep = downsample(timestamps, start.timestamp(), end.timestamp(), points)
+    return {
+        "portfolio_id": portfolio_id,
+        "range": period,
+        "start": start,
+        "end": end,
+        "snapshots": len(rows),
+        "points": [
+            {
+                "timestamp": datetime.fromtimestamp(timestamps[i], timezone.utc),
+                "portfolio_value": rows[i][1],
+                "total_risk_dollars": rows[i][2],
+                "total_risk_percent": rows[i][3],
+                "max_concentration": rows[i][4],
+            }
+            for i in keep.tolist()
+        ],
+    }
+
+
+class RiskHistoryRecorder:
+    """Writes risk snapshots on position changes and market closes."""
+
+    def __init__(
+        self,
+        debounce: float = 2.0,
+        close_check_interval: float = 60.0,
+        calendar: Optional[MarketCalendar] = None,
+    ):
+        """
+        Initialize the recorder.
+
+        Args:
+            debounce: Seconds position changes are collected before recording
+            close_check_interval: Seconds between checks for a new market close
+            calendar: Exchange sessions (default: the price cache's)
+        """
+        self.debounce = debounce
+        self.close_check_interval = close_check_interval
+        self.calendar = calendar or price_cache.calendar
+        self.sessions = AsyncSessionLocal
+        self.prices = price_cache
+        self.correlations = correlation_feed
+        self.redis = None
+        # Cleared by the launcher in every worker but one, which records closes for all.
+        self.records_closes = True
+        self._dirty: Set[int] = set()
+        self._recorded: Dict[int, str] = {}
+        self._partitions: Set[str] = set()
+        self._last_close: Optional[datetime] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Only the writing worker records a position change.
+        snapshot_store.add_listener(self._on_invalidate, local_only=True)
+
+    @property
+    def running(self) -> bool:
+        """Return whether the recording loop is active."""
+        return self._task is not None and not self._task.done()
+
+    def _on_invalidate(self, portfolio_id: int) -> None:
+        """Schedule a portfolio whose positions were written."""
+        self._dirty.add(portfolio_id)
+        self._wake.set()
+
+    async def _ensure_partitions(self, db: AsyncSession, timestamps: Sequence[datetime]) -> None:
+        """Create the monthly partitions ``timestamps`` fall in (PostgreSQL only)."""
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        for name, start, end in {partition_for(t) for t in timestamps}:
+            if name in self._partitions:
+                continue
+            try:
+                async with db.begin_nested():
+                    await db.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {RiskSnapshot.__tablename__} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+            except DBAPIError as e:
+                # Another worker created it concurrently, or rows for the
+                # month already sit in the default partition.
+                logger.warning("Risk history partition not created", partition=name, error=str(e))
+            self._partitions.add(name)
+
+    async def _write(self, db: AsyncSession, rows: List[dict], trigger: str) -> None:
+        """Insert rows, ignoring any already recorded for the same time."""
+        if not rows:
+            return
+        await self._ensure_partitions(db, [row["timestamp"] for row in rows])
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        await db.execute(insert(RiskSnapshot).on_conflict_do_nothing(), rows)
+        HISTORY_WRITES.inc(len(rows), trigger=trigger)
+
+    async def flush(self, now: Optional[datetime] = None) -> int:
+        """
+        Record every portfolio written since the last flush.
+
+        Returns:
+            Number of rows written
+        """
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        timestamp = now or datetime.now(timezone.utc)
+        rows, hashes = [], {}
+        async with self.sessions() as db:
+            for portfolio_id in sorted(dirty):
+                try:
+                    snapshot = await snapshot_store.get(db, portfolio_id)
+                except PortfolioNotFoundError:
+                    self._recorded.pop(portfolio_id, None)
+                    continue
+                if self._recorded.get(portfolio_id) == snapshot.content_hash:
+                    continue
+                row = measure(snapshot)
+                row["meta"]["trigger"] = POSITIONS
+                rows.append({"portfolio_id": portfolio_id, "timestamp": timestamp, **row})
+                hashes[portfolio_id] = snapshot.content_hash
+            await self._write(db, rows, POSITIONS)
+            await db.commit()
+        self._recorded.update(hashes)
+        return len(rows)
+
+    async def record_close(self, closed_at: datetime) -> int:
+        """
+        Record every portfolio valued at the latest daily closes.
+
+        Symbols without a daily bar keep their stored price.
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            MarketDataError: If closing prices could not be fetched
+        """
+        closed_at = closed_at.astimezone(timezone.utc)
+        written = 0
+        async with self.sessions() as db:
+            portfolio_ids = (await db.scalars(select(Portfolio.id).order_by(Portfolio.id))).all()
+            for i in range(0, len(portfolio_ids), CLOSE_BATCH_SIZE):
+                snapshots = []
+                for portfolio_id in portfolio_ids[i:i + CLOSE_BATCH_SIZE]:
+                    try:
+                        snapshots.append(await snapshot_store.get(db, portfolio_id, cache=False))
+                    except PortfolioNotFoundError:
+                        continue
+                symbols = sorted({s for snapshot in snapshots for s in snapshot.symbols})
+                bars = await self.prices.get_bars(symbols, background=True) if symbols else {}
+
+                rows = []
+                for snapshot in snapshots:
+                    closes = np.array(
+                        [bars[s].close if s in bars else np.nan for s in snapshot.symbols],
+                        dtype=np.float64,
+                    )
+                    row = measure(snapshot, closes)
+                    row["meta"]["trigger"] = CLOSE
+                    rows.append({"portfolio_id": snapshot.portfolio_id, "timestamp": closed_at, **row})
+                await self._write(db, rows, CLOSE)
+                written += len(rows)
+            await db.commit()
+        return written
+
+    async def _record_close_once(self, closed_at: datetime) -> bool:
+        """
+        Record a close unless another worker has claimed it, or records every close.
+
+        Returns:
+            Whether the close is recorded, by this worker or another
+
+        Raises:
+            MarketDataError: If closing prices could not be fetched
+        """
+        if not self.records_closes:
+            return True
+        key = f"{KEY_PREFIX}:risk_history:close:{closed_at.astimezone(timezone.utc).isoformat()}"
+        claimed = True
+        if self.redis is not None:
+            try:
+                claimed = await self.redis.set(key, CLOSE_RECORDING, nx=True, ex=CLOSE_CLAIM_SECONDS)
+                if not claimed:
+                    return await self.redis.get(key) == CLOSE_RECORDED
+            except Exception as e:
+                # Recording without the claim only risks a duplicate sweep.
+                logger.warning("Close claim failed", error=str(e))
+                claimed = False
+
+        try:
+            written = await self.record_close(closed_at)
+        except BaseException:
+            if claimed and self.redis is not None:
+                try:
+                    await self.redis.delete(key)
+                except Exception as e:
+                    logger.warning("Close claim release failed", error=str(e))
+            raise
+        logger.info("Market close recorded", closed_at=closed_at.isoformat(), portfolios=written)
+        if claimed and self.redis is not None:
+            try:
+                await self.redis.set(key, CLOSE_RECORDED, ex=CLOSE_MARKER_SECONDS)
+            except Exception as e:
+                logger.warning("Close marker not written", error=str(e))
+        return True
+
+    async def _check_close(self, now: Optional[datetime] = None) -> None:
+        """Record the latest close once, then advance the correlation universe."""
+        now = now or datetime.now(timezone.utc)
+        closed_at = self.calendar.last_close(now)
+        if closed_at == self._last_close:
+            return
+        if self.calendar.next_open(closed_at) <= now:
+            # The next session has opened, so the latest daily bars are no
+            # longer this close's (a worker starting mid-session).
+            logger.info("Close skipped after the next session opened", closed_at=closed_at.isoformat())
+            self._last_close = closed_at
+            return
+        try:
+            if not await self._record_close_once(closed_at):
+                return
+        except MarketDataError as e:
+            logger.warning("Closing prices unavailable; close not recorded", error=str(e))
+            return
+        self._last_close = closed_at
+        try:
+            await self.correlations.on_close()
+        except MarketDataError as e:
+            logger.warning("Correlation universe not advanced", error=str(e))
+
+    async def _run(self) -> None:
+        """Flush position changes after ``debounce`` and watch for closes."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.close_check_interval)
+                await asyncio.sleep(self.debounce)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                await self._check_close()
+            except Exception as e:
+                logger.error("Risk history recording failed", error=str(e), exc_info=True)
+
+    def start(self) -> None:
+        """Start the recording loop, claiming closes through the result cache's Redis, if any."""
+        backend = result_cache.backend
+        self.redis = backend.client if isinstance(backend, RedisCache) else None
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="risk-history")
+
+    async def stop(self) -> None:
+        """Stop the recording loop, recording pending position changes first."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Risk history flush on shutdown failed", error=str(e), exc_info=True)
+
+    def clear(self) -> None:
+        """Forget pending and recorded portfolios."""
+        self._dirty.clear()
+        self._recorded.clear()
+        self._last_close = None
+
+
+risk_history = RiskHistoryRecorder(
+    debounce=settings.RISK_HISTORY_DEBOUNCE_SECONDS,
+    close_check_interval=settings.RISK_HISTORY_CLOSE_CHECK_SECONDS,
+)
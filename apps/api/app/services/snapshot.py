@@ -0,0 +1,419 @@
+"""
+Columnar in-memory portfolio snapshots.
+
+A ``PortfolioSnapshot`` holds one contiguous, read-only NumPy buffer per
+position field, with symbols and sectors stored as interned integer codes.
+Snapshots are built once from column tuples (never hydrated ORM objects),
+kept in a process-wide ``SnapshotStore`` and shared by every analytic until a
+committed write to the portfolio or its positions invalidates them.
+
+Commits invalidate the store of the process that made them; the snapshot
+relay (``app.services.snapshot_relay``) forwards them to the other workers
+over Redis. Snapshots also expire after ``SNAPSHOT_TTL_SECONDS``, which
+bounds how stale a worker can be when it misses an invalidation, and the
+store keeps at most ``SNAPSHOT_MAX_ENTRIES`` of them in LRU order.
+"""
+
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import structlog
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.portfolio import Portfolio
+from app.models.position import Position
+from app.services.risk.calculator import PositionArrays
+
+logger = structlog.get_logger()
+
+_PENDING_KEY = "snapshot_invalidations"
+
+
+class PortfolioNotFoundError(LookupError):
+    """Raised when a portfolio id does not exist."""
+
+
+class CodeTable:
+    """
+    Interning table mapping strings to dense integer codes.
+
+    Code 0 is reserved for ``None`` so that nullable columns such as
+    ``sector`` need no separate mask.
+    """
+
+    __slots__ = ("_codes", "_names")
+
+    def __init__(self) -> None:
+        """Initialize the table with the reserved ``None`` entry."""
+        self._codes: Dict[Optional[str], int] = {None: 0}
+        self._names: List[Optional[str]] = [None]
+
+    def __len__(self) -> int:
+        """Return the number of distinct values, including ``None``."""
+        return len(self._names)
+
+    def encode(self, name: Optional[str]) -> int:
+        """Return the code for ``name``, assigning a new one if needed."""
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self._names)
+            name = sys.intern(name)
+            self._codes[name] = code
+            self._names.append(name)
+        return code
+
+    def encode_many(self, names: Iterable[Optional[str]]) -> np.ndarray:
+        """Encode a column of strings into an int32 array."""
+        encode = self.encode
+        return np.fromiter((encode(n) for n in names), dtype=np.int32)
+
+    def decode(self, code: int) -> Optional[str]:
+        """Return the string for ``code``."""
+        return self._names[code]
+
+    def decode_many(self, codes: np.ndarray) -> List[Optional[str]]:
+        """Decode an array of codes into strings."""
+        names = self._names
+        return [names[c] for c in codes.tolist()]
+
+
+symbol_codes = CodeTable()
+sector_codes = CodeTable()
+
+
+def _frozen(values, dtype) -> np.ndarray:
+    """Return a contiguous read-only array."""
+    array = np.ascontiguousarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class PortfolioSnapshot:
+    """Immutable columnar snapshot of one portfolio's positions."""
+
+    _COLUMNS = (
+        "position_id",
+        "symbol_code",
+        "sector_code",
+        "quantity",
+        "entry_price",
+        "stop_loss",
+        "current_price",
+    )
+
+    __slots__ = (
+        "portfolio_id",
+        "cash_balance",
+        "position_id",
+        "symbol_code",
+        "sector_code",
+        "quantity",
+        "entry_price",
+        "stop_loss",
+        "current_price",
+        "_content_hash",
+    )
+
+    def __init__(
+        self,
+        portfolio_id: int,
+        cash_balance: float,
+        rows: List[tuple],
+    ) -> None:
+        """
+        Build a snapshot from position rows.
+
+        Args:
+            portfolio_id: Portfolio the rows belong to
+            cash_balance: Portfolio cash balance
+            rows: ``(id, symbol, sector, quantity, entry_price, stop_loss,
+                current_price)`` tuples
+        """
+        self.portfolio_id = portfolio_id
+        self.cash_balance = float(cash_balance)
+
+        columns = list(zip(*rows)) if rows else [()] * 7
+        ids, symbols, sectors, qty, entry, stop, price = columns
+
+        self.position_id = _frozen(ids, np.int64)
+        self.symbol_code = _frozen(symbol_codes.encode_many(symbols), np.int32)
+        self.sector_code = _frozen(sector_codes.encode_many(sectors), np.int32)
+        self.quantity = _frozen(qty, np.float64)
+        self.entry_price = _frozen(entry, np.float64)
+        self.stop_loss = _frozen(np.array(stop, dtype=np.float64), np.float64)
+        current = np.array(price, dtype=np.float64)
+        self.current_price = _frozen(
+            np.where(np.isnan(current), self.entry_price, current), np.float64
+        )
+        self._content_hash: Optional[str] = None
+
+    def __len__(self) -> int:
+        """Return the number of positions."""
+        return len(self.position_id)
+
+    def __repr__(self) -> str:
+        """Return string representation of PortfolioSnapshot."""
+        return f"<PortfolioSnapshot(portfolio_id={self.portfolio_id}, positions={len(self)})>"
+
+    @property
+    def arrays(self) -> PositionArrays:
+        """Return the risk engine's view of the snapshot (no copy)."""
+        return PositionArrays(
+            quantity=self.quantity,
+            entry_price=self.entry_price,
+            stop_loss=self.stop_loss,
+            current_price=self.current_price,
+        )
+
+    def at_prices(self, prices: np.ndarray) -> "PortfolioSnapshot":
+        """
+        Return the snapshot valued at ``prices``, sharing every other column.
+
+        NaN keeps a position's stored price. The copy's content hash covers
+        the new prices, so results cached for it are keyed on them.
+        """
+        price = np.where(np.isnan(prices), self.current_price, prices)
+        if np.array_equal(price, self.current_price):
+            return self
+        snapshot = PortfolioSnapshot.__new__(PortfolioSnapshot)
+        for name in self.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        snapshot.current_price = _frozen(price, np.float64)
+        snapshot._content_hash = None
+        return snapshot
+
+    @property
+    def symbols(self) -> List[str]:
+        """Return decoded symbols in position order."""
+        return symbol_codes.decode_many(self.symbol_code)
+
+    @property
+    def sectors(self) -> List[Optional[str]]:
+        """Return decoded sectors in position order."""
+        return sector_codes.decode_many(self.sector_code)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the total size of the column buffers in bytes."""
+        return sum(getattr(self, name).nbytes for name in self._COLUMNS)
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Return a digest of the snapshot's contents.
+
+        Symbol and sector codes are process-local, so the decoded strings are
+        hashed instead to keep digests comparable across workers.
+        """
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(np.float64(self.cash_balance).tobytes())
+            for name in self._COLUMNS:
+                if name not in ("symbol_code", "sector_code"):
+                    digest.update(getattr(self, name).data)
+            digest.update("\x1f".join(map(str, self.symbols + self.sectors)).encode())
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+
+class SnapshotStore:
+    """
+    Process-wide cache of portfolio snapshots.
+
+    Each portfolio has a generation counter that is bumped on invalidation.
+    A build records the generation it started from and is discarded if an
+    invalidation lands while it is loading, so a slow reader can never
+    reinstate data that a concurrent writer has already replaced.
+
+    Snapshots older than ``ttl`` seconds are rebuilt on the next read, and
+    the least recently used snapshot is dropped once ``max_entries`` are
+    stored. Neither counts as an invalidation: listeners are not notified.
+    """
+
+    __slots__ = ("max_entries", "ttl", "clock", "_snapshots", "_generations", "_listeners")
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60.0, clock=time.monotonic) -> None:
+        """
+        Initialize an empty store.
+
+        Args:
+            max_entries: Maximum number of snapshots kept
+            ttl: Seconds a snapshot is served before it is rebuilt
+            clock: Monotonic clock returning seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._snapshots: "OrderedDict[int, Tuple[float, PortfolioSnapshot]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._listeners: List[Tuple[Callable[[int], None], bool]] = []
+
+    def __len__(self) -> int:
+        """Return the number of cached snapshots, including expired ones."""
+        return len(self._snapshots)
+
+    def peek(self, portfolio_id: int) -> Optional[PortfolioSnapshot]:
+        """Return the cached snapshot without loading it, ``None`` if missing or expired."""
+        entry = self._snapshots.get(portfolio_id)
+        if entry is None:
+            return None
+        built_at, snapshot = entry
+        if self.clock() - built_at >= self.ttl:
+            del self._snapshots[portfolio_id]
+            return None
+        return snapshot
+
+    def generation(self, portfolio_id: int) -> int:
+        """Return the invalidation generation for a portfolio."""
+        return self._generations.get(portfolio_id, 0)
+
+    async def get(self, db: AsyncSession, portfolio_id: int, cache: bool = True) -> PortfolioSnapshot:
+        """
+        Return the snapshot for a portfolio, building it on a miss.
+
+        Args:
+            db: Session used on a miss
+            portfolio_id: Portfolio to return
+            cache: Store a snapshot built on a miss; sweeps over every
+                portfolio pass ``False`` so they do not evict the working set
+
+        Raises:
+            PortfolioNotFoundError: If the portfolio does not exist
+        """
+        snapshot = self.peek(portfolio_id)
+        if snapshot is not None:
+            self._snapshots.move_to_end(portfolio_id)
+            return snapshot
+
+        generation = self.generation(portfolio_id)
+        built_at = self.clock()
+        snapshot = await self._load(db, portfolio_id)
+        if cache and self.generation(portfolio_id) == generation:
+            self._snapshots[portfolio_id] = (built_at, snapshot)
+            self._snapshots.move_to_end(portfolio_id)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def add_listener(self, listener: Callable[[int], None], local_only: bool = False) -> None:
+        """
+        Register a callback invoked with the portfolio id on invalidation.
+
+        Args:
+            listener: Callback taking the portfolio id
+            local_only: Skip invalidations relayed from other processes,
+                for work that only the writing process should do
+        """
+        self._listeners.append((listener, local_only))
+
+    def invalidate(self, portfolio_id: int, relayed: bool = False) -> None:
+        """
+        Drop the snapshot for a portfolio and notify listeners.
+
+        Args:
+            portfolio_id: Portfolio written
+            relayed: Whether the write happened in another process
+        """
+        self._generations[portfolio_id] = self.generation(portfolio_id) + 1
+        self._snapshots.pop(portfolio_id, None)
+        for listener, local_only in self._listeners:
+            if not (relayed and local_only):
+                listener(portfolio_id)
+
+    def clear(self, relayed: bool = False) -> None:
+        """Drop every snapshot."""
+        for portfolio_id in list(self._snapshots):
+            self.invalidate(portfolio_id, relayed)
+
+    @staticmethod
+    async def _load(db: AsyncSession, portfolio_id: int) -> PortfolioSnapshot:
+        """
+        Load column tuples for a portfolio and build its snapshot.
+
+        Snapshots are shared until invalidated, so they are read from the
+        primary even through a read-routed session: a lagging replica would
+        otherwise be cached for the snapshot's lifetime.
+        """
+        cash_balance = await db.scalar(
+            select(Portfolio.cash_balance).where(Portfolio.id == portfolio_id),
+            bind_arguments={"primary": True},
+        )
+        if cash_balance is None:
+            raise PortfolioNotFoundError(portfolio_id)
+
+        result = await db.execute(
+            select(
+                Position.id,
+                Position.symbol,
+                Position.sector,
+                Position.quantity,
+                Position.entry_price,
+                Position.stop_loss,
+                Position.current_price,
+            )
+            .where(Position.portfolio_id == portfolio_id)
+            .order_by(Position.id),
+            bind_arguments={"primary": True},
+        )
+        return PortfolioSnapshot(portfolio_id, cash_balance, result.all())
+
+
+snapshot_store = SnapshotStore(
+    max_entries=settings.SNAPSHOT_MAX_ENTRIES,
+    ttl=settings.SNAPSHOT_TTL_SECONDS,
+)
+
+
+def mark_portfolio_dirty(db: AsyncSession, portfolio_id: int) -> None:
+    """
+    Invalidate a portfolio's snapshot when ``db`` next commits.
+
+    ORM unit-of-work writes are tracked automatically; Core statements such
+    as bulk inserts bypass the flush and must call this instead.
+    """
+    db.info.setdefault(_PENDING_KEY, set()).add(portfolio_id)
+
+
+def _touched_portfolios(session: Session) -> Set[int]:
+    """
+    Return ids of portfolios whose rows are pending in a flush.
+
+    A position moved to another portfolio touches both: the previous id is
+    read from the attribute history.
+    """
+    touched = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Position):
+            history = inspect(obj).attrs.portfolio_id.history
+            touched.update(i for i in history.sum() if i is not None)
+        elif isinstance(obj, Portfolio) and obj.id is not None:
+            touched.add(obj.id)
+    return touched
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_invalidations(session: Session, flush_context, instances) -> None:
+    """Remember which portfolios a flush writes to."""
+    touched = _touched_portfolios(session)
+    if touched:
+        session.info.setdefault(_PENDING_KEY, set()).update(touched)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    """Invalidate snapshots for portfolios written in the committed transaction."""
+    for portfolio_id in session.info.pop(_PENDING_KEY, ()):
+        snapshot_store.invalidate(portfolio_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    """Forget pending invalidations when a transaction is rolled back."""
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,141 @@
+"""
+Cross-process snapshot invalidation.
+
+Committed writes invalidate the snapshot store of the worker that made them
+(see ``app.services.snapshot``). The relay publishes each of those
+invalidations on a Redis channel and applies the ones published by other
+workers, so every worker drops its snapshot, cached results and live
+dashboard state of a portfolio written elsewhere. Listeners registered as
+``local_only`` (the risk history recorder) only hear the writing process.
+
+Pub/sub delivery is at most once: messages published while a subscriber is
+reconnecting are lost. After reconnecting the relay clears its store, and
+the snapshot TTL bounds staleness in the meantime. Without Redis the relay
+stays idle and only the TTL applies.
+"""
+
+import asyncio
+import uuid
+from typing import Optional, Set
+
+import structlog
+
+from app.cache import KEY_PREFIX, RedisCache, result_cache
+from app.services.snapshot import SnapshotStore, snapshot_store
+
+logger = structlog.get_logger()
+
+CHANNEL = f"{KEY_PREFIX}:snapshot:invalidate"
+
+
+class SnapshotRelay:
+    """Publishes this process's snapshot invalidations and applies other processes'."""
+
+    def __init__(self, store: SnapshotStore = snapshot_store, channel: str = CHANNEL, retry: float = 1.0):
+        """
+        Initialize the relay.
+
+        Args:
+            store: Snapshot store to keep in step
+            channel: Redis channel carrying invalidations
+            retry: Seconds to wait before resubscribing after a failure
+        """
+        self.store = store
+        self.channel = channel
+        self.retry = retry
+        self.origin = uuid.uuid4().hex
+        self.client = None
+        self._task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        store.add_listener(self._on_invalidate, local_only=True)
+
+    def _on_invalidate(self, portfolio_id: int) -> None:
+        """Publish a local invalidation; runs inside ``after_commit``."""
+        if self.client is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.publish(portfolio_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def publish(self, portfolio_id: int) -> None:
+        """Tell the other workers that a portfolio was written."""
+        try:
+            await self.client.publish(self.channel, f"{self.origin}:{portfolio_id}")
+        except Exception as e:
+            logger.warning("Snapshot invalidation publish failed", portfolio_id=portfolio_id, error=str(e))
+
+    def apply(self, message: str) -> None:
+        """Apply an invalidation published by another worker."""
+        origin, _, portfolio_id = message.partition(":")
+        if origin == self.origin:
+            return
+        self.store.invalidate(int(portfolio_id), relayed=True)
+
+    def _resync(self) -> None:
+        """Drop every snapshot; invalidations may have been missed."""
+        self.store.clear(relayed=True)
+
+    async def _listen(self) -> None:
+        """Apply invalidations from the channel until cancelled, resubscribing on failure."""
+        subscribed = False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                if subscribed:
+                    self._resync()
+                subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.apply(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Snapshot invalidation subscription failed", error=str(e))
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(self.retry)
+
+    def start(self, client) -> None:
+        """
+        Start relaying over ``client``.
+
+        Args:
+            client: ``redis.asyncio.Redis`` compatible client with ``decode_responses=True``
+        """
+        self.client = client
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(), name="snapshot-relay")
+
+    async def stop(self) -> None:
+        """Stop relaying and wait for pending publishes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.client = None
+
+
+snapshot_relay = SnapshotRelay()
+
+
+async def init_snapshot_relay() -> None:
+    """Relay snapshot invalidations over the result cache's Redis connection, if it has one."""
+    backend = result_cache.backend
+    if isinstance(backend, RedisCache):
+        snapshot_relay.start(backend.client)
+    logger.info("Snapshot relay ready", shared=snapshot_relay.client is not None)
+
+
+async def close_snapshot_relay() -> None:
+    """Stop relaying snapshot invalidations."""
+    await snapshot_relay.stop()
@@ -0,0 +1,324 @@
+"""
+Historical stress scenarios (US-026).
+
+Scenarios such as the 2008 crisis or the COVID crash are defined as price
+shocks by sector, with per-beta-bucket multipliers and per-symbol overrides
+(ETFs, single names). They are compiled once into a dense shock matrix with
+one row per scenario and one column per shock key:
+
+* one column per (sector, beta bucket) cell, the sector shock times the
+  bucket multiplier, with an "other" sector row using the market shock;
+* one column per overridden symbol.
+
+Each position maps to exactly one column (its symbol if overridden, else its
+sector and beta cell), so applying every scenario to a portfolio is a
+``bincount`` of market values into columns followed by a single
+matrix-vector product, independent of the number of scenarios in Python.
+
+Compiled sets are saved as an uncompressed ``.npz`` with plain arrays (no
+pickles) and loaded once at startup:
+
+    python -m app.services.stress definitions.json scenarios.npz
+"""
+
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import structlog
+
+from app.services.snapshot import PortfolioSnapshot, sector_codes, symbol_codes
+
+logger = structlog.get_logger()
+
+BUILTIN_SCENARIOS = Path(__file__).with_name("stress_scenarios.json")
+FORMAT_VERSION = 1
+DEFAULT_BETA = 1.0
+
+
+def _normalize(name: Optional[str]) -> str:
+    """Return the lookup form of a sector or symbol name."""
+    return (name or "").strip().upper()
+
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    """Portfolio P&L under one scenario."""
+
+    name: str
+    title: str
+    description: str
+    pnl: float
+    pnl_percent: float
+    portfolio_value_after: float
+
+    def dict(self) -> dict:
+        """Convert result to a dictionary."""
+        return asdict(self)
+
+
+class ScenarioSet:
+    """
+    Compiled stress scenarios.
+
+    ``shocks`` has shape ``(scenarios, columns)``; columns are the
+    ``len(sectors) x len(multipliers)`` sector/beta cells in row-major order
+    followed by one column per symbol override. Sector row 0 is "other".
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        titles: Sequence[str],
+        descriptions: Sequence[str],
+        sector_keys: Sequence[str],
+        sector_rows: Sequence[int],
+        symbols: Sequence[str],
+        bucket_edges: Sequence[float],
+        shocks: np.ndarray,
+    ):
+        """
+        Initialize a compiled set; use ``compile`` or ``load`` to build one.
+
+        Args:
+            names: Scenario identifiers
+            titles: Human-readable scenario titles
+            descriptions: Scenario descriptions
+            sector_keys: Normalized sector names and aliases
+            sector_rows: Sector row of each key
+            symbols: Normalized overridden symbols, in column order
+            bucket_edges: Increasing beta bucket boundaries
+            shocks: Shock matrix of shape ``(scenarios, columns)``
+        """
+        self.names = list(names)
+        self.titles = list(titles)
+        self.descriptions = list(descriptions)
+        self.bucket_edges = np.asarray(bucket_edges, dtype=np.float64)
+        self.buckets = len(self.bucket_edges) + 1
+        self.shocks = np.ascontiguousarray(shocks, dtype=np.float64)
+        self.shocks.flags.writeable = False
+        self.symbols = list(symbols)
+        self.cells = self.shocks.shape[1] - len(self.symbols)
+
+        self._sector_rows = dict(zip(sector_keys, (int(r) for r in sector_rows)))
+        self._symbol_columns = {s: self.cells + i for i, s in enumerate(self.symbols)}
+        # Process-local code -> sector row / symbol column, grown with the code tables.
+        self._rows_by_code = np.zeros(0, dtype=np.intp)
+        self._columns_by_code = np.zeros(0, dtype=np.intp)
+
+        if len(self.names) != self.shocks.shape[0]:
+            raise ValueError(f"{len(self.names)} scenario names for {self.shocks.shape[0]} shock rows")
+        if self.cells <= 0 or self.cells % self.buckets:
+            raise ValueError(f"{self.cells} sector cells is not a multiple of {self.buckets} beta buckets")
+
+    def __len__(self) -> int:
+        """Return the number of scenarios."""
+        return len(self.names)
+
+    @classmethod
+    def compile(cls, definitions: Dict[str, Any]) -> "ScenarioSet":
+        """
+        Compile scenario definitions (the ``stress_scenarios.json`` layout).
+
+        Each cell shock is the scenario's sector shock (its ``market`` shock
+        for unlisted sectors) times the beta bucket multiplier, floored at
+        a total loss. Symbol overrides are used as given.
+        """
+        buckets = definitions.get("beta_buckets", {})
+        edges = [float(e) for e in buckets.get("edges", (0.8, 1.2))]
+        multipliers = np.asarray(buckets.get("multipliers", (0.7, 1.0, 1.3)), dtype=np.float64)
+        if len(multipliers) != len(edges) + 1 or edges != sorted(edges):
+            raise ValueError("beta_buckets needs increasing edges and one more multiplier than edges")
+
+        scenarios = definitions["scenarios"]
+        sectors: List[str] = [""]
+        symbols: List[str] = []
+        for scenario in scenarios:
+            for sector in scenario.get("sectors", {}):
+                if _normalize(sector) not in sectors:
+                    sectors.append(_normalize(sector))
+            for symbol in scenario.get("symbols", {}):
+                if _normalize(symbol) not in symbols:
+                    symbols.append(_normalize(symbol))
+
+        sector_keys = list(sectors)
+        sector_rows = list(range(len(sectors)))
+        for alias, target in definitions.get("sector_aliases", {}).items():
+            if _normalize(target) in sectors:
+                sector_keys.append(_normalize(alias))
+                sector_rows.append(sectors.index(_normalize(target)))
+
+        cells = len(sectors) * len(multipliers)
+        shocks = np.zeros((len(scenarios), cells + len(symbols)))
+        for row, scenario in enumerate(scenarios):
+            market = float(scenario.get("market", 0.0))
+            by_sector = np.full(len(sectors), market)
+            for sector, shock in scenario.get("sectors", {}).items():
+                by_sector[sectors.index(_normalize(sector))] = float(shock)
+            shocks[row, :cells] = np.maximum(np.outer(by_sector, multipliers), -1.0).ravel()
+            # Symbols a scenario does not override move with the market.
+            shocks[row, cells:] = market
+            for symbol, shock in scenario.get("symbols", {}).items():
+                shocks[row, cells + symbols.index(_normalize(symbol))] = float(shock)
+
+        return cls(
+            names=[s["name"] for s in scenarios],
+            titles=[s.get("title", s["name"]) for s in scenarios],
+            descriptions=[s.get("description", "") for s in scenarios],
+            sector_keys=sector_keys,
+            sector_rows=sector_rows,
+            symbols=symbols,
+            bucket_edges=edges,
+            shocks=shocks,
+        )
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path] = BUILTIN_SCENARIOS) -> "ScenarioSet":
+        """Compile a JSON definitions file."""
+        with open(path, encoding="utf-8") as f:
+            return cls.compile(json.load(f))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the compiled set as an uncompressed ``.npz``."""
+        keys = list(self._sector_rows)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                version=np.int32(FORMAT_VERSION),
+                names=np.array(self.names, dtype=str),
+                titles=np.array(self.titles, dtype=str),
+                descriptions=np.array(self.descriptions, dtype=str),
+                sector_keys=np.array(keys, dtype=str),
+                sector_rows=np.array([self._sector_rows[k] for k in keys], dtype=np.int32),
+                symbols=np.array(self.symbols, dtype=str),
+                bucket_edges=self.bucket_edges,
+                shocks=self.shocks.astype(np.float32),
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ScenarioSet":
+        """
+        Read a set written by ``save``.
+
+        Raises:
+            ValueError: If the file has an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported scenario file version {version}")
+            return cls(
+                names=data["names"].tolist(),
+                titles=data["titles"].tolist(),
+                descriptions=data["descriptions"].tolist(),
+                sector_keys=data["sector_keys"].tolist(),
+                sector_rows=data["sector_rows"].tolist(),
+                symbols=data["symbols"].tolist(),
+                bucket_edges=data["bucket_edges"],
+                shocks=data["shocks"],
+            )
+
+    def _sync_codes(self) -> None:
+        """Extend the code lookups to cover codes interned since the last call."""
+        if len(self._rows_by_code) < len(sector_codes):
+            start = len(self._rows_by_code)
+            rows = [self._sector_rows.get(_normalize(sector_codes.decode(c)), 0)
+                    for c in range(start, len(sector_codes))]
+            self._rows_by_code = np.concatenate([self._rows_by_code, np.array(rows, dtype=np.intp)])
+        if len(self._columns_by_code) < len(symbol_codes):
+            start = len(self._columns_by_code)
+            columns = [self._symbol_columns.get(_normalize(symbol_codes.decode(c)), -1)
+                       for c in range(start, len(symbol_codes))]
+            self._columns_by_code = np.concatenate([self._columns_by_code, np.array(columns, dtype=np.intp)])
+
+    def columns(self, snapshot: PortfolioSnapshot, betas: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return the shock column of every position.
+
+        Args:
+            snapshot: Portfolio snapshot
+            betas: Optional beta per position (default ``DEFAULT_BETA``)
+        """
+        self._sync_codes()
+        if betas is None:
+            bucket = int(np.searchsorted(self.bucket_edges, DEFAULT_BETA, side="right"))
+        else:
+            bucket = np.searchsorted(self.bucket_edges, np.asarray(betas, dtype=np.float64), side="right")
+        cells = self._rows_by_code[snapshot.sector_code] * self.buckets + bucket
+        symbol_columns = self._columns_by_code[snapshot.symbol_code]
+        return np.where(symbol_columns >= 0, symbol_columns, cells)
+
+    def pnl(self, snapshot: PortfolioSnapshot, betas: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return the dollar P&L of ``snapshot`` under every scenario."""
+        exposure = np.bincount(
+            self.columns(snapshot, betas),
+            weights=snapshot.quantity * snapshot.current_price,
+            minlength=self.shocks.shape[1],
+        )
+        return self.shocks @ exposure
+
+    def run(self, snapshot: PortfolioSnapshot, betas: Optional[np.ndarray] = None) -> List[ScenarioResult]:
+        """
+        Apply every scenario to a portfolio, worst first.
+
+        Cash is not shocked; percentages are of the pre-shock portfolio value.
+        """
+        pnl = self.pnl(snapshot, betas)
+        value = float(np.dot(snapshot.quantity, snapshot.current_price)) + snapshot.cash_balance
+        return [
+            ScenarioResult(
+                name=self.names[i],
+                title=self.titles[i],
+                description=self.descriptions[i],
+                pnl=round(float(pnl[i]), 2),
+                pnl_percent=round(float(pnl[i]) / value * 100.0, 4) if value > 0 else 0.0,
+                portfolio_value_after=round(value + float(pnl[i]), 2),
+            )
+            for i in np.argsort(pnl, kind="stable")
+        ]
+
+
+class StressTester:
+    """Holder of the scenario set loaded at startup."""
+
+    def __init__(self, scenarios: ScenarioSet, source: Optional[str] = None):
+        """
+        Initialize with a compiled scenario set.
+
+        Args:
+            scenarios: Compiled scenarios
+            source: File the set was loaded from, ``None`` for the built-in definitions
+        """
+        self.scenarios = scenarios
+        self.source = source
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Load a compiled scenario file, or compile the built-in definitions.
+
+        A set already loaded from the same source is kept, so workers forked
+        by the launcher share the parent's copy instead of each building one.
+        """
+        if (path or None) == self.source:
+            return
+        self.scenarios = ScenarioSet.load(path) if path else ScenarioSet.from_json()
+        self.source = path or None
+        logger.info("Stress scenarios loaded", scenarios=len(self.scenarios), source=path or "builtin")
+
+    def run(self, snapshot: PortfolioSnapshot, betas: Optional[np.ndarray] = None) -> List[ScenarioResult]:
+        """Apply every scenario to a portfolio, worst first."""
+        return self.scenarios.run(snapshot, betas)
+
+
+stress_tester = StressTester(ScenarioSet.from_json())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.services.stress DEFINITIONS.json OUTPUT.npz")
+    compiled = ScenarioSet.from_json(sys.argv[1])
+    compiled.save(sys.argv[2])
+    print(f"Compiled {len(compiled)} scenarios into {sys.argv[2]}")
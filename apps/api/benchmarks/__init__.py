@@ -0,0 +1,6 @@
+"""
+Micro-benchmarks package.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from ``apps/api``
+and prints a plain-text timing table.
+"""
@@ -0,0 +1,106 @@
+"""
+Bulk position write benchmark.
+
+Compares one-ORM-object-per-lot inserts with the bulk upsert paths on the
+SQLite engine used by the test suite and, when ``--postgres-url`` is given,
+on PostgreSQL (where the COPY path is also measured).
+
+Usage:
+    python -m benchmarks.bench_bulk_insert [--lots N] [--postgres-url URL]
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Portfolio, Position, User
+from app.services.positions import upsert_positions
+
+SQLITE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+def make_lots(n: int) -> list:
+    """Generate ``n`` distinct lots."""
+    return [
+        {
+            "symbol": f"S{i % 5000}",
+            "lot": str(i // 5000),
+            "quantity": float(i % 500 + 1),
+            "entry_price": 10.0 + i % 90,
+            "stop_loss": 9.0 + i % 90,
+            "current_price": 11.0 + i % 90,
+            "sector": "Technology",
+        }
+        for i in range(n)
+    ]
+
+
+async def orm_add(db: AsyncSession, portfolio_id: int, lots: list) -> None:
+    """Insert lots one ORM object at a time."""
+    for row in lots:
+        db.add(Position(portfolio_id=portfolio_id, **row))
+    await db.flush()
+
+
+async def run(url: str, n: int) -> None:
+    """Time every available write path against ``url``."""
+    kwargs = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}
+    engine = create_async_engine(url, **kwargs)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    lots = make_lots(n)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with sessions() as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        portfolio = Portfolio(user_id=user.id, name="bench", cash_balance=0.0)
+        db.add(portfolio)
+        await db.commit()
+        portfolio_id = portfolio.id
+
+    paths = {
+        "orm add": lambda db: orm_add(db, portfolio_id, lots),
+        "upsert insert": lambda db: upsert_positions(db, portfolio_id, lots, use_copy=False),
+    }
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg":
+        paths["upsert copy"] = lambda db: upsert_positions(db, portfolio_id, lots, use_copy=True)
+
+    print(f"{engine.dialect.name} ({n:,} lots)")
+    for name, write in paths.items():
+        async with sessions() as db:
+            await db.execute(delete(Position))
+            await db.commit()
+            start = time.perf_counter()
+            await write(db)
+            await db.commit()
+            elapsed = time.perf_counter() - start
+        print(f"  {name:<14} {elapsed:>8.3f}s {n / elapsed:>12,.0f} lots/s")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lots", type=int, default=50_000)
+    parser.add_argument("--postgres-url", help="postgresql+asyncpg:// URL of a scratch database")
+    args = parser.parse_args()
+
+    asyncio.run(run(SQLITE_URL, args.lots))
+    if args.postgres_url:
+        asyncio.run(run(args.postgres_url, args.lots))
+
+
+if __name__ == "__main__":
+    main()
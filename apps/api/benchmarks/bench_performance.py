@@ -0,0 +1,89 @@
+"""
+Performance kernel benchmark.
+
+Compares the single-pass kernels with a naive recompute of every window
+from its own slice:
+
+* summary: return, volatility, Sharpe and maximum drawdown for the 1M, 3M,
+  6M, 1Y and 3Y trailing windows of one value series (array and generator
+  input).
+* rolling: the 1Y rolling volatility at every day of the series.
+
+Usage:
+    python -m benchmarks.bench_performance [--repeat N]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.services.risk import WINDOWS, performance_summary, rolling_mean_std
+
+LENGTHS = (1_000, 10_000, 100_000)
+ROLLING_WINDOW = WINDOWS["1Y"]
+
+
+def make_values(days: int, seed: int = 0) -> np.ndarray:
+    """Generate a random-walk portfolio value series."""
+    rng = np.random.default_rng(seed)
+    return 100_000.0 * np.cumprod(1.0 + rng.normal(0.0004, 0.012, days))
+
+
+def naive_summary(values: np.ndarray) -> dict:
+    """Recompute every window from its slice, one pass per statistic."""
+    result = {}
+    for name, days in WINDOWS.items():
+        if days >= len(values):
+            continue
+        window = values[-1 - days:]
+        returns = window[1:] / window[:-1] - 1.0
+        std = returns.std(ddof=1)
+        result[name] = (
+            window[-1] / window[0] - 1.0,
+            std * math.sqrt(252),
+            returns.mean() / std * math.sqrt(252),
+            float((1.0 - window / np.maximum.accumulate(window)).max()),
+        )
+    return result
+
+
+def naive_rolling_std(returns: np.ndarray, window: int) -> np.ndarray:
+    """Standard deviation of each window recomputed from its slice."""
+    return np.array([returns[i:i + window].std(ddof=1) for i in range(len(returns) - window + 1)])
+
+
+def best_of(fn, repeat: int) -> float:
+    """Return the best wall time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    columns = ("naive summary", "array", "generator", "naive rolling", "cumsum rolling")
+    print(f"{'days':>10} " + " ".join(f"{c:>15}" for c in columns))
+    for n in LENGTHS:
+        values = make_values(n)
+        returns = values[1:] / values[:-1] - 1.0
+        timings = (
+            best_of(lambda: naive_summary(values), args.repeat),
+            best_of(lambda: performance_summary(values), args.repeat),
+            best_of(lambda: performance_summary(float(v) for v in values), args.repeat),
+            best_of(lambda: naive_rolling_std(returns, ROLLING_WINDOW), 1),
+            best_of(lambda: rolling_mean_std(returns, ROLLING_WINDOW), args.repeat),
+        )
+        print(f"{n:>10,} " + " ".join(f"{t * 1e3:>13.3f}ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
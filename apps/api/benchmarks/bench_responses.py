@@ -0,0 +1,147 @@
+"""
+JSON response benchmark.
+
+Serves the same payload through three routes of an in-process ASGI app and
+reports the wall time per request:
+
+* stdlib: response-model validation, ``jsonable_encoder`` and the stdlib
+  ``json`` module (FastAPI's ``JSONResponse``; the previous default).
+* orjson: validation and ``jsonable_encoder``, rendered by ``FastJSONResponse``
+  (the current default).
+* trusted: ``trusted_output``, rendering the endpoint's value, NumPy arrays
+  included, with orjson and no validation.
+
+Payloads are a holdings correlation matrix, a downsampled risk history and
+a position list.
+
+Usage:
+    python -m benchmarks.bench_responses [--repeat N]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient
+
+from app.responses import FastJSONResponse, trusted_output
+from app.schemas.correlation import CorrelationMatrix
+from app.schemas.position import PositionBulkCreate
+from app.schemas.risk import RiskHistory
+
+
+def correlation_payload(n: int, as_array: bool) -> dict:
+    """Return a correlation matrix of ``n`` symbols."""
+    rng = np.random.default_rng(0)
+    matrix = np.round(np.corrcoef(rng.normal(size=(n, 300))), 6)
+    return {
+        "portfolio_id": 1,
+        "symbols": [f"S{i:04d}" for i in range(n)],
+        "matrix": matrix if as_array else matrix.tolist(),
+        "high_correlation_pairs": [],
+        "missing_symbols": [],
+        "observations": 252,
+        "window": 252,
+        "calculated_at": datetime.utcnow(),
+    }
+
+
+def history_payload(points: int) -> dict:
+    """Return a risk history of ``points`` points."""
+    end = datetime.now(timezone.utc)
+    return {
+        "portfolio_id": 1,
+        "range": "1Y",
+        "start": end - timedelta(days=365),
+        "end": end,
+        "snapshots": points,
+        "points": [
+            {
+                "timestamp": end - timedelta(hours=i),
+                "portfolio_value": 100_000.0 + i,
+                "total_risk_dollars": 2_000.0 + i,
+                "total_risk_percent": 2.0,
+                "max_concentration": 12.5,
+            }
+            for i in range(points)
+        ],
+    }
+
+
+def positions_payload(rows: int) -> dict:
+    """Return a list of ``rows`` position lots."""
+    return {
+        "positions": [
+            {"symbol": f"S{i % 500:04d}", "lot": f"L{i}", "quantity": 100.0, "entry_price": 50.0,
+             "stop_loss": 45.0, "current_price": 52.5, "sector": "Technology"}
+            for i in range(rows)
+        ],
+    }
+
+
+PAYLOADS = {
+    "correlation 100": (CorrelationMatrix, lambda array: correlation_payload(100, array)),
+    "correlation 500": (CorrelationMatrix, lambda array: correlation_payload(500, array)),
+    "history 1000": (RiskHistory, lambda array: history_payload(1000)),
+    "positions 10k": (PositionBulkCreate, lambda array: positions_payload(10_000)),
+}
+
+
+def make_app() -> FastAPI:
+    """Build an app with stdlib, orjson and trusted routes per payload."""
+    app = FastAPI(default_response_class=FastJSONResponse)
+    for i, (model, build) in enumerate(PAYLOADS.values()):
+        plain, native = build(False), build(True)
+
+        async def stdlib(plain=plain):
+            return plain
+
+        async def orjson(plain=plain):
+            return plain
+
+        @trusted_output
+        async def trusted(native=native):
+            return native
+
+        app.get(f"/{i}/stdlib", response_model=model, response_class=JSONResponse)(stdlib)
+        app.get(f"/{i}/orjson", response_model=model)(orjson)
+        app.get(f"/{i}/trusted", response_model=model)(trusted)
+    return app
+
+
+async def best_of(client: AsyncClient, path: str, repeat: int) -> float:
+    """Return the best wall time of ``repeat`` requests, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        best = min(best, time.perf_counter() - start)
+        response.raise_for_status()
+    return best
+
+
+async def run(repeat: int) -> None:
+    """Run the benchmark and print a table."""
+    columns = ("stdlib", "orjson", "trusted", "speedup")
+    print(f"{'payload':>16} " + " ".join(f"{c:>12}" for c in columns))
+    async with AsyncClient(app=make_app(), base_url="http://bench") as client:
+        for i, name in enumerate(PAYLOADS):
+            timings = [await best_of(client, f"/{i}/{route}", repeat) for route in columns[:3]]
+            print(f"{name:>16} " + " ".join(f"{t * 1e3:>10.2f}ms" for t in timings)
+                  + f" {timings[0] / timings[2]:>11.1f}x")
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
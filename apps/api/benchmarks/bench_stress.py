@@ -0,0 +1,83 @@
+"""
+Stress scenario benchmark.
+
+Measures wall time of applying every scenario to one portfolio against
+portfolio size and scenario count, with synthetic scenarios over the
+built-in sectors and a symbol override per scenario.
+
+Usage:
+    python -m benchmarks.bench_stress [--repeat N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.snapshot import PortfolioSnapshot
+from app.services.stress import ScenarioSet
+
+SIZES = (10, 1_000, 100_000)
+SCENARIO_COUNTS = (5, 100, 1_000)
+SECTORS = (
+    "Information Technology", "Financials", "Health Care", "Energy", "Industrials",
+    "Consumer Discretionary", "Consumer Staples", "Utilities", "Materials",
+    "Real Estate", "Communication Services",
+)
+
+
+def make_scenarios(count: int, seed: int = 0) -> ScenarioSet:
+    """Compile ``count`` random sector scenarios."""
+    rng = np.random.default_rng(seed)
+    return ScenarioSet.compile({"scenarios": [
+        {
+            "name": f"s{i}",
+            "market": float(rng.uniform(-0.5, 0.2)),
+            "sectors": {s: float(rng.uniform(-0.8, 0.3)) for s in SECTORS},
+            "symbols": {f"SYM{i}": -1.0},
+        }
+        for i in range(count)
+    ]})
+
+
+def make_snapshot(positions: int, seed: int = 0) -> PortfolioSnapshot:
+    """Build a snapshot with random sectors and prices."""
+    rng = np.random.default_rng(seed)
+    sectors = rng.choice(SECTORS + (None,), positions)
+    rows = [
+        (i, f"SYM{i}", sectors[i], float(q), float(p), None, float(p))
+        for i, (q, p) in enumerate(zip(rng.integers(1, 500, positions), rng.uniform(5, 500, positions)))
+    ]
+    return PortfolioSnapshot(1, 10_000.0, rows)
+
+
+def best_of(fn, repeat: int) -> float:
+    """Return the best wall time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    scenario_sets = {count: make_scenarios(count) for count in SCENARIO_COUNTS}
+    print(f"{'positions':>10} " + " ".join(f"{f'{c} scen.':>12}" for c in SCENARIO_COUNTS))
+    for n in SIZES:
+        snapshot = make_snapshot(n)
+        timings = []
+        for count in SCENARIO_COUNTS:
+            scenarios = scenario_sets[count]
+            scenarios.run(snapshot)  # warm the code lookups
+            timings.append(best_of(lambda: scenarios.run(snapshot), args.repeat))
+        print(f"{n:>10,} " + " ".join(f"{t * 1e3:>10.3f}ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Bulk validation benchmark.
+
+Validates the same list of rows three ways and reports the cost per row:
+
+* per-row: one model instantiation and ``model_dump`` per row (how the bulk
+  upsert and CSV import handled rows before).
+* model: the list validated inside its container model
+  (``PositionBulkCreate``, what FastAPI does with the request body), then
+  one ``model_dump`` per row.
+* adapter: one ``TypeAdapter`` call to validate and one to dump the whole
+  list (``POSITION_LIST`` / ``IMPORT_ROWS``).
+
+Position rows are typed JSON values; import rows are the raw strings read
+from a CSV file, currency formatting included.
+
+Usage:
+    python -m benchmarks.bench_validation [--rows N [N ...]] [--repeat N]
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+from app.schemas.imports import IMPORT_ROWS, ImportRow
+from app.schemas.position import POSITION_LIST, PositionBulkCreate, PositionCreate
+
+
+def position_rows(rows: int) -> List[dict]:
+    """Return ``rows`` position lots as decoded JSON."""
+    return [
+        {"symbol": f"S{i % 500:04d}", "lot": f"L{i}", "quantity": 100.0, "entry_price": 50.0,
+         "stop_loss": 45.0, "current_price": 52.5, "sector": "Technology"}
+        for i in range(rows)
+    ]
+
+
+def import_rows(rows: int) -> List[dict]:
+    """Return ``rows`` CSV rows as read by ``csv.DictReader``."""
+    return [
+        {"symbol": f"s{i % 500:04d}", "lot": "" if i % 2 else f"L{i}", "quantity": "1,000",
+         "entry_price": "$50.25", "stop_loss": "" if i % 3 else "45", "current_price": "52.50",
+         "sector": "Technology"}
+        for i in range(rows)
+    ]
+
+
+COLUMNS = ("per-row", "model", "adapter")
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Return the best wall time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows: int, repeat: int) -> None:
+    """Run the benchmark at ``rows`` rows and print its table rows."""
+    positions, imports = position_rows(rows), import_rows(rows)
+    cases = {
+        "positions": {
+            "per-row": lambda: [PositionCreate(**row).model_dump() for row in positions],
+            "model": lambda: [p.model_dump() for p in PositionBulkCreate.model_validate(
+                {"positions": positions}).positions],
+            "adapter": lambda: POSITION_LIST.dump_python(POSITION_LIST.validate_python(positions)),
+        },
+        "import rows": {
+            "per-row": lambda: [ImportRow(**row).model_dump() for row in imports],
+            "model": None,
+            "adapter": lambda: IMPORT_ROWS.dump_python(IMPORT_ROWS.validate_python(imports)),
+        },
+    }
+
+    for name, fns in cases.items():
+        timings = {k: best_of(fn, repeat) * 1e6 / rows for k, fn in fns.items() if fn is not None}
+        cells = [f"{timings[c]:>8.2f}us" if c in timings else f"{'-':>10}" for c in COLUMNS]
+        speedup = timings["per-row"] / timings["adapter"]
+        print(f"{name:>12} {rows:>8} " + " ".join(cells) + f" {speedup:>9.1f}x")
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    columns = COLUMNS + ("speedup",)
+    print("microseconds per row")
+    print(f"{'payload':>12} {'rows':>8} " + " ".join(f"{c:>10}" for c in columns))
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,26 @@ This module contains shared fixtures and configuration for all tests.
 """
 
 import asyncio
+import itertools
 import pytest
 import pytest_asyncio
-from typing import AsyncGenerator, Generator
+from typing import AsyncGenerator, Awaitable, Callable, Generator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db, get_read_sessionmaker, get_sessionmaker
+from app.monitoring import system_sampler
+from app.cache import result_cache
 from app.config import settings
+from app.models import Portfolio, Position, User
+from app.services.correlation import correlation_service
+from app.services.correlation_feed import correlation_feed
+from app.services.live import dashboard_hub
+from app.services.risk_history import risk_history
+from app.services.market_data import FakeQuoteProvider, QuoteClient, price_cache
+from app.services.snapshot import PortfolioSnapshot, snapshot_store
 
 # Test database URL - using SQLite for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -55,6 +65,16 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
+    # Forget in-memory state tied to the dropped rows
+    snapshot_store.clear()
+    correlation_service.clear()
+    correlation_feed.clear()
+    price_cache.clear()
+    dashboard_hub.clear()
+    risk_history.clear()
+    await result_cache.backend.close()
+    system_sampler.reset()
+
 
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
@@ -73,12 +93,72 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     
     # Override the dependency
     app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_read_db] = get_test_db
+    app.dependency_overrides[get_sessionmaker] = lambda: TestAsyncSessionLocal
+    app.dependency_overrides[get_read_sessionmaker] = lambda: TestAsyncSessionLocal
+    # The health sampler opens its own sessions.
+    session_factory = system_sampler.session_factory
+    system_sampler.session_factory = TestAsyncSessionLocal
     
     async with AsyncClient(app=app, base_url="http://testserver") as test_client:
         yield test_client
     
     # Clean up
     app.dependency_overrides.clear()
+    system_sampler.session_factory = session_factory
+
+
+@pytest.fixture
+def create_portfolio(db_session: AsyncSession) -> Callable[..., Awaitable[Portfolio]]:
+    """
+    Return a factory for committed portfolios, each owned by a new user.
+
+    The factory takes ``Position`` column values for each lot and an
+    optional ``cash_balance``.
+    """
+    owners = itertools.count(1)
+
+    async def create(*positions: dict, cash_balance: float = 0.0) -> Portfolio:
+        n = next(owners)
+        user = User(email=f"trader{n}@example.com", username=f"trader{n}", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=cash_balance)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all([Position(portfolio_id=portfolio.id, **lot) for lot in positions])
+        await db_session.commit()
+        return portfolio
+
+    return create
+
+
+@pytest.fixture
+def make_snapshot() -> Callable[..., PortfolioSnapshot]:
+    """Return a builder of in-memory snapshots from ``(symbol, sector, quantity, price)`` rows."""
+
+    def build(rows, cash: float = 0.0) -> PortfolioSnapshot:
+        return PortfolioSnapshot(
+            1, cash, [(i, s, sec, q, p, None, p) for i, (s, sec, q, p) in enumerate(rows)]
+        )
+
+    return build
+
+
+@pytest.fixture
+def quotes() -> Generator[FakeQuoteProvider, None, None]:
+    """
+    Serve the application's price cache from a fake provider.
+
+    Yields:
+        FakeQuoteProvider: Provider whose ``prices`` fix the quotes analytics use
+    """
+    client = price_cache.client
+    provider = FakeQuoteProvider()
+    price_cache.client = QuoteClient(provider, batch_window=0)
+    yield provider
+    price_cache.client = client
+    price_cache.clear()
 
 
 @pytest.fixture(scope="session")
@@ -101,7 +181,7 @@ def mock_settings():
     
     Returns settings with testing configuration.
     """
-    test_settings = settings.copy(update={
+    test_settings = settings.model_copy(update={
         "TESTING": True,
         "DEBUG": True,
         "SQLALCHEMY_DATABASE_URI": TEST_DATABASE_URL,
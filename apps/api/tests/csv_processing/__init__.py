@@ -0,0 +1,3 @@
+"""
+CSV processing test package.
+"""
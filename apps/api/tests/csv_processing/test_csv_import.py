@@ -0,0 +1,318 @@
+"""
+CSV import tests.
+
+This module contains tests for the incremental CSV parser, header mapping
+and the streaming import endpoint.
+"""
+
+import io
+import json
+
+import pytest
+from pydantic import ValidationError
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_sessionmaker
+from app.main import app
+from app.models import Position
+from app.schemas.imports import IMPORT_ROWS
+from app.services.csv_import import CsvFormatError, CsvImporter, iter_csv_records, map_header
+from tests.conftest import TestAsyncSessionLocal
+
+
+def reader(data: bytes):
+    """Return an async ``read(n)`` callable over ``data``."""
+    buffer = io.BytesIO(data)
+
+    async def read(n: int) -> bytes:
+        return buffer.read(n)
+
+    return read
+
+
+async def parse(data: bytes, chunk_size: int):
+    """Collect all records parsed from ``data``."""
+    return [record async for record in iter_csv_records(reader(data), chunk_size)]
+
+
+async def upload(client: AsyncClient, portfolio_id: int, body: str, **params):
+    """Upload a CSV and return the decoded NDJSON events."""
+    response = await client.post(
+        "/api/v1/import/csv",
+        params={"portfolio_id": portfolio_id, **params},
+        files={"file": ("positions.csv", body.encode(), "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestCsvParser:
+    """Test suite for the incremental parser."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+    async def test_records_independent_of_chunking(self, chunk_size):
+        """Test that chunk boundaries never change the parsed records."""
+        data = (
+            '﻿Symbol,Qty,Note\r\n'
+            'AAPL,10,"multi\r\nline"\r\n'
+            '\r\n'
+            'MSFT,"1,000","say ""hi"""\r\n'
+            'Ünï,5,last'
+        ).encode()
+
+        records = await parse(data, chunk_size)
+
+        assert records == [
+            (1, ["Symbol", "Qty", "Note"]),
+            (2, ["AAPL", "10", "multi\r\nline"]),
+            (5, ["MSFT", "1,000", 'say "hi"']),
+            (6, ["Ünï", "5", "last"]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unterminated_quote(self):
+        """Test that an unterminated quoted field is reported."""
+        with pytest.raises(CsvFormatError):
+            await parse(b'Symbol\n"AAPL\n', 4)
+
+    @pytest.mark.asyncio
+    async def test_invalid_utf8(self):
+        """Test that undecodable bytes are reported."""
+        with pytest.raises(CsvFormatError):
+            await parse(b"Symbol\n\xff\xfe\n", 4)
+
+    def test_map_header_aliases(self):
+        """Test that broker header spellings map onto row fields."""
+        mapping = map_header(["Ticker", " Shares ", "Average Cost", "Last Price"])
+
+        assert mapping == {"symbol": 0, "quantity": 1, "entry_price": 2, "current_price": 3}
+
+    def test_map_header_missing_required(self):
+        """Test that a missing required column is rejected."""
+        with pytest.raises(CsvFormatError):
+            map_header(["Symbol", "Quantity"])
+
+
+class TestImportRows:
+    """Test suite for batch validation of import rows."""
+
+    def test_cells_are_cleaned(self):
+        """Blank cells, currency formatting and accounting negatives are normalized."""
+        rows = IMPORT_ROWS.dump_python(IMPORT_ROWS.validate_python([
+            {"symbol": " aapl ", "lot": " ", "quantity": "(1,000)", "entry_price": "$1,250.50",
+             "stop_loss": "N/A", "current_price": "--", "sector": ""},
+        ]))
+        assert rows == [{
+            "symbol": "AAPL", "lot": "default", "quantity": -1000.0, "entry_price": 1250.5,
+            "stop_loss": None, "current_price": None, "sector": None,
+        }]
+
+    def test_errors_are_located_by_row(self):
+        """Errors of a batch carry the row index, then the field."""
+        with pytest.raises(ValidationError) as e:
+            IMPORT_ROWS.validate_python([
+                {"symbol": "AAPL", "quantity": "10", "entry_price": "100"},
+                {"symbol": "", "quantity": "5", "entry_price": "abc"},
+            ])
+        assert {err["loc"] for err in e.value.errors()} == {(1, "symbol"), (1, "entry_price")}
+
+
+class TestCsvImportEndpoint:
+    """Test suite for the streaming import endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_import_commits_valid_file(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a valid file is imported in batches."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Quantity,Entry Price,Stop Loss\n" + "".join(
+            f"s{i},{i + 1},\"$1,00{i % 10}.50\",\n" for i in range(25)
+        )
+
+        events = await upload(client, portfolio.id, body, batch_size=10)
+
+        assert [e["event"] for e in events] == ["progress"] * 3 + ["complete"]
+        assert events[-1]["committed"] is True
+        assert events[-1]["imported"] == 25
+        assert events[-1]["bytes_read"] == len(body)
+        count = await db_session.scalar(
+            select(func.count()).select_from(Position).where(Position.portfolio_id == portfolio.id)
+        )
+        assert count == 25
+        symbol, price = (await db_session.execute(
+            select(Position.symbol, Position.entry_price).order_by(Position.id).limit(1)
+        )).one()
+        assert (symbol, price) == ("S0", 1000.5)
+
+    @pytest.mark.asyncio
+    async def test_invalid_rows_block_import(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that rejected rows are reported and nothing is committed."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Quantity,Entry Price\nAAPL,10,100\nMSFT,0,200\n,5,abc\n"
+
+        events = await upload(client, portfolio.id, body)
+
+        errors = [e for e in events if e["event"] == "error"]
+        assert [e["line"] for e in errors] == [3, 4]
+        assert {err["field"] for err in errors[1]["errors"]} == {"symbol", "entry_price"}
+        assert events[-1] == {
+            "event": "complete", "committed": False,
+            "rows": 3, "imported": 0, "rejected": 2, "bytes_read": len(body),
+        }
+        count = await db_session.scalar(select(func.count()).select_from(Position))
+        assert count == 0
+
+    @pytest.mark.asyncio
+    async def test_skip_invalid_commits_valid_rows(self, client: AsyncClient, create_portfolio):
+        """Test that skip_invalid imports the rows that passed validation."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Quantity,Entry Price\nAAPL,10,100\nMSFT,0,200\n"
+
+        events = await upload(client, portfolio.id, body, skip_invalid="true")
+
+        assert events[-1]["committed"] is True
+        assert events[-1]["imported"] == 1
+
+    @pytest.mark.asyncio
+    async def test_dry_run_does_not_write(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that dry runs validate without writing."""
+        portfolio = await create_portfolio()
+
+        events = await upload(client, portfolio.id, "Symbol,Quantity,Entry Price\nAAPL,10,100\n", dry_run="true")
+
+        assert events[-1]["committed"] is False
+        assert await db_session.scalar(select(func.count()).select_from(Position)) == 0
+
+    @pytest.mark.asyncio
+    async def test_missing_columns_fail(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that an unrecognized header fails the import."""
+        portfolio = await create_portfolio()
+
+        events = await upload(client, portfolio.id, "Name,Amount\nfoo,1\n")
+
+        assert events == [{
+            "event": "failed", "message": events[0]["message"],
+            "rows": 0, "imported": 0, "rejected": 0, "bytes_read": 18,
+        }]
+        assert "symbol" in events[0]["message"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_symbols_without_lot_column(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        create_portfolio,
+    ):
+        """Test that each row of a repeated symbol is kept as its own lot, across batches."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Quantity,Entry Price\nAAPL,10,100\nMSFT,5,300\nAAPL,20,150\n"
+
+        events = await upload(client, portfolio.id, body, batch_size=2)
+
+        assert events[-1]["committed"] is True
+        assert events[-1]["imported"] == 3
+        rows = (await db_session.execute(
+            select(Position.symbol, Position.lot, Position.quantity).order_by(Position.symbol, Position.lot)
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            ("AAPL", "default", 10.0), ("AAPL", "default-2", 20.0), ("MSFT", "default", 5.0),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_lots_are_rejected(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a (symbol, lot) repeated in a file with a lot column is reported, not overwritten."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Lot,Quantity,Entry Price\nAAPL,A,10,100\nAAPL,B,20,150\naapl,A,30,120\n"
+
+        events = await upload(client, portfolio.id, body, batch_size=2)
+
+        errors = [e for e in events if e["event"] == "error"]
+        assert [(e["line"], e["errors"][0]["field"]) for e in errors] == [(4, "lot")]
+        assert "line 2" in errors[0]["errors"][0]["message"]
+        assert events[-1]["committed"] is False
+        assert events[-1]["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_lots_within_a_batch_and_reimports(self, client: AsyncClient, create_portfolio):
+        """Test that a duplicate in one batch is rejected, and lots seen by one import do not leak into the next."""
+        portfolio = await create_portfolio()
+        body = "Symbol,Lot,Quantity,Entry Price\nAAPL,A,10,100\nAAPL,A,30,120\n"
+
+        events = await upload(client, portfolio.id, body, dry_run="true")
+
+        errors = [e for e in events if e["event"] == "error"]
+        assert [e["line"] for e in errors] == [3]
+        assert "line 2" in errors[0]["errors"][0]["message"]
+
+        body = "Symbol,Lot,Quantity,Entry Price\nAAPL,A,10,100\nAAPL,B,30,120\n"
+        for _ in range(2):
+            events = await upload(client, portfolio.id, body)
+            assert events[-1]["committed"] is True
+            assert events[-1]["rejected"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_mid_stream_rolls_back(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        monkeypatch,
+        create_portfolio,
+    ):
+        """Test that an import stopped after a written batch leaves no rows and no open transaction."""
+        portfolio = await create_portfolio()
+        sessions = []
+
+        def record_session():
+            session = TestAsyncSessionLocal()
+            sessions.append(session)
+            return session
+
+        app.dependency_overrides[get_sessionmaker] = lambda: record_session
+        flush = CsvImporter._flush_batch
+
+        async def fail_after_first(self, batch, mapping):
+            if self.stats.rows:
+                raise RuntimeError("connection lost")
+            return await flush(self, batch, mapping)
+
+        monkeypatch.setattr(CsvImporter, "_flush_batch", fail_after_first)
+        body = "Symbol,Quantity,Entry Price\n" + "".join(f"s{i},1,10\n" for i in range(4))
+
+        # Starlette re-raises body errors wrapped in an ExceptionGroup.
+        with pytest.raises(Exception):
+            await client.post(
+                "/api/v1/import/csv",
+                params={"portfolio_id": portfolio.id, "batch_size": 2},
+                files={"file": ("positions.csv", body.encode(), "text/csv")},
+            )
+
+        assert len(sessions) == 1
+        assert not sessions[0].in_transaction()
+        assert await db_session.scalar(select(func.count()).select_from(Position)) == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_portfolio(self, client: AsyncClient):
+        """Test that uploads to an unknown portfolio are rejected."""
+        response = await client.post(
+            "/api/v1/import/csv",
+            params={"portfolio_id": 999},
+            files={"file": ("positions.csv", b"Symbol\n", "text/csv")},
+        )
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_missing_file(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a request without a file part is rejected."""
+        portfolio = await create_portfolio()
+
+        response = await client.post(
+            "/api/v1/import/csv",
+            params={"portfolio_id": portfolio.id},
+            data={"other": "x"},
+        )
+
+        assert response.status_code == 422
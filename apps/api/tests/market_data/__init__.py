@@ -0,0 +1,3 @@
+"""
+Market data test package.
+"""
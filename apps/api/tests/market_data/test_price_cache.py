@@ -0,0 +1,216 @@
+"""
+Price cache tests.
+
+This module contains tests for the market calendar, tiered freshness of
+quotes and daily bars, the Redis tier and stampede protection.
+"""
+
+import asyncio
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.market_data import (
+    DailyBar,
+    FakeQuoteProvider,
+    MarketCalendar,
+    PriceCache,
+    QuoteClient,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def at(*args) -> float:
+    """Return the epoch seconds of a New York wall-clock time."""
+    return datetime(*args, tzinfo=NEW_YORK).timestamp()
+
+
+class Clock:
+    """Settable wall clock."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FixedBarProvider(FakeQuoteProvider):
+    """Provider whose daily bars are always from ``bar_date``."""
+
+    def __init__(self, bar_date: date):
+        super().__init__()
+        self.bar_date = bar_date
+
+    async def fetch_daily_bars(self, symbols):
+        self.calls.append(list(symbols))
+        return {
+            s: DailyBar(s, self.bar_date, 1.0, 1.0, 1.0, 1.0, None, self.name)
+            for s in symbols
+        }
+
+
+class SlowProvider(FakeQuoteProvider):
+    """Provider that takes a while to answer."""
+
+    async def fetch_quotes(self, symbols):
+        await asyncio.sleep(0.05)
+        return await super().fetch_quotes(symbols)
+
+
+def make_cache(provider, now: float, redis=None, **options) -> PriceCache:
+    return PriceCache(QuoteClient(provider, batch_window=0), redis=redis, clock=Clock(now), **options)
+
+
+@pytest.fixture
+def redis():
+    """Return a fakeredis client standing in for the shared tier."""
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+class TestMarketCalendar:
+    """Test suite for regular session arithmetic."""
+
+    def test_sessions_skip_weekends(self):
+        """Friday's close is the last close all weekend; the next open is Monday."""
+        calendar = MarketCalendar()
+        saturday = datetime(2024, 3, 9, 12, 0, tzinfo=NEW_YORK)
+        tuesday_noon = datetime(2024, 3, 12, 12, 0, tzinfo=NEW_YORK)
+
+        assert not calendar.is_open(saturday)
+        assert calendar.is_open(tuesday_noon)
+        assert calendar.last_close(saturday) == datetime(2024, 3, 8, 16, 0, tzinfo=NEW_YORK)
+        assert calendar.next_open(saturday) == datetime(2024, 3, 11, 9, 30, tzinfo=NEW_YORK)
+        assert calendar.last_close(tuesday_noon) == datetime(2024, 3, 11, 16, 0, tzinfo=NEW_YORK)
+
+
+class TestPriceCache:
+    """Test suite for freshness rules and the in-process tier."""
+
+    @pytest.mark.asyncio
+    async def test_quotes_expire_during_market_hours(self):
+        """Quotes are served from L1 within the TTL and refetched after it."""
+        provider = FakeQuoteProvider()
+        cache = make_cache(provider, at(2024, 3, 12, 11, 0), quote_ttl=60)
+
+        first = await cache.get_quote("aapl")
+        cache.clock.now += 30
+        assert await cache.get_quote("AAPL") is first
+        cache.clock.now += 60
+        await cache.get_quote("AAPL")
+
+        assert provider.calls == [["AAPL"], ["AAPL"]]
+
+    @pytest.mark.asyncio
+    async def test_closed_market_is_never_refetched(self):
+        """A quote fetched after the close stays fresh until the next open."""
+        provider = FakeQuoteProvider()
+        cache = make_cache(provider, at(2024, 3, 8, 16, 5), quote_ttl=60)
+
+        await cache.get_quote("AAPL")
+        cache.clock.now = at(2024, 3, 10, 20, 0)  # Sunday evening
+        await cache.get_quote("AAPL")
+        assert provider.calls == [["AAPL"]]
+
+        cache.clock.now = at(2024, 3, 11, 9, 31)  # Monday open
+        await cache.get_quote("AAPL")
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_bars_refresh_after_each_close(self):
+        """A bar of an older session is refetched once the TTL has passed."""
+        provider = FixedBarProvider(date(2024, 3, 11))
+        cache = make_cache(provider, at(2024, 3, 12, 10, 0), bar_ttl=3600)
+
+        await cache.get_bar("SPY")
+        cache.clock.now = at(2024, 3, 12, 15, 0)
+        await cache.get_bar("SPY")
+        assert len(provider.calls) == 2
+
+        cache.clock.now = at(2024, 3, 12, 16, 1)  # Tuesday's bar not published yet
+        await cache.get_bar("SPY")
+        cache.clock.now = at(2024, 3, 12, 18, 0)
+        await cache.get_bar("SPY")
+        assert len(provider.calls) == 4
+
+        provider.bar_date = date(2024, 3, 12)
+        cache.clock.now = at(2024, 3, 13, 8, 0)
+        bar = await cache.get_bar("SPY")
+        assert len(provider.calls) == 5
+        assert bar.date == date(2024, 3, 12)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_refresh(self):
+        """Concurrent lookups of a missing symbol trigger one upstream fetch."""
+        provider = SlowProvider({"AAPL": 190.0})
+        cache = make_cache(provider, at(2024, 3, 12, 11, 0))
+
+        quotes = await asyncio.gather(*(cache.get_quotes(["AAPL", "MSFT"]) for _ in range(10)))
+
+        assert provider.calls == [["AAPL", "MSFT"]]
+        assert all(q["AAPL"].price == 190.0 for q in quotes)
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_unknown_symbols(self):
+        """L1 keeps at most ``max_entries`` values; unknown symbols are not cached."""
+        provider = FakeQuoteProvider(unknown=["NOPE"])
+        cache = make_cache(provider, at(2024, 3, 12, 11, 0), max_entries=2)
+
+        quotes = await cache.get_quotes(["A", "B", "C", "NOPE"])
+
+        assert set(quotes) == {"A", "B", "C"}
+        assert len(cache) == 2
+        assert await cache.get_quote("NOPE") is None
+
+
+class TestSharedTier:
+    """Test suite for the Redis tier and cross-process locking."""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_fetched_prices(self, redis):
+        """A second worker is served from Redis with the Redis TTL spanning the weekend."""
+        provider = FakeQuoteProvider()
+        now = at(2024, 3, 8, 17, 0)
+        first = make_cache(provider, now, redis=redis)
+        second = make_cache(provider, now, redis=redis)
+
+        fetched = await first.get_quote("AAPL")
+        shared = await second.get_quote("AAPL")
+
+        assert provider.calls == [["AAPL"]]
+        assert shared == fetched
+        assert await redis.ttl("pxr:price:quote:AAPL") > 2 * 86400
+
+    @pytest.mark.asyncio
+    async def test_lock_loser_serves_stale_value(self, redis):
+        """While another worker holds the refresh lock, a stale value is served."""
+        provider = FakeQuoteProvider({"AAPL": 190.0})
+        cache = make_cache(provider, at(2024, 3, 12, 11, 0), redis=redis, quote_ttl=60)
+        stale = await cache.get_quote("AAPL")
+
+        cache.clock.now += 120
+        await redis.set("pxr:price:quote:AAPL:lock", "other-worker", px=10_000)
+        served = await cache.get_quote("AAPL")
+
+        assert served is stale
+        assert provider.calls == [["AAPL"]]
+
+    @pytest.mark.asyncio
+    async def test_lock_loser_waits_for_winner(self, redis):
+        """Without a stale value, a lock loser picks up the winner's write."""
+        provider = SlowProvider({"AAPL": 190.0})
+        now = at(2024, 3, 12, 11, 0)
+        winner = make_cache(provider, now, redis=redis)
+        loser = make_cache(FakeQuoteProvider(), now, redis=redis)
+
+        task = asyncio.create_task(winner.get_quote("AAPL"))
+        await asyncio.sleep(0.01)
+        quote = await loser.get_quote("AAPL")
+        await task
+
+        assert quote.price == 190.0
+        assert loser.client.provider.calls == []
+        assert await redis.exists("pxr:price:quote:AAPL:lock") == 0
@@ -0,0 +1,265 @@
+"""
+Quote client tests.
+
+This module contains tests for request coalescing, batching and rate limiting
+in the quote client, the provider response parsing and the quote endpoints.
+"""
+
+import asyncio
+import time
+from datetime import date
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.services.market_data import (
+    AlphaVantageProvider,
+    FakeQuoteProvider,
+    MarketDataError,
+    PolygonProvider,
+    QuoteClient,
+    QuoteNotFoundError,
+    RateLimitExceeded,
+    TokenBucket,
+    init_market_data,
+    quote_client,
+)
+from app.config import settings
+
+
+class FailingProvider(FakeQuoteProvider):
+    """Provider whose calls always fail."""
+
+    async def fetch_quotes(self, symbols):
+        self.calls.append(list(symbols))
+        raise MarketDataError("upstream down")
+
+
+class TestQuoteClient:
+    """Test suite for coalescing and batching."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_fetch(self):
+        """Concurrent requests for a symbol are coalesced into one upstream call."""
+        provider = FakeQuoteProvider({"AAPL": 190.5})
+        client = QuoteClient(provider)
+
+        quotes = await asyncio.gather(*(client.get_quote("aapl") for _ in range(20)))
+
+        assert provider.calls == [["AAPL"]]
+        assert {q.price for q in quotes} == {190.5}
+
+    @pytest.mark.asyncio
+    async def test_single_lookups_are_batched(self):
+        """Lookups within the batch window go upstream as batches of max size."""
+        provider = FakeQuoteProvider(max_batch_size=3)
+        client = QuoteClient(provider, batch_window=0.01)
+
+        symbols = ["A", "B", "C", "D", "E"]
+        quotes = await asyncio.gather(*(client.get_quote(s) for s in symbols))
+
+        assert [q.symbol for q in quotes] == symbols
+        assert provider.calls == [["A", "B", "C"], ["D", "E"]]
+
+    @pytest.mark.asyncio
+    async def test_get_quotes_skips_unknown_symbols(self):
+        """Batch lookups leave out symbols the provider does not know."""
+        provider = FakeQuoteProvider(unknown=["NOPE"])
+        client = QuoteClient(provider)
+
+        quotes = await client.get_quotes(["MSFT", "NOPE", "msft"])
+
+        assert list(quotes) == ["MSFT"]
+        assert provider.calls == [["MSFT", "NOPE"]]
+        with pytest.raises(QuoteNotFoundError):
+            await client.get_quote("NOPE")
+
+    @pytest.mark.asyncio
+    async def test_provider_errors_reach_every_waiter(self):
+        """A failed batch fails all of its waiters and is not cached."""
+        provider = FailingProvider()
+        client = QuoteClient(provider)
+
+        results = await asyncio.gather(
+            client.get_quote("A"), client.get_quote("A"), client.get_quote("B"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, MarketDataError) for r in results)
+        assert provider.calls == [["A", "B"]]
+        with pytest.raises(MarketDataError):
+            await client.get_quote("A")
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_fetch(self):
+        """Cancelling one waiter leaves the coalesced fetch running for others."""
+        provider = FakeQuoteProvider({"A": 1.0})
+        client = QuoteClient(provider, batch_window=0.02)
+
+        first = asyncio.create_task(client.get_quote("A"))
+        second = asyncio.create_task(client.get_quote("A"))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert (await second).price == 1.0
+
+
+class TestTokenBucket:
+    """Test suite for the rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_refill(self):
+        """The bucket allows a burst and then paces callers at the refill rate."""
+        bucket = TokenBucket(rate=50.0, capacity=2)
+
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        assert 0.03 <= elapsed < 0.2
+
+    @pytest.mark.asyncio
+    async def test_max_wait_fails_fast(self):
+        """Waits beyond the budget raise instead of sleeping."""
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        await bucket.acquire()
+
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await bucket.acquire(max_wait=1.0)
+        assert excinfo.value.retry_after > 9
+
+    @pytest.mark.asyncio
+    async def test_client_reports_rate_limit(self):
+        """Lookups fail with RateLimitExceeded once the bucket is empty."""
+        provider = FakeQuoteProvider()
+        client = QuoteClient(provider, limiter=TokenBucket(rate=0.01, capacity=1), max_wait=0.1)
+
+        await client.get_quote("A")
+        with pytest.raises(RateLimitExceeded):
+            await client.get_quote("B")
+        assert provider.calls == [["A"]]
+
+    @pytest.mark.asyncio
+    async def test_background_bars_wait_for_tokens(self):
+        """Bar sweeps wait for tokens beyond ``max_wait`` instead of failing."""
+        limiter = TokenBucket(rate=50.0, capacity=1)
+        client = QuoteClient(FakeQuoteProvider(max_batch_size=1), limiter=limiter, max_wait=0.0)
+
+        with pytest.raises(RateLimitExceeded):
+            await client.get_daily_bars(["A", "B"])
+        assert set(await client.get_daily_bars(["A", "B", "C"], background=True)) == {"A", "B", "C"}
+
+
+class TestProviders:
+    """Test suite for upstream response parsing."""
+
+    @pytest.mark.asyncio
+    async def test_alpha_vantage_global_quote(self):
+        """GLOBAL_QUOTE responses are parsed; throttling notes raise."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            symbol = request.url.params["symbol"]
+            if symbol == "THROTTLED":
+                return httpx.Response(200, json={"Note": "5 calls per minute"})
+            return httpx.Response(200, json={"Global Quote": {
+                "01. symbol": symbol, "05. price": "123.4500", "06. volume": "1000",
+                "07. latest trading day": "2024-05-03", "08. previous close": "120.0000",
+            }})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            provider = AlphaVantageProvider(http, "key")
+            quotes = await provider.fetch_quotes(["IBM"])
+            with pytest.raises(MarketDataError, match="5 calls"):
+                await provider.fetch_quotes(["THROTTLED"])
+
+        assert quotes["IBM"].price == 123.45
+        assert quotes["IBM"].previous_close == 120.0
+        assert quotes["IBM"].volume == 1000
+
+    @pytest.mark.asyncio
+    async def test_alpha_vantage_daily_bar(self):
+        """TIME_SERIES_DAILY responses yield the latest bar."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.params["function"] == "TIME_SERIES_DAILY"
+            return httpx.Response(200, json={"Time Series (Daily)": {
+                "2024-05-02": {"1. open": "1", "2. high": "2", "3. low": "0.5",
+                               "4. close": "1.5", "5. volume": "10"},
+                "2024-05-03": {"1. open": "1.5", "2. high": "2.5", "3. low": "1",
+                               "4. close": "2", "5. volume": "20"},
+            }})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            bars = await QuoteClient(AlphaVantageProvider(http, "key")).get_daily_bars(["ibm"])
+
+        assert bars["IBM"].date == date(2024, 5, 3)
+        assert bars["IBM"].close == 2.0
+        assert bars["IBM"].volume == 20
+
+    @pytest.mark.asyncio
+    async def test_polygon_snapshot_batch(self):
+        """One snapshot call returns quotes for every requested ticker."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"status": "OK", "tickers": [
+                {"ticker": "AAPL", "lastTrade": {"p": 190.1}, "day": {"c": 190.0, "v": 5000},
+                 "prevDay": {"c": 188.0}, "updated": 1714761600000000000},
+                {"ticker": "MSFT", "day": {"c": 410.2}, "prevDay": {"c": 405.0}},
+            ]})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            quotes = await PolygonProvider(http, "key").fetch_quotes(["AAPL", "MSFT", "NOPE"])
+
+        assert len(requests) == 1
+        assert requests[0].url.params["tickers"] == "AAPL,MSFT,NOPE"
+        assert quotes["AAPL"].price == 190.1
+        assert quotes["MSFT"].price == 410.2
+        assert "NOPE" not in quotes
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("provider,api_key", [("polgon", "key"), ("polygon", None)])
+    async def test_misconfigured_provider_fails_startup(self, monkeypatch, provider, api_key):
+        """An unknown provider or a missing key raises instead of falling back to fake prices."""
+        monkeypatch.setattr(settings, "MARKET_DATA_PROVIDER", provider)
+        monkeypatch.setattr(settings, "MARKET_DATA_API_KEY", api_key)
+        configured = quote_client.provider
+
+        with pytest.raises(ValueError):
+            await init_market_data()
+        assert quote_client.provider is configured
+
+
+class TestQuoteEndpoints:
+    """Test suite for the market data endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_quote_and_batch_quotes(self, client: AsyncClient):
+        """Single and batch quote endpoints use the shared client."""
+        provider = FakeQuoteProvider({"AAPL": 190.5, "MSFT": 410.0}, unknown=["NOPE"])
+        with patch.object(quote_client, "provider", provider):
+            single = await client.get("/api/v1/market/quote/aapl")
+            batch = await client.get("/api/v1/market/batch-quotes?symbols=MSFT,NOPE,AAPL")
+            missing = await client.get("/api/v1/market/quote/NOPE")
+
+        assert single.status_code == 200
+        assert single.json()["price"] == 190.5
+        assert batch.status_code == 200
+        assert [q["symbol"] for q in batch.json()["quotes"]] == ["MSFT", "AAPL"]
+        assert batch.json()["missing_symbols"] == ["NOPE"]
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_quote(self, client: AsyncClient):
+        """An exhausted rate limit is reported as 503 with Retry-After."""
+        bucket = TokenBucket(rate=0.01, capacity=1)
+        bucket.tokens = 0
+        with patch.object(quote_client, "limiter", bucket), \
+             patch.object(quote_client, "max_wait", 0.0):
+            response = await client.get("/api/v1/market/quote/AAPL")
+
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) > 1
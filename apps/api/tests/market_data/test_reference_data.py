@@ -0,0 +1,136 @@
+"""
+Security reference data tests.
+
+This module contains tests for the compiled file format, binary-search
+lookups, atomic hot reload and classification of portfolios from the
+memory-mapped reference data.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.services.concentration import portfolio_concentration, symbol_classifier
+from app.services.reference_data import (
+    ReferenceData,
+    ReferenceDataStore,
+    compile_reference_data,
+)
+
+SECURITIES = [
+    {"symbol": "msft", "sector": "Technology", "industry": "Software", "country": "US",
+     "style_box": "large-growth", "market_cap": "3.1e12", "beta": "0.9"},
+    {"symbol": "AAPL", "sector": "Technology", "industry": "Hardware", "country": "US",
+     "style_box": "large-growth", "market_cap": "2.9e12", "beta": "1.2"},
+    {"symbol": "SAP", "sector": "Technology", "industry": "Software", "country": "DE",
+     "market_cap": "1.5e9", "beta": ""},
+    {"symbol": "BRK.B", "sector": "Financials", "country": "US"},
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_classifications():
+    """Drop symbol classifications after each test."""
+    yield
+    symbol_classifier.clear()
+
+
+@pytest.fixture
+def reference_file(tmp_path):
+    path = tmp_path / "reference.bin"
+    compile_reference_data(SECURITIES, path)
+    return path
+
+
+class TestReferenceData:
+    """Test suite for the compiled file and lookups."""
+
+    def test_lookup_by_binary_search(self, reference_file):
+        """Symbols are found case-insensitively; unknown and over-long symbols miss."""
+        data = ReferenceData(reference_file)
+
+        rows = data.rows(["AAPL", "brk.b", "NOPE", "MSFTXXXXXXXXX", "MSFT"])
+
+        assert len(data) == 4
+        assert (rows >= 0).tolist() == [True, True, False, False, True]
+        assert data.categories("industry", rows) == ["Hardware", None, None, None, "Software"]
+        msft = data.get("msft")
+        assert (msft.sector, msft.country, msft.market_cap, msft.beta) == (
+            "Technology", "US", 3.1e12, 0.9,
+        )
+        assert data.get("SAP").beta is None
+
+    def test_columns_are_mapped_not_copied(self, reference_file):
+        """Columns are read-only views of the file mapping."""
+        data = ReferenceData(reference_file)
+        column = data._columns["market_cap"]
+
+        assert not column.flags.writeable
+        assert not column.flags.owndata
+
+    def test_rejects_other_files(self, tmp_path):
+        """Files without the reference data magic are refused."""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a reference file")
+
+        with pytest.raises(ValueError):
+            ReferenceData(path)
+
+
+class TestReferenceDataStore:
+    """Test suite for hot reload and consumers of the store."""
+
+    def test_hot_reload_on_new_version(self, reference_file):
+        """A republished file is swapped in; the old mapping stays usable."""
+        store = ReferenceDataStore()
+        assert store.load(reference_file)
+        old = store.data
+        assert not store.reload_if_changed()
+
+        compile_reference_data(SECURITIES + [{"symbol": "NVDA", "industry": "Semiconductors"}],
+                               reference_file)
+        assert store.reload_if_changed()
+
+        assert store.version != old.build_id
+        assert store.get("NVDA").industry == "Semiconductors"
+        assert old.get("NVDA") is None
+        assert old.get("AAPL").industry == "Hardware"
+
+    def test_invalid_version_keeps_current_data(self, reference_file, tmp_path):
+        """A broken file is not installed."""
+        store = ReferenceDataStore()
+        store.load(reference_file)
+        build_id = store.version
+
+        broken = tmp_path / "broken.bin"
+        broken.write_bytes(b"garbage")
+        os.replace(broken, reference_file)
+
+        assert not store.reload_if_changed()
+        assert store.version == build_id
+
+    def test_classifies_portfolios_and_betas(self, reference_file, make_snapshot):
+        """Concentration dimensions and stress betas are read from the loaded file."""
+        store = ReferenceDataStore()
+        store.load(reference_file)
+        snapshot = make_snapshot([("AAPL", None, 10, 100.0), ("SAP", None, 10, 100.0), ("ZZZZ", None, 20, 100.0)])
+
+        report = portfolio_concentration(snapshot, dimensions=("country", "market_cap"))
+        country, market_cap = report.views
+
+        assert {g.key: g.percent for g in country.top} == {"US": 25.0, "DE": 25.0}
+        assert country.unclassified_percent == 50.0
+        assert [g.key for g in market_cap.top] == ["large", "small"]
+        np.testing.assert_allclose(store.betas(snapshot), [1.2, 1.0, 1.0])
+
+    def test_explicit_assignments_win(self, reference_file, make_snapshot):
+        """Classifications assigned in code override the reference data."""
+        symbol_classifier.assign("country", {"SAP": "EU"})
+        store = ReferenceDataStore()
+        store.load(reference_file)
+        snapshot = make_snapshot([("SAP", None, 10, 100.0), ("MSFT", None, 10, 100.0)])
+
+        country = portfolio_concentration(snapshot, dimensions=("country",)).views[0]
+
+        assert {g.key for g in country.top} == {"EU", "US"}
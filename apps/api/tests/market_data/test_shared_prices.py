@@ -0,0 +1,168 @@
+"""
+Shared price table tests.
+
+This module contains tests for the shared-memory quote table, its updater
+and the price cache reading quotes from it.
+"""
+
+import os
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.market_data import (
+    FakeQuoteProvider,
+    PriceCache,
+    Quote,
+    QuoteClient,
+    SharedPriceTable,
+    SharedPriceUpdater,
+)
+from app.services.stress import stress_tester
+
+NEW_YORK = ZoneInfo("America/New_York")
+OPEN = datetime(2024, 3, 6, 11, 0, tzinfo=NEW_YORK).timestamp()
+CLOSED = datetime(2024, 3, 6, 18, 0, tzinfo=NEW_YORK).timestamp()
+
+
+def quote(symbol: str, price: float, previous_close=None, volume=None) -> Quote:
+    return Quote(symbol, price, datetime(2024, 3, 6, 16, 0, tzinfo=timezone.utc), "fake", previous_close, volume)
+
+
+@pytest.fixture
+def table():
+    """Return a small table, freed after the test."""
+    table = SharedPriceTable.create(4)
+    yield table
+    table.close()
+    table.unlink()
+
+
+class TestSharedPriceTable:
+    """Test suite for the shared-memory quote table."""
+
+    def test_round_trip(self, table):
+        """Written quotes read back with their optional fields and fetch time."""
+        table.register(["AAPL", "MSFT"])
+        assert table.put({"AAPL": quote("AAPL", 190.5, 188.0, 1200), "MSFT": quote("MSFT", 410.0)}, 100.0) == 2
+
+        entries = table.get(["AAPL", "MSFT"])
+        assert entries["AAPL"] == (100.0, quote("AAPL", 190.5, 188.0, 1200))
+        assert entries["MSFT"] == (100.0, quote("MSFT", 410.0))
+
+    def test_unregistered_and_unpriced_symbols_are_left_out(self, table):
+        """Only registered symbols are written; only priced ones are read."""
+        table.register(["AAPL"])
+        assert table.put({"TSLA": quote("TSLA", 1.0)}, 100.0) == 0
+        assert table.get(["AAPL", "TSLA"]) == {}
+        assert table.symbols() == ["AAPL"]
+
+    def test_register_is_idempotent_and_bounded(self, table):
+        """Registering twice keeps one slot; symbols past capacity are skipped."""
+        table.register(["A", "B", "A"])
+        table.register(["B", "C", "D", "E", "F"])
+        assert table.symbols() == ["A", "B", "C", "D"]
+        assert table.slot("E") is None
+
+    def test_record_being_written_is_not_read(self, table):
+        """A record with an odd sequence number is reported as not priced."""
+        table.register(["AAPL"])
+        table.put({"AAPL": quote("AAPL", 190.0)}, 100.0)
+        table._records["seq"][0] += 1
+        assert table.get(["AAPL"]) == {}
+        table._records["seq"][0] += 1
+        assert table.get(["AAPL"])["AAPL"][1].price == 190.0
+
+    def test_forked_child_shares_the_table(self, table):
+        """A symbol registered and priced by a forked child is visible to the parent."""
+        pid = os.fork()
+        if pid == 0:
+            try:
+                table.register(["NVDA"])
+                table.put({"NVDA": quote("NVDA", 880.0)}, 100.0)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        assert table.get(["NVDA"])["NVDA"][1].price == 880.0
+
+
+class TestSharedPriceUpdater:
+    """Test suite for the table's single writer."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_unpriced_and_expired_symbols(self, table):
+        """Unpriced symbols are fetched at once and again once older than the interval."""
+        provider = FakeQuoteProvider()
+        now = [OPEN]
+        updater = SharedPriceUpdater(table, QuoteClient(provider, batch_window=0), interval=15.0,
+                                     clock=lambda: now[0])
+        table.register(["AAPL", "MSFT"])
+
+        assert await updater.refresh() == 2
+        assert await updater.refresh() == 0
+        now[0] += 15.0
+        assert await updater.refresh() == 2
+        assert [sorted(c) for c in provider.calls] == [["AAPL", "MSFT"], ["AAPL", "MSFT"]]
+
+    @pytest.mark.asyncio
+    async def test_quotes_after_the_close_are_kept_until_the_open(self, table):
+        """Outside market hours a quote fetched after the close is not refreshed."""
+        now = [CLOSED]
+        updater = SharedPriceUpdater(table, QuoteClient(FakeQuoteProvider(), batch_window=0),
+                                     interval=15.0, clock=lambda: now[0])
+        table.register(["AAPL"])
+        await updater.refresh()
+        now[0] += 3600.0
+        assert updater.due(now[0]) == []
+
+
+class TestPriceCacheSharedTier:
+    """Test suite for quotes served from the shared table."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_table_quotes_skip_the_provider(self, table):
+        """Quotes the updater wrote are served without an upstream call."""
+        provider = FakeQuoteProvider()
+        cache = PriceCache(QuoteClient(provider, batch_window=0), clock=lambda: OPEN)
+        cache.shared = table
+        table.register(["AAPL"])
+        table.put({"AAPL": quote("AAPL", 190.0)}, OPEN - 5)
+
+        quotes = await cache.get_quotes(["aapl"])
+        assert quotes["AAPL"].price == 190.0
+        assert provider.calls == []
+
+    @pytest.mark.asyncio
+    async def test_misses_are_registered_and_fetched(self, table):
+        """A symbol missing from the table is fetched directly and registered for the updater."""
+        provider = FakeQuoteProvider()
+        cache = PriceCache(QuoteClient(provider, batch_window=0), clock=lambda: OPEN)
+        cache.shared = table
+
+        quotes = await cache.get_quotes(["MSFT"])
+        assert quotes["MSFT"].price == provider.price_for("MSFT")
+        assert provider.calls == [["MSFT"]]
+        assert table.symbols() == ["MSFT"]
+
+    @pytest.mark.asyncio
+    async def test_expired_table_quotes_are_refreshed(self, table):
+        """A table quote past the TTL (updater down) falls through to the provider."""
+        provider = FakeQuoteProvider()
+        cache = PriceCache(QuoteClient(provider, batch_window=0), clock=lambda: OPEN, quote_ttl=60.0)
+        cache.shared = table
+        table.register(["AAPL"])
+        table.put({"AAPL": quote("AAPL", 1.0)}, OPEN - 120)
+
+        quotes = await cache.get_quotes(["AAPL"])
+        assert quotes["AAPL"].price == provider.price_for("AAPL")
+
+
+class TestStressPreload:
+    """Test suite for keeping a preloaded scenario set."""
+
+    def test_same_source_is_not_reloaded(self):
+        """Loading the built-in scenarios again keeps the set already compiled."""
+        scenarios = stress_tester.scenarios
+        stress_tester.load(None)
+        assert stress_tester.scenarios is scenarios
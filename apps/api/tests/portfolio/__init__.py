@@ -0,0 +1,3 @@
+"""
+Portfolio test package.
+"""
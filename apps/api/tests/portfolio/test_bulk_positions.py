@@ -0,0 +1,119 @@
+"""
+Bulk position write tests.
+
+This module contains tests for the bulk upsert service and the
+``positions/bulk`` endpoint.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Position
+from app.services.positions import dedupe_lots, upsert_positions
+from app.services.snapshot import snapshot_store
+
+
+def lot(symbol: str, quantity: float, lot: str = "default", **extra) -> dict:
+    """Build a position row."""
+    return {"symbol": symbol, "lot": lot, "quantity": quantity, "entry_price": 10.0, **extra}
+
+
+class TestBulkUpsertService:
+    """Test suite for the bulk upsert service."""
+
+    def test_dedupe_keeps_last(self):
+        """Test that duplicate (symbol, lot) rows keep the last occurrence."""
+        rows = dedupe_lots([lot("AAPL", 1), lot("AAPL", 2, lot="b"), lot("AAPL", 3)])
+
+        assert [(r["lot"], r["quantity"]) for r in rows] == [("default", 3), ("b", 2)]
+
+    @pytest.mark.asyncio
+    async def test_upsert_inserts_and_replaces(self, db_session: AsyncSession, create_portfolio):
+        """Test that existing lots are updated in place and new lots inserted."""
+        portfolio = await create_portfolio()
+        await upsert_positions(db_session, portfolio.id, [lot("AAPL", 1), lot("MSFT", 2)])
+        await db_session.commit()
+
+        result = await upsert_positions(
+            db_session, portfolio.id,
+            [lot("AAPL", 5, stop_loss=9.0), lot("AAPL", 7, lot="2024-01"), lot("AAPL", 6, stop_loss=8.0)],
+        )
+        await db_session.commit()
+
+        assert result.dict() == {"received": 3, "written": 2, "duplicates": 1, "method": "insert"}
+        rows = (await db_session.execute(
+            select(Position.symbol, Position.lot, Position.quantity, Position.stop_loss)
+            .order_by(Position.symbol, Position.lot)
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            ("AAPL", "2024-01", 7.0, None),
+            ("AAPL", "default", 6.0, 8.0),
+            ("MSFT", "default", 2.0, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_copy_requires_postgres(self, db_session: AsyncSession, create_portfolio):
+        """Test that forcing COPY on SQLite is rejected."""
+        portfolio = await create_portfolio()
+
+        with pytest.raises(NotImplementedError):
+            await upsert_positions(db_session, portfolio.id, [lot("AAPL", 1)], use_copy=True)
+
+    @pytest.mark.asyncio
+    async def test_commit_invalidates_snapshot(self, db_session: AsyncSession, create_portfolio):
+        """Test that Core bulk writes still invalidate the snapshot on commit."""
+        portfolio = await create_portfolio()
+        await snapshot_store.get(db_session, portfolio.id)
+
+        await upsert_positions(db_session, portfolio.id, [lot("AAPL", 1)])
+        assert snapshot_store.peek(portfolio.id) is not None
+        await db_session.commit()
+
+        assert snapshot_store.peek(portfolio.id) is None
+
+
+class TestBulkPositionsEndpoint:
+    """Test suite for the bulk positions endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a payload of lots is written in one request."""
+        portfolio = await create_portfolio()
+        payload = {"positions": [lot(f"s{i}", i + 1) for i in range(200)] + [lot("S0", 42)]}
+
+        response = await client.post(f"/api/v1/portfolio/{portfolio.id}/positions/bulk", json=payload)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "portfolio_id": portfolio.id,
+            "received": 201,
+            "written": 200,
+            "duplicates": 1,
+            "method": "insert",
+        }
+        assert await db_session.scalar(select(func.count()).select_from(Position)) == 200
+        quantity = await db_session.scalar(select(Position.quantity).where(Position.symbol == "S0"))
+        assert quantity == 42
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_validation(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that invalid lots reject the whole payload."""
+        portfolio = await create_portfolio()
+
+        response = await client.post(
+            f"/api/v1/portfolio/{portfolio.id}/positions/bulk",
+            json={"positions": [lot("AAPL", 0)]},
+        )
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_unknown_portfolio(self, client: AsyncClient):
+        """Test that writes to an unknown portfolio are rejected."""
+        response = await client.post(
+            "/api/v1/portfolio/999/positions/bulk", json={"positions": [lot("AAPL", 1)]}
+        )
+
+        assert response.status_code == 404
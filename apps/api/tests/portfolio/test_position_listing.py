@@ -0,0 +1,109 @@
+"""
+Position listing tests.
+
+This module contains tests for the keyset-paginated ``positions`` listing
+endpoint and its cursor helpers.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.positions import (
+    InvalidCursor,
+    LISTABLE_FIELDS,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    upsert_positions,
+)
+from tests.portfolio.test_bulk_positions import lot
+
+
+async def create_lots(db_session: AsyncSession, create_portfolio, count: int) -> int:
+    """Create a portfolio holding ``count`` lots and return its ID."""
+    portfolio = await create_portfolio()
+    await upsert_positions(db_session, portfolio.id, [lot(f"S{i:03d}", i + 1, sector="Tech") for i in range(count)])
+    await db_session.commit()
+    return portfolio.id
+
+
+class TestListingHelpers:
+    """Test suite for cursor and projection parsing."""
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes to the ID it was built from."""
+        assert decode_cursor(encode_cursor(12345)) == 12345
+
+    @pytest.mark.parametrize("cursor", ["!!", "bm90LWFuLWlk", encode_cursor(-1)])
+    def test_invalid_cursor(self, cursor: str):
+        """Test that malformed cursors are rejected."""
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor)
+
+    def test_projection_keeps_id_and_listing_order(self):
+        """Test that id is always selected and fields keep a fixed order."""
+        assert parse_fields(["quantity", " symbol "]) == ("id", "symbol", "quantity")
+        assert parse_fields(None) == LISTABLE_FIELDS
+        with pytest.raises(ValueError):
+            parse_fields(["symbol", "hashed_password"])
+
+
+class TestPositionListingEndpoint:
+    """Test suite for the position listing endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_every_lot_once(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that following next_cursor returns every lot once, in ID order."""
+        portfolio_id = await create_lots(db_session, create_portfolio, 25)
+        url = f"/api/v1/portfolio/{portfolio_id}/positions"
+
+        ids, pages, params = [], [], {"limit": 10, "fields": "symbol,quantity"}
+        while True:
+            response = await client.get(url, params=params)
+            assert response.status_code == 200
+            page = response.json()
+            pages.append(len(page["positions"]))
+            ids.extend(p["id"] for p in page["positions"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        assert pages == [10, 10, 5]
+        assert ids == sorted(ids) and len(set(ids)) == 25
+        assert page["fields"] == ["id", "symbol", "quantity"]
+        assert page["positions"][-1] == {"id": ids[-1], "symbol": "S024", "quantity": 25.0}
+
+    @pytest.mark.asyncio
+    async def test_exact_page_has_no_cursor(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a page ending on the last lot does not point to an empty page."""
+        portfolio_id = await create_lots(db_session, create_portfolio, 10)
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio_id}/positions", params={"limit": 10})
+
+        page = response.json()
+        assert len(page["positions"]) == 10
+        assert page["next_cursor"] is None
+        assert set(page["positions"][0]) == set(LISTABLE_FIELDS)
+
+    @pytest.mark.asyncio
+    async def test_empty_portfolio(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that a portfolio without lots lists an empty page."""
+        portfolio = await create_portfolio()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/positions")
+
+        assert response.json() == {
+            "portfolio_id": portfolio.id, "fields": list(LISTABLE_FIELDS), "positions": [], "next_cursor": None,
+        }
+
+    @pytest.mark.asyncio
+    async def test_invalid_parameters(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Test that bad cursors, unknown fields and unknown portfolios are rejected."""
+        portfolio = await create_portfolio()
+        url = f"/api/v1/portfolio/{portfolio.id}/positions"
+
+        assert (await client.get(url, params={"cursor": "!!"})).status_code == 400
+        assert (await client.get(url, params={"fields": "symbol,owner"})).status_code == 400
+        assert (await client.get(url, params={"limit": 0})).status_code == 422
+        assert (await client.get("/api/v1/portfolio/999/positions")).status_code == 404
@@ -0,0 +1,161 @@
+"""
+Portfolio snapshot tests.
+
+This module contains tests for the columnar snapshot store and its
+invalidation on committed position writes.
+"""
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position
+from app.services.snapshot import (
+    CodeTable,
+    PortfolioNotFoundError,
+    SnapshotStore,
+    snapshot_store,
+)
+
+
+# Two lots, one without a sector, stop or price; held with 250.0 cash.
+LOTS = (
+    dict(symbol="AAPL", sector="Technology", quantity=10, entry_price=100.0, stop_loss=90.0, current_price=110.0),
+    dict(symbol="XOM", sector=None, quantity=5, entry_price=50.0, stop_loss=None, current_price=None),
+)
+
+
+class TestCodeTable:
+    """Test suite for string interning."""
+
+    def test_encode_is_stable(self):
+        """Test that equal strings share a code and None maps to 0."""
+        table = CodeTable()
+
+        codes = table.encode_many(["AAPL", "MSFT", "AAPL", None])
+
+        assert codes.tolist() == [1, 2, 1, 0]
+        assert table.decode_many(codes) == ["AAPL", "MSFT", "AAPL", None]
+        assert len(table) == 3
+
+
+class TestSnapshotStore:
+    """Test suite for the portfolio snapshot store."""
+
+    @pytest.mark.asyncio
+    async def test_build_snapshot(self, db_session: AsyncSession, create_portfolio):
+        """Test that a snapshot holds read-only columns and decoded codes."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+
+        snapshot = await SnapshotStore().get(db_session, portfolio.id)
+
+        assert len(snapshot) == 2
+        assert snapshot.cash_balance == 250.0
+        assert snapshot.symbols == ["AAPL", "XOM"]
+        assert snapshot.sectors == ["Technology", None]
+        assert snapshot.current_price.tolist() == [110.0, 50.0]
+        assert not snapshot.quantity.flags.writeable
+        assert snapshot.arrays.quantity is snapshot.quantity
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_shared(self, db_session: AsyncSession, create_portfolio):
+        """Test that repeated reads return the same snapshot object."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        store = SnapshotStore()
+
+        first = await store.get(db_session, portfolio.id)
+        second = await store.get(db_session, portfolio.id)
+
+        assert first is second
+
+    @pytest.mark.asyncio
+    async def test_commit_invalidates_snapshot(self, db_session: AsyncSession, create_portfolio):
+        """Test that committing a position write drops the cached snapshot."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        before = await snapshot_store.get(db_session, portfolio.id)
+
+        db_session.add(Position(portfolio_id=portfolio.id, symbol="MSFT",
+                                quantity=1, entry_price=300.0))
+        await db_session.commit()
+
+        assert snapshot_store.peek(portfolio.id) is None
+        after = await snapshot_store.get(db_session, portfolio.id)
+        assert after is not before
+        assert len(after) == 3
+
+    @pytest.mark.asyncio
+    async def test_moved_position_invalidates_both_portfolios(self, db_session: AsyncSession, create_portfolio):
+        """Test that moving a position drops the snapshots of its old and new portfolio."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        other = Portfolio(user_id=portfolio.user_id, name="Other", cash_balance=0.0)
+        db_session.add(other)
+        await db_session.commit()
+        await snapshot_store.get(db_session, portfolio.id)
+        await snapshot_store.get(db_session, other.id)
+
+        position = await db_session.scalar(select(Position).where(Position.symbol == "XOM"))
+        position.portfolio_id = other.id
+        await db_session.commit()
+
+        assert snapshot_store.peek(portfolio.id) is None
+        assert snapshot_store.peek(other.id) is None
+        assert len(await snapshot_store.get(db_session, portfolio.id)) == 1
+
+    @pytest.mark.asyncio
+    async def test_snapshots_expire(self, db_session: AsyncSession, create_portfolio):
+        """Test that a snapshot older than the TTL is rebuilt without notifying listeners."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        clock = [0.0]
+        store = SnapshotStore(ttl=10.0, clock=lambda: clock[0])
+        notified = []
+        store.add_listener(notified.append)
+
+        first = await store.get(db_session, portfolio.id)
+        clock[0] = 9.0
+        assert await store.get(db_session, portfolio.id) is first
+        clock[0] = 10.0
+        assert store.peek(portfolio.id) is None
+        assert await store.get(db_session, portfolio.id) is not first
+        assert notified == []
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_is_evicted(self, db_session: AsyncSession, create_portfolio):
+        """Test that the store keeps at most max_entries snapshots."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        others = [Portfolio(user_id=portfolio.user_id, name=f"P{i}", cash_balance=0.0) for i in range(2)]
+        db_session.add_all(others)
+        await db_session.commit()
+        store = SnapshotStore(max_entries=2)
+
+        await store.get(db_session, portfolio.id)
+        await store.get(db_session, others[0].id)
+        await store.get(db_session, portfolio.id)
+        await store.get(db_session, others[1].id)
+
+        assert len(store) == 2
+        assert store.peek(others[0].id) is None
+        assert store.peek(portfolio.id) is not None
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_build_is_not_cached(self, db_session: AsyncSession, create_portfolio):
+        """Test that a build racing an invalidation is not stored."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        store = SnapshotStore()
+        load = SnapshotStore._load
+
+        async def racing_load(db, portfolio_id):
+            snapshot = await load(db, portfolio_id)
+            store.invalidate(portfolio_id)
+            return snapshot
+
+        with patch.object(SnapshotStore, "_load", staticmethod(racing_load)):
+            await store.get(db_session, portfolio.id)
+
+        assert store.peek(portfolio.id) is None
+
+    @pytest.mark.asyncio
+    async def test_missing_portfolio(self, db_session: AsyncSession):
+        """Test that unknown portfolios raise PortfolioNotFoundError."""
+        with pytest.raises(PortfolioNotFoundError):
+            await SnapshotStore().get(db_session, 999)
@@ -0,0 +1,79 @@
+"""
+Snapshot relay tests.
+
+This module contains tests for relaying snapshot invalidations between
+workers over Redis pub/sub, using fakeredis as the shared server.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.snapshot import SnapshotStore
+from app.services.snapshot_relay import SnapshotRelay
+from tests.portfolio.test_snapshot import LOTS
+
+
+@pytest.fixture
+def server():
+    """Return a fakeredis server shared by the simulated workers."""
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeServer()
+
+
+def worker(server):
+    """Return a store and a relay started on its own connection to ``server``."""
+    from fakeredis.aioredis import FakeRedis
+
+    store = SnapshotStore()
+    relay = SnapshotRelay(store, retry=0.01)
+    relay.start(FakeRedis(server=server, decode_responses=True))
+    return store, relay
+
+
+async def settle() -> None:
+    """Let subscriptions and published messages be processed."""
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+class TestSnapshotRelay:
+    """Test suite for cross-process snapshot invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_workers(self, server, db_session: AsyncSession, create_portfolio):
+        """An invalidation in one worker drops the snapshot in another, once, skipping local-only listeners."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        (store_a, relay_a), (store_b, relay_b) = worker(server), worker(server)
+        notified_a, notified_b = [], []
+        store_a.add_listener(notified_a.append)
+        store_b.add_listener(notified_b.append)
+        local_b = []
+        store_b.add_listener(local_b.append, local_only=True)
+        await settle()
+        try:
+            await store_b.get(db_session, portfolio.id)
+
+            store_a.invalidate(portfolio.id)
+            await settle()
+
+            assert store_b.peek(portfolio.id) is None
+            assert notified_a == [portfolio.id]
+            assert notified_b == [portfolio.id]
+            assert local_b == []
+        finally:
+            await relay_a.stop()
+            await relay_b.stop()
+
+    @pytest.mark.asyncio
+    async def test_idle_without_redis(self, db_session: AsyncSession, create_portfolio):
+        """Without a client, invalidations stay local."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=250.0)
+        store = SnapshotStore()
+        relay = SnapshotRelay(store)
+
+        store.invalidate(portfolio.id)
+
+        assert relay.client is None
+        assert not relay._tasks
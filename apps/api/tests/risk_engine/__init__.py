@@ -0,0 +1,3 @@
+"""
+Risk engine test package.
+"""
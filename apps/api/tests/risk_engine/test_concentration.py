@@ -0,0 +1,135 @@
+"""
+Concentration analysis tests.
+
+This module contains tests for the single-pass group-by kernel, the
+concentration views and warnings, and the concentration endpoint.
+"""
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position, User
+from app.services.concentration import (
+    group_totals,
+    market_cap_bucket,
+    portfolio_concentration,
+    symbol_classifier,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_classifications():
+    """Drop symbol classifications after each test."""
+    yield
+    symbol_classifier.clear()
+
+
+class TestGroupTotals:
+    """Test suite for the group-by kernel."""
+
+    def test_matches_per_dimension_loop(self):
+        """One pass over several columns equals a dict loop per column."""
+        rng = np.random.default_rng(3)
+        weights = rng.uniform(1, 100, 500)
+        columns = [rng.integers(0, 5, 500), rng.integers(100, 10_000, 500)]
+
+        keys, totals, counts = group_totals(columns, weights)
+
+        for codes, key, total, count in zip(columns, keys, totals, counts):
+            expected = {}
+            for code, weight in zip(codes.tolist(), weights):
+                expected[code] = expected.get(code, 0.0) + weight
+            assert key.tolist() == sorted(expected)
+            np.testing.assert_allclose(total, [expected[k] for k in key.tolist()])
+            assert count.sum() == 500
+
+
+class TestConcentration:
+    """Test suite for concentration views and warnings."""
+
+    def test_positions_and_sectors(self, make_snapshot):
+        """Lots of a symbol are aggregated; HHI, top-N and >20% warnings are reported."""
+        snapshot = make_snapshot([
+            ("AAPL", "Technology", 10, 100.0),
+            ("AAPL", "Technology", 20, 100.0),
+            ("MSFT", "Technology", 10, 100.0),
+            ("XOM", "Energy", -20, 100.0),
+            ("NEWCO", None, 10, 100.0),
+        ], cash=2_000.0)
+
+        report = portfolio_concentration(snapshot, top_n=2, dimensions=("position", "sector"))
+        positions, sectors = report.views
+
+        assert report.portfolio_value == 9_000.0
+        assert [g.key for g in positions.top] == ["AAPL", "XOM"]
+        assert positions.top[0].positions == 2
+        assert positions.groups == 4
+        assert positions.hhi == pytest.approx((300 / 7) ** 2 + 2 * (100 / 7) ** 2 + (200 / 7) ** 2,
+                                              rel=1e-4)
+        assert report.max_concentration == pytest.approx(33.3333)
+        assert sectors.unclassified_percent == pytest.approx(11.1111)
+        assert [(w.dimension, w.key) for w in report.warnings[:2]] == [
+            ("sector", "Technology"), ("position", "AAPL"),
+        ]
+        assert {(w.dimension, w.key) for w in report.warnings[2:]} == {
+            ("sector", "Energy"), ("position", "XOM"),
+        }
+
+    def test_classified_dimensions(self, make_snapshot):
+        """Country and market cap come from the symbol classifier; unclassified is never warned."""
+        symbol_classifier.assign("country", {"AAPL": "US", "SAP": "DE"})
+        symbol_classifier.assign("market_cap", {"AAPL": market_cap_bucket(3e12),
+                                                "SAP": market_cap_bucket(1.5e9)})
+        snapshot = make_snapshot([
+            ("AAPL", "Technology", 10, 100.0),
+            ("SAP", "Technology", 10, 100.0),
+            ("UNKNOWN", None, 30, 100.0),
+        ])
+
+        report = portfolio_concentration(snapshot, dimensions=("country", "market_cap"))
+        country, market_cap = report.views
+
+        assert {g.key: g.percent for g in country.top} == {"US": 20.0, "DE": 20.0}
+        assert country.unclassified_percent == 60.0
+        assert country.effective_groups == 2.0
+        assert [g.key for g in market_cap.top] == ["large", "small"]
+        assert report.warnings == []
+
+
+class TestConcentrationEndpoint:
+    """Test suite for the concentration endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_get_portfolio_concentration(self, client: AsyncClient, db_session: AsyncSession, quotes):
+        """Every dimension is reported with warnings above the threshold."""
+        quotes.prices.update({"AAPL": 100.0, "JPM": 100.0, "BAC": 100.0})
+        user = User(email="conc@example.com", username="conc", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=0.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all([
+            Position(portfolio_id=portfolio.id, symbol=symbol, sector=sector, quantity=qty,
+                     entry_price=100.0, current_price=100.0)
+            for symbol, sector, qty in (("AAPL", "Technology", 50), ("JPM", "Financials", 25),
+                                        ("BAC", "Financials", 25))
+        ])
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/concentration?threshold=30")
+        missing = await client.get("/api/v1/portfolio/999999/concentration")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [v["dimension"] for v in data["views"]] == [
+            "position", "sector", "industry", "country", "market_cap", "style_box",
+        ]
+        assert data["max_concentration"] == 50.0
+        assert data["views"][1]["hhi"] == 5_000.0
+        assert [(w["dimension"], w["key"]) for w in data["warnings"]] == [
+            ("position", "AAPL"), ("sector", "Technology"), ("sector", "Financials"),
+        ]
+        assert missing.status_code == 404
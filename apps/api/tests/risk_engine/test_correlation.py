@@ -0,0 +1,143 @@
+"""
+Correlation service tests.
+
+This module contains tests for the incremental rolling-window correlation
+and the holdings correlation endpoint.
+"""
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position, User
+from app.services.correlation import CorrelationService, RollingCorrelation, correlation_service
+
+
+def make_returns(days: int, n: int, seed: int = 0) -> np.ndarray:
+    """Generate returns where the first two columns are strongly correlated."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.01, (days, n))
+    returns[:, 1] = returns[:, 0] * 0.9 + rng.normal(0.0, 0.002, days)
+    return returns
+
+
+class TestRollingCorrelation:
+    """Test suite for the incremental correlation matrix."""
+
+    def test_incremental_updates_match_full_recompute(self):
+        """Pushing bars past the window equals np.corrcoef over the last window."""
+        returns = make_returns(days=130, n=5)
+        universe = RollingCorrelation(["A", "B", "C", "D", "E"], window=50)
+
+        for row in returns:
+            universe.push_returns(row)
+
+        assert universe.observations == 50
+        np.testing.assert_allclose(universe.matrix(), np.corrcoef(returns[-50:], rowvar=False),
+                                   atol=1e-10)
+
+    def test_returns_window_oldest_first(self):
+        """The returns of a wrapped window come back in chronological order."""
+        returns = make_returns(days=70, n=3)
+        universe = RollingCorrelation(["A", "B", "C"], window=50)
+        for row in returns:
+            universe.push_returns(row)
+
+        np.testing.assert_array_equal(universe.returns(["C", "A"]), returns[-50:][:, [2, 0]])
+
+    def test_load_then_push_and_prices(self):
+        """A seeded universe keeps rolling from closing prices."""
+        returns = make_returns(days=60, n=3)
+        universe = RollingCorrelation(["A", "B", "C"], window=40)
+        universe.load(returns[:55])
+
+        prices = np.array([100.0, 50.0, 20.0])
+        universe.push_prices(prices)
+        for row in returns[55:]:
+            prices = prices * (1 + row)
+            universe.push_prices(prices)
+
+        np.testing.assert_allclose(universe.matrix(), np.corrcoef(returns[-40:], rowvar=False),
+                                   atol=1e-10)
+
+    def test_constant_series_and_submatrix(self):
+        """Zero-variance symbols get NaN; sub-matrices follow the requested order."""
+        returns = make_returns(days=30, n=3)
+        returns[:, 2] = 0.0
+        universe = RollingCorrelation(["A", "B", "C"], window=30)
+        universe.load(returns)
+
+        sub = universe.submatrix(["B", "A"])
+        assert sub[0, 0] == 1.0
+        assert sub[0, 1] == pytest.approx(np.corrcoef(returns[:, 0], returns[:, 1])[0, 1])
+        assert np.isnan(universe.matrix()[2]).all()
+
+    def test_matrix_is_cached_until_next_bar(self):
+        """The matrix is computed once per bar."""
+        universe = RollingCorrelation(["A", "B"], window=10)
+        universe.load(make_returns(days=10, n=2))
+
+        first = universe.matrix()
+        assert universe.matrix() is first
+        universe.push_returns([0.01, 0.02])
+        assert universe.matrix() is not first
+
+
+class TestCorrelationService:
+    """Test suite for universe selection and slicing."""
+
+    def test_smallest_covering_universe_is_sliced(self):
+        """Holdings are served from the smallest universe covering them."""
+        service = CorrelationService()
+        service.register("broad", ["A", "B", "C", "D"], make_returns(300, 4))
+        service.register("tech", ["A", "B"], make_returns(300, 2, seed=1))
+
+        result = service.for_symbols(["B", "A", "A", "ZZZ"])
+
+        assert result.symbols == ["B", "A"]
+        assert result.missing_symbols == ["ZZZ"]
+        assert result.observations == 252
+        (a, b, corr), = result.high_pairs(0.7)
+        assert {a, b} == {"A", "B"}
+        assert corr > 0.9
+
+    def test_on_bar_requires_every_symbol(self):
+        """A bar must carry a close for each universe symbol."""
+        service = CorrelationService()
+        service.register("u", ["A", "B"])
+        with pytest.raises(KeyError):
+            service.on_bar("u", {"A": 1.0})
+
+
+class TestCorrelationEndpoint:
+    """Test suite for the holdings correlation endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_get_portfolio_correlation(self, client: AsyncClient, db_session: AsyncSession):
+        """Test the matrix of a stored portfolio's holdings."""
+        user = User(email="corr@example.com", username="corr", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=0.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all([
+            Position(portfolio_id=portfolio.id, symbol=symbol, quantity=10, entry_price=10.0)
+            for symbol in ("AAPL", "MSFT", "NEWCO")
+        ])
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/correlation")
+        assert response.status_code == 422
+
+        correlation_service.register("test", ["AAPL", "MSFT", "XOM"], make_returns(300, 3))
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/correlation")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["symbols"] == ["AAPL", "MSFT"]
+        assert data["missing_symbols"] == ["NEWCO"]
+        assert data["matrix"][0][0] == 1.0
+        assert data["high_correlation_pairs"][0]["symbol_a"] == "AAPL"
+        assert data["window"] == 252
@@ -0,0 +1,206 @@
+"""
+Correlation feed tests.
+
+This module contains tests for seeding the holdings universe from daily
+history and advancing it at market closes.
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position, User
+from app.services.correlation import CorrelationService
+from app.services.correlation_feed import HOLDINGS, CorrelationFeed, align_closes
+from app.services.market_data import DailyBar, FakeQuoteProvider, MarketDataError, PriceCache, QuoteClient, TokenBucket
+from tests.conftest import TestAsyncSessionLocal
+
+START = date(2024, 3, 4)
+
+
+def bars(symbol: str, closes, start: date = START):
+    """Return consecutive daily bars of ``closes``."""
+    return [
+        DailyBar(symbol, start + timedelta(days=i), c, c, c, c, None, "fake")
+        for i, c in enumerate(closes)
+    ]
+
+
+class NextDayProvider(FakeQuoteProvider):
+    """Fake provider whose latest bar is dated after its history."""
+
+    async def fetch_daily_bars(self, symbols):
+        latest = await super().fetch_daily_bars(symbols)
+        tomorrow = date.today() + timedelta(days=1)
+        return {s: DailyBar(s, tomorrow, b.close * 1.1, b.close * 1.1, b.close * 1.1, b.close * 1.1, None, "fake")
+                for s, b in latest.items()}
+
+
+class FlakyProvider(FakeQuoteProvider):
+    """Fake provider whose first ``failures`` history calls fail."""
+
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    async def fetch_daily_history(self, symbol, days):
+        if self.failures:
+            self.failures -= 1
+            raise MarketDataError("upstream down")
+        return await super().fetch_daily_history(symbol, days)
+
+
+def make_feed(provider: FakeQuoteProvider, **client_options) -> CorrelationFeed:
+    """Return a feed over a private service, the test database and ``provider``."""
+    client = QuoteClient(provider, batch_window=0, **client_options)
+    feed = CorrelationFeed(CorrelationService(), window=20, retry=0.01)
+    feed.sessions = TestAsyncSessionLocal
+    feed.client = client
+    feed.prices = PriceCache(client)
+    return feed
+
+
+async def hold(db_session: AsyncSession, *symbols: str) -> None:
+    """Create a portfolio holding ``symbols``."""
+    user = User(email="feed@example.com", username="feed", hashed_password="x")
+    db_session.add(user)
+    await db_session.flush()
+    portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=0.0)
+    db_session.add(portfolio)
+    await db_session.flush()
+    db_session.add_all([
+        Position(portfolio_id=portfolio.id, symbol=s, quantity=1, entry_price=10.0) for s in symbols
+    ])
+    await db_session.commit()
+
+
+class TestAlignCloses:
+    """Test suite for aligning per-symbol histories."""
+
+    def test_gaps_are_carried_forward(self):
+        """A missing day repeats the previous close."""
+        history = {"A": bars("A", [1.0, 2.0, 3.0]), "B": bars("B", [10.0, 11.0, 12.0])}
+        del history["B"][1]
+
+        symbols, dates, closes = align_closes(history, 3)
+
+        assert symbols == ["A", "B"]
+        assert dates == [START, START + timedelta(days=1), START + timedelta(days=2)]
+        np.testing.assert_array_equal(closes, [[1.0, 10.0], [2.0, 10.0], [3.0, 12.0]])
+
+    def test_short_history_is_left_out(self):
+        """A symbol without a close on the window's first date is excluded."""
+        history = {"A": bars("A", [1.0, 2.0, 3.0]), "NEW": bars("NEW", [5.0], START + timedelta(days=2))}
+
+        symbols, _, closes = align_closes(history, 3)
+
+        assert symbols == ["A"]
+        assert closes.shape == (3, 1)
+
+
+class TestCorrelationFeed:
+    """Test suite for seeding and advancing the holdings universe."""
+
+    @pytest.mark.asyncio
+    async def test_seed_from_holdings(self, db_session: AsyncSession):
+        """Held symbols with history fill the window; those without are left out."""
+        await hold(db_session, "AAPL", "MSFT", "NEWCO")
+        feed = make_feed(FakeQuoteProvider(unknown=["NEWCO"]))
+
+        assert await feed.seed() == 2
+
+        universe = feed.service.universe(HOLDINGS)
+        assert universe.symbols == ("AAPL", "MSFT")
+        assert universe.observations == 20
+        assert feed.last_date.weekday() < 5
+        found, returns, missing = feed.service.returns_for(["AAPL", "NEWCO"])
+        assert found == ["AAPL"] and returns.shape == (20, 1) and missing == ["NEWCO"]
+
+    @pytest.mark.asyncio
+    async def test_close_adds_one_bar(self, db_session: AsyncSession):
+        """A newer daily bar is pushed once; the same bar again is ignored."""
+        await hold(db_session, "AAPL", "MSFT")
+        feed = make_feed(NextDayProvider())
+        await feed.seed()
+        universe = feed.service.universe(HOLDINGS)
+        version = universe.version
+
+        assert await feed.on_close() is True
+        assert await feed.on_close() is False
+
+        assert universe.version == version + 1
+        np.testing.assert_allclose(universe.returns(["AAPL", "MSFT"])[-1], [0.1, 0.1])
+
+    @pytest.mark.asyncio
+    async def test_new_holding_reseeds(self, db_session: AsyncSession):
+        """A symbol bought after seeding joins the universe at the next close."""
+        await hold(db_session, "AAPL")
+        feed = make_feed(FakeQuoteProvider(unknown=["NEWCO"]))
+        await feed.seed()
+        db_session.add(Position(portfolio_id=1, symbol="MSFT", quantity=1, entry_price=10.0))
+        db_session.add(Position(portfolio_id=1, symbol="NEWCO", quantity=1, entry_price=10.0))
+        await db_session.commit()
+
+        assert await feed.on_close() is True
+        assert feed.service.universe(HOLDINGS).symbols == ("AAPL", "MSFT")
+        # NEWCO has no history; it does not trigger a reseed at every close.
+        assert await feed.on_close() is False
+
+    @pytest.mark.asyncio
+    async def test_seed_waits_for_rate_limit_tokens(self, db_session: AsyncSession):
+        """Seeding more symbols than the burst waits for tokens instead of failing."""
+        await hold(db_session, "A", "B", "C", "D")
+        feed = make_feed(FakeQuoteProvider(), limiter=TokenBucket(rate=200.0, capacity=1), max_wait=0.0)
+
+        assert await feed.seed() == 4
+
+    @pytest.mark.asyncio
+    async def test_startup_seed_retries_and_blocks_closes(self, db_session: AsyncSession):
+        """A failed startup seed is retried; a close meanwhile does not start another seed."""
+        await hold(db_session, "AAPL", "MSFT")
+        provider = FlakyProvider(failures=1)
+        feed = make_feed(provider)
+        feed.retry = 0.05
+
+        feed.start()
+        await asyncio.sleep(0.01)
+        assert feed.seeding
+        assert await feed.on_close() is False
+        await asyncio.wait_for(feed._task, 1.0)
+
+        assert feed.service.universe(HOLDINGS).symbols == ("AAPL", "MSFT")
+        assert provider.failures == 0
+        assert provider.calls == [["AAPL"], ["MSFT"]]
+
+    @pytest.mark.asyncio
+    async def test_followers_load_the_published_universe(self, db_session: AsyncSession, tmp_path):
+        """A following worker loads the seeding worker's closes instead of fetching them."""
+        await hold(db_session, "AAPL", "MSFT", "NEWCO")
+        publisher = make_feed(NextDayProvider(unknown=["NEWCO"]))
+        publisher.history_path = str(tmp_path / "correlation.npz")
+        provider = FakeQuoteProvider()
+        follower = make_feed(provider)
+        follower.history_path = publisher.history_path
+        follower.follows = True
+        await publisher.seed()
+
+        follower.start()
+        await asyncio.sleep(0.05)
+        try:
+            assert follower.service.universe(HOLDINGS).symbols == ("AAPL", "MSFT")
+            assert follower.last_date == publisher.last_date
+            assert follower.service.returns_for(["NEWCO"])[2] == ["NEWCO"]
+
+            assert await publisher.on_close() is True
+            assert await follower.on_close() is False
+            await asyncio.sleep(0.05)
+            assert follower.last_date == publisher.last_date
+            np.testing.assert_allclose(
+                follower.service.universe(HOLDINGS).returns(["AAPL", "MSFT"])[-1], [0.1, 0.1]
+            )
+        finally:
+            await follower.stop()
+        assert provider.calls == []
@@ -0,0 +1,119 @@
+"""
+Performance kernel tests.
+
+This module contains tests for the streaming drawdown, Welford and rolling
+window kernels against direct per-window computations.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.services.risk import (
+    WINDOWS,
+    PerformanceAccumulator,
+    Welford,
+    max_drawdown,
+    performance_summary,
+    rolling_mean_std,
+    trailing_max_drawdowns,
+)
+from app.services.risk.performance import TRADING_DAYS_PER_YEAR
+
+
+def make_values(days: int = 1_000, seed: int = 3) -> np.ndarray:
+    """Generate a random-walk portfolio value series."""
+    rng = np.random.default_rng(seed)
+    return 100_000.0 * np.cumprod(1.0 + rng.normal(0.0004, 0.012, days))
+
+
+def naive_drawdown(values) -> float:
+    """Maximum drawdown by comparing every peak with every later trough."""
+    worst = 0.0
+    for i, peak in enumerate(values):
+        for trough in values[i + 1:]:
+            worst = max(worst, 1.0 - trough / peak)
+    return worst
+
+
+class TestKernels:
+    """Test suite for the single-pass kernels."""
+
+    def test_welford_matches_numpy(self):
+        """Welford moments equal the two-pass mean and sample variance."""
+        x = np.random.default_rng(1).normal(1e6, 1.0, 10_000)
+        moments = Welford()
+        for v in x:
+            moments.push(v)
+        assert moments.mean == pytest.approx(x.mean(), rel=1e-12)
+        assert moments.variance == pytest.approx(x.var(ddof=1), rel=1e-9)
+        assert math.isnan(Welford().variance)
+
+    def test_trailing_drawdowns_match_every_suffix(self):
+        """Each suffix's drawdown equals a direct computation over it."""
+        values = make_values(60)
+        suffix = trailing_max_drawdowns(values)
+        for s in range(len(values)):
+            assert suffix[s] == pytest.approx(naive_drawdown(values[s:]), abs=1e-12)
+        assert max_drawdown(values) == pytest.approx(naive_drawdown(values), abs=1e-12)
+
+    def test_rolling_mean_std_match_windows(self):
+        """Cumulative-sum rolling moments equal per-window NumPy moments."""
+        returns = np.diff(make_values(300)) / make_values(300)[:-1]
+        mean, std = rolling_mean_std(returns, 21)
+        assert len(mean) == len(returns) - 20
+        for i in (0, 17, len(mean) - 1):
+            window = returns[i:i + 21]
+            assert mean[i] == pytest.approx(window.mean(), rel=1e-9)
+            assert std[i] == pytest.approx(window.std(ddof=1), rel=1e-9)
+
+
+class TestPerformanceSummary:
+    """Test suite for trailing-window summaries."""
+
+    def test_windows_match_direct_computation(self):
+        """Every window equals statistics computed on its own slice."""
+        values = make_values(600)
+        summary = performance_summary(values, risk_free_rate=0.02)
+
+        assert set(summary) == {"1M", "3M", "6M", "1Y", "inception"}
+        for name, stats in summary.items():
+            days = WINDOWS.get(name, len(values) - 1)
+            window = values[-1 - days:]
+            returns = window[1:] / window[:-1] - 1.0
+            std = returns.std(ddof=1)
+            assert stats.days == days
+            assert stats.total_return == pytest.approx(window[-1] / window[0] - 1.0, rel=1e-12)
+            assert stats.volatility == pytest.approx(std * math.sqrt(TRADING_DAYS_PER_YEAR), rel=1e-8)
+            assert stats.sharpe == pytest.approx(
+                (returns.mean() - 0.02 / TRADING_DAYS_PER_YEAR) / std * math.sqrt(TRADING_DAYS_PER_YEAR),
+                rel=1e-7,
+            )
+            assert stats.max_drawdown == pytest.approx(max_drawdown(window), abs=1e-12)
+
+    def test_generator_matches_array(self):
+        """A generator is streamed and agrees with the vectorized path."""
+        values = make_values(2_000)
+        streamed = performance_summary(float(v) for v in values)
+        vectorized = performance_summary(values)
+
+        assert set(streamed) == set(vectorized) == set(WINDOWS) | {"inception"}
+        for name in vectorized:
+            for field, expected in vectorized[name].dict().items():
+                if isinstance(expected, float):
+                    assert streamed[name].dict()[field] == pytest.approx(expected, rel=1e-8, abs=1e-12)
+
+    def test_accumulator_keeps_only_longest_window(self):
+        """Memory is bounded by the longest window, not the stream length."""
+        accumulator = PerformanceAccumulator({"1M": 21}).extend(make_values(5_000))
+        assert len(accumulator._values) == 22
+        assert accumulator.summary()["inception"].days == 4_999
+
+    def test_short_and_flat_series(self):
+        """Too little history yields nothing; a flat series has no Sharpe ratio."""
+        assert performance_summary(np.array([100.0, 101.0])) == {}
+        flat = performance_summary(np.full(30, 100.0))
+        assert flat["1M"].volatility == 0.0
+        assert flat["1M"].sharpe is None
+        assert flat["1M"].max_drawdown == 0.0
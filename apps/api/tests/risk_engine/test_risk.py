@@ -0,0 +1,156 @@
+"""
+Risk engine tests.
+
+This module contains tests for the vectorized risk calculator and the
+portfolio risk endpoint.
+"""
+
+import math
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position, User
+from app.services.risk import PositionArrays, calculate_risk
+
+
+class TestRiskCalculator:
+    """Test suite for the vectorized risk calculator."""
+
+    def test_total_risk_if_all_stops_hit(self):
+        """Test dollar and percentage risk from current price to stop."""
+        positions = PositionArrays.from_columns(
+            quantity=[100, 50],
+            entry_price=[10.0, 20.0],
+            stop_loss=[9.0, 18.0],
+            current_price=[11.0, 20.0],
+        )
+
+        metrics = calculate_risk(positions, cash_balance=1000.0)
+
+        assert metrics.position_count == 2
+        assert metrics.market_value == 2100.0
+        assert metrics.cost_basis == 2000.0
+        assert metrics.unrealized_pnl == 100.0
+        assert metrics.portfolio_value == 3100.0
+        assert metrics.total_risk_dollars == 300.0
+        assert math.isclose(metrics.total_risk_percent, 300 / 3100 * 100, rel_tol=1e-4)
+        assert metrics.largest_position_risk == 200.0
+
+    def test_unprotected_positions_count_towards_drawdown_only(self):
+        """Test that positions without a stop are excluded from stop risk."""
+        positions = PositionArrays.from_columns(
+            quantity=[10, 10],
+            entry_price=[100.0, 50.0],
+            stop_loss=[90.0, None],
+            current_price=[100.0, 50.0],
+        )
+
+        metrics = calculate_risk(positions)
+
+        assert metrics.total_risk_dollars == 100.0
+        assert metrics.max_drawdown_dollars == 600.0
+        assert metrics.unprotected_positions == 1
+
+    def test_stop_above_price_does_not_offset_risk(self):
+        """Test that trailing stops above the market contribute zero risk."""
+        positions = PositionArrays.from_columns(
+            quantity=[10, 10],
+            entry_price=[100.0, 100.0],
+            stop_loss=[120.0, 90.0],
+            current_price=[110.0, 100.0],
+        )
+
+        assert calculate_risk(positions).total_risk_dollars == 100.0
+
+    def test_missing_current_price_falls_back_to_entry(self):
+        """Test that lots without a quote are valued at entry price."""
+        positions = PositionArrays.from_columns(
+            quantity=[10], entry_price=[50.0], stop_loss=[45.0], current_price=[None]
+        )
+
+        assert calculate_risk(positions).market_value == 500.0
+
+    def test_empty_portfolio(self):
+        """Test metrics for a portfolio without positions."""
+        metrics = calculate_risk(PositionArrays.from_rows([]), cash_balance=500.0)
+
+        assert metrics.position_count == 0
+        assert metrics.total_risk_dollars == 0.0
+        assert metrics.total_risk_percent == 0.0
+        assert metrics.largest_position_risk == 0.0
+        assert metrics.portfolio_value == 500.0
+
+    def test_mismatched_columns_rejected(self):
+        """Test that columns of different lengths are rejected."""
+        with pytest.raises(ValueError):
+            PositionArrays(
+                quantity=np.ones(2),
+                entry_price=np.ones(2),
+                stop_loss=np.ones(1),
+                current_price=np.ones(2),
+            )
+
+
+class TestRiskEndpoint:
+    """Test suite for the portfolio risk endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_get_portfolio_risk(self, client: AsyncClient, db_session: AsyncSession, quotes):
+        """Test risk metrics for a stored portfolio."""
+        quotes.prices.update({"AAPL": 11.0, "MSFT": 20.0})
+        user = User(email="trader@example.com", username="trader", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=1000.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all([
+            Position(portfolio_id=portfolio.id, symbol="AAPL", quantity=100,
+                     entry_price=10.0, stop_loss=9.0, current_price=11.0),
+            Position(portfolio_id=portfolio.id, symbol="MSFT", quantity=50,
+                     entry_price=20.0, stop_loss=18.0, current_price=20.0),
+        ])
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/risk")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["portfolio_id"] == portfolio.id
+        assert data["position_count"] == 2
+        assert data["total_risk_dollars"] == 300.0
+        assert "calculated_at" in data
+
+    @pytest.mark.asyncio
+    async def test_risk_is_valued_at_cached_quotes(self, client: AsyncClient, db_session: AsyncSession, quotes):
+        """Test that quotes replace stored prices and unquoted positions keep theirs."""
+        quotes.prices["AAPL"] = 12.0
+        quotes.unknown.add("MSFT")
+        user = User(email="trader@example.com", username="trader", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=0.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all([
+            Position(portfolio_id=portfolio.id, symbol="AAPL", quantity=100,
+                     entry_price=10.0, stop_loss=9.0, current_price=11.0),
+            Position(portfolio_id=portfolio.id, symbol="MSFT", quantity=50,
+                     entry_price=20.0, stop_loss=18.0, current_price=20.0),
+        ])
+        await db_session.commit()
+
+        data = (await client.get(f"/api/v1/portfolio/{portfolio.id}/risk")).json()
+
+        assert data["total_risk_dollars"] == 100 * 3.0 + 50 * 2.0
+        assert quotes.calls == [["AAPL", "MSFT"]]
+
+    @pytest.mark.asyncio
+    async def test_get_portfolio_risk_not_found(self, client: AsyncClient):
+        """Test risk metrics for an unknown portfolio."""
+        response = await client.get("/api/v1/portfolio/999/risk")
+
+        assert response.status_code == 404
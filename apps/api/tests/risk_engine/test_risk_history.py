@@ -0,0 +1,244 @@
+"""
+Risk history tests.
+
+This module contains tests for the stored risk columns, partition bounds,
+downsampling, snapshot recording and the history endpoint.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Position, RiskSnapshot
+from app.services.market_data import FakeQuoteProvider, MarketDataError, PriceCache, QuoteClient
+from app.cache import KEY_PREFIX
+from app.services.risk_history import CLOSE_RECORDED, CLOSE_RECORDING, downsample, measure, partition_for, risk_history
+from app.services.snapshot import PortfolioSnapshot, snapshot_store
+from tests.conftest import TestAsyncSessionLocal
+
+
+@pytest_asyncio.fixture
+async def recorder():
+    """Point the application's recorder at the test database and a fake provider."""
+    sessions, prices = risk_history.sessions, risk_history.prices
+    risk_history.sessions = TestAsyncSessionLocal
+    risk_history.prices = PriceCache(QuoteClient(FakeQuoteProvider({"AAPL": 120.0}), batch_window=0))
+    yield risk_history
+    risk_history.sessions, risk_history.prices = sessions, prices
+
+
+# Two stopped lots and one unprotected lot, held with 1000.0 cash.
+LOTS = (
+    dict(symbol="AAPL", quantity=10, entry_price=100.0, current_price=100.0, stop_loss=90.0),
+    dict(symbol="MSFT", quantity=5, entry_price=200.0, current_price=200.0, stop_loss=180.0),
+    dict(symbol="AAPL", lot="b", quantity=10, entry_price=100.0, current_price=100.0),
+)
+
+
+class TestMeasure:
+    """Test suite for the stored risk columns."""
+
+    def test_columns_match_risk_engine(self):
+        """Risk comes from the risk engine; concentration groups lots by symbol."""
+        snapshot = PortfolioSnapshot(1, 1000.0, [
+            (1, "AAPL", None, 10, 100.0, 90.0, 100.0),
+            (2, "MSFT", None, 5, 200.0, 180.0, 200.0),
+            (3, "AAPL", None, 10, 100.0, None, 100.0),
+        ])
+        row = measure(snapshot)
+
+        assert row["portfolio_value"] == 4000.0
+        assert row["total_risk_dollars"] == 10 * 10 + 5 * 20
+        assert row["max_concentration"] == pytest.approx(50.0)
+        assert row["meta"]["unprotected_positions"] == 1
+
+    def test_prices_override_stored_ones(self):
+        """Closing prices revalue positions; NaN keeps the stored price."""
+        snapshot = PortfolioSnapshot(1, 0.0, [
+            (1, "AAPL", None, 10, 100.0, 90.0, 100.0),
+            (2, "MSFT", None, 5, 200.0, 180.0, 200.0),
+        ])
+        row = measure(snapshot, np.array([110.0, np.nan]))
+        assert row["portfolio_value"] == 10 * 110.0 + 5 * 200.0
+        assert row["total_risk_dollars"] == 10 * 20 + 5 * 20
+
+
+class TestPartitionsAndDownsampling:
+    """Test suite for monthly partition bounds and downsampling."""
+
+    def test_partition_bounds(self):
+        """Partitions are UTC calendar months and roll over the year."""
+        name, start, end = partition_for(datetime(2024, 12, 31, 23, 0, tzinfo=timezone(timedelta(hours=-5))))
+        assert name == "risk_snapshots_202501"
+        assert start == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        assert end == datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+    def test_keeps_latest_per_bucket(self):
+        """Each bucket keeps its latest row; short series are returned whole."""
+        timestamps = np.array([0.0, 1.0, 2.5, 3.0, 9.0, 9.5])
+        assert downsample(timestamps, 0.0, 10.0, 5).tolist() == [1, 3, 5]
+        assert downsample(timestamps[:3], 0.0, 10.0, 5).tolist() == [0, 1, 2]
+
+
+class TestRecorder:
+    """Test suite for materializing snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_position_writes_are_recorded_once(self, db_session: AsyncSession, recorder, create_portfolio):
+        """A commit schedules the portfolio; unchanged snapshots are not recorded again."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=1000.0)
+
+        assert await recorder.flush() == 1
+        snapshot_store.invalidate(portfolio.id)
+        assert await recorder.flush() == 0
+
+        position = await db_session.scalar(select(Position).where(Position.symbol == "MSFT"))
+        position.current_price = 210.0
+        await db_session.commit()
+        assert await recorder.flush() == 1
+
+        rows = (await db_session.scalars(
+            select(RiskSnapshot).where(RiskSnapshot.portfolio_id == portfolio.id)
+            .order_by(RiskSnapshot.timestamp)
+        )).all()
+        assert [r.portfolio_value for r in rows] == [4000.0, 4050.0]
+        assert rows[0].meta["trigger"] == "positions"
+
+    @pytest.mark.asyncio
+    async def test_close_is_recorded_at_closing_prices_once(self, db_session: AsyncSession, recorder, create_portfolio):
+        """Close rows use daily closes and repeated recordings of a close are ignored."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=1000.0)
+        closed_at = datetime(2024, 3, 8, 21, 0, tzinfo=timezone.utc)
+
+        assert await recorder.record_close(closed_at) == 1
+        await recorder.record_close(closed_at)
+        # The sweep does not fill the shared snapshot store.
+        assert snapshot_store.peek(portfolio.id) is None
+
+        rows = (await db_session.scalars(
+            select(RiskSnapshot).where(RiskSnapshot.portfolio_id == portfolio.id)
+        )).all()
+        assert len(rows) == 1
+        assert rows[0].meta["trigger"] == "close"
+        msft = FakeQuoteProvider().price_for("MSFT")
+        assert rows[0].portfolio_value == pytest.approx(20 * 120.0 + 5 * msft + 1000.0)
+
+
+    @pytest.mark.asyncio
+    async def test_close_is_recorded_by_one_worker(self, recorder, monkeypatch):
+        """Workers sharing Redis record a close once and wait on a claim in progress."""
+        fakeredis = pytest.importorskip("fakeredis.aioredis")
+        recorded = []
+
+        async def record_close(closed_at):
+            recorded.append(closed_at)
+            return 0
+
+        monkeypatch.setattr(recorder, "record_close", record_close)
+        monkeypatch.setattr(recorder, "redis", fakeredis.FakeRedis(decode_responses=True))
+        closed_at = datetime(2024, 3, 8, 21, 0, tzinfo=timezone.utc)
+
+        assert await recorder._record_close_once(closed_at) is True
+        assert await recorder._record_close_once(closed_at) is True
+        assert recorded == [closed_at]
+
+        pending = datetime(2024, 3, 11, 20, 0, tzinfo=timezone.utc)
+        await recorder.redis.set(f"{KEY_PREFIX}:risk_history:close:{pending.isoformat()}", CLOSE_RECORDING)
+        assert await recorder._record_close_once(pending) is False
+        assert recorded == [closed_at]
+
+    @pytest.mark.asyncio
+    async def test_close_is_skipped_once_the_next_session_opens(self, recorder, monkeypatch):
+        """A worker starting mid-session does not record the previous close at partial-day bars."""
+        recorded, advanced = [], []
+
+        async def record_close_once(closed_at):
+            recorded.append(closed_at)
+            return True
+
+        async def on_close():
+            advanced.append(True)
+            return True
+
+        monkeypatch.setattr(recorder, "_record_close_once", record_close_once)
+        monkeypatch.setattr(recorder.correlations, "on_close", on_close)
+        monkeypatch.setattr(recorder, "_last_close", None)
+        friday_close = recorder.calendar.last_close(datetime(2024, 3, 9, tzinfo=timezone.utc))
+
+        # Monday mid-session: Friday's close is past and not swept.
+        await recorder._check_close(recorder.calendar.next_open(friday_close) + timedelta(hours=1))
+        assert recorded == [] and advanced == []
+
+        monkeypatch.setattr(recorder, "_last_close", None)
+        # Saturday: Friday's bars are still the close's.
+        await recorder._check_close(friday_close + timedelta(hours=12))
+        assert recorded == [friday_close] and advanced == [True]
+
+    @pytest.mark.asyncio
+    async def test_failed_close_is_not_marked_recorded(self, recorder, monkeypatch):
+        """A sweep that fails releases its claim, so the close is recorded again."""
+        fakeredis = pytest.importorskip("fakeredis.aioredis")
+        attempts = []
+
+        async def record_close(closed_at):
+            attempts.append(closed_at)
+            if len(attempts) == 1:
+                raise MarketDataError("upstream down")
+            return 0
+
+        monkeypatch.setattr(recorder, "record_close", record_close)
+        monkeypatch.setattr(recorder, "redis", fakeredis.FakeRedis(decode_responses=True))
+        closed_at = datetime(2024, 3, 8, 21, 0, tzinfo=timezone.utc)
+        key = f"{KEY_PREFIX}:risk_history:close:{closed_at.isoformat()}"
+
+        with pytest.raises(MarketDataError):
+            await recorder._record_close_once(closed_at)
+        assert await recorder.redis.get(key) is None
+        assert await recorder._record_close_once(closed_at) is True
+        assert await recorder.redis.get(key) == CLOSE_RECORDED
+        assert attempts == [closed_at, closed_at]
+
+
+class TestHistoryEndpoint:
+    """Test suite for the risk history endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_history_is_downsampled(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Stored rows in range are bucketed to the requested number of points."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=1000.0)
+        now = datetime.now(timezone.utc)
+        db_session.add_all([
+            RiskSnapshot(
+                portfolio_id=portfolio.id, timestamp=now - timedelta(days=days),
+                portfolio_value=1000.0 + days, total_risk_dollars=float(days),
+                total_risk_percent=0.0, max_concentration=10.0,
+            )
+            for days in (40, 20, 19, 5, 1)
+        ])
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/risk/history",
+                                    params={"range": "1M", "points": 2})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["range"] == "1M"
+        assert data["snapshots"] == 4
+        assert [p["total_risk_dollars"] for p in data["points"]] == [19.0, 1.0]
+
+        year = await client.get(f"/api/v1/portfolio/{portfolio.id}/risk/history", params={"range": "1Y"})
+        assert year.json()["snapshots"] == 5
+
+    @pytest.mark.asyncio
+    async def test_invalid_requests(self, client: AsyncClient, db_session: AsyncSession, create_portfolio):
+        """Unknown portfolios are 404 and unknown ranges are rejected."""
+        portfolio = await create_portfolio(*LOTS, cash_balance=1000.0)
+        missing = await client.get("/api/v1/portfolio/999999/risk/history")
+        bad_range = await client.get(f"/api/v1/portfolio/{portfolio.id}/risk/history",
+                                     params={"range": "5Y"})
+        assert missing.status_code == 404
+        assert bad_range.status_code == 422
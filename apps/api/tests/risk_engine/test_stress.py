@@ -0,0 +1,111 @@
+"""
+Stress scenario tests.
+
+This module contains tests for scenario compilation, the binary scenario
+format, applying every scenario to a portfolio and the stress endpoint.
+"""
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Portfolio, Position, User
+from app.services.stress import ScenarioSet
+
+DEFINITIONS = {
+    "beta_buckets": {"edges": [0.8, 1.2], "multipliers": [0.5, 1.0, 1.5]},
+    "sector_aliases": {"Tech": "Information Technology"},
+    "scenarios": [
+        {
+            "name": "crash",
+            "market": -0.2,
+            "sectors": {"Information Technology": -0.4, "Energy": 0.1},
+            "symbols": {"SPY": -0.25},
+        },
+        {"name": "rally", "market": 0.1},
+    ],
+}
+
+
+class TestScenarioSet:
+    """Test suite for compiled scenarios."""
+
+    def test_shocks_by_symbol_sector_and_beta(self, make_snapshot):
+        """Symbols override sectors, aliases resolve and betas pick the bucket multiplier."""
+        scenarios = ScenarioSet.compile(DEFINITIONS)
+        snapshot = make_snapshot([
+            ("AAPL", "tech", 10, 100.0),       # -0.4 x 1.0
+            ("XOM", "Energy", 10, 100.0),      # +0.1 x 1.5 (high beta)
+            ("SPY", "Information Technology", 10, 100.0),  # symbol override
+            ("NEWCO", None, -10, 100.0),       # market, short
+        ])
+
+        pnl = scenarios.pnl(snapshot, betas=np.array([1.0, 1.5, 1.0, 0.5]))
+
+        np.testing.assert_allclose(pnl, [-400 + 150 - 250 + 100, 100 + 150 + 100 - 50])
+
+    def test_run_orders_worst_first(self, make_snapshot):
+        """Results are sorted by P&L with percentages of portfolio value."""
+        scenarios = ScenarioSet.compile(DEFINITIONS)
+        snapshot = make_snapshot([("AAPL", "Information Technology", 10, 100.0)], cash=1_000.0)
+
+        results = scenarios.run(snapshot)
+
+        assert [r.name for r in results] == ["crash", "rally"]
+        assert results[0].pnl == -400.0
+        assert results[0].pnl_percent == -20.0
+        assert results[0].portfolio_value_after == 1_600.0
+
+    def test_binary_round_trip(self, tmp_path, make_snapshot):
+        """A saved set loads with identical shocks and lookups."""
+        compiled = ScenarioSet.compile(DEFINITIONS)
+        path = tmp_path / "scenarios.npz"
+        compiled.save(path)
+
+        loaded = ScenarioSet.load(path)
+        snapshot = make_snapshot([("SPY", None, 1, 100.0), ("MSFT", "Tech", 1, 100.0)])
+
+        assert loaded.names == ["crash", "rally"]
+        np.testing.assert_allclose(loaded.shocks, compiled.shocks, atol=1e-7)
+        np.testing.assert_allclose(loaded.pnl(snapshot), compiled.pnl(snapshot), atol=1e-4)
+
+    def test_builtin_scenarios(self, make_snapshot):
+        """The built-in set covers the 2008 crisis and the COVID crash."""
+        scenarios = ScenarioSet.from_json()
+        snapshot = make_snapshot([("JPM", "Financials", 100, 100.0)])
+
+        results = {r.name: r for r in scenarios.run(snapshot)}
+
+        assert results["gfc_2008"].pnl == -8_000.0
+        assert results["covid_2020"].pnl == -4_200.0
+
+
+class TestStressEndpoint:
+    """Test suite for the portfolio stress endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_get_portfolio_stress(self, client: AsyncClient, db_session: AsyncSession, quotes):
+        """Every built-in scenario is applied to the stored positions."""
+        quotes.prices["XOM"] = 100.0
+        user = User(email="stress@example.com", username="stress", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=1_000.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add(Position(portfolio_id=portfolio.id, symbol="XOM", sector="Energy",
+                                quantity=10, entry_price=100.0, current_price=100.0))
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/stress")
+        missing = await client.get("/api/v1/portfolio/999999/stress")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["portfolio_value"] == 2_000.0
+        pnl = [s["pnl"] for s in data["scenarios"]]
+        assert pnl == sorted(pnl)
+        assert {"gfc_2008", "covid_2020"} <= {s["name"] for s in data["scenarios"]}
+        assert data["scenarios"][0]["name"] == "covid_2020"
+        assert missing.status_code == 404
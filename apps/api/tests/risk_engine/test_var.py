@@ -0,0 +1,120 @@
+"""
+Value at Risk tests.
+
+This module contains tests for the parametric, historical and Monte Carlo
+VaR / CVaR calculations.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from app.services.risk import InsufficientHistoryError, calculate_var
+from app.services.risk.var import monte_carlo_var
+
+
+def make_returns(days: int = 1_000, positions: int = 3, seed: int = 7) -> np.ndarray:
+    """Generate correlated normal daily returns."""
+    rng = np.random.default_rng(seed)
+    vol = np.linspace(0.01, 0.03, positions)
+    corr = np.full((positions, positions), 0.5) + 0.5 * np.eye(positions)
+    cov = corr * np.outer(vol, vol)
+    return rng.multivariate_normal(np.full(positions, 0.0005), cov, size=days)
+
+
+class TestVaR:
+    """Test suite for VaR and CVaR methods."""
+
+    def test_parametric_matches_closed_form(self):
+        """Parametric VaR equals z * sigma - mu for the portfolio P&L."""
+        returns = make_returns()
+        exposures = np.array([10_000.0, 5_000.0, -2_000.0])
+
+        result = calculate_var(returns, exposures, method="parametric", confidence=0.99)
+
+        pnl = returns @ exposures
+        z = NormalDist().inv_cdf(0.99)
+        expected = z * pnl.std(ddof=1) - pnl.mean()
+        assert math.isclose(result.var, expected, abs_tol=0.01)
+        assert result.cvar > result.var
+        assert result.portfolio_value == 17_000.0
+        assert math.isclose(result.var_percent, result.var / 17_000 * 100, rel_tol=1e-3)
+
+    def test_historical_quantile_and_expected_shortfall(self):
+        """Historical VaR is the empirical loss quantile; CVaR averages the tail."""
+        returns = np.linspace(-0.05, 0.049, 100)[:, np.newaxis]
+        exposures = np.array([1_000.0])
+
+        result = calculate_var(returns, exposures, method="historical", confidence=0.95,
+                               min_observations=100)
+
+        pnl = returns[:, 0] * 1_000
+        cutoff = np.quantile(pnl, 0.05)
+        assert math.isclose(result.var, -cutoff, abs_tol=0.01)
+        assert math.isclose(result.cvar, -pnl[pnl <= cutoff].mean(), abs_tol=0.01)
+
+    def test_square_root_of_time_scaling(self):
+        """Parametric and historical VaR scale with the square root of the horizon."""
+        returns = make_returns() - make_returns().mean(axis=0)
+        exposures = np.array([1_000.0, 1_000.0, 1_000.0])
+
+        for method in ("parametric", "historical"):
+            one_day = calculate_var(returns, exposures, method=method)
+            ten_day = calculate_var(returns, exposures, method=method, horizon_days=10)
+            assert math.isclose(ten_day.var, one_day.var * math.sqrt(10), rel_tol=1e-3)
+
+    def test_monte_carlo_is_seeded_and_close_to_parametric(self):
+        """Monte Carlo is reproducible for a seed and converges to the normal VaR."""
+        returns = make_returns()
+        exposures = np.array([10_000.0, 5_000.0, 2_000.0])
+
+        first = monte_carlo_var(returns, exposures, paths=200_000, seed=42, chunk_size=30_000)
+        second = monte_carlo_var(returns, exposures, paths=200_000, seed=42, chunk_size=30_000)
+        parametric = calculate_var(returns, exposures, method="parametric")
+
+        assert first == second
+        assert first.paths == 200_000
+        assert math.isclose(first.var, parametric.var, rel_tol=0.03)
+        assert math.isclose(first.cvar, parametric.cvar, rel_tol=0.03)
+
+    def test_monte_carlo_process_pool_matches_serial(self):
+        """Fanning chunks out to processes does not change a seeded result."""
+        returns = make_returns()
+        exposures = np.array([10_000.0, 5_000.0, 2_000.0])
+
+        serial = monte_carlo_var(returns, exposures, paths=20_000, seed=1, chunk_size=5_000,
+                                 horizon_days=5)
+        parallel = monte_carlo_var(returns, exposures, paths=20_000, seed=1, chunk_size=5_000,
+                                   horizon_days=5, workers=2)
+
+        assert serial == parallel
+
+    @pytest.mark.parametrize("days,positions", [(20, 40), (300, 3)])
+    def test_singular_covariance(self, days, positions):
+        """Monte Carlo handles more positions than days and collinear returns."""
+        returns = make_returns(days=days, positions=positions)
+        if positions == 3:
+            returns[:, 2] = returns[:, 0]
+        exposures = np.full(positions, 100.0)
+
+        result = monte_carlo_var(returns, exposures, paths=50_000, seed=3, min_observations=20)
+        parametric = calculate_var(returns, exposures, method="parametric", min_observations=20)
+
+        assert math.isclose(result.var, parametric.var, rel_tol=0.05)
+
+    def test_insufficient_history(self):
+        """Less than a year of returns raises with an explanation."""
+        with pytest.raises(InsufficientHistoryError, match="252 days"):
+            calculate_var(make_returns(days=100), np.ones(3))
+
+    def test_invalid_arguments(self):
+        """Bad method, confidence or shapes are rejected."""
+        returns = make_returns()
+        with pytest.raises(ValueError, match="Unknown VaR method"):
+            calculate_var(returns, np.ones(3), method="delta")
+        with pytest.raises(ValueError, match="confidence"):
+            calculate_var(returns, np.ones(3), confidence=95)
+        with pytest.raises(ValueError, match="returns must be"):
+            calculate_var(returns, np.ones(4))
@@ -0,0 +1,178 @@
+"""
+Result cache tests.
+
+This module contains tests for the in-process and Redis cache backends and
+the analytics memoization layer built on them.
+"""
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from unittest.mock import patch
+
+from app.cache import MemoryCache, RedisCache, ResultCache, result_cache
+from app.models import Portfolio, Position, User
+from app.services.snapshot import PortfolioSnapshot
+
+ROWS = [(1, "AAPL", "Technology", 10.0, 100.0, 90.0, 110.0)]
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    """Yield each cache backend, using fakeredis as the Redis stand-in."""
+    if request.param == "memory":
+        return MemoryCache()
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    return RedisCache(fakeredis.FakeRedis(decode_responses=True))
+
+
+class TestMemoryCache:
+    """Test suite for the in-process backend."""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = MemoryCache(max_entries=2)
+        await cache.set("a", "1", ttl=60)
+        await cache.set("b", "2", ttl=60)
+        await cache.get("a")
+        await cache.set("c", "3", ttl=60)
+
+        assert await cache.get("a") == "1"
+        assert await cache.get("b") is None
+        assert await cache.get("c") == "3"
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Test that expired entries are not returned."""
+        cache = MemoryCache()
+        with patch("app.cache.time.monotonic", return_value=1000.0):
+            await cache.set("a", "1", ttl=10)
+        with patch("app.cache.time.monotonic", return_value=1011.0):
+            assert await cache.get("a") is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_tags_forget_evicted_and_expired_keys(self):
+        """Test that tags only track keys still stored."""
+        cache = MemoryCache(max_entries=2)
+        with patch("app.cache.time.monotonic", return_value=1000.0):
+            await cache.set("a", "1", ttl=10, tag="t1")
+            await cache.set("b", "2", ttl=60, tag="t2")
+            await cache.set("c", "3", ttl=60, tag="t2")
+        assert cache._tags == {"t2": {"b", "c"}}
+
+        with patch("app.cache.time.monotonic", return_value=1011.0):
+            await cache.set("d", "4", ttl=5, tag="t3")
+        with patch("app.cache.time.monotonic", return_value=1020.0):
+            assert await cache.get("d") is None
+        assert cache._tags == {"t2": {"c"}}
+
+
+class TestResultCache:
+    """Test suite for analytics memoization."""
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_memoizes(self, backend):
+        """Test that a second lookup for the same snapshot is a hit."""
+        cache = ResultCache(backend)
+        snapshot = PortfolioSnapshot(1, 100.0, ROWS)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"value": 42}
+
+        first = await cache.get_or_compute("risk", snapshot, compute)
+        second = await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, ROWS), compute)
+
+        assert first == second == {"value": 42}
+        assert len(calls) == 1
+        assert cache.hits == 1 and cache.misses == 1
+        assert cache.hit_ratio == 0.5
+
+    @pytest.mark.asyncio
+    async def test_content_change_misses(self, backend):
+        """Test that changed positions produce a different key."""
+        cache = ResultCache(backend)
+        changed = [(1, "AAPL", "Technology", 20.0, 100.0, 90.0, 110.0)]
+
+        await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, ROWS), lambda: {"v": 1})
+        result = await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, changed), lambda: {"v": 2})
+
+        assert result == {"v": 2}
+
+    @pytest.mark.asyncio
+    async def test_price_change_misses(self, backend):
+        """Test that a changed price is a different key and other prices are not."""
+        cache = ResultCache(backend)
+        repriced = [(1, "AAPL", "Technology", 10.0, 100.0, 90.0, 111.0)]
+
+        await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, ROWS), lambda: {"v": 1})
+        result = await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, repriced), lambda: {"v": 2})
+        cached = await cache.get_or_compute("risk", PortfolioSnapshot(1, 100.0, ROWS), lambda: {"v": 3})
+
+        assert result == {"v": 2}
+        assert cached == {"v": 1}
+
+    @pytest.mark.asyncio
+    async def test_invalidate_portfolio(self, backend):
+        """Test that invalidation deletes every entry of a portfolio."""
+        cache = ResultCache(backend)
+        snapshot = PortfolioSnapshot(1, 100.0, ROWS)
+        await cache.get_or_compute("risk", snapshot, lambda: {"v": 1})
+        await cache.get_or_compute("concentration", snapshot, lambda: {"v": 1})
+
+        await cache.invalidate(1)
+
+        assert await backend.get(cache.make_key("risk", snapshot)) is None
+        assert await backend.get(cache.make_key("concentration", snapshot)) is None
+
+    @pytest.mark.asyncio
+    async def test_backend_failure_falls_back_to_compute(self):
+        """Test that backend errors degrade to recomputation."""
+
+        class BrokenBackend(MemoryCache):
+            async def get(self, key):
+                raise ConnectionError("down")
+
+        cache = ResultCache(BrokenBackend())
+        result = await cache.get_or_compute("risk", PortfolioSnapshot(1, 0.0, ROWS), lambda: {"v": 1})
+
+        assert result == {"v": 1}
+
+
+class TestRiskEndpointCaching:
+    """Test suite for caching on the risk endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_position_write_invalidates(self, client: AsyncClient, db_session: AsyncSession, quotes):
+        """Test that risk is served from cache until a position write."""
+        quotes.prices.update({"AAPL": 100.0, "MSFT": 300.0})
+        user = User(email="trader@example.com", username="trader", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main", cash_balance=0.0)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add(Position(portfolio_id=portfolio.id, symbol="AAPL", quantity=10,
+                                entry_price=100.0, stop_loss=90.0, current_price=100.0))
+        await db_session.commit()
+        url = f"/api/v1/portfolio/{portfolio.id}/risk"
+
+        first = (await client.get(url)).json()
+        hits = result_cache.hits
+        second = (await client.get(url)).json()
+        assert result_cache.hits == hits + 1
+        assert second == first
+
+        db_session.add(Position(portfolio_id=portfolio.id, symbol="MSFT", quantity=1,
+                                entry_price=300.0, stop_loss=280.0, current_price=300.0))
+        await db_session.commit()
+        await asyncio.sleep(0)
+
+        third = (await client.get(url)).json()
+        assert third["position_count"] == 2
+        assert third["total_risk_dollars"] == 120.0
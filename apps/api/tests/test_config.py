@@ -0,0 +1,39 @@
+"""
+Settings tests.
+
+This module contains tests for environment parsing of the application
+settings.
+"""
+
+from app.config import Settings
+
+REQUIRED = {
+    "SECRET_KEY": "secret",
+    "POSTGRES_SERVER": "db",
+    "POSTGRES_USER": "app",
+    "POSTGRES_PASSWORD": "pw",
+    "POSTGRES_DB": "portfolio",
+}
+
+
+class TestSettings:
+    """Test suite for settings validation."""
+
+    def test_database_url_is_assembled(self):
+        """Without an explicit URL, one is built from the POSTGRES_* settings."""
+        settings = Settings(**REQUIRED, POSTGRES_PORT=6543)
+        assert str(settings.SQLALCHEMY_DATABASE_URI) == "postgresql+asyncpg://app:pw@db:6543/portfolio"
+
+    def test_explicit_database_url_wins(self):
+        """An explicit URL is used as given."""
+        url = "postgresql+asyncpg://u:p@elsewhere:5432/other"
+        settings = Settings(**REQUIRED, SQLALCHEMY_DATABASE_URI=url)
+        assert str(settings.SQLALCHEMY_DATABASE_URI) == url
+
+    def test_cors_origins_from_comma_separated_env(self, monkeypatch):
+        """A comma-separated environment value is split into origins."""
+        monkeypatch.setenv("BACKEND_CORS_ORIGINS", "http://localhost:3000, https://example.com")
+        settings = Settings(**REQUIRED)
+        assert [str(o) for o in settings.BACKEND_CORS_ORIGINS] == [
+            "http://localhost:3000/", "https://example.com/",
+        ]
@@ -0,0 +1,106 @@
+"""
+Database engine tests.
+
+This module tests pool instrumentation and read-replica routing.
+"""
+
+import contextvars
+
+import pytest
+from sqlalchemy import insert, select, text
+from unittest.mock import patch
+
+from app import database
+from app.database import (
+    POOL_CHECKOUT_TIMEOUTS,
+    POOL_CHECKOUT_WAIT,
+    POOL_OVERFLOW_CONNECTS,
+    POOL_PRE_PING,
+    RoutingSession,
+    create_engine_for,
+)
+from app.models import Position
+
+
+class TestPoolInstrumentation:
+    """Test suite for pool event hooks and settings."""
+
+    @pytest.mark.asyncio
+    async def test_pool_settings_and_checkout_metrics(self):
+        """Engines use the configured pool and record wait and pre-ping per pool."""
+        engine = create_engine_for("sqlite+aiosqlite:///:memory:", "pool-test")
+        try:
+            assert engine.pool.size() == database.settings.DB_POOL_SIZE
+            assert engine.pool._max_overflow == database.settings.DB_MAX_OVERFLOW
+            assert engine.pool._recycle == database.settings.DB_POOL_RECYCLE
+
+            for _ in range(2):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+
+        assert POOL_CHECKOUT_WAIT.count(pool="pool-test") == 2
+        # The first checkout opens a fresh connection and is not pinged.
+        assert POOL_PRE_PING.count(pool="pool-test") == 1
+
+    @pytest.mark.asyncio
+    async def test_exhaustion_records_overflow_and_timeouts(self):
+        """Overflow connections and checkout timeouts are counted."""
+        with patch.object(database.settings, "DB_POOL_SIZE", 1), \
+             patch.object(database.settings, "DB_MAX_OVERFLOW", 1), \
+             patch.object(database.settings, "DB_POOL_TIMEOUT", 0.05):
+            engine = create_engine_for("sqlite+aiosqlite:///:memory:", "exhaustion-test")
+        try:
+            first = await engine.connect()
+            second = await engine.connect()
+            with pytest.raises(Exception) as excinfo:
+                await engine.connect()
+            await first.close()
+            await second.close()
+        finally:
+            await engine.dispose()
+
+        assert "QueuePool limit" in str(excinfo.value)
+        assert POOL_OVERFLOW_CONNECTS.get(pool="exhaustion-test") == 1
+        assert POOL_CHECKOUT_TIMEOUTS.get(pool="exhaustion-test") == 1
+
+
+class TestRoutingSession:
+    """Test suite for read-replica routing."""
+
+    def test_without_replica_everything_goes_to_primary(self):
+        """With no replica configured reads use the primary."""
+        session = RoutingSession()
+
+        assert session.get_bind(clause=select(Position)) is database.engine.sync_engine
+
+    def test_selects_go_to_replica_and_writes_to_primary(self):
+        """Only SELECTs are routed to the replica."""
+        replica = create_engine_for("sqlite+aiosqlite:///:memory:", "replica-test")
+        session = RoutingSession()
+
+        def check():
+            assert session.get_bind(clause=select(Position)) is replica.sync_engine
+            assert session.get_bind(clause=insert(Position)) is database.engine.sync_engine
+            assert session.get_bind(clause=text("SELECT 1")) is database.engine.sync_engine
+            assert session.get_bind(clause=select(Position), primary=True) is database.engine.sync_engine
+
+        with patch.object(database, "replica_engine", replica):
+            contextvars.Context().run(check)
+
+    def test_reads_stay_on_primary_after_a_local_commit(self):
+        """Reads go to the primary within the replica lag window after a commit in the same context."""
+        replica = create_engine_for("sqlite+aiosqlite:///:memory:", "replica-lag-test")
+        session = RoutingSession()
+
+        def committed():
+            database._record_primary_commit(session)
+            return session.get_bind(clause=select(Position))
+
+        def other_request():
+            return session.get_bind(clause=select(Position))
+
+        with patch.object(database, "replica_engine", replica):
+            assert contextvars.Context().run(committed) is database.engine.sync_engine
+            assert contextvars.Context().run(other_request) is replica.sync_engine
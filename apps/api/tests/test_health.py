@@ -5,10 +5,15 @@ This module contains comprehensive tests for all health check endpoints
 including basic health, detailed health, liveness, and readiness probes.
 """
 
+import time
+
 import pytest
 from httpx import AsyncClient
 from unittest.mock import patch, AsyncMock
 
+from app.database import get_db
+from app.main import app
+
 
 class TestHealthEndpoints:
     """Test suite for health check endpoints."""
@@ -72,11 +77,11 @@ class TestHealthEndpoints:
     @pytest.mark.asyncio
     async def test_detailed_health_check_db_failure(self, client: AsyncClient):
         """Test the detailed health check when database is unhealthy."""
-        # Mock database failure
-        with patch('app.routers.health.get_db') as mock_get_db:
-            mock_session = AsyncMock()
-            mock_session.execute.side_effect = Exception("Database connection failed")
-            mock_get_db.return_value.__aenter__.return_value = mock_session
+        # Mock database failure in the sampler's ping
+        with patch(
+            'app.monitoring.SystemSampler._ping_db',
+            AsyncMock(side_effect=Exception("Database connection failed")),
+        ):
             
             with patch('psutil.cpu_percent', return_value=25.5), \
                  patch('psutil.virtual_memory') as mock_memory, \
@@ -98,6 +103,54 @@ class TestHealthEndpoints:
                 assert data["status"] == "degraded"
                 assert "unhealthy" in data["database"]["status"]
 
+    @pytest.mark.asyncio
+    async def test_detailed_health_check_serves_cached_sample(self, client: AsyncClient):
+        """Test that a fresh background sample is served without resampling."""
+        from app.monitoring import system_sampler
+        
+        first = (await client.get("/api/v1/health/detailed")).json()
+        
+        with patch('app.monitoring.SystemSampler.sample') as mock_sample:
+            second = (await client.get("/api/v1/health/detailed")).json()
+            mock_sample.assert_not_called()
+        
+        assert second["sample"]["taken_at"] == first["sample"]["taken_at"]
+        assert second["sample"]["age_seconds"] >= 0
+        assert second["sample"]["interval_seconds"] == system_sampler.interval
+        assert len(second["sample"]["history"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_detailed_health_check_refreshes_stale_sample(self, client: AsyncClient):
+        """Test that a stale sample is replaced inline and kept in history."""
+        from app.monitoring import system_sampler
+        
+        first = (await client.get("/api/v1/health/detailed")).json()
+        
+        with patch('app.monitoring.time.monotonic', return_value=time.monotonic() + 3600):
+            second = (await client.get("/api/v1/health/detailed")).json()
+        
+        assert len(first["sample"]["history"]) == 1
+        assert second["sample"]["history"][0] == first["sample"]["history"][0]
+        assert len(system_sampler.history) == 2
+        assert len(second["sample"]["history"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_background_sampler_lifecycle(self, db_session):
+        """Test that the background sampler publishes samples until stopped."""
+        import asyncio
+        from app.monitoring import SystemSampler
+        from tests.conftest import TestAsyncSessionLocal
+        
+        sampler = SystemSampler(TestAsyncSessionLocal, interval=0.01, history_size=3)
+        sampler.start()
+        await asyncio.sleep(0.1)
+        await sampler.stop()
+        
+        assert not sampler.running
+        assert sampler.latest is not None
+        assert sampler.latest.db_status == "healthy"
+        assert len(sampler.history) == 3
+
     @pytest.mark.asyncio
     async def test_liveness_probe(self, client: AsyncClient):
         """Test the liveness probe endpoint."""
@@ -126,20 +179,19 @@ class TestHealthEndpoints:
     async def test_readiness_probe_failure(self, client: AsyncClient):
         """Test the readiness probe when service is not ready."""
         # Mock database failure
-        with patch('app.routers.health.get_db') as mock_get_db:
-            mock_session = AsyncMock()
-            mock_session.execute.side_effect = Exception("Database connection failed")
-            mock_get_db.return_value.__aenter__.return_value = mock_session
-            
-            response = await client.get("/api/v1/health/readiness")
-            
-            assert response.status_code == 503
-            data = response.json()["detail"]
-            
-            assert data["status"] == "not_ready"
-            assert "timestamp" in data
-            assert "checks" in data
-            assert data["checks"]["database"] == "unhealthy"
+        mock_session = AsyncMock()
+        mock_session.execute.side_effect = Exception("Database connection failed")
+        app.dependency_overrides[get_db] = lambda: mock_session
+        
+        response = await client.get("/api/v1/health/readiness")
+        
+        assert response.status_code == 503
+        data = response.json()["detail"]
+        
+        assert data["status"] == "not_ready"
+        assert "timestamp" in data
+        assert "checks" in data
+        assert data["checks"]["database"] == "unhealthy"
 
     @pytest.mark.asyncio
     async def test_health_endpoints_response_headers(self, client: AsyncClient):
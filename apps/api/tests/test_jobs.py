@@ -0,0 +1,339 @@
+"""
+Background job tests.
+
+This module contains tests for job deduplication, supersession and
+cancellation on both brokers, and for the job endpoints.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import RedisCache, result_cache
+from app.config import settings
+from app.models import Position
+from app.services.correlation import correlation_service
+from app.services.correlation_feed import correlation_feed
+from app.services.jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobKindDisabled,
+    JobQueue,
+    MemoryJobBroker,
+    RedisJobBroker,
+    init_jobs,
+    job_queue,
+)
+from app.services.market_data import FakeQuoteProvider, QuoteClient
+from tests.conftest import TestAsyncSessionLocal
+
+
+def make_queue(broker=None) -> JobQueue:
+    """Return a queue with a sleep-and-report handler."""
+    queue = JobQueue(broker or MemoryJobBroker(), concurrency=1, poll_interval=0.05)
+
+    @queue.handler("count")
+    async def count(ctx):
+        for i in range(ctx.params["steps"]):
+            await asyncio.sleep(0.01)
+            await ctx.progress((i + 1) / ctx.params["steps"], f"step {i + 1}")
+        return {"steps": ctx.params["steps"]}
+
+    return queue
+
+
+async def wait_for(queue: JobQueue, job_id: str, timeout: float = 5.0):
+    """Poll until a job has finished."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await queue.get(job_id)
+        if not job.active or asyncio.get_running_loop().time() > deadline:
+            return job
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def redis():
+    """Return a fakeredis client standing in for the shared broker."""
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest_asyncio.fixture
+async def workers():
+    """Run the application's job queue on a fresh in-memory broker and the test database."""
+    broker, sessions, read_sessions = job_queue.broker, job_queue.sessions, job_queue.read_sessions
+    job_queue.broker = MemoryJobBroker()
+    job_queue.poll_interval = 0.05
+    job_queue.sessions = job_queue.read_sessions = TestAsyncSessionLocal
+    job_queue.start()
+    yield job_queue
+    await job_queue.stop()
+    job_queue.broker, job_queue.sessions, job_queue.read_sessions = broker, sessions, read_sessions
+    job_queue.poll_interval = 1.0
+
+
+class TestJobQueue:
+    """Test suite for submission, workers and cancellation."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["memory", "redis"])
+    async def test_dedup_and_supersede(self, backend, request):
+        """Identical pending jobs are shared; different parameters cancel the pending job."""
+        broker = MemoryJobBroker() if backend == "memory" else RedisJobBroker(request.getfixturevalue("redis"))
+        queue = make_queue(broker)
+
+        first = await queue.submit("count", 1, {"steps": 3})
+        again = await queue.submit("count", 1, {"steps": 3})
+        other_portfolio = await queue.submit("count", 2, {"steps": 3})
+        newer = await queue.submit("count", 1, {"steps": 5})
+
+        assert again.id == first.id
+        assert other_portfolio.id != first.id
+        assert (await queue.get(first.id)).status == CANCELLED
+        assert (await queue.get(first.id)).message == f"Superseded by job {newer.id}"
+        assert (await queue.get(newer.id)).status == QUEUED
+        assert (await queue.get(other_portfolio.id)).status == QUEUED
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["memory", "redis"])
+    async def test_worker_runs_jobs_and_skips_cancelled(self, backend, request):
+        """Workers record progress and results and never start a cancelled job."""
+        broker = MemoryJobBroker() if backend == "memory" else RedisJobBroker(request.getfixturevalue("redis"))
+        queue = make_queue(broker)
+        cancelled = await queue.submit("count", 1, {"steps": 2})
+        await queue.cancel(cancelled.id)
+        job = await queue.submit("count", 2, {"steps": 4})
+
+        queue.start()
+        try:
+            done = await wait_for(queue, job.id)
+        finally:
+            await queue.stop()
+
+        assert (done.status, done.progress, done.result) == (SUCCEEDED, 1.0, {"steps": 4})
+        assert done.started_at is not None and done.finished_at >= done.started_at
+        assert (await queue.get(cancelled.id)).started_at is None
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self):
+        """A running job stops and cannot be marked succeeded afterwards."""
+        queue = make_queue()
+        job = await queue.submit("count", 1, {"steps": 500})
+        queue.start()
+        try:
+            while (await queue.get(job.id)).status != RUNNING:
+                await asyncio.sleep(0.005)
+            await queue.cancel(job.id)
+            await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+
+        stopped = await queue.get(job.id)
+        assert stopped.status == CANCELLED
+        assert stopped.progress < 1.0
+        assert stopped.result is None
+
+    @pytest.mark.asyncio
+    async def test_failures_are_recorded(self):
+        """A handler exception fails the job with its message."""
+        queue = JobQueue(MemoryJobBroker(), concurrency=1, poll_interval=0.05)
+
+        @queue.handler("boom")
+        async def boom(ctx):
+            raise ValueError("no history")
+
+        job = await queue.submit("boom", 1, {})
+        queue.start()
+        try:
+            done = await wait_for(queue, job.id)
+        finally:
+            await queue.stop()
+
+        assert (done.status, done.error) == (FAILED, "no history")
+
+    @pytest.mark.asyncio
+    async def test_cleanup_of_jobs_that_never_run(self):
+        """Cancelled and skipped jobs release their resources; jobs that run clean up themselves."""
+        queue = make_queue()
+        cleaned = []
+        handler, supersede, _ = queue._handlers["count"]
+        queue.handler("count", supersede=False, cleanup=lambda job: cleaned.append(job.id))(handler)
+
+        cancelled = await queue.submit("count", 1, {"steps": 1})
+        await queue.cancel(cancelled.id)
+        assert cleaned == [cancelled.id]
+
+        # Cancelled by a process that does not know the kind's cleanup.
+        skipped = await queue.submit("count", 2, {"steps": 1})
+        await queue.broker.transition(skipped.id, {QUEUED}, status=CANCELLED)
+        ran = await queue.submit("count", 3, {"steps": 1})
+        queue.start()
+        try:
+            await wait_for(queue, ran.id)
+        finally:
+            await queue.stop()
+
+        # The cancelled job is skipped when dequeued as well; cleanups are idempotent.
+        assert set(cleaned) == {cancelled.id, skipped.id}
+        assert ran.id not in cleaned
+
+    @pytest.mark.asyncio
+    async def test_jobs_of_dead_workers_are_requeued(self, redis):
+        """A running job whose lease runs out is requeued, then fails after max_attempts."""
+        clock = [1000.0]
+        broker = RedisJobBroker(redis, lease_ttl=30.0, max_attempts=2, clock=lambda: clock[0])
+        queue = make_queue(broker)
+        job = await queue.submit("count", 1, {"steps": 1})
+
+        # A worker takes the job and dies without acknowledging it.
+        assert await broker.dequeue(timeout=0.01) == job.id
+        await broker.transition(job.id, {QUEUED}, status=RUNNING, started_at=clock[0])
+        clock[0] += 29.0
+        assert await broker.reap() == []
+        clock[0] += 2.0
+        [requeued] = await broker.reap()
+
+        assert (requeued.status, requeued.attempts, requeued.started_at) == (QUEUED, 1, None)
+        assert await broker.dequeue(timeout=0.01) == job.id
+        await broker.transition(job.id, {QUEUED}, status=RUNNING, started_at=clock[0])
+        clock[0] += 31.0
+        [failed] = await broker.reap()
+
+        assert (failed.status, failed.error) == (FAILED, "Lost 2 workers")
+        assert await broker.dequeue(timeout=0.01) is None
+        assert await redis.llen("pxr:jobs:processing") == 0
+
+    @pytest.mark.asyncio
+    async def test_acknowledged_jobs_are_not_reaped(self, redis):
+        """A finished job leaves the processing list, and a job without a lease gets one first."""
+        clock = [1000.0]
+        broker = RedisJobBroker(redis, lease_ttl=30.0, clock=lambda: clock[0])
+        queue = make_queue(broker)
+        done = await queue.submit("count", 1, {"steps": 1})
+        pending = await queue.submit("count", 2, {"steps": 1})
+
+        assert await broker.dequeue(timeout=0.01) == done.id
+        await broker.ack(done.id)
+        # Between BLMOVE and the first renewal.
+        await redis.lmove("pxr:jobs:queue", "pxr:jobs:processing", "LEFT", "RIGHT")
+        clock[0] += 100.0
+        assert await broker.reap() == []
+        assert await redis.lrange("pxr:jobs:processing", 0, -1) == [pending.id]
+
+        clock[0] += 31.0
+        assert await broker.reap() == []
+        assert await broker.dequeue(timeout=0.01) == pending.id
+
+    @pytest.mark.asyncio
+    async def test_redis_without_spool_dir_disables_imports(self, redis, monkeypatch):
+        """Sharing jobs through Redis without JOB_SPOOL_DIR disables only import jobs."""
+        monkeypatch.setattr(result_cache, "backend", RedisCache(redis))
+        monkeypatch.setattr(settings, "JOB_SPOOL_DIR", None)
+        monkeypatch.setattr(job_queue, "broker", job_queue.broker)
+        monkeypatch.setattr(job_queue, "disabled", {})
+        # No workers: the queued job must not run against the real database.
+        monkeypatch.setattr(job_queue, "concurrency", 0)
+
+        await init_jobs()
+        try:
+            assert isinstance(job_queue.broker, RedisJobBroker)
+            with pytest.raises(JobKindDisabled, match="JOB_SPOOL_DIR"):
+                await job_queue.submit("import", 1, {"path": "x"})
+            job = await job_queue.submit("stress", 1, {})
+            assert job.status == QUEUED
+        finally:
+            await job_queue.stop()
+
+
+class TestJobEndpoints:
+    """Test suite for submitting and polling jobs over HTTP."""
+
+    @pytest.mark.asyncio
+    async def test_monte_carlo_var_job(self, client: AsyncClient, db_session: AsyncSession, workers, create_portfolio):
+        """A VaR job runs in chunks to completion; finished jobs cannot be cancelled."""
+        portfolio = await create_portfolio(*[
+            dict(symbol=s, quantity=100, entry_price=100.0, current_price=100.0) for s in ("AAPL", "MSFT")
+        ])
+        rng = np.random.default_rng(7)
+        correlation_service.register("test", ["AAPL", "MSFT"], rng.normal(0.0, 0.01, (300, 2)))
+
+        body = {"method": "monte_carlo", "paths": 20_000, "seed": 1}
+        response = await client.post(f"/api/v1/portfolio/{portfolio.id}/risk/calculate", json=body)
+        duplicate = await client.post(f"/api/v1/portfolio/{portfolio.id}/risk/calculate", json=body)
+        missing = await client.post("/api/v1/portfolio/999999/risk/calculate", json=body)
+
+        assert response.status_code == 202
+        assert response.json()["status"] in (QUEUED, RUNNING)
+        assert duplicate.json()["id"] == response.json()["id"]
+        assert missing.status_code == 404
+
+        done = await wait_for(workers, response.json()["id"])
+        data = (await client.get(f"/api/v1/jobs/{done.id}")).json()
+        assert data["status"] == SUCCEEDED
+        assert data["progress"] == 1.0
+        assert data["result"]["paths"] == 20_000
+        assert 0 < data["result"]["var"] < data["result"]["cvar"]
+        assert (await client.delete(f"/api/v1/jobs/{done.id}")).status_code == 409
+        assert (await client.get("/api/v1/jobs/unknown")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_var_job_on_seeded_history(self, client: AsyncClient, workers, monkeypatch, create_portfolio):
+        """A VaR job succeeds on the holdings universe the feed seeds from provider history."""
+        portfolio = await create_portfolio(*[
+            dict(symbol=s, quantity=100, entry_price=100.0, current_price=100.0) for s in ("AAPL", "MSFT", "XOM")
+        ])
+        monkeypatch.setattr(correlation_feed, "sessions", TestAsyncSessionLocal)
+        monkeypatch.setattr(correlation_feed, "client", QuoteClient(FakeQuoteProvider(), batch_window=0))
+        assert await correlation_feed.seed() == 3
+
+        response = await client.post(f"/api/v1/portfolio/{portfolio.id}/risk/calculate",
+                                     json={"method": "historical", "confidence": 0.99})
+        done = await wait_for(workers, response.json()["id"])
+
+        assert done.status == SUCCEEDED, done.error
+        assert done.result["observations"] == 252
+        assert 0 < done.result["var"] <= done.result["cvar"]
+
+    @pytest.mark.asyncio
+    async def test_var_job_without_history_fails(self, client: AsyncClient, workers, create_portfolio):
+        """Holdings without price history fail the job with a readable error."""
+        portfolio = await create_portfolio(
+            dict(symbol="NEWCO", quantity=10, entry_price=10.0, current_price=10.0)
+        )
+
+        response = await client.post(f"/api/v1/portfolio/{portfolio.id}/risk/calculate",
+                                     json={"method": "historical"})
+        done = await wait_for(workers, response.json()["id"])
+
+        assert done.status == FAILED
+        assert "NEWCO" in done.error
+
+    @pytest.mark.asyncio
+    async def test_import_job(self, client: AsyncClient, db_session: AsyncSession, workers, create_portfolio):
+        """A spooled upload is imported by a worker and the spool file removed."""
+        portfolio = await create_portfolio()
+        body = "symbol,quantity,entry_price\nAAPL,10,150\nMSFT,5,300\nBAD,x,1\n"
+
+        response = await client.post(
+            "/api/v1/import/csv/jobs",
+            params={"portfolio_id": portfolio.id, "skip_invalid": True},
+            files={"file": ("positions.csv", body.encode(), "text/csv")},
+        )
+        assert response.status_code == 202
+        done = await wait_for(workers, response.json()["id"])
+
+        assert done.status == SUCCEEDED
+        assert (done.result["imported"], done.result["rejected"]) == (2, 1)
+        assert done.result["errors"][0]["symbol"] == "BAD"
+        count = await db_session.scalar(select(func.count()).select_from(Position)
+                                        .where(Position.portfolio_id == portfolio.id))
+        assert count == 2
@@ -0,0 +1,241 @@
+"""
+Live dashboard tests.
+
+This module contains tests for change detection and coalescing in the
+dashboard hub, and for the server-sent event endpoint.
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.routers.live import stream_portfolio
+from app.models import Position
+from app.services.live import dashboard_hub
+from app.services.market_data import FakeQuoteProvider, QuoteClient
+from app.services.snapshot import snapshot_store
+from tests.conftest import TestAsyncSessionLocal
+
+
+@pytest_asyncio.fixture
+async def hub():
+    """Point the application's hub at the test database and a fake provider."""
+    sessions, quotes, limit = dashboard_hub.sessions, dashboard_hub.quotes, dashboard_hub.max_connections
+    provider = FakeQuoteProvider({"AAPL": 110.0, "MSFT": 200.0, "XOM": 50.0})
+    dashboard_hub.sessions = TestAsyncSessionLocal
+    dashboard_hub.quotes = QuoteClient(provider, batch_window=0)
+    dashboard_hub.provider = provider
+    yield dashboard_hub
+    dashboard_hub.sessions, dashboard_hub.quotes, dashboard_hub.max_connections = sessions, quotes, limit
+    del dashboard_hub.provider
+    dashboard_hub.clear()
+
+
+def lots(holdings):
+    """Return ``(symbol, quantity)`` lots bought at 100 with a stop at 90."""
+    return [
+        dict(symbol=symbol, quantity=quantity, entry_price=100.0, current_price=100.0, stop_loss=90.0)
+        for symbol, quantity in holdings
+    ]
+
+
+def next_now(subscription):
+    """Return a subscription's pending update without waiting."""
+    return subscription.next(0)
+
+
+class TestDashboardHub:
+    """Test suite for change detection and fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_then_deltas_of_changed_fields(self, db_session: AsyncSession, hub, create_portfolio):
+        """The first update carries every field; later ones only what moved."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10), ("MSFT", 5)]), cash_balance=1000.0)
+        subscription = hub.subscribe(portfolio.id)
+
+        await hub.tick()
+        first = await next_now(subscription)
+        assert first["market_value"] == 10 * 110.0 + 5 * 200.0
+        assert first["portfolio_value"] == first["market_value"] + 1000.0
+        assert {"total_risk_dollars", "unrealized_pnl", "position_count", "day_pnl"} <= set(first)
+
+        await hub.tick()
+        assert await next_now(subscription) is None
+
+        hub.provider.prices["AAPL"] = 120.0
+        await hub.tick()
+        delta = await next_now(subscription)
+        assert delta["market_value"] == 10 * 120.0 + 5 * 200.0
+        assert "position_count" not in delta
+        assert "cost_basis" not in delta
+
+    @pytest.mark.asyncio
+    async def test_only_portfolios_holding_moved_symbols_recompute(self, hub, create_portfolio):
+        """A price move reaches subscribers of portfolios holding that symbol only."""
+        tech = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        energy = await create_portfolio(*lots([("XOM", 10), ("MSFT", 1)]), cash_balance=1000.0)
+        tech_sub, energy_sub = hub.subscribe(tech.id), hub.subscribe(energy.id)
+        await hub.tick()
+        await next_now(tech_sub), await next_now(energy_sub)
+
+        hub.provider.prices["XOM"] = 55.0
+        await hub.tick()
+        assert await next_now(tech_sub) is None
+        assert (await next_now(energy_sub))["market_value"] == 10 * 55.0 + 200.0
+        # Watched symbols are fetched together in one upstream call per tick.
+        assert sorted(hub.provider.calls[-1]) == ["AAPL", "MSFT", "XOM"]
+
+    @pytest.mark.asyncio
+    async def test_position_writes_trigger_recompute(self, db_session: AsyncSession, hub, create_portfolio):
+        """Invalidating a watched snapshot reloads it on the next tick."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        subscription = hub.subscribe(portfolio.id)
+        await hub.tick()
+        await next_now(subscription)
+
+        db_session.add(Position(portfolio_id=portfolio.id, symbol="MSFT", quantity=2,
+                                entry_price=100.0, current_price=100.0))
+        await db_session.commit()
+        snapshot_store.invalidate(portfolio.id)
+        await hub.tick()
+
+        delta = await next_now(subscription)
+        assert delta["position_count"] == 2
+        assert delta["unprotected_positions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_snapshot_is_reloaded(self, db_session: AsyncSession, hub, monkeypatch, create_portfolio):
+        """A write this worker was not told about is picked up once the snapshot expires."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        subscription = hub.subscribe(portfolio.id)
+        await hub.tick()
+        await next_now(subscription)
+
+        # A Core update, as another worker's write looks to this one: no invalidation.
+        await db_session.execute(
+            update(Position).where(Position.portfolio_id == portfolio.id).values(quantity=20)
+        )
+        await db_session.commit()
+        await hub.tick()
+        assert await next_now(subscription) is None
+
+        monkeypatch.setattr(snapshot_store, "ttl", 0.0)
+        await hub.tick()
+        delta = await next_now(subscription)
+        assert delta["market_value"] == 2200.0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_gets_merged_delta(self, db_session: AsyncSession, hub, create_portfolio):
+        """Updates a client has not read are merged, latest value winning."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10), ("MSFT", 5)]), cash_balance=1000.0)
+        slow, fast = hub.subscribe(portfolio.id), hub.subscribe(portfolio.id)
+        await hub.tick()
+        await next_now(slow), await next_now(fast)
+
+        for price in (111.0, 112.0, 113.0):
+            hub.provider.prices["AAPL"] = price
+            await hub.tick()
+            assert (await next_now(fast))["market_value"] == 10 * price + 5 * 200.0
+        hub.provider.prices["MSFT"] = 150.0
+        await hub.tick()
+
+        merged = await next_now(slow)
+        assert merged["market_value"] == 10 * 113.0 + 5 * 150.0
+        assert await next_now(slow) is None
+
+    @pytest.mark.asyncio
+    async def test_late_subscriber_starts_from_published_state(self, db_session: AsyncSession, hub, create_portfolio):
+        """A second subscriber is served the current state without a recompute."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        first = hub.subscribe(portfolio.id)
+        await hub.tick()
+        expected = await next_now(first)
+        calls = len(hub.provider.calls)
+
+        second = hub.subscribe(portfolio.id)
+        assert await next_now(second) == expected
+        assert len(hub.provider.calls) == calls
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        assert hub.connections == 0
+        await hub.tick()
+        assert len(hub.provider.calls) == calls
+
+
+class TestLiveEndpoint:
+    """Test suite for the live stream endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_unknown_portfolio(self, client: AsyncClient, hub):
+        """Streams of unknown portfolios are refused."""
+        response = await client.get("/api/v1/portfolio/999999/live")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_connection_limit(self, client: AsyncClient, db_session: AsyncSession, hub, create_portfolio):
+        """Connections beyond the per-worker limit get a 503 with Retry-After."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        hub.max_connections = 1
+        hub.subscribe(portfolio.id)
+
+        response = await client.get(f"/api/v1/portfolio/{portfolio.id}/live")
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+    @pytest.mark.asyncio
+    async def test_subscription_starts_with_the_body(self, db_session: AsyncSession, hub, create_portfolio):
+        """A client gone before the body streams leaves no subscription behind."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+
+        response = await stream_portfolio(portfolio.id, db_session)
+        assert hub.connections == 0
+        await response.body_iterator.aclose()
+        assert hub.connections == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_sends_snapshot_and_unsubscribes(self, client: AsyncClient, hub, create_portfolio):
+        """The stream opens with a snapshot event and is dropped on disconnect."""
+        portfolio = await create_portfolio(*lots([("AAPL", 10)]), cash_balance=1000.0)
+        chunks, disconnect = [], asyncio.Event()
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            chunks.append(message)
+            if message["type"] == "http.response.body" and message.get("body"):
+                disconnect.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/v1/portfolio/{portfolio.id}/live", "raw_path": b"",
+            "root_path": "", "query_string": b"", "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+        }
+        request = asyncio.create_task(app(scope, receive, send))
+        while hub.connections == 0:
+            await asyncio.sleep(0.01)
+        await hub.tick()
+        await asyncio.wait_for(request, 5)
+
+        assert chunks[0]["status"] == 200
+        assert dict(chunks[0]["headers"])[b"content-type"].startswith(b"text/event-stream")
+        frame = next(c["body"] for c in chunks if c.get("body")).decode()
+        lines = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+        assert lines["event"] == "snapshot"
+        assert lines["id"] == "1"
+        data = json.loads(lines["data"])
+        assert data["portfolio_id"] == portfolio.id
+        assert data["market_value"] == 1100.0
+        assert hub.connections == 0
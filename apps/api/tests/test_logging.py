@@ -0,0 +1,160 @@
+"""
+Request logging tests.
+
+This module tests the ASGI logging middleware (request IDs, header redaction,
+sampling) and the queue-backed log sink.
+"""
+
+import json
+import logging
+import queue
+
+import pytest
+import structlog
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from httpx import AsyncClient
+from unittest.mock import MagicMock, patch
+
+from app.logging_config import DeferredQueueHandler, _formatter
+from app.middleware.logging import LoggingMiddleware
+
+
+def _make_app(**middleware_options) -> FastAPI:
+    """Build a minimal app wrapped in the logging middleware."""
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        return PlainTextResponse(json.dumps(payload))
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(LoggingMiddleware, **middleware_options)
+    return app
+
+
+def _events(mock_logger: MagicMock):
+    """Return (level, message, fields) for every call on the mocked logger."""
+    return [
+        (name, args[0], kwargs)
+        for name, args, kwargs in mock_logger.method_calls
+    ]
+
+
+class TestLoggingMiddleware:
+    """Test suite for the request logging middleware."""
+
+    @pytest.mark.asyncio
+    async def test_request_id_and_redaction(self):
+        """Sampled requests log start and completion with sensitive headers redacted."""
+        app = _make_app()
+        with patch("app.middleware.logging.logger") as mock_logger:
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                response = await ac.get(
+                    "/ok?x=1", headers={"Authorization": "Bearer secret", "X-Trace": "abc"}
+                )
+
+        assert response.status_code == 200
+        request_id = response.headers["x-request-id"]
+
+        (start_level, start_msg, start), (end_level, end_msg, end) = _events(mock_logger)
+        assert (start_level, start_msg) == ("info", "Request started")
+        assert start["request_id"] == request_id
+        assert start["url"] == "http://test/ok?x=1"
+        assert start["headers"]["authorization"] == "[REDACTED]"
+        assert start["headers"]["x-trace"] == "abc"
+        assert (end_level, end_msg) == ("info", "Request completed")
+        assert end["request_id"] == request_id
+        assert end["status_code"] == 200
+        assert end["response_size"] == len(response.content)
+
+    @pytest.mark.asyncio
+    async def test_unsampled_success_is_silent_but_errors_are_logged(self):
+        """With sampling disabled only failures reach the log, with request context."""
+        app = _make_app(sample_rate=0.0)
+        with patch("app.middleware.logging.logger") as mock_logger:
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                ok = await ac.get("/ok")
+                missing = await ac.get("/missing")
+
+        assert "x-request-id" in ok.headers
+        events = _events(mock_logger)
+        assert len(events) == 1
+        level, message, fields = events[0]
+        assert (level, message) == ("warning", "Request completed")
+        assert fields["request_id"] == missing.headers["x-request-id"]
+        assert fields["status_code"] == 404
+        assert fields["method"] == "GET"
+        assert fields["path"] == "/missing"
+
+    @pytest.mark.asyncio
+    async def test_exception_is_logged_and_reraised(self):
+        """Unhandled exceptions are logged as failures and propagate."""
+        app = _make_app(sample_rate=0.0)
+        with patch("app.middleware.logging.logger") as mock_logger:
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                with pytest.raises(RuntimeError):
+                    await ac.get("/boom")
+
+        messages = [(level, message) for level, message, _ in _events(mock_logger)]
+        assert ("error", "Request failed with exception") in messages
+        assert ("error", "Request failed") in messages
+
+    @pytest.mark.asyncio
+    async def test_body_size_counted_without_buffering(self):
+        """log_body reports the number of request body bytes received."""
+        app = _make_app(log_body=True)
+        body = json.dumps({"key": "v" * 100})
+        with patch("app.middleware.logging.logger") as mock_logger:
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                response = await ac.post(
+                    "/echo", content=body, headers={"Content-Type": "application/json"}
+                )
+
+        assert response.status_code == 200
+        _, _, end = _events(mock_logger)[-1]
+        assert end["body_size"] == len(body)
+
+
+class TestDeferredQueueHandler:
+    """Test suite for the queue-backed log sink."""
+
+    def test_structlog_records_are_rendered_by_the_listener(self):
+        """Event dicts are enqueued as-is and rendered to JSON by the formatter."""
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        event = {"event": "Request completed", "status_code": 200}
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, event, None, None)
+        record._logger = structlog.get_logger()
+        record._name = "info"
+
+        handler.handle(record)
+        queued = log_queue.get_nowait()
+
+        assert queued.msg is event
+        rendered = json.loads(_formatter().format(queued))
+        assert rendered["event"] == "Request completed"
+        assert rendered["status_code"] == 200
+
+    def test_stdlib_records_are_merged_before_enqueueing(self):
+        """Plain logging records have their arguments merged on the calling thread."""
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        record = logging.LogRecord("uvicorn", logging.INFO, __file__, 1, "%s connected", ("peer",), None)
+
+        handler.handle(record)
+        queued = log_queue.get_nowait()
+
+        assert queued.msg == "peer connected"
+        assert queued.args is None
+        rendered = json.loads(_formatter().format(queued))
+        assert rendered["event"] == "peer connected"
+        assert rendered["logger"] == "uvicorn"
+        assert rendered["level"] == "info"
@@ -0,0 +1,126 @@
+"""
+Metrics tests.
+
+This module tests the metrics registry, its Prometheus text rendering, the
+request metrics middleware and the ``/metrics`` endpoint.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import POOL_CHECKOUT_WAIT, InstrumentedAsyncAdaptedQueuePool
+from app.metrics import CONTENT_TYPE, MetricsRegistry
+from app.middleware.metrics import REQUEST_DURATION
+
+
+class TestMetricsRegistry:
+    """Test suite for metric types and rendering."""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Bucket counts are cumulative and end with +Inf, _sum and _count."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, route="/a")
+
+        rendered = registry.render()
+
+        assert "# TYPE latency_seconds histogram" in rendered
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in rendered
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in rendered
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in rendered
+        assert 'latency_seconds_sum{route="/a"} 2.65' in rendered
+        assert 'latency_seconds_count{route="/a"} 4' in rendered
+        assert histogram.count(route="/a") == 4
+
+    def test_counter_gauge_and_callbacks(self):
+        """Counters, gauges and callback-backed metrics render their values."""
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs_total", "Jobs", ("kind",))
+        gauge = registry.gauge("in_flight", "In flight")
+        registry.gauge("ratio", "Ratio", function=lambda: 0.25)
+
+        counter.inc(kind='say "hi"')
+        counter.inc(2, kind='say "hi"')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        rendered = registry.render()
+
+        assert 'jobs_total{kind="say \\"hi\\""} 3' in rendered
+        assert "in_flight 1" in rendered
+        assert "ratio 0.25" in rendered
+
+    def test_labelled_callback_metrics(self):
+        """Labelled callbacks return a mapping of label values to values."""
+        registry = MetricsRegistry()
+        gauge = registry.gauge(
+            "pool_size", "Pool size", ("pool",),
+            function=lambda: {("primary",): 5, ("replica",): 3},
+        )
+
+        rendered = registry.render()
+
+        assert 'pool_size{pool="primary"} 5' in rendered
+        assert 'pool_size{pool="replica"} 3' in rendered
+        assert gauge.get(pool="replica") == 3
+
+    def test_rejects_duplicates_and_wrong_labels(self):
+        """Names are unique and observations must supply exactly the label names."""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ("method",))
+
+        with pytest.raises(ValueError):
+            registry.counter("requests_total", "Requests again")
+        with pytest.raises(ValueError):
+            counter.inc(route="/")
+
+    @pytest.mark.asyncio
+    async def test_pool_checkout_wait_is_recorded(self):
+        """Every pool checkout is observed in the checkout wait histogram."""
+        engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:", poolclass=InstrumentedAsyncAdaptedQueuePool
+        )
+        before = POOL_CHECKOUT_WAIT.count(pool="primary")
+        try:
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+
+        assert POOL_CHECKOUT_WAIT.count(pool="primary") == before + 3
+
+
+class TestMetricsEndpoint:
+    """Test suite for the /metrics endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_requests_are_labelled_by_route_template(self, client: AsyncClient):
+        """Latency is recorded per route template and status, unmatched paths grouped."""
+        labels = {"method": "GET", "route": "/api/v1/health", "status": "200"}
+        missing = {"method": "GET", "route": "unmatched", "status": "404"}
+        before, before_missing = REQUEST_DURATION.count(**labels), REQUEST_DURATION.count(**missing)
+
+        await client.get("/api/v1/health")
+        await client.get("/api/v1/health")
+        await client.get("/api/v1/does-not-exist")
+
+        assert REQUEST_DURATION.count(**labels) == before + 2
+        assert REQUEST_DURATION.count(**missing) == before_missing + 1
+
+        response = await client.get("/api/v1/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == CONTENT_TYPE
+        body = response.text
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/api/v1/health",status="200"} '
+            f"{before + 2}"
+        ) in body
+        assert 'http_requests_in_progress{method="GET"} 1' in body
+        assert "# TYPE db_pool_checkout_wait_seconds histogram" in body
+        assert "result_cache_hit_ratio" in body
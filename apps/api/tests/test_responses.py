@@ -0,0 +1,104 @@
+"""
+JSON response tests.
+
+This module contains tests for orjson rendering and the trusted output
+path that skips response-model validation.
+"""
+
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import BaseModel
+
+from app.responses import FastJSONResponse, dumps, trusted_output
+
+
+class Point(BaseModel):
+    """Schema used as a response model."""
+
+    value: float
+    at: datetime
+
+
+class TestFastJSONResponse:
+    """Test suite for orjson rendering."""
+
+    def test_native_types(self):
+        """Datetimes render as ISO 8601, arrays as lists with NaN as null."""
+        body = json.loads(dumps({
+            "naive": datetime(2024, 3, 6, 16, 0, 0, 500),
+            "aware": datetime(2024, 3, 6, 16, 0, tzinfo=timezone.utc),
+            "matrix": np.array([[1.0, np.nan], [0.25, 1.0]]),
+            "count": np.int64(3),
+        }))
+        assert body == {
+            "naive": "2024-03-06T16:00:00.000500",
+            "aware": "2024-03-06T16:00:00+00:00",
+            "matrix": [[1.0, None], [0.25, 1.0]],
+            "count": 3,
+        }
+
+    def test_fallback_types(self):
+        """Pydantic models, decimals and sets are converted."""
+        body = json.loads(dumps({
+            "point": Point(value=1.5, at=datetime(2024, 3, 6)),
+            "amount": Decimal("2.50"),
+            "tags": {"a"},
+        }))
+        assert body == {"point": {"value": 1.5, "at": "2024-03-06T00:00:00"}, "amount": 2.5, "tags": ["a"]}
+
+    def test_unsupported_type_raises(self):
+        """Unknown objects fail loudly rather than rendering something arbitrary."""
+        with pytest.raises(TypeError):
+            dumps({"x": object()})
+
+
+class TestTrustedOutput:
+    """Test suite for endpoints that skip response-model validation."""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI(default_response_class=FastJSONResponse)
+
+        @app.get("/validated", response_model=Point)
+        async def validated():
+            return {"value": "1.5", "at": datetime(2024, 3, 6)}
+
+        @app.get("/trusted", response_model=Point)
+        @trusted_output
+        async def trusted(scale: float = 1.0):
+            return {"value": np.float64(1.5) * scale, "at": datetime(2024, 3, 6), "extra": np.arange(2)}
+
+        @app.get("/explicit", response_model=Point)
+        @trusted_output
+        async def explicit():
+            return FastJSONResponse({"custom": True}, status_code=202)
+
+        return app
+
+    @pytest.mark.asyncio
+    async def test_output_is_rendered_as_returned(self, app):
+        """Trusted output is not coerced or filtered by the response model."""
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            validated = await client.get("/validated")
+            trusted = await client.get("/trusted", params={"scale": 2})
+            explicit = await client.get("/explicit")
+
+        assert validated.json() == {"value": 1.5, "at": "2024-03-06T00:00:00"}
+        assert trusted.status_code == 200
+        assert trusted.json() == {"value": 3.0, "at": "2024-03-06T00:00:00", "extra": [0, 1]}
+        assert explicit.status_code == 202
+        assert explicit.json() == {"custom": True}
+
+    def test_schema_still_documented(self, app):
+        """The response model still appears in the OpenAPI schema, with query parameters."""
+        operation = app.openapi()["paths"]["/trusted"]["get"]
+        assert operation["responses"]["200"]["content"]["application/json"]["schema"] == {
+            "$ref": "#/components/schemas/Point"
+        }
+        assert [p["name"] for p in operation["parameters"]] == ["scale"]
@@ -0,0 +1,74 @@
+"""
+Startup tests.
+
+This module contains tests for startup phase timing and the migration
+head check that lets startup skip ``create_all``.
+"""
+
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import database
+from app.startup import StartupTimer
+from tests.conftest import test_engine
+
+
+class TestStartupTimer:
+    """Test suite for phase timing."""
+
+    @pytest.mark.asyncio
+    async def test_phases_run_concurrently_and_are_recorded(self):
+        """Concurrent phases overlap and each gets its own duration."""
+        timer = StartupTimer()
+        timer.begin()
+        start = time.perf_counter()
+        results = await timer.concurrently(a=asyncio.sleep(0.05, "a"), b=asyncio.sleep(0.05, "b"))
+
+        assert results == {"a": "a", "b": "b"}
+        assert time.perf_counter() - start < 0.09
+        assert timer.phases["a"] >= 0.05 and timer.phases["b"] >= 0.05
+        assert timer.phases["boot"] > 0
+        assert timer.total >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_failed_phase_is_recorded_and_raised(self):
+        """A failing phase still has a duration and aborts startup."""
+        async def fail():
+            raise RuntimeError("redis down")
+
+        timer = StartupTimer()
+        with pytest.raises(RuntimeError):
+            await timer.concurrently(cache=fail())
+        assert "cache" in timer.phases
+
+
+class TestSchemaCheck:
+    """Test suite for the migration head check."""
+
+    @pytest.mark.asyncio
+    async def test_without_migrations_schema_is_not_current(self):
+        """With no migration scripts startup always runs create_all."""
+        assert database._alembic_heads() == ()
+        assert await database.schema_is_current() is False
+
+    @pytest.mark.asyncio
+    async def test_applied_head_is_current(self):
+        """The database is current when alembic_version holds every head."""
+        engine, heads = database.engine, database._alembic_heads
+        database.engine, database._alembic_heads = test_engine, lambda: ("abc123",)
+        try:
+            async with test_engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            assert await database.schema_is_current() is False
+
+            async with test_engine.begin() as conn:
+                await conn.execute(text("INSERT INTO alembic_version VALUES ('abc123')"))
+            assert await database.schema_is_current() is True
+            assert await database.prepare_schema("alembic") == "current"
+        finally:
+            database.engine, database._alembic_heads = engine, heads
+            async with test_engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))